@@ -19,7 +19,8 @@ import {
   ComprehensiveBatchResult,
   UploadProgress,
   BatchUploadProgress,
-  AnalysisProgress
+  AnalysisProgress,
+  BatchResultSummary
 } from './types';
 
 // API Configuration
@@ -170,7 +171,6 @@ export async function startBatchAnalysis(
   logger.debug('startBatchAnalysis called with', imagePaths.length, 'images, batchId:', batchId);
 
   const payload: any = {
-    images: imagePaths,
     grid_square_size_inches: config.gridSquareSize,
     include_visualizations: config.includeVisualizations,
     include_color_analysis: config.includeColorAnalysis,
@@ -180,6 +180,11 @@ export async function startBatchAnalysis(
     save_logs: config.saveLogs,
   };
 
+  // Without explicit paths the server analyzes everything uploaded under batchId
+  if (imagePaths.length > 0) {
+    payload.images = imagePaths;
+  }
+
   // If we have a batch_id from upload, include it
   if (batchId) {
     payload.batch_id = batchId;
@@ -194,9 +199,70 @@ export async function startBatchAnalysis(
 }
 
 /**
- * Stream batch analysis progress using polling
+ * Stream batch analysis progress
+ *
+ * Uses the server-sent event stream so progress and finished results arrive
+ * as they happen; falls back to polling if the stream cannot be opened.
  */
 export async function streamBatchProgress(
+  batchId: string, 
+  onProgress: (progress: AnalysisProgress) => void,
+  onComplete?: (result: ComprehensiveBatchResult) => void,
+  onError?: (error: any) => void,
+  onResult?: (summary: BatchResultSummary) => void
+): Promise<void> {
+  if (typeof window === 'undefined' || typeof EventSource === 'undefined') {
+    return pollBatchProgress(batchId, onProgress, onComplete, onError);
+  }
+
+  const source = new EventSource(`${API_BASE_URL}${API_VERSION}/analysis/batch/${batchId}/events`);
+  let receivedEvent = false;
+
+  source.addEventListener('progress', (event) => {
+    receivedEvent = true;
+    onProgress(JSON.parse((event as MessageEvent).data));
+  });
+
+  source.addEventListener('result', (event) => {
+    onResult?.(JSON.parse((event as MessageEvent).data));
+  });
+
+  source.addEventListener('end', async (event) => {
+    source.close();
+    const { status } = JSON.parse((event as MessageEvent).data);
+    if (status === 'completed') {
+      logger.info('Streaming completed, fetching final results...');
+      try {
+        const finalResult = await getComprehensiveBatchResults(batchId);
+        onComplete?.(finalResult);
+      } catch (resultError) {
+        logger.error('Failed to fetch final results:', resultError);
+        onError?.(resultError);
+      }
+    } else if (status === 'cancelled') {
+      logger.info('Analysis cancelled during streaming');
+      onError?.(new Error('Batch analysis cancelled'));
+    } else {
+      logger.warn('Analysis failed during streaming');
+      onError?.(new Error('Batch analysis failed'));
+    }
+  });
+
+  source.onerror = () => {
+    // EventSource reconnects on its own once a stream was established;
+    // if it never opened, switch to polling instead
+    if (!receivedEvent) {
+      logger.warn('Progress stream unavailable, falling back to polling');
+      source.close();
+      pollBatchProgress(batchId, onProgress, onComplete, onError);
+    }
+  };
+}
+
+/**
+ * Track batch analysis progress by polling (fallback when event streams are unavailable)
+ */
+async function pollBatchProgress(
   batchId: string, 
   onProgress: (progress: AnalysisProgress) => void,
   onComplete?: (result: ComprehensiveBatchResult) => void,
@@ -229,6 +295,12 @@ export async function streamBatchProgress(
         return;
       }
 
+      if (progress.status === 'cancelled') {
+        logger.info('Analysis cancelled during streaming');
+        onError?.(new Error('Batch analysis cancelled'));
+        return;
+      }
+
       attempts++;
       if (attempts >= maxAttempts) {
         onError?.(new Error('Analysis timeout - exceeded maximum wait time'));
@@ -263,7 +335,6 @@ export async function getBatchStatus(batchId: string): Promise<{
   completed_images: number;
   failed_images: number;
   progress_percent: number;
-  results: FishAnalysisResult[];
 }> {
   const response = await apiClient.get(`/analysis/batch/${batchId}/status`);
   return response.data;
@@ -525,7 +596,7 @@ export async function uploadAndAnalyzeBatchEnhanced(
     logger.info('Phase 2: Starting batch analysis...');
     // Phase 2: Start analysis
     const analysisStartResult = await startBatchAnalysis(
-      uploadResult.uploaded_files.map(f => f.file_path),
+      [],  // The server resolves the uploaded images from the batch_id
       config,
       uploadResult.batch_id  // Pass the batch_id from upload
     );
@@ -588,7 +659,7 @@ export async function uploadAndAnalyzeBatch(
       const status = await getBatchStatus(uploadResult.batch_id);
       onProgress?.(`Processing images... (${status.completed_images}/${status.total_images})`, status.progress_percent);
       
-      if (status.status === 'completed' || status.status === 'failed') {
+      if (status.status === 'completed' || status.status === 'failed' || status.status === 'cancelled') {
         break;
       }
       
@@ -69,7 +69,8 @@ export enum AnalysisStatus {
   PENDING = "pending",
   PROCESSING = "processing", 
   COMPLETED = "completed",
-  FAILED = "failed"
+  FAILED = "failed",
+  CANCELLED = "cancelled"
 }
 
 export interface FishAnalysisResult {
@@ -283,6 +284,18 @@ export interface AnalysisProgress {
   average_processing_time?: number; // seconds per image
 }
 
+// Per-image summary pushed on the batch event stream as each result finishes
+export interface BatchResultSummary {
+  analysis_id: string;
+  image_path: string;
+  status: AnalysisStatus;
+  processing_time_seconds: number;
+  detections_total: number;
+  measurements: Record<string, number>; // name -> inches
+  visualization_paths: Record<string, string>;
+  error_message?: string;
+}
+
 // Enhanced Batch Analysis Result with Population Data
 export interface ComprehensiveBatchResult {
   batch_analysis: BatchAnalysisResultEnhanced;
@@ -2,9 +2,9 @@
 Fish analysis endpoints
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable, Set, Tuple, Union
 import logging
 from pathlib import Path
 import uuid
@@ -12,8 +12,10 @@ from datetime import datetime
 import asyncio
 import json
 import math
+import threading
+import time
 
-from app.core.config import settings
+from app.core.config import WatchFolderConfig, settings
 from app.models.fish_analysis import (
     FishAnalysisResult, BatchAnalysisResult, AnalysisRequest, 
     BatchAnalysisRequest, AnalysisStatus, PopulationStatistics,
@@ -23,8 +25,29 @@ from app.models.fish_analysis import (
     PopulationCorrelation, PopulationInsight, ImageDimensions,
     CalibrationInfo, ProcessingMetadata
 )
-from app.services.fish_measurement import fish_measurement_service
-from app.services.in_memory_storage import store
+from app.services.fish_measurement import fish_measurement_service, AnalysisCancelledError, PrefetchedImage
+from app.services.analysis_executor import analysis_executor, ingest_executor
+from app.services.admission import admission_controller
+from app.services.result_store import result_store
+from app.services.result_db import owner_alive, result_db
+from app.services.batch_lifecycle import batch_lifecycle
+from app.services.batch_events import batch_events, END_EVENT
+from app.services.in_memory_storage import mem_image_namespace, make_mem_image_key
+from app.services.storage import store
+from app.services.watch_folder import watch_folder_service
+from app.utils.archive_stream import ArchiveFormatError, ArchiveMember, ArchiveStream
+from app.utils.file_utils import (
+    ImagePartStream,
+    IngestedImage,
+    StreamedPart,
+    generate_unique_filename,
+    ingest_image_bytes,
+    ingest_image_file,
+    is_image_filename,
+)
+from app.utils.image_probe import ImageProbeError, probe_image, probe_image_file
+from app.utils.manifest import ManifestError, glob_manifest, parse_manifest
+from starlette.requests import ClientDisconnect
 import io
 import csv
 import json as jsonlib
@@ -45,9 +68,25 @@ from app.services.population_analysis import population_analysis_service
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# In-memory storage for batch analysis status (in production, use Redis/database)
+# Status of batches known to this process; every entry is also saved to the
+# result database so finished batches can be reloaded after a restart
 batch_analysis_status: Dict[str, Dict[str, Any]] = {}
 
+# Monotonic time each batch_analysis_status entry was last read, for idle eviction
+batch_last_access: Dict[str, float] = {}
+
+# Runtime handles for batches that have not finished yet: cancel event, image
+# paths and the asyncio tasks processing them. Kept apart from
+# batch_analysis_status because these objects are not JSON serializable.
+active_batches: Dict[str, Dict[str, Any]] = {}
+
+FINISHED_STATUSES = (AnalysisStatus.COMPLETED, AnalysisStatus.FAILED, AnalysisStatus.CANCELLED)
+
+# Seconds between admission retries while a bulk upload or manifest waits for capacity
+ADMISSION_RETRY_SECONDS = 1.0
+# Why an image that waited ANALYSIS_TIMEOUT_SECONDS for capacity was not admitted
+ADMISSION_TIMED_OUT = "Timed out waiting for analysis capacity"
+
 def sanitize_for_json(obj: Any) -> Any:
     """Recursively sanitize an object to be JSON-safe, removing NaN, inf, and other problematic values."""
     if isinstance(obj, dict):
@@ -63,6 +102,181 @@ def sanitize_for_json(obj: Any) -> Any:
     else:
         return obj
 
+def _unpin_images(image_paths) -> None:
+    """Release pins on in-memory images; blocking, so callers run it on a worker thread"""
+    for image_path in image_paths:
+        if image_path.startswith('mem://'):
+            store.unpin(image_path)
+
+def _pin_existing_image(image_path: str) -> bool:
+    """
+    Pin an in-memory image if it exists; False (and left unpinned) if it does not
+    
+    Blocking: with a remote backend each store call is a request, so callers
+    run it on a worker thread.
+    """
+    store.pin(image_path)
+    if store.exists(image_path):
+        return True
+    store.unpin(image_path)
+    return False
+
+def _discard_image(image_path: str) -> None:
+    """Unpin and delete a stored image a batch did not take; blocking like _pin_existing_image"""
+    store.unpin(image_path)
+    store.delete(image_path)
+
+def _release_image(image_path: str) -> bool:
+    """Delete a stored image if it is still there; blocking like _pin_existing_image"""
+    if not store.exists(image_path):
+        return False
+    store.delete(image_path)
+    return True
+
+def _probe_batch_image(image_path: str) -> Optional[str]:
+    """Why an existing batch image cannot be analyzed, judged from its header, or None"""
+    try:
+        if image_path.startswith('mem://'):
+            blob = store.get(image_path)
+            if blob is None:
+                return "Image not found"
+            probe = probe_image(blob[0])
+        else:
+            probe = probe_image_file(image_path)
+        probe.check_limits(settings.MIN_IMAGE_DIMENSION, settings.MAX_IMAGE_PIXELS)
+    except (ImageProbeError, OSError) as e:
+        return str(e)
+    return None
+
+async def _get_batch_info(batch_id: str) -> Dict[str, Any]:
+    """
+    Status entry of a batch, reloaded from the result database if this process does not hold it
+    
+    A batch still running in another worker process is reloaded on every
+    call instead of being cached, so its progress stays current; one whose
+    process has exited is marked interrupted.
+    """
+    batch_info = batch_analysis_status.get(batch_id)
+    if batch_info is not None:
+        batch_last_access[batch_id] = time.monotonic()
+        return batch_info
+    
+    batch_info = await asyncio.to_thread(result_db.load_batch, batch_id)
+    if batch_info is None:
+        raise HTTPException(status_code=404, detail="Batch analysis not found")
+    owner = batch_info.pop("owner", None)
+    if batch_info["status"] not in FINISHED_STATUSES:
+        if owner_alive(owner):
+            return batch_info
+        batch_info["status"] = AnalysisStatus.FAILED
+        batch_info["error_message"] = "Batch was interrupted by a server restart"
+        batch_info["current_image"] = None
+        await _save_batch(batch_id, batch_info)
+    batch_info = batch_analysis_status.setdefault(batch_id, batch_info)
+    batch_last_access[batch_id] = time.monotonic()
+    return batch_info
+
+async def _save_batch(batch_id: str, batch_info: Dict[str, Any]) -> None:
+    """Persist a batch status entry on a worker thread; a snapshot is saved so the loop can keep updating it"""
+    await asyncio.to_thread(result_db.save_batch, batch_id, dict(batch_info))
+
+def _evict_idle_batches(max_idle_seconds: float) -> int:
+    """Drop finished batches not read for max_idle_seconds; _get_batch_info reloads them"""
+    cutoff = time.monotonic() - max_idle_seconds
+    evicted = 0
+    for batch_id, batch_info in list(batch_analysis_status.items()):
+        if batch_info["status"] not in FINISHED_STATUSES or batch_id in active_batches:
+            continue
+        if batch_last_access.get(batch_id, 0.0) > cutoff:
+            continue
+        batch_analysis_status.pop(batch_id, None)
+        batch_last_access.pop(batch_id, None)
+        evicted += 1
+    return evicted
+
+batch_lifecycle.register_evictor(_evict_idle_batches)
+
+async def stop_active_batches() -> None:
+    """Cancel unfinished batches and wait until each has saved its final status"""
+    runners = []
+    for batch_id, active in list(active_batches.items()):
+        batch_info = batch_analysis_status.get(batch_id)
+        if batch_info is not None:
+            batch_info["status"] = AnalysisStatus.CANCELLED
+            batch_info["error_message"] = "Batch was interrupted by a server shutdown"
+        active["cancel_event"].set()
+        for task in active["tasks"]:
+            task.cancel()
+        for key in ("feeder", "runner"):
+            runner = active.get(key)
+            if runner is not None and not runner.done():
+                runner.cancel()
+                runners.append(runner)
+    if runners:
+        await asyncio.gather(*runners, return_exceptions=True)
+
+async def _build_progress(batch_id: str, batch_info: Dict[str, Any]) -> AnalysisProgress:
+    """Compute the progress view of a batch from its status entry and published results"""
+    # Average processing time over results published so far; a finished
+    # batch's stats come from the result database
+    stats = await asyncio.to_thread(result_store.get(batch_id).stats)
+    
+    # Calculate progress
+    progress_percent = 0
+    if batch_info["total_images"] > 0:
+        progress_percent = (batch_info["completed_images"] / batch_info["total_images"]) * 100
+    
+    # Calculate processing rate
+    processing_rate = None
+    if batch_info.get("started_at") and batch_info["completed_images"] > 0:
+        elapsed_time = (datetime.utcnow() - batch_info["started_at"]).total_seconds() / 60  # minutes
+        if elapsed_time > 0:
+            processing_rate = batch_info["completed_images"] / elapsed_time
+    
+    # Estimate completion time
+    estimated_completion_time = None
+    if (processing_rate and processing_rate > 0 and 
+        batch_info["status"] == AnalysisStatus.PROCESSING):
+        remaining_images = batch_info["total_images"] - batch_info["completed_images"]
+        remaining_minutes = remaining_images / processing_rate
+        estimated_completion = datetime.utcnow().timestamp() + (remaining_minutes * 60)
+        estimated_completion_time = datetime.fromtimestamp(estimated_completion).isoformat()
+    
+    return AnalysisProgress(
+        batch_id=batch_id,
+        status=batch_info["status"],
+        total_images=batch_info["total_images"],
+        completed_images=batch_info["completed_images"],
+        failed_images=batch_info["failed_images"],
+        current_image=batch_info.get("current_image"),
+        progress_percent=round(progress_percent, 1),
+        estimated_completion_time=estimated_completion_time,
+        processing_rate=processing_rate,
+        average_processing_time=stats["average_processing_time"]
+    )
+
+def _result_summary(result: FishAnalysisResult) -> Dict[str, Any]:
+    """Compact per-image summary pushed to batch event subscribers"""
+    return {
+        "analysis_id": result.analysis_id,
+        "image_path": result.image_path,
+        "status": result.status.value,
+        "processing_time_seconds": result.processing_metadata.processing_time_seconds,
+        "detections_total": sum(result.detections.values()) if result.detections else 0,
+        "measurements": {m.name: m.distance_inches for m in result.measurements},
+        "visualization_paths": result.visualization_paths,
+        "error_message": result.error_message
+    }
+
+async def _publish_progress(batch_id: str) -> None:
+    batch_info = batch_analysis_status.get(batch_id)
+    if batch_info is None or not batch_events.subscriber_count(batch_id):
+        return
+    progress = await _build_progress(batch_id, batch_info)
+    batch_events.publish(batch_id, "progress", progress.model_dump(mode="json"))
+    if batch_info["status"] in FINISHED_STATUSES:
+        batch_events.publish(batch_id, END_EVENT, {"status": batch_info["status"].value})
+
 @router.post("/single", response_model=FishAnalysisResult)
 async def analyze_single_image(request: AnalysisRequest):
     """
@@ -75,27 +289,50 @@ async def analyze_single_image(request: AnalysisRequest):
         Complete fish analysis result
     """
     try:
-        # Validate image path exists (supports in-memory and disk paths)
         image_path_str = request.image_path
-        if image_path_str.startswith('mem://'):
-            if not store.exists(image_path_str):
+        # Validate image path exists (supports in-memory and disk paths); an
+        # upload is pinned so memory pressure cannot evict it while it is
+        # queued or running
+        pinned = image_path_str.startswith('mem://')
+        if pinned:
+            if not await asyncio.to_thread(_pin_existing_image, image_path_str):
                 raise HTTPException(status_code=404, detail=f"Image not found: {image_path_str}")
-        else:
-            image_path = Path(image_path_str)
-            if not image_path.exists():
-                raise HTTPException(status_code=404, detail=f"Image not found: {image_path_str}")
-        
-        logger.info(f"Starting single image analysis: {request.image_path}")
-        
-        # Process the image
-        result = await fish_measurement_service.process_image(
-            image_path=request.image_path,
-            grid_square_size=request.grid_square_size_inches,
-            include_visualizations=request.include_visualizations,
-            include_color_analysis=request.include_color_analysis,
-            include_lateral_line_analysis=request.include_lateral_line_analysis
-        )
-        
+        elif not Path(image_path_str).exists():
+            raise HTTPException(status_code=404, detail=f"Image not found: {image_path_str}")
+        try:
+            # Reject now rather than time out later if the queue is too deep
+            admission_controller.admit_analysis(1, max_wait_seconds=settings.ANALYSIS_TIMEOUT_SECONDS)
+            
+            logger.info(f"Starting single image analysis: {request.image_path}")
+            
+            # Process the image on the shared worker pool; the event is set if the
+            # request times out or the client disconnects so the worker stops early
+            cancel_event = threading.Event()
+            try:
+                result = await analysis_executor.run(
+                    fish_measurement_service.analyze_image,
+                    image_path=request.image_path,
+                    grid_square_size=request.grid_square_size_inches,
+                    include_visualizations=request.include_visualizations,
+                    include_color_analysis=request.include_color_analysis,
+                    include_lateral_line_analysis=request.include_lateral_line_analysis,
+                    cancel_event=cancel_event,
+                    timeout=settings.ANALYSIS_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                raise HTTPException(
+                    status_code=504,
+                    detail=f"Analysis did not finish within {settings.ANALYSIS_TIMEOUT_SECONDS:g}s"
+                )
+            finally:
+                admission_controller.release(1)
+            if result.status == AnalysisStatus.COMPLETED:
+                admission_controller.observe(result.processing_metadata.processing_time_seconds)
+        finally:
+            if pinned:
+                await asyncio.to_thread(store.unpin, image_path_str)
+        
+        await asyncio.to_thread(result_store.save, result)
         logger.info(f"Single image analysis completed: {result.analysis_id}")
         return result
         
@@ -121,6 +358,9 @@ async def start_batch_analysis(
         Batch analysis initiation response
     """
     try:
+        if not request.images and not request.batch_id:
+            raise HTTPException(status_code=400, detail="Either images or batch_id must be provided")
+        
         # Use provided batch_id from request or generate new one
         batch_id = request.batch_id or str(uuid.uuid4())
         
@@ -128,21 +368,56 @@ async def start_batch_analysis(
         valid_images = []
         invalid_images = []
         
-        for image_path in request.images:
-            if image_path.startswith('mem://'):
-                if store.exists(image_path):
-                    valid_images.append(image_path)
-                else:
-                    invalid_images.append(image_path)
+        if not request.images:
+            # Resolve the batch's uploads through the store's namespace index;
+            # they come back already pinned
+            valid_images = await asyncio.to_thread(store.pin_namespace, mem_image_namespace(batch_id))
+            if len(valid_images) > settings.MAX_BATCH_SIZE:
+                await asyncio.to_thread(_unpin_images, valid_images)
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Batch has {len(valid_images)} images; maximum is {settings.MAX_BATCH_SIZE}"
+                )
+        
+        # Pin uploads before checking them so they cannot be evicted while
+        # queued; the store calls run on the ingest pool, off the event loop
+        mem_images = [image_path for image_path in request.images or [] if image_path.startswith('mem://')]
+        mem_found = dict(zip(mem_images, await asyncio.gather(*(
+            ingest_executor.run(_pin_existing_image, image_path) for image_path in mem_images
+        ))))
+        for image_path in request.images or []:
+            if mem_found.get(image_path, True):
+                # Missing files are caught by the header probe below, off the event loop
+                valid_images.append(image_path)
             else:
-                if Path(image_path).exists():
-                    valid_images.append(image_path)
-                else:
-                    invalid_images.append(image_path)
+                invalid_images.append(image_path)
+        
+        if request.images:
+            # Catch missing, corrupt, undersized and oversized images from
+            # their headers now rather than after they have queued for a decode
+            probe_errors = await asyncio.gather(*(
+                ingest_executor.run(_probe_batch_image, image_path) for image_path in valid_images
+            ))
+            rejected = []
+            for image_path, error in zip(list(valid_images), probe_errors):
+                if error is None:
+                    continue
+                logger.warning(f"Rejected batch image {image_path}: {error}")
+                valid_images.remove(image_path)
+                rejected.append(image_path)
+            if rejected:
+                await asyncio.to_thread(_unpin_images, rejected)
+                invalid_images.extend(rejected)
         
         if not valid_images:
             raise HTTPException(status_code=400, detail="No valid images found")
         
+        try:
+            admission_controller.admit_analysis(len(valid_images))
+        except HTTPException:
+            await asyncio.to_thread(_unpin_images, valid_images)
+            raise
+        
         # Initialize batch status
         batch_analysis_status[batch_id] = {
             "batch_id": batch_id,
@@ -150,12 +425,23 @@ async def start_batch_analysis(
             "total_images": len(valid_images),
             "completed_images": 0,
             "failed_images": len(invalid_images),
-            "results": [],
             "invalid_images": invalid_images,
             "started_at": datetime.utcnow(),
             "grid_square_size": request.grid_square_size_inches,
             "include_visualizations": request.include_visualizations
         }
+        batch_last_access[batch_id] = time.monotonic()
+        await _save_batch(batch_id, batch_analysis_status[batch_id])
+        result_store.create(batch_id)
+        # Remote backends start pulling inputs while the first images queue
+        store.prefetch(valid_images)
+        active_batches[batch_id] = {
+            "cancel_event": threading.Event(),
+            "image_paths": valid_images,
+            "tasks": [],
+            "reserved": len(valid_images),
+            "pinned": {p for p in valid_images if p.startswith('mem://')}
+        }
         
         # Start background processing
         background_tasks.add_task(
@@ -182,6 +468,647 @@ async def start_batch_analysis(
         logger.error(f"Error starting batch analysis: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to start batch analysis")
 
+async def _open_streamed_batch(
+    batch_id: str,
+    grid_square_size_inches: float,
+    include_visualizations: bool,
+    prefetch_images: int = 0
+) -> Dict[str, Any]:
+    """
+    Register a batch whose images are analyzed while they are still arriving
+    
+    The batch exists from the first byte so its status and events can be
+    watched while images are still being uploaded.
+    
+    Args:
+        batch_id: Batch ID
+        grid_square_size_inches: Grid calibration size
+        include_visualizations: Generate visualizations
+        prefetch_images: Images decoded ahead of inference (see _process_batch_images)
+    
+    Returns:
+        The batch's active entry; image paths put on its "queue" are analyzed
+        until a None sentinel is put
+    """
+    batch_analysis_status[batch_id] = {
+        "batch_id": batch_id,
+        "status": AnalysisStatus.PENDING,
+        "total_images": 0,
+        "completed_images": 0,
+        "failed_images": 0,
+        "invalid_images": [],
+        "started_at": datetime.utcnow(),
+        "grid_square_size": grid_square_size_inches,
+        "include_visualizations": include_visualizations
+    }
+    batch_last_access[batch_id] = time.monotonic()
+    result_store.create(batch_id)
+    queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    active = {
+        "cancel_event": threading.Event(),
+        "image_paths": [],
+        "tasks": [],
+        "reserved": 0,
+        "pinned": set(),
+        "queue": queue
+    }
+    active_batches[batch_id] = active
+    # Held on the batch so the runner is not garbage collected mid-flight
+    active["runner"] = asyncio.create_task(_process_batch_images(
+        batch_id,
+        _queued_images(queue),
+        grid_square_size_inches,
+        include_visualizations,
+        prefetch_images=prefetch_images
+    ))
+    await _save_batch(batch_id, batch_analysis_status[batch_id])
+    return active
+
+async def _admit_streamed_image(
+    active: Dict[str, Any],
+    wait: bool = False,
+    disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+) -> Optional[str]:
+    """
+    Reserve analysis capacity for one more image of a streamed batch
+    
+    Args:
+        active: The batch's active entry
+        wait: Hold the upload until there is room, for up to
+            ANALYSIS_TIMEOUT_SECONDS, instead of turning the image away; the
+            request body is not read in the meantime
+        disconnected: Whether the client that sent the image has gone, polled
+            while waiting
+    
+    Returns:
+        Why the image cannot be admitted (ADMISSION_TIMED_OUT if the wait ran
+        out), or None once it is
+    """
+    deadline = time.monotonic() + settings.ANALYSIS_TIMEOUT_SECONDS
+    while True:
+        if active["cancel_event"].is_set() or active["runner"].done():
+            return "Batch is no longer accepting images"
+        try:
+            if wait:
+                admission_controller.admit_upload()
+            admission_controller.admit_analysis(1)
+            return None
+        except HTTPException as e:
+            if not wait:
+                return e.detail
+        if time.monotonic() >= deadline:
+            return ADMISSION_TIMED_OUT
+        if disconnected is not None and await disconnected():
+            return "Client disconnected while waiting for analysis capacity"
+        await asyncio.sleep(ADMISSION_RETRY_SECONDS)
+
+def _queue_streamed_image(batch_id: str, active: Dict[str, Any], image_path: str) -> None:
+    """Hand an admitted image to a streamed batch's runner; the batch now holds its admission reservation"""
+    active["reserved"] += 1
+    active["image_paths"].append(image_path)
+    batch_analysis_status[batch_id]["total_images"] += 1
+    active["queue"].put_nowait(image_path)
+
+def _accept_streamed_image(
+    batch_id: str,
+    active: Dict[str, Any],
+    filename: str,
+    image: IngestedImage
+) -> Dict[str, Any]:
+    """Queue an admitted, stored and pinned image of a streamed batch; returns its upload summary"""
+    active["pinned"].add(image.key)
+    _queue_streamed_image(batch_id, active, image.key)
+    return {
+        "original_filename": filename,
+        "file_path": image.key,
+        "file_size": image.size,
+        "content_hash": image.content_hash,
+        "image_dimensions": dict(zip(("width", "height"), image.probe.oriented_size)),
+        "scale_factor": image.normalization.scale if image.normalization else 1.0
+    }
+
+def _store_pinned_image(ingest: Callable[[str], IngestedImage], key: str) -> IngestedImage:
+    """Store an image through ingest and pin it, on a worker thread"""
+    image = ingest(key)
+    store.pin(image.key)
+    return image
+
+async def _ingest_streamed_image(
+    batch_id: str,
+    active: Dict[str, Any],
+    filename: str,
+    ingest: Callable[[str], IngestedImage],
+    disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Admit, validate and store one image of a streamed batch on the ingest pool, then queue it
+    
+    Waits for analysis capacity rather than turning the image away, up to
+    ANALYSIS_TIMEOUT_SECONDS.
+    
+    Args:
+        batch_id: Batch ID
+        active: The batch's active entry
+        filename: Original filename
+        ingest: Validates the image and stores it under the given key; runs on a worker thread
+        disconnected: Passed on to _admit_streamed_image
+    
+    Returns:
+        (upload summary, None) once the image is queued, or (None, why it was rejected)
+    """
+    error = await _admit_streamed_image(active, wait=True, disconnected=disconnected)
+    if error is not None:
+        return None, error
+    try:
+        image = await ingest_executor.run(
+            _store_pinned_image, ingest, make_mem_image_key(batch_id, generate_unique_filename(filename))
+        )
+    except HTTPException as e:
+        error = e.detail
+    except Exception as e:
+        logger.error(f"Error storing streamed image {filename}: {str(e)}")
+        error = str(e)
+    else:
+        if not (active["cancel_event"].is_set() or active["runner"].done()):
+            return _accept_streamed_image(batch_id, active, filename, image), None
+        await asyncio.to_thread(_discard_image, image.key)
+        error = "Batch is no longer accepting images"
+    # The batch never took over the admission reservation
+    admission_controller.release(1)
+    return None, error
+
+def _reject_streamed_image(batch_id: str, filename: str, error: str) -> Dict[str, Any]:
+    """Count a file of a streamed batch as failed; returns its failure summary"""
+    logger.warning(f"Rejected streamed image {filename}: {error}")
+    batch_info = batch_analysis_status[batch_id]
+    batch_info["failed_images"] += 1
+    batch_info["invalid_images"].append(filename)
+    return {"filename": filename, "error": error}
+
+async def _finish_streamed_batch(
+    batch_id: str,
+    active: Dict[str, Any],
+    accepted: int,
+    stream_error: Optional[str]
+) -> None:
+    """
+    Settle a streamed batch whose input has ended; images already queued are still analyzed
+    
+    Raises:
+        HTTPException: 400 if no image was accepted
+    """
+    batch_info = batch_analysis_status[batch_id]
+    if stream_error is not None:
+        logger.warning(f"Streamed batch {batch_id} upload ended early: {stream_error}")
+        batch_info["error_message"] = stream_error
+    
+    if not accepted and not active["cancel_event"].is_set():
+        await active["runner"]
+        batch_info["status"] = AnalysisStatus.FAILED
+        batch_info["error_message"] = stream_error or "No valid images found"
+        await _save_batch(batch_id, batch_info)
+        raise HTTPException(status_code=400, detail=batch_info["error_message"])
+
+@router.post("/batch/stream")
+async def upload_and_analyze_batch(
+    request: Request,
+    grid_square_size_inches: float = 1.0,
+    include_visualizations: bool = True
+):
+    """
+    Upload a multipart batch of images and analyze them as they arrive
+    
+    The body is read incrementally; each image is validated, stored and
+    queued for analysis as soon as its part has been received, so the
+    first results are ready before the upload finishes. Progress can be
+    followed on the batch events stream while the upload is still running.
+    Options are taken from the query string; plain form fields in the body
+    are ignored.
+    
+    Args:
+        request: Raw request whose multipart/form-data body holds the images
+        grid_square_size_inches: Grid calibration size
+        include_visualizations: Generate visualizations
+    
+    Returns:
+        Batch summary with the accepted and rejected files
+    """
+    try:
+        admission_controller.admit_upload()
+        
+        batch_id = str(uuid.uuid4())
+        parts = ImagePartStream(
+            request.headers.get("content-type", ""),
+            make_key=lambda filename: make_mem_image_key(batch_id, generate_unique_filename(filename)),
+            max_files=settings.MAX_BATCH_SIZE,
+            max_total_size=settings.MAX_TOTAL_BATCH_SIZE
+        )
+        active = await _open_streamed_batch(batch_id, grid_square_size_inches, include_visualizations)
+        
+        uploaded_files = []
+        failed_files = []
+        
+        async def enqueue(part: StreamedPart) -> None:
+            if part.image is not None:
+                await asyncio.to_thread(store.pin, part.image.key)
+                error = await _admit_streamed_image(active)
+                if error is not None:
+                    await asyncio.to_thread(_discard_image, part.image.key)
+                    part.error = error
+            if part.error is not None:
+                failed_files.append(_reject_streamed_image(batch_id, part.filename, part.error))
+            else:
+                uploaded_files.append(_accept_streamed_image(batch_id, active, part.filename, part.image))
+        
+        stream_error = None
+        try:
+            # Parsing, hashing and storing (and normalizing, if enabled) run
+            # off the event loop
+            async for chunk in request.stream():
+                for part in await asyncio.to_thread(parts.feed, chunk):
+                    await enqueue(part)
+            for part in await asyncio.to_thread(parts.finish):
+                await enqueue(part)
+        except ClientDisconnect:
+            stream_error = "Client disconnected during upload"
+        except HTTPException as e:
+            stream_error = e.detail
+        finally:
+            # Images already queued are still analyzed
+            active["queue"].put_nowait(None)
+        
+        await _finish_streamed_batch(batch_id, active, len(uploaded_files), stream_error)
+        
+        logger.info(
+            f"Streamed batch upload finished: {batch_id} with {len(uploaded_files)} images, "
+            f"{len(failed_files)} rejected"
+        )
+        
+        return {
+            "message": "Batch analysis started",
+            "batch_id": batch_id,
+            "total_images": len(uploaded_files),
+            "uploaded_files": uploaded_files,
+            "failed_files": failed_files,
+            "upload_error": stream_error,
+            "status_check_url": f"/api/v1/analysis/batch/{batch_id}/status",
+            "events_url": f"/api/v1/analysis/batch/{batch_id}/events"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in streamed batch analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to start batch analysis")
+
+@router.post("/batch/archive")
+async def analyze_archive_batch(
+    request: Request,
+    grid_square_size_inches: float = 1.0,
+    include_visualizations: bool = True
+):
+    """
+    Upload a zip or tar archive of images and analyze them as they are extracted
+    
+    The request body is the archive itself (zip, or tar optionally gzip,
+    bzip2 or xz compressed). It is extracted while it streams in, one member
+    at a time; each image is validated and stored on the ingest worker pool
+    and queued for analysis straight away. Files without an image extension
+    are skipped. When analysis or the image store is at capacity, reading
+    the body pauses until there is room, so a large archive is throttled
+    rather than rejected; an image still waiting after
+    ANALYSIS_TIMEOUT_SECONDS is rejected.
+    
+    Args:
+        request: Raw request whose body is the archive
+        grid_square_size_inches: Grid calibration size
+        include_visualizations: Generate visualizations
+    
+    Returns:
+        Batch summary with the accepted and rejected files
+    """
+    try:
+        admission_controller.admit_upload()
+        
+        batch_id = str(uuid.uuid4())
+        archive = ArchiveStream(settings.MAX_UPLOAD_SIZE, accept=is_image_filename)
+        active = await _open_streamed_batch(batch_id, grid_square_size_inches, include_visualizations)
+        
+        uploaded_files = []
+        failed_files = []
+        # Members extracted but not yet stored; bounds memory to a few images per worker
+        in_flight = asyncio.Semaphore(ingest_executor.max_workers * 2)
+        ingests: List[asyncio.Task] = []
+        body_read = False
+        
+        async def disconnected() -> bool:
+            # Polling the connection takes the next message off it, which
+            # would lose a body chunk while the archive is still arriving
+            return body_read and await request.is_disconnected()
+        
+        async def ingest(member: ArchiveMember) -> None:
+            try:
+                error = member.error
+                if error is None:
+                    uploaded, error = await _ingest_streamed_image(
+                        batch_id, active, member.name,
+                        lambda key: ingest_image_bytes(member.name, key, member.data),
+                        disconnected
+                    )
+                if error is None:
+                    uploaded_files.append(uploaded)
+                else:
+                    failed_files.append(_reject_streamed_image(batch_id, member.name, error))
+            finally:
+                in_flight.release()
+        
+        async def extracted(members: List[ArchiveMember]) -> None:
+            for member in members:
+                if len(ingests) >= settings.MAX_ARCHIVE_IMAGES:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Archive has more than {settings.MAX_ARCHIVE_IMAGES} images"
+                    )
+                # Backpressure: stop reading the body while validation is saturated
+                await in_flight.acquire()
+                ingests.append(asyncio.create_task(ingest(member)))
+        
+        stream_error = None
+        received = 0
+        try:
+            # Decompression runs off the event loop
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > settings.MAX_ARCHIVE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Archive too large. Maximum size: {settings.MAX_ARCHIVE_SIZE / (1024**3):.1f}GB"
+                    )
+                await extracted(await asyncio.to_thread(archive.feed, chunk))
+            body_read = True
+            await extracted(await asyncio.to_thread(archive.finish))
+        except ClientDisconnect:
+            stream_error = "Client disconnected during upload"
+        except ArchiveFormatError as e:
+            stream_error = str(e)
+        except HTTPException as e:
+            stream_error = e.detail
+        finally:
+            await asyncio.gather(*ingests, return_exceptions=True)
+            active["queue"].put_nowait(None)
+        
+        await _finish_streamed_batch(batch_id, active, len(uploaded_files), stream_error)
+        
+        logger.info(
+            f"Archive batch upload finished: {batch_id} ({archive.format}) with {len(uploaded_files)} images, "
+            f"{len(failed_files)} rejected, {archive.skipped} non-image files skipped"
+        )
+        
+        return {
+            "message": "Batch analysis started",
+            "batch_id": batch_id,
+            "archive_format": archive.format,
+            "total_images": len(uploaded_files),
+            "skipped_files": archive.skipped,
+            "uploaded_files": uploaded_files,
+            "failed_files": failed_files,
+            "upload_error": stream_error,
+            "status_check_url": f"/api/v1/analysis/batch/{batch_id}/status",
+            "events_url": f"/api/v1/analysis/batch/{batch_id}/events"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in archive batch analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to start batch analysis")
+
+@router.post("/batch/manifest")
+async def analyze_manifest_batch(
+    request: Request,
+    directory_glob: Optional[str] = None,
+    base_dir: Optional[str] = None,
+    grid_square_size_inches: float = 1.0,
+    include_visualizations: bool = True
+):
+    """
+    Analyze a very large batch of server-side images listed in a manifest
+    
+    The request body is a CSV or NDJSON manifest of image paths; with
+    directory_glob, the images matching that pattern are used instead and
+    the body is ignored. Up to MAX_MANIFEST_IMAGES images are accepted.
+    Paths, base_dir and directory_glob are relative to MANIFEST_ROOT and
+    must stay inside it.
+    
+    The response is returned as soon as the manifest is parsed. Paths are
+    then checked lazily, MANIFEST_CHUNK_SIZE at a time on the ingest pool,
+    and queued as analysis capacity frees up. The next images are loaded and
+    decoded ahead while the current ones are in inference.
+    
+    Args:
+        request: Raw request whose body is the manifest
+        directory_glob: Glob pattern under MANIFEST_ROOT (** recurses) used instead of a manifest
+        base_dir: Directory under MANIFEST_ROOT that relative manifest paths are resolved against
+        grid_square_size_inches: Grid calibration size
+        include_visualizations: Generate visualizations
+    
+    Returns:
+        Batch initiation response
+    """
+    try:
+        if not settings.MANIFEST_ROOT:
+            raise HTTPException(status_code=403, detail="Manifest batches are disabled: MANIFEST_ROOT is not set")
+        try:
+            if directory_glob:
+                image_paths = await asyncio.to_thread(
+                    glob_manifest, directory_glob, settings.MAX_MANIFEST_IMAGES, settings.MANIFEST_ROOT
+                )
+            else:
+                body = bytearray()
+                async for chunk in request.stream():
+                    body += chunk
+                    if len(body) > settings.MAX_MANIFEST_SIZE:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"Manifest too large. Maximum size: {settings.MAX_MANIFEST_SIZE / (1024*1024):.1f}MB"
+                        )
+                image_paths = await asyncio.to_thread(
+                    parse_manifest,
+                    bytes(body),
+                    settings.MAX_MANIFEST_IMAGES,
+                    settings.MANIFEST_ROOT,
+                    base_dir,
+                    request.headers.get("content-type")
+                )
+        except ManifestError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        batch_id = str(uuid.uuid4())
+        active = await _open_streamed_batch(
+            batch_id,
+            grid_square_size_inches,
+            include_visualizations,
+            prefetch_images=settings.MANIFEST_PREFETCH_IMAGES
+        )
+        batch_info = batch_analysis_status[batch_id]
+        batch_info["source"] = "manifest"
+        batch_info["manifest_images"] = len(image_paths)
+        active["feeder"] = asyncio.create_task(_feed_manifest_batch(batch_id, active, image_paths))
+        
+        logger.info(f"Manifest batch analysis started: {batch_id} with {len(image_paths)} listed images")
+        
+        return {
+            "message": "Batch analysis started",
+            "batch_id": batch_id,
+            "manifest_images": len(image_paths),
+            "status_check_url": f"/api/v1/analysis/batch/{batch_id}/status",
+            "events_url": f"/api/v1/analysis/batch/{batch_id}/events"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in manifest batch analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to start batch analysis")
+
+def _check_manifest_image(image_path: str) -> Optional[str]:
+    """Why a manifest entry cannot be analyzed, or None"""
+    if image_path.startswith('mem://'):
+        return "Manifest entries must be image files on the server"
+    return _probe_batch_image(image_path)
+
+async def _feed_manifest_batch(batch_id: str, active: Dict[str, Any], image_paths: List[str]) -> None:
+    """
+    Check and queue the images of a manifest batch, chunk by chunk
+    
+    Each chunk is checked in parallel on the ingest pool. Its valid images
+    are then admitted one at a time, waiting for capacity. At most one chunk
+    is queued ahead of inference, so a long manifest does not take the whole
+    admission backlog from other requests. If an image waits longer than
+    ANALYSIS_TIMEOUT_SECONDS, feeding stops and the batch records why.
+    """
+    accepted = 0
+    error_message = None
+    try:
+        for start in range(0, len(image_paths), settings.MANIFEST_CHUNK_SIZE):
+            chunk = image_paths[start:start + settings.MANIFEST_CHUNK_SIZE]
+            errors = await asyncio.gather(*(
+                ingest_executor.run(_check_manifest_image, image_path) for image_path in chunk
+            ))
+            for image_path, error in zip(chunk, errors):
+                if error is not None:
+                    _reject_streamed_image(batch_id, image_path, error)
+                    continue
+                while active["reserved"] >= settings.MANIFEST_CHUNK_SIZE and not active["cancel_event"].is_set():
+                    await asyncio.sleep(ADMISSION_RETRY_SECONDS)
+                error = await _admit_streamed_image(active, wait=True)
+                if error == ADMISSION_TIMED_OUT:
+                    # Entries not queued yet are left out; the batch reports why
+                    error_message = error
+                    break
+                if error is not None:
+                    # The batch was cancelled or stopped
+                    return
+                _queue_streamed_image(batch_id, active, image_path)
+                accepted += 1
+            if error_message is not None:
+                break
+    except Exception as e:
+        logger.error(f"Error feeding manifest batch {batch_id}: {str(e)}")
+        error_message = str(e)
+    finally:
+        active["queue"].put_nowait(None)
+    
+    try:
+        await _finish_streamed_batch(batch_id, active, accepted, error_message)
+    except HTTPException as e:
+        logger.warning(f"Manifest batch {batch_id} failed: {e.detail}")
+
+async def _analyze_watched_files(
+    image_paths: List[str],
+    folder: WatchFolderConfig,
+    settled: Callable[[str, bool], None]
+) -> Tuple[str, Dict[str, Optional[str]]]:
+    """
+    Analyze images collected from a watch folder as one batch
+    
+    Args:
+        image_paths: Completely written image files in the folder
+        folder: The folder's rig profile
+        settled: Called on the event loop with each queued file and True
+            once its result is published, or False if the batch ends
+            without publishing one
+    
+    Returns:
+        Batch ID, and for each file the batch took, None if it was queued or
+        why it was rejected as an invalid image. Files missing from the
+        outcome were not taken: the batch stopped early, capacity did not
+        free up in time, or storing them failed for a reason other than the
+        image itself (a full store, an unreadable file). They can be
+        submitted again.
+    """
+    batch_id = str(uuid.uuid4())
+    active = await _open_streamed_batch(batch_id, folder.grid_square_size_inches, folder.include_visualizations)
+    rig_id = folder.rig_id or Path(folder.path).name
+    batch_analysis_status[batch_id]["source"] = f"watch:{rig_id}"
+    outcomes: Dict[str, Optional[str]] = {}
+    # Files whose ingest failed validation, as opposed to failing transiently
+    invalid: Set[str] = set()
+    # Stored key -> watched file, for queued files whose result is not published yet
+    unpublished: Dict[str, str] = {}
+    
+    def published(key: str) -> None:
+        image_path = unpublished.pop(key, None)
+        if image_path is not None:
+            settled(image_path, True)
+    
+    def runner_done(_: asyncio.Task) -> None:
+        for image_path in unpublished.values():
+            settled(image_path, False)
+        unpublished.clear()
+    
+    active["published"] = published
+    active["runner"].add_done_callback(runner_done)
+    
+    def ingest_file(image_path: str, key: str) -> IngestedImage:
+        try:
+            return ingest_image_file(image_path, key)
+        except HTTPException as e:
+            if 400 <= e.status_code < 500:
+                invalid.add(image_path)
+            raise
+    
+    async def ingest(image_path: str) -> None:
+        filename = Path(image_path).name
+        summary, error = await _ingest_streamed_image(
+            batch_id, active, filename,
+            lambda key: ingest_file(image_path, key)
+        )
+        if summary is not None:
+            unpublished[summary["file_path"]] = image_path
+        if error is not None and image_path not in invalid:
+            # Not taken; the file stays in the folder and is submitted again
+            if not (active["cancel_event"].is_set() or active["runner"].done()):
+                logger.warning(f"Watched image {filename} left for a later batch: {error}")
+            return
+        outcomes[image_path] = error
+        if error is not None:
+            _reject_streamed_image(batch_id, filename, error)
+    
+    try:
+        await asyncio.gather(*(ingest(image_path) for image_path in image_paths))
+    finally:
+        active["queue"].put_nowait(None)
+    
+    accepted = sum(1 for error in outcomes.values() if error is None)
+    try:
+        await _finish_streamed_batch(batch_id, active, accepted, None)
+    except HTTPException as e:
+        logger.warning(f"Watched batch {batch_id} from rig {rig_id} failed: {e.detail}")
+    return batch_id, outcomes
+
+watch_folder_service.register_submitter(_analyze_watched_files)
+
 @router.get("/batch/{batch_id}/status")
 async def get_batch_status(batch_id: str):
     """
@@ -194,10 +1121,7 @@ async def get_batch_status(batch_id: str):
         Current batch status
     """
     try:
-        if batch_id not in batch_analysis_status:
-            raise HTTPException(status_code=404, detail="Batch analysis not found")
-        
-        status_info = batch_analysis_status[batch_id].copy()
+        status_info = (await _get_batch_info(batch_id)).copy()
         
         # Calculate progress
         progress_percent = 0
@@ -226,10 +1150,7 @@ async def get_batch_results(batch_id: str):
         Complete batch analysis results
     """
     try:
-        if batch_id not in batch_analysis_status:
-            raise HTTPException(status_code=404, detail="Batch analysis not found")
-        
-        batch_info = batch_analysis_status[batch_id]
+        batch_info = await _get_batch_info(batch_id)
         
         if batch_info["status"] == AnalysisStatus.PROCESSING:
             raise HTTPException(
@@ -244,7 +1165,7 @@ async def get_batch_results(batch_id: str):
             total_images=batch_info["total_images"],
             completed_images=batch_info["completed_images"],
             failed_images=batch_info["failed_images"],
-            results=batch_info["results"],
+            results=await asyncio.to_thread(result_store.results, batch_id),
             processing_metadata={
                 "processing_time_seconds": batch_info.get("total_processing_time", 0),
                 "model_version": "model",
@@ -261,6 +1182,101 @@ async def get_batch_results(batch_id: str):
         logger.error(f"Error getting batch results: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving batch results")
 
+@router.get("/result/{analysis_id}", response_model=FishAnalysisResult)
+async def get_analysis_result(analysis_id: str):
+    """
+    Get a single analysis result by its ID
+    
+    Args:
+        analysis_id: Analysis ID
+        
+    Returns:
+        The stored fish analysis result
+    """
+    try:
+        result = await asyncio.to_thread(result_store.find, analysis_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Analysis result not found")
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting analysis result: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error retrieving analysis result")
+
+@router.get("/results")
+async def query_analysis_results(
+    batch_id: Optional[str] = None,
+    status_filter: Optional[AnalysisStatus] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    measurement: Optional[str] = None,
+    min_inches: Optional[float] = None,
+    max_inches: Optional[float] = None,
+    page: int = 1,
+    per_page: int = 50,
+    sort_order: str = "desc"
+):
+    """
+    Query stored analysis results across batches
+    
+    Args:
+        batch_id: Only results of this batch
+        status_filter: Only results with this status
+        since: Processed at or after this time (naive times are UTC)
+        until: Processed before this time (naive times are UTC)
+        measurement: Only results with this measurement name
+        min_inches: Lower bound for the named measurement
+        max_inches: Upper bound for the named measurement
+        page: Page number (1-based)
+        per_page: Items per page
+        sort_order: Sort direction by processing time (asc/desc)
+        
+    Returns:
+        Paginated results with metadata
+    """
+    try:
+        if (min_inches is not None or max_inches is not None) and measurement is None:
+            raise HTTPException(status_code=400, detail="min_inches/max_inches require a measurement name")
+        
+        page = max(1, page)
+        per_page = max(1, min(per_page, 500))
+        items, total_items = await asyncio.to_thread(
+            result_db.query_results,
+            batch_id=batch_id,
+            status=status_filter,
+            since=since,
+            until=until,
+            measurement=measurement,
+            min_inches=min_inches,
+            max_inches=max_inches,
+            offset=(page - 1) * per_page,
+            limit=per_page,
+            newest_first=sort_order == "desc"
+        )
+        total_pages = max(1, (total_items + per_page - 1) // per_page)
+        
+        return {
+            "items": items,
+            "pagination": {
+                "total_items": total_items,
+                "items_per_page": per_page,
+                "current_page": page,
+                "total_pages": total_pages,
+                "has_next": page < total_pages,
+                "has_previous": page > 1,
+                "next_page": page + 1 if page < total_pages else None,
+                "previous_page": page - 1 if page > 1 else None
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error querying analysis results: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error querying analysis results")
+
 @router.get("/result/{analysis_id}/visualization/{viz_type}")
 async def get_visualization(analysis_id: str, viz_type: str):
     """
@@ -282,7 +1298,7 @@ async def get_visualization(analysis_id: str, viz_type: str):
         
         # First try in-memory visualization
         mem_key = f"memvis://{analysis_id}/{viz_type}.jpg"
-        blob = store.get(mem_key)
+        blob = await asyncio.to_thread(store.get, mem_key)
         if blob is not None:
             data, content_type = blob
             return StreamingResponse(iter([data]), media_type=content_type or "image/jpeg")
@@ -318,24 +1334,38 @@ async def cancel_batch_analysis(batch_id: str):
         Cancellation confirmation
     """
     try:
-        if batch_id not in batch_analysis_status:
-            raise HTTPException(status_code=404, detail="Batch analysis not found")
-        
-        batch_info = batch_analysis_status[batch_id]
-        
-        if batch_info["status"] in [AnalysisStatus.COMPLETED, AnalysisStatus.FAILED]:
-            raise HTTPException(status_code=400, detail="Cannot cancel completed analysis")
+        batch_info = await _get_batch_info(batch_id)
         
-        # Mark as cancelled (the background task should check this)
-        batch_analysis_status[batch_id]["status"] = AnalysisStatus.FAILED
-        batch_analysis_status[batch_id]["error_message"] = "Analysis cancelled by user"
-        
-        logger.info(f"Batch analysis cancelled: {batch_id}")
+        if batch_info["status"] in FINISHED_STATUSES:
+            raise HTTPException(status_code=400, detail=f"Cannot cancel {batch_info['status'].value} analysis")
+        if batch_id not in batch_analysis_status:
+            raise HTTPException(status_code=409, detail="Batch is running in another server process")
+        
+        batch_info["status"] = AnalysisStatus.CANCELLED
+        batch_info["error_message"] = "Analysis cancelled by user"
+        
+        released = 0
+        active = active_batches.get(batch_id)
+        if active is not None:
+            # Stops in-flight images at their next stage boundary
+            active["cancel_event"].set()
+            # Drops tasks still waiting for a worker slot
+            for task in active["tasks"]:
+                task.cancel()
+            # Release queued uploads now instead of waiting for their TTL
+            released = sum(await asyncio.gather(*(
+                ingest_executor.run(_release_image, image_path)
+                for image_path in active["image_paths"] if image_path.startswith('mem://')
+            )))
+        
+        logger.info(f"Batch analysis cancelled: {batch_id} ({released} in-memory images released)")
+        await _publish_progress(batch_id)
         
         return {
             "message": "Batch analysis cancelled",
             "batch_id": batch_id,
-            "status": "cancelled"
+            "status": AnalysisStatus.CANCELLED.value,
+            "released_images": released
         }
         
     except HTTPException:
@@ -356,10 +1386,7 @@ async def get_population_statistics(batch_id: str):
         Population statistics and insights
     """
     try:
-        if batch_id not in batch_analysis_status:
-            raise HTTPException(status_code=404, detail="Batch analysis not found")
-        
-        batch_info = batch_analysis_status[batch_id]
+        batch_info = await _get_batch_info(batch_id)
         
         if batch_info["status"] != AnalysisStatus.COMPLETED:
             raise HTTPException(
@@ -368,7 +1395,7 @@ async def get_population_statistics(batch_id: str):
             )
         
         # Get the fish analysis results
-        results = batch_info["results"]
+        results = await asyncio.to_thread(result_store.results, batch_id)
         if not results:
             raise HTTPException(status_code=400, detail="No analysis results found")
         
@@ -442,48 +1469,56 @@ async def get_batch_results_paginated(
         Paginated results with metadata
     """
     try:
-        if batch_id not in batch_analysis_status:
-            raise HTTPException(status_code=404, detail="Batch analysis not found")
-        
-        batch_info = batch_analysis_status[batch_id]
-        all_results = batch_info["results"]
-        
-        # Filter results
-        filtered_results = all_results
-        
-        if status_filter:
-            filtered_results = [r for r in filtered_results if r.status.value == status_filter]
-        
-        if search:
-            search_lower = search.lower()
-            filtered_results = [
-                r for r in filtered_results 
-                if search_lower in r.image_path.lower() or search_lower in r.analysis_id.lower()
-            ]
-        
-        # Sort results
+        await _get_batch_info(batch_id)
+        result_set = result_store.get(batch_id)
         reverse = sort_order == "desc"
-        if sort_by == "created_at":
-            filtered_results.sort(key=lambda x: x.processing_metadata.processed_at, reverse=reverse)
-        elif sort_by == "processing_time":
-            filtered_results.sort(key=lambda x: x.processing_metadata.processing_time_seconds, reverse=reverse)
-        elif sort_by == "confidence":
-            filtered_results.sort(
-                key=lambda x: (
-                    sum(d.confidence for d in x.detailed_detections) / len(x.detailed_detections)
-                    if x.detailed_detections else 0
-                ), 
-                reverse=reverse
-            )
-        
-        # Paginate
-        total_items = len(filtered_results)
-        total_pages = max(1, (total_items + per_page - 1) // per_page)
-        page = max(1, min(page, total_pages))
         
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        page_results = filtered_results[start_idx:end_idx]
+        known_statuses = {s.value for s in AnalysisStatus}
+        if not search and sort_by == "created_at" and (not status_filter or status_filter in known_statuses):
+            # Served straight from the ordered index; works mid-batch
+            status = AnalysisStatus(status_filter) if status_filter else None
+            total_items = await asyncio.to_thread(result_set.count, status)
+            total_pages = max(1, (total_items + per_page - 1) // per_page)
+            page = max(1, min(page, total_pages))
+            page_results, _ = await asyncio.to_thread(
+                result_set.page, (page - 1) * per_page, per_page, status, newest_first=reverse
+            )
+        else:
+            # Filter results
+            filtered_results = await asyncio.to_thread(result_set.all)
+            
+            if status_filter:
+                filtered_results = [r for r in filtered_results if r.status.value == status_filter]
+            
+            if search:
+                search_lower = search.lower()
+                filtered_results = [
+                    r for r in filtered_results 
+                    if search_lower in r.image_path.lower() or search_lower in r.analysis_id.lower()
+                ]
+            
+            # Sort results
+            if sort_by == "created_at":
+                filtered_results.sort(key=lambda x: x.processing_metadata.processed_at, reverse=reverse)
+            elif sort_by == "processing_time":
+                filtered_results.sort(key=lambda x: x.processing_metadata.processing_time_seconds, reverse=reverse)
+            elif sort_by == "confidence":
+                filtered_results.sort(
+                    key=lambda x: (
+                        sum(d.confidence for d in x.detailed_detections) / len(x.detailed_detections)
+                        if x.detailed_detections else 0
+                    ), 
+                    reverse=reverse
+                )
+            
+            # Paginate
+            total_items = len(filtered_results)
+            total_pages = max(1, (total_items + per_page - 1) // per_page)
+            page = max(1, min(page, total_pages))
+            
+            start_idx = (page - 1) * per_page
+            end_idx = start_idx + per_page
+            page_results = filtered_results[start_idx:end_idx]
         
         # Create pagination metadata
         pagination_meta = {
@@ -520,50 +1555,7 @@ async def get_batch_analysis_progress(batch_id: str):
         Enhanced progress information
     """
     try:
-        if batch_id not in batch_analysis_status:
-            raise HTTPException(status_code=404, detail="Batch analysis not found")
-        
-        batch_info = batch_analysis_status[batch_id]
-        
-        # Calculate progress
-        progress_percent = 0
-        if batch_info["total_images"] > 0:
-            progress_percent = (batch_info["completed_images"] / batch_info["total_images"]) * 100
-        
-        # Calculate processing rate
-        processing_rate = None
-        if batch_info.get("started_at") and batch_info["completed_images"] > 0:
-            elapsed_time = (datetime.utcnow() - batch_info["started_at"]).total_seconds() / 60  # minutes
-            if elapsed_time > 0:
-                processing_rate = batch_info["completed_images"] / elapsed_time
-        
-        # Calculate average processing time
-        average_processing_time = None
-        if batch_info["results"]:
-            processing_times = [r.processing_metadata.processing_time_seconds for r in batch_info["results"]]
-            average_processing_time = sum(processing_times) / len(processing_times)
-        
-        # Estimate completion time
-        estimated_completion_time = None
-        if (processing_rate and processing_rate > 0 and 
-            batch_info["status"] == AnalysisStatus.PROCESSING):
-            remaining_images = batch_info["total_images"] - batch_info["completed_images"]
-            remaining_minutes = remaining_images / processing_rate
-            estimated_completion = datetime.utcnow().timestamp() + (remaining_minutes * 60)
-            estimated_completion_time = datetime.fromtimestamp(estimated_completion).isoformat()
-        
-        return AnalysisProgress(
-            batch_id=batch_id,
-            status=batch_info["status"],
-            total_images=batch_info["total_images"],
-            completed_images=batch_info["completed_images"],
-            failed_images=batch_info["failed_images"],
-            current_image=batch_info.get("current_image"),
-            progress_percent=round(progress_percent, 1),
-            estimated_completion_time=estimated_completion_time,
-            processing_rate=processing_rate,
-            average_processing_time=average_processing_time
-        )
+        return await _build_progress(batch_id, await _get_batch_info(batch_id))
         
     except HTTPException:
         raise
@@ -571,6 +1563,56 @@ async def get_batch_analysis_progress(batch_id: str):
         logger.error(f"Error getting batch progress: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving batch progress")
 
+@router.get("/batch/{batch_id}/events")
+async def stream_batch_events(batch_id: str, request: Request):
+    """
+    Stream batch progress as server-sent events
+    
+    Emits a `progress` event immediately and after every change, a `result`
+    event with a summary of each image as it finishes, and a final `end`
+    event once the batch completes, fails or is cancelled.
+    
+    Args:
+        batch_id: Batch analysis ID
+        
+    Returns:
+        text/event-stream response
+    """
+    batch_info = await _get_batch_info(batch_id)
+    queue = batch_events.subscribe(batch_id)
+    
+    def _format(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(sanitize_for_json(data), default=str)}\n\n"
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            progress = await _build_progress(batch_id, batch_info)
+            yield _format("progress", progress.model_dump(mode="json"))
+            if batch_info["status"] in FINISHED_STATUSES:
+                yield _format(END_EVENT, {"status": batch_info["status"].value})
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _format(event, data)
+                if event == END_EVENT:
+                    return
+        finally:
+            batch_events.unsubscribe(batch_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/batch/{batch_id}/comprehensive", response_model=ComprehensiveBatchResult)
 async def get_comprehensive_batch_results(batch_id: str):
     """
@@ -584,7 +1626,7 @@ async def get_comprehensive_batch_results(batch_id: str):
     """
     try:
         # Get basic batch results
-        batch_info = batch_analysis_status[batch_id]
+        batch_info = await _get_batch_info(batch_id)
         if batch_info["status"] != AnalysisStatus.COMPLETED:
             if batch_info["status"] == AnalysisStatus.PROCESSING:
                 raise HTTPException(
@@ -596,6 +1638,8 @@ async def get_comprehensive_batch_results(batch_id: str):
                     status_code=400, 
                     detail=f"Batch analysis failed: {batch_info.get('error_message', 'Unknown error')}"
                 )
+            elif batch_info["status"] == AnalysisStatus.CANCELLED:
+                raise HTTPException(status_code=400, detail="Batch analysis was cancelled")
             else:
                 raise HTTPException(status_code=400, detail="Batch analysis not completed")
         
@@ -635,7 +1679,7 @@ async def get_comprehensive_batch_results(batch_id: str):
             total_images=batch_info["total_images"],
             completed_images=batch_info["completed_images"],
             failed_images=batch_info["failed_images"],
-            results=batch_info["results"],
+            results=await asyncio.to_thread(result_store.results, batch_id),
             processing_metadata={
                 "processing_time_seconds": batch_info.get("total_processing_time", 0),
                 "model_version": "model",
@@ -699,14 +1743,11 @@ async def download_batch_results(batch_id: str, format: str):
         if format not in ['csv', 'json', 'pdf', 'zip', 'xlsx']:
             raise HTTPException(status_code=400, detail="Invalid format. Use: csv, json, pdf, zip, xlsx")
         
-        if batch_id not in batch_analysis_status:
-            raise HTTPException(status_code=404, detail="Batch analysis not found")
-        
-        batch_info = batch_analysis_status[batch_id]
+        batch_info = await _get_batch_info(batch_id)
         if batch_info["status"] != AnalysisStatus.COMPLETED:
             raise HTTPException(status_code=400, detail="Batch analysis not completed")
         
-        results = batch_info["results"]
+        results = await asyncio.to_thread(result_store.results, batch_id)
 
         def result_records() -> Iterable[dict]:
             for r in results:
@@ -787,7 +1828,7 @@ async def download_batch_results(batch_id: str, format: str):
                 for r in results:
                     for vtype in ['detailed', 'measurements']:
                         key = f"memvis://{r.analysis_id}/{vtype}.jpg"
-                        blob = store.get(key)
+                        blob = await asyncio.to_thread(store.get, key)
                         if blob is not None:
                             data, _ct = blob
                             z.writestr(f"visualizations/{r.analysis_id}_{vtype}.jpg", data)
@@ -811,104 +1852,197 @@ async def download_batch_results(batch_id: str, format: str):
         logger.error(f"Error downloading batch results: {str(e)}")
         raise HTTPException(status_code=500, detail="Error generating download")
 
+async def _queued_images(queue: "asyncio.Queue[Optional[str]]") -> AsyncIterator[str]:
+    """Yield image paths put on queue until a None sentinel arrives"""
+    while True:
+        image_path = await queue.get()
+        if image_path is None:
+            return
+        yield image_path
+
+async def _iterate_images(image_paths: Union[List[str], AsyncIterator[str]]) -> AsyncIterator[str]:
+    if isinstance(image_paths, list):
+        for image_path in image_paths:
+            yield image_path
+    else:
+        async for image_path in image_paths:
+            yield image_path
+
+async def _prefetch_batch_image(image_path: str) -> Optional[PrefetchedImage]:
+    """Load and decode an image on the ingest pool ahead of its analysis; None if that fails, so the analysis reports why"""
+    try:
+        return await ingest_executor.run(fish_measurement_service.prefetch_image, image_path)
+    except Exception as e:
+        logger.warning(f"Could not prefetch batch image {image_path}: {str(e)}")
+        return None
+
 async def _process_batch_images(
     batch_id: str, 
-    image_paths: List[str],
+    image_paths: Union[List[str], AsyncIterator[str]],
     grid_square_size: float,
-    include_visualizations: bool
+    include_visualizations: bool,
+    prefetch_images: int = 0
 ):
     """
     Background task to process batch images
     
     Args:
         batch_id: Batch ID
-        image_paths: List of image paths to process
+        image_paths: Image paths to process, either a list or an async
+            iterator that yields images as they arrive
         grid_square_size: Grid calibration size
         include_visualizations: Generate visualizations
+        prefetch_images: How many images beyond those in inference are
+            loaded and decoded ahead on the ingest pool; 0 leaves loading
+            to the analysis itself
     """
+    active = active_batches.get(batch_id) or {
+        "cancel_event": threading.Event(),
+        "image_paths": image_paths if isinstance(image_paths, list) else [],
+        "tasks": [],
+        "reserved": 0,
+        "pinned": set()
+    }
+    active_batches[batch_id] = active
+    active.setdefault("runner", asyncio.current_task())
+    cancel_event: threading.Event = active["cancel_event"]
+    
+    def _notify_published(image_path: str) -> None:
+        # Lets the batch's source act once an image's result is durable
+        published = active.get("published")
+        if published is not None:
+            published(image_path)
+    
     try:
         batch_info = batch_analysis_status[batch_id]
+        if cancel_event.is_set():
+            return
         batch_info["status"] = AnalysisStatus.PROCESSING
         
         start_time = datetime.now()
-        results = []
         
-        # Concurrency control
+        # Keep at most CONCURRENCY_LIMIT images of this batch in the shared
+        # executor so single-image requests are not queued behind the whole batch
         semaphore = asyncio.Semaphore(settings.CONCURRENCY_LIMIT)
+        # An image holds a window slot from the start of its prefetch to the
+        # end of its analysis, which bounds the decoded images held in memory
+        window = asyncio.Semaphore(settings.CONCURRENCY_LIMIT + prefetch_images)
 
         async def process_one(idx: int, image_path: str):
-            nonlocal results
-            async with semaphore:
-                try:
-                    if batch_info["status"] == AnalysisStatus.FAILED:
-                        return
-                    batch_info["current_image"] = image_path
-                    logger.info(f"Processing batch image {idx+1}/{len(image_paths)}: {image_path}")
-                    # Offload CPU-bound processing to a thread to avoid blocking the event loop
-                    def _run_sync():
-                        # Run the existing coroutine to completion in a new event loop in this worker thread
-                        return asyncio.run(
-                            fish_measurement_service.process_image(
-                                image_path=image_path,
-                                grid_square_size=grid_square_size,
-                                include_visualizations=include_visualizations
-                            )
+            try:
+                async with window:
+                    prefetched = None
+                    if prefetch_images > 0 and not cancel_event.is_set():
+                        prefetched = await _prefetch_batch_image(image_path)
+                    async with semaphore:
+                        if cancel_event.is_set():
+                            return
+                        batch_info["current_image"] = image_path
+                        await _publish_progress(batch_id)
+                        logger.info(f"Processing batch image {idx+1}/{batch_info['total_images']}: {image_path}")
+                        # CPU-bound work runs on the shared analysis executor
+                        result = await analysis_executor.run(
+                            fish_measurement_service.analyze_image,
+                            image_path=image_path,
+                            grid_square_size=grid_square_size,
+                            include_visualizations=include_visualizations,
+                            cancel_event=cancel_event,
+                            prefetched=prefetched
                         )
-                    result = await asyncio.to_thread(_run_sync)
-                    results.append(result)
-                    batch_info["completed_images"] += 1
-                    logger.info(f"Completed batch image {idx+1}/{len(image_paths)}")
-                except Exception as e:
-                    logger.error(f"Error processing batch image {image_path}: {str(e)}")
-                    batch_info["failed_images"] += 1
-                    failed_result = FishAnalysisResult(
-                        analysis_id=str(uuid.uuid4()),
-                        image_path=image_path,
-                        status=AnalysisStatus.FAILED,
-                        image_dimensions=ImageDimensions(width=1, height=1),
-                        calibration=CalibrationInfo(
-                            pixels_per_inch=0.0,
-                            grid_square_size_inches=grid_square_size,
-                            detected_squares=0,
-                            calibration_quality="failed"
-                        ),
-                        detections={},
-                        detailed_detections=[],
-                        measurements=[],
-                        processing_metadata=ProcessingMetadata(
-                            processing_time_seconds=0.0,
-                            model_version="yolov8",
-                            api_version=settings.VERSION,
-                            processed_at=datetime.utcnow()
-                        ),
-                        error_message=str(e)
-                    )
-                    results.append(failed_result)
-                finally:
-                    # Cleanup in-memory image after processing to free memory
-                    if image_path.startswith('mem://'):
-                        store.delete(image_path)
+                        await asyncio.to_thread(result_store.publish, batch_id, result)
+                        batch_events.publish(batch_id, "result", _result_summary(result))
+                        _notify_published(image_path)
+                        if result.status == AnalysisStatus.COMPLETED:
+                            admission_controller.observe(result.processing_metadata.processing_time_seconds)
+                        batch_info["completed_images"] += 1
+                        await _publish_progress(batch_id)
+                        logger.info(f"Completed batch image {idx+1}/{batch_info['total_images']}")
+            except (asyncio.CancelledError, AnalysisCancelledError):
+                # Cancelled images are neither completed nor failed
+                return
+            except Exception as e:
+                logger.error(f"Error processing batch image {image_path}: {str(e)}")
+                batch_info["failed_images"] += 1
+                failed_result = FishAnalysisResult(
+                    analysis_id=str(uuid.uuid4()),
+                    image_path=image_path,
+                    status=AnalysisStatus.FAILED,
+                    image_dimensions=ImageDimensions(width=1, height=1),
+                    calibration=CalibrationInfo(
+                        pixels_per_inch=0.0,
+                        grid_square_size_inches=grid_square_size,
+                        detected_squares=0,
+                        calibration_quality="failed"
+                    ),
+                    detections={},
+                    detailed_detections=[],
+                    measurements=[],
+                    processing_metadata=ProcessingMetadata(
+                        processing_time_seconds=0.0,
+                        model_version="yolov8",
+                        api_version=settings.VERSION,
+                        processed_at=datetime.utcnow()
+                    ),
+                    error_message=str(e)
+                )
+                await asyncio.to_thread(result_store.publish, batch_id, failed_result)
+                batch_events.publish(batch_id, "result", _result_summary(failed_result))
+                _notify_published(image_path)
+                await _publish_progress(batch_id)
+            finally:
+                # Cleanup in-memory image after processing to free memory
+                if image_path in active["pinned"]:
+                    active["pinned"].discard(image_path)
+                    await asyncio.to_thread(store.unpin, image_path)
+                if active["reserved"] > 0:
+                    active["reserved"] -= 1
+                    admission_controller.release(1)
+                if image_path.startswith('mem://'):
+                    await asyncio.to_thread(store.delete, image_path)
 
-        # Launch tasks
-        tasks = [asyncio.create_task(process_one(i, p)) for i, p in enumerate(image_paths)]
-        await asyncio.gather(*tasks)
+        # Launch a task per image as soon as it is available
+        tasks: List[asyncio.Task] = []
+        active["tasks"] = tasks
+        async for image_path in _iterate_images(image_paths):
+            tasks.append(asyncio.create_task(process_one(len(tasks), image_path)))
+        await asyncio.gather(*tasks, return_exceptions=True)
         
         # Clear current image
         batch_info["current_image"] = None
         
         # Finalize batch
         total_time = (datetime.now() - start_time).total_seconds()
-        batch_info["results"] = results
         batch_info["total_processing_time"] = total_time
         
-        if batch_info["status"] != AnalysisStatus.FAILED:  # Not cancelled
+        if cancel_event.is_set():
+            batch_info["status"] = AnalysisStatus.CANCELLED
+        else:
             batch_info["status"] = AnalysisStatus.COMPLETED
         
         batch_info["completed_at"] = datetime.utcnow()
         
-        logger.info(f"Batch processing completed: {batch_id} in {total_time:.2f}s")
+        logger.info(f"Batch processing {batch_info['status'].value}: {batch_id} in {total_time:.2f}s")
+        await _publish_progress(batch_id)
         
     except Exception as e:
         logger.error(f"Error in batch processing: {str(e)}")
         batch_analysis_status[batch_id]["status"] = AnalysisStatus.FAILED
-        batch_analysis_status[batch_id]["error_message"] = str(e)
\ No newline at end of file
+        batch_analysis_status[batch_id]["error_message"] = str(e)
+        await _publish_progress(batch_id)
+    finally:
+        # Images that never ran (cancelled or aborted) give their slots back
+        admission_controller.release(active["reserved"])
+        active["reserved"] = 0
+        pinned = list(active["pinned"])
+        active["pinned"].clear()
+        # The thread finishes the unpins even if this task is cancelled meanwhile
+        await asyncio.to_thread(_unpin_images, pinned)
+        # Finished results are served from the result database from here on;
+        # saved while still active so idle eviction cannot race the final save
+        batch_info = batch_analysis_status.get(batch_id)
+        try:
+            if batch_info is not None:
+                await _save_batch(batch_id, batch_info)
+        finally:
+            result_store.drop(batch_id)
+            active_batches.pop(batch_id, None)
@@ -2,23 +2,49 @@
 File upload endpoints
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Request, Response
 from fastapi.responses import JSONResponse
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import aiofiles
+import asyncio
+import base64
+import binascii
 import uuid
+from contextlib import asynccontextmanager
 from pathlib import Path
 import logging
 from datetime import datetime
+from starlette.requests import ClientDisconnect
 
 from app.core.config import settings
-from app.utils.file_utils import validate_image_file, generate_unique_filename
-from app.services.in_memory_storage import store, make_mem_image_key
+from app.utils.file_utils import IngestedImage, ingest_image_upload, ingest_upload_file, generate_unique_filename
+from app.services.in_memory_storage import make_mem_image_key, StorageFullError
+from app.services.admission import admission_controller
+from app.services.analysis_executor import ingest_executor
+from app.services.resumable_upload import UploadBusyError, UploadSession, resumable_uploads
 from app.models.fish_analysis import AnalysisStatus
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Protocol version sent with resumable upload responses, as in tus
+_TUS_HEADERS = {"Tus-Resumable": "1.0.0"}
+
+# Unfinished resumable uploads are on their way into the blob store
+admission_controller.register_pending_bytes(resumable_uploads.reserved_bytes)
+
+def _upload_file_info(original_filename: Optional[str], saved_filename: str, ingested: IngestedImage) -> dict:
+    return {
+        "original_filename": original_filename,
+        "saved_filename": saved_filename,
+        "file_path": ingested.key,
+        "file_size": ingested.size,
+        "content_hash": ingested.content_hash,
+        "image_dimensions": dict(zip(("width", "height"), ingested.probe.oriented_size)),
+        "scale_factor": ingested.normalization.scale if ingested.normalization else 1.0,
+        "upload_time": datetime.utcnow().isoformat()
+    }
+
 @router.post("/single")
 async def upload_single_image(
     file: UploadFile = File(...),
@@ -37,18 +63,15 @@ async def upload_single_image(
         Upload confirmation with file info and analysis trigger
     """
     try:
-        # Validate file
-        await validate_image_file(file)
+        admission_controller.admit_upload()
         
         # Generate unique filename
-        file_extension = Path(file.filename).suffix.lower()
-        unique_filename = generate_unique_filename(file.filename)
+        unique_filename = generate_unique_filename(file.filename or "")
         
-        # Read content and store in memory instead of disk
-        content = await file.read()
+        # Validate and stream into the memory store in a single read
         batch_id = str(uuid.uuid4())
         mem_key = make_mem_image_key(batch_id, unique_filename)
-        store.put(mem_key, content, content_type=file.content_type, ttl_seconds=settings.MEMORY_TTL_SECONDS)
+        ingested = await ingest_image_upload(file, mem_key)
         
         logger.info(f"Single image uploaded to memory: {unique_filename} -> {mem_key}")
         
@@ -56,13 +79,7 @@ async def upload_single_image(
         return {
             "status": "success",
             "message": "Image uploaded successfully",
-            "file_info": {
-                "original_filename": file.filename,
-                "saved_filename": unique_filename,
-                "file_path": mem_key,
-                "file_size": len(content),
-                "upload_time": datetime.utcnow().isoformat()
-            },
+            "file_info": _upload_file_info(file.filename, unique_filename, ingested),
             "analysis_params": {
                 "grid_square_size": grid_square_size,
                 "include_visualizations": include_visualizations
@@ -72,10 +89,29 @@ async def upload_single_image(
         
     except HTTPException:
         raise
+    except StorageFullError as e:
+        logger.warning(f"Memory store full, rejecting upload: {str(e)}")
+        raise HTTPException(status_code=503, detail="Image store is full, retry later", headers={"Retry-After": "30"})
     except Exception as e:
         logger.error(f"Error uploading single image: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error during upload")
 
+async def _ingest_batch_file(batch_id: str, file: UploadFile, remaining_bytes: int) -> Tuple[str, IngestedImage]:
+    """Validate, hash and store one file of a batch upload on the ingest pool"""
+    if (file.size or 0) > remaining_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds maximum total size of {settings.MAX_TOTAL_BATCH_SIZE / (1024*1024):.0f}MB"
+        )
+    
+    # Generate unique filename
+    unique_filename = generate_unique_filename(file.filename or "")
+    mem_key = make_mem_image_key(batch_id, unique_filename)
+    ingested = await ingest_executor.run(
+        ingest_upload_file, file, mem_key, max_size=min(settings.MAX_UPLOAD_SIZE, remaining_bytes)
+    )
+    return unique_filename, ingested
+
 @router.post("/batch")
 async def upload_batch_images(
     files: List[UploadFile] = File(...),
@@ -104,38 +140,40 @@ async def upload_batch_images(
         if len(files) == 0:
             raise HTTPException(status_code=400, detail="No files provided")
         
+        admission_controller.admit_upload()
+        
         # Create a batch id for in-memory references
         batch_id = str(uuid.uuid4())
 
         uploaded_files = []
         failed_files = []
         
-        # Process each file
+        # The files are fully received, so their sizes are known: share out
+        # the total size budget in upload order, as a serial pass would
+        remaining_bytes = []
+        total_bytes = 0
         for file in files:
-            try:
-                # Validate file
-                await validate_image_file(file)
-                
-                # Generate unique filename
-                unique_filename = generate_unique_filename(file.filename)
-                content = await file.read()
-                mem_key = make_mem_image_key(batch_id, unique_filename)
-                store.put(mem_key, content, content_type=file.content_type, ttl_seconds=settings.MEMORY_TTL_SECONDS)
-                
-                uploaded_files.append({
-                    "original_filename": file.filename,
-                    "saved_filename": unique_filename,
-                    "file_path": mem_key,
-                    "file_size": len(content),
-                    "upload_time": datetime.utcnow().isoformat()
-                })
-                
-            except Exception as e:
-                logger.error(f"Error uploading file {file.filename}: {str(e)}")
+            remaining_bytes.append(settings.MAX_TOTAL_BATCH_SIZE - total_bytes)
+            if total_bytes + (file.size or 0) <= settings.MAX_TOTAL_BATCH_SIZE:
+                total_bytes += file.size or 0
+        
+        # Validate, hash and store every file in parallel on the ingest pool,
+        # keeping the results in upload order
+        results = await asyncio.gather(
+            *(_ingest_batch_file(batch_id, file, remaining) for file, remaining in zip(files, remaining_bytes)),
+            return_exceptions=True
+        )
+        
+        for file, result in zip(files, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error uploading file {file.filename}: {str(result)}")
                 failed_files.append({
                     "filename": file.filename,
-                    "error": str(e)
+                    "error": str(result)
                 })
+                continue
+            unique_filename, ingested = result
+            uploaded_files.append(_upload_file_info(file.filename, unique_filename, ingested))
         
         if not uploaded_files:
             raise HTTPException(
@@ -169,6 +207,259 @@ async def upload_batch_images(
         logger.error(f"Error in batch upload: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error during batch upload")
 
+def _header_int(request: Request, name: str) -> Optional[int]:
+    value = request.headers.get(name)
+    if value is None:
+        return None
+    if not value.strip().isdigit():
+        raise HTTPException(status_code=400, detail=f"{name} must be a non-negative integer")
+    return int(value)
+
+def _parse_upload_metadata(header: Optional[str]) -> Dict[str, str]:
+    """Decode a tus Upload-Metadata header: comma-separated keys with base64 values"""
+    metadata = {}
+    for pair in (header or "").split(","):
+        key, _, value = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value.strip(), validate=True).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail=f"Upload-Metadata value for {key} is not base64 UTF-8")
+    return metadata
+
+async def _resumable_session(upload_id: str) -> UploadSession:
+    session = await asyncio.to_thread(resumable_uploads.get, upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found or expired", headers=_TUS_HEADERS)
+    return session
+
+@asynccontextmanager
+async def _claimed_resumable_session(upload_id: str) -> AsyncIterator[UploadSession]:
+    """The upload, claimed against other requests (in any worker) while the block runs"""
+    try:
+        session = await asyncio.to_thread(resumable_uploads.claim, upload_id)
+    except UploadBusyError:
+        raise HTTPException(
+            status_code=409,
+            detail="Another request is still writing this upload",
+            headers={"Retry-After": "1", **_TUS_HEADERS}
+        )
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found or expired", headers=_TUS_HEADERS)
+    try:
+        yield session
+    finally:
+        await asyncio.to_thread(resumable_uploads.release, session)
+
+@router.post("/resumable", status_code=201)
+async def create_resumable_upload(
+    request: Request,
+    filename: Optional[str] = None,
+    batch_id: Optional[str] = None
+):
+    """
+    Start a resumable upload of one image
+    
+    The total size goes in the Upload-Length header and the filename in the
+    filename parameter or, tus-style, in Upload-Metadata. Chunks are then
+    sent with PATCH to the returned upload URL, and the upload is finalized
+    with POST {upload_url}/finalize. Uploads created with the same batch_id
+    land in one batch, which /api/v1/analysis/batch can analyze once they
+    are finalized.
+    
+    Args:
+        request: Request carrying the Upload-Length and Upload-Metadata headers
+        filename: Original filename of the image
+        batch_id: Batch to add the image to (a new one by default)
+    
+    Returns:
+        Upload id and URL, and the mem:// path the image will have
+    """
+    try:
+        length = _header_int(request, "Upload-Length")
+        if length is None:
+            raise HTTPException(status_code=400, detail="Upload-Length header is required")
+        filename = filename or _parse_upload_metadata(request.headers.get("Upload-Metadata")).get("filename")
+        if batch_id is None:
+            batch_id = str(uuid.uuid4())
+        else:
+            try:
+                batch_id = str(uuid.UUID(batch_id))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="batch_id must be a UUID")
+        
+        admission_controller.admit_upload(length)
+        
+        unique_filename = generate_unique_filename(filename or "")
+        mem_key = make_mem_image_key(batch_id, unique_filename)
+        session = await asyncio.to_thread(resumable_uploads.create, filename, mem_key, length, batch_id)
+        upload_url = f"/api/v1/upload/resumable/{session.upload_id}"
+        
+        logger.info(f"Resumable upload created: {session.upload_id} for {filename} ({length} bytes) -> {mem_key}")
+        
+        return JSONResponse(
+            status_code=201,
+            headers={"Location": upload_url, "Upload-Offset": "0", **_TUS_HEADERS},
+            content={
+                "status": "created",
+                "upload_id": session.upload_id,
+                "upload_url": upload_url,
+                "batch_id": batch_id,
+                "file_path": mem_key,
+                "upload_length": length,
+                "upload_offset": 0,
+                "expires_in_seconds": resumable_uploads.ttl_seconds
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating resumable upload: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error during upload")
+
+@router.head("/resumable/{upload_id}")
+async def get_resumable_upload_offset(upload_id: str):
+    """
+    Report how many bytes of an upload the server holds, to resume from
+    
+    Returns:
+        Empty response with Upload-Offset and Upload-Length headers
+    """
+    session = await _resumable_session(upload_id)
+    return Response(
+        status_code=200,
+        headers={
+            "Upload-Offset": str(session.offset),
+            "Upload-Length": str(session.length),
+            "Cache-Control": "no-store",
+            **_TUS_HEADERS
+        }
+    )
+
+@router.patch("/resumable/{upload_id}")
+async def append_resumable_upload(upload_id: str, request: Request):
+    """
+    Append a chunk to a resumable upload
+    
+    The body (Content-Type application/offset+octet-stream) is written at
+    the Upload-Offset header, which must equal the server's current offset.
+    If the connection drops, the bytes that arrived are kept; ask for the
+    offset with HEAD and resume from there.
+    
+    Args:
+        upload_id: Upload to append to
+        request: Request carrying the chunk
+    
+    Returns:
+        Empty response with the new Upload-Offset header
+    """
+    try:
+        content_type = request.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type != "application/offset+octet-stream":
+            raise HTTPException(status_code=415, detail="Expected an application/offset+octet-stream body")
+        offset = _header_int(request, "Upload-Offset")
+        if offset is None:
+            raise HTTPException(status_code=400, detail="Upload-Offset header is required")
+        
+        async with _claimed_resumable_session(upload_id) as session:
+            if session.result is not None:
+                raise HTTPException(status_code=409, detail="Upload is already finalized")
+            if offset != session.offset:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Upload-Offset {offset} does not match the current offset {session.offset}",
+                    headers={"Upload-Offset": str(session.offset), **_TUS_HEADERS}
+                )
+            # Stored in parts of up to UPLOAD_CHUNK_SIZE as the body arrives
+            part = bytearray()
+            try:
+                async for chunk in request.stream():
+                    part += chunk
+                    if len(part) >= settings.UPLOAD_CHUNK_SIZE:
+                        await ingest_executor.run(resumable_uploads.append, session, part)
+                        part = bytearray()
+            except ClientDisconnect:
+                logger.info(
+                    f"Resumable upload {upload_id} interrupted at {session.offset + len(part)} of {session.length} bytes"
+                )
+            if part:
+                # Whatever arrived is kept, so the client resumes after it
+                await ingest_executor.run(resumable_uploads.append, session, part)
+        
+        return Response(status_code=204, headers={"Upload-Offset": str(session.offset), **_TUS_HEADERS})
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error appending to resumable upload {upload_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error during upload")
+
+@router.post("/resumable/{upload_id}/finalize")
+async def finalize_resumable_upload(upload_id: str, checksum: Optional[str] = None):
+    """
+    Validate a completely received upload and make it available for analysis
+    
+    Repeating the call after success returns the same file info.
+    
+    Args:
+        upload_id: Upload to finalize
+        checksum: Expected content_hash (hex BLAKE2b-256) of the whole file;
+            on mismatch the upload is discarded
+    
+    Returns:
+        Upload confirmation with the image's mem:// path
+    """
+    try:
+        async with _claimed_resumable_session(upload_id) as session:
+            if session.result is None:
+                if session.offset < session.length:
+                    raise HTTPException(
+                        status_code=409,
+                        detail=f"Upload incomplete: {session.offset} of {session.length} bytes received",
+                        headers={"Upload-Offset": str(session.offset), **_TUS_HEADERS}
+                    )
+                # Assembly, validation and storage (and normalization, if enabled) run off the event loop
+                ingested = await ingest_executor.run(resumable_uploads.finish, session, checksum)
+                await ingest_executor.run(
+                    resumable_uploads.complete,
+                    session,
+                    _upload_file_info(session.filename, session.key.rsplit("/", 1)[-1], ingested)
+                )
+                logger.info(f"Resumable upload finalized: {upload_id} -> {session.key}")
+            elif checksum is not None and checksum.strip().lower() != session.digest:
+                raise HTTPException(status_code=400, detail="Checksum mismatch")
+        
+        return {
+            "status": "success",
+            "message": "Image uploaded successfully",
+            "batch_id": session.batch_id,
+            "file_info": session.result,
+            "next_step": f"Call /api/v1/analysis/single with file_path: {session.key}"
+        }
+        
+    except HTTPException:
+        raise
+    except StorageFullError as e:
+        logger.warning(f"Memory store full, resumable upload {upload_id} left open: {str(e)}")
+        raise HTTPException(status_code=503, detail="Image store is full, retry later", headers={"Retry-After": "30"})
+    except Exception as e:
+        logger.error(f"Error finalizing resumable upload {upload_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error during upload")
+
+@router.delete("/resumable/{upload_id}", status_code=204)
+async def delete_resumable_upload(upload_id: str):
+    """
+    Abandon a resumable upload and free what it received
+    
+    A finalized image stays in the store until its TTL expires; only the
+    upload record is dropped.
+    """
+    async with _claimed_resumable_session(upload_id) as session:
+        await asyncio.to_thread(resumable_uploads.discard, session.upload_id)
+    return Response(status_code=204, headers=_TUS_HEADERS)
+
 @router.get("/status/{filename}")
 async def get_upload_status(filename: str):
     """
@@ -3,11 +3,20 @@ Application configuration settings
 """
 
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
 from pathlib import Path
 
+class WatchFolderConfig(BaseModel):
+    """A directory written by a camera rig, and how its images are analyzed"""
+    path: str = Field(..., description="Directory the rig writes images into")
+    rig_id: Optional[str] = Field(default=None, description="Rig name recorded on its batches; defaults to the directory name")
+    grid_square_size_inches: float = Field(default=1.0, gt=0, description="Calibration grid size of the rig")
+    include_visualizations: bool = Field(default=True, description="Generate visualizations for the rig's images")
+    processed_dir: str = Field(default="processed", description="Subdirectory analyzed images are moved to")
+    rejected_dir: str = Field(default="rejected", description="Subdirectory invalid images are moved to")
+
 class Settings(BaseSettings):
     # Project info
     PROJECT_NAME: str = "OctaPulse Aquaculture Analysis API"
@@ -30,6 +39,11 @@ class Settings(BaseSettings):
         description="Path to the trained model"
     )
     
+    SEGMENTATION_INPUT_LONG_SIDE: int = Field(
+        default=1280,
+        description="Segmentation runs on the smallest reduced decode with at least this long side; 0 uses full resolution"
+    )
+    
     GRID_SQUARE_SIZE_INCHES: float = Field(
         default=1.0,
         description="Size of grid squares in inches for calibration"
@@ -41,6 +55,39 @@ class Settings(BaseSettings):
         description="Maximum file upload size in bytes"
     )
     
+    UPLOAD_CHUNK_SIZE: int = Field(
+        default=1024 * 1024,  # 1MB
+        description="Chunk size used when streaming uploads into the blob store"
+    )
+    
+    MIN_IMAGE_DIMENSION: int = Field(
+        default=100,
+        description="Images narrower or shorter than this many pixels are rejected"
+    )
+    
+    MAX_IMAGE_PIXELS: int = Field(
+        default=100_000_000,
+        description="Images with more pixels than this are rejected before decoding"
+    )
+    
+    UPLOAD_NORMALIZE_LONG_SIDE: int = Field(
+        default=0,
+        description="Uploads with a longer side are stored as a downscaled JPEG working copy of this long side; 0 keeps originals"
+    )
+    UPLOAD_NORMALIZE_JPEG_QUALITY: int = Field(default=92, description="JPEG quality of normalized working copies")
+    UPLOAD_VERIFY_DECODE: bool = Field(
+        default=False,
+        description="Decode uploads at ingest so files with corrupt image data are rejected before analysis"
+    )
+    RESUMABLE_UPLOAD_TTL_SECONDS: int = Field(
+        default=60 * 60,  # 1 hour
+        description="Resumable uploads idle for this long are discarded; finalized ones are remembered as long"
+    )
+    RESUMABLE_UPLOAD_MAX_BYTES: int = Field(
+        default=2_147_483_648,  # 2 GB
+        description="Total declared size of unfinished resumable uploads across all workers"
+    )
+    
     ALLOWED_IMAGE_EXTENSIONS: List[str] = [
         ".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif"
     ]
@@ -49,20 +96,54 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     RESULTS_DIR: str = "results"
     TEMP_DIR: str = "temp"
+    RESULT_DB_PATH: str = Field(
+        default="data/results.db",
+        description="SQLite database holding analysis results and batch status across restarts"
+    )
+    BATCH_ARCHIVE_DIR: str = Field(default="data/archive", description="Compressed archives of compacted batches")
+    BATCH_MEMORY_IDLE_SECONDS: float = Field(
+        default=900.0,
+        description="Finished batches unread for this long are dropped from memory and reloaded on demand"
+    )
+    BATCH_ARCHIVE_AFTER_HOURS: float = Field(
+        default=24.0,
+        description="Finished batches are compacted into the archive this long after their last activity; 0 disables"
+    )
+    BATCH_RETENTION_DAYS: float = Field(
+        default=0.0,
+        description="Batches started longer ago than this are deleted with their results; 0 keeps them forever"
+    )
+    BATCH_SWEEP_INTERVAL_SECONDS: float = Field(default=300.0, description="Interval between batch lifecycle sweeps")
     
     # Processing settings
     MAX_BATCH_SIZE: int = Field(
         default=100,
         description="Maximum number of images in a batch"
     )
+    SERVER_WORKERS: int = Field(
+        default=1,
+        description="Uvicorn worker processes; more than one needs STORAGE_TYPE=shm or s3 to share uploads"
+    )
     CONCURRENCY_LIMIT: int = Field(
         default=3,
         description="Maximum number of concurrent image processing tasks"
     )
+    INGEST_WORKERS: int = Field(
+        default=4,
+        description="Threads validating and storing images from bulk uploads such as archives"
+    )
+    ANALYSIS_TIMEOUT_SECONDS: float = Field(
+        default=300.0,
+        description="Maximum time a single-image analysis request may wait and run, and a bulk image may wait for capacity"
+    )
     MEMORY_TTL_SECONDS: int = Field(
         default=60 * 30,  # 30 minutes
         description="TTL for in-memory stored images and artifacts"
     )
+    RESULT_CACHE_MAX_ENTRIES: int = Field(
+        default=5000,
+        description="Completed analyses remembered by image content; 0 disables the result cache"
+    )
 
     # AprilTag calibration
     APRILTAG_SIZE_MM: float = Field(
@@ -73,20 +154,60 @@ class Settings(BaseSettings):
         default="DICT_APRILTAG_25h9",
         description="OpenCV aruco predefined AprilTag dictionary to detect"
     )
+    APRILTAG_SEARCH_LONG_SIDE: int = Field(
+        default=2000,
+        description="AprilTags are first searched on a reduced decode with at least this long side; 0 searches full resolution only"
+    )
 
     # Optional global limits and debugging
     MAX_TOTAL_BATCH_SIZE: int = Field(
         default=2_147_483_648,  # 2 GB
         description="Maximum total size of a batch upload in bytes"
     )
+    MAX_ARCHIVE_IMAGES: int = Field(
+        default=10_000,
+        description="Maximum number of images in an archive batch upload"
+    )
+    MAX_ARCHIVE_SIZE: int = Field(
+        default=64 * 1024 ** 3,  # 64 GB
+        description="Maximum size of an archive batch upload in bytes"
+    )
+    MAX_MANIFEST_IMAGES: int = Field(default=100_000, description="Maximum number of images in a manifest batch")
+    MAX_MANIFEST_SIZE: int = Field(
+        default=32 * 1024 * 1024,  # 32 MB
+        description="Maximum size of an uploaded batch manifest in bytes"
+    )
+    MANIFEST_ROOT: Optional[str] = Field(
+        default=None,
+        description="Directory manifest batches may read images from; manifest batches are refused when unset"
+    )
+    MANIFEST_CHUNK_SIZE: int = Field(
+        default=256,
+        description="Manifest entries checked together on the ingest pool before they are queued"
+    )
+    MANIFEST_PREFETCH_IMAGES: int = Field(
+        default=4,
+        description="Images of a manifest batch loaded and decoded ahead of inference"
+    )
     DEBUG: bool = Field(default=True, description="Enable debug mode")
     LOG_LEVEL: str = Field(default="INFO", description="Application log level")
 
     # Storage configuration
     STORAGE_TYPE: str = Field(
-        default="memory",  # memory | s3
+        default="memory",  # memory | s3 | shm
         description="Active storage backend"
     )
+    SHM_ARENA_NAME: str = Field(default="octapulse-blobs", description="Shared memory segment shared by local worker processes")
+    SHM_ARENA_SIZE_MB: int = Field(default=1024, description="Size of the shared memory blob arena")
+    SHM_ARENA_SLOTS: int = Field(default=8192, description="Index slots in the shared memory arena")
+    SHM_LOCK_PATH: str = Field(default="/tmp/octapulse-blobs.lock", description="Lock file serializing arena updates across processes")
+    S3_KEY_PREFIX: str = Field(default="", description="Prefix prepended to every S3 object key")
+    S3_MAX_POOL_CONNECTIONS: int = Field(default=32, description="Size of the shared S3 HTTP connection pool")
+    S3_MULTIPART_THRESHOLD_MB: int = Field(default=8, description="Objects at least this large use multipart upload")
+    S3_MULTIPART_CHUNK_SIZE_MB: int = Field(default=8, description="Multipart upload part size")
+    S3_TRANSFER_CONCURRENCY: int = Field(default=4, description="Parallel part uploads per multipart transfer")
+    S3_PREFETCH_WORKERS: int = Field(default=8, description="Threads fetching batch inputs into the local cache")
+    S3_CACHE_MAX_SIZE_MB: int = Field(default=256, description="Local read-through cache size in front of S3")
     S3_BUCKET_NAME: Optional[str] = Field(default=None, description="S3 bucket name for storage")
     S3_REGION: Optional[str] = Field(default=None, description="S3 region")
     S3_ENDPOINT_URL: Optional[str] = Field(default=None, description="Custom S3 endpoint URL (for MinIO, etc.)")
@@ -95,11 +216,66 @@ class Settings(BaseSettings):
     S3_USE_SSL: bool = Field(default=True, description="Use SSL for S3 connections")
     MEMORY_STORAGE_MAX_SIZE_MB: int = Field(
         default=500,
-        description="Max memory store size in MB (soft limit, local only)"
+        description="Max memory store size in MB; least recently used unpinned objects are evicted beyond it"
     )
     MEMORY_STORAGE_MAX_OBJECTS: int = Field(
         default=1000,
-        description="Max number of objects allowed in memory store"
+        description="Max number of blobs allowed in memory store; content reference records are not counted"
+    )
+    MEMORY_SPILL_ENABLED: bool = Field(
+        default=True,
+        description="Spill objects evicted from the memory store to disk segments instead of dropping them"
+    )
+    MEMORY_SPILL_DIR: str = Field(default="temp/spill", description="Directory for memory store spill segments")
+    MEMORY_SPILL_MAX_SIZE_MB: int = Field(
+        default=4096,
+        description="Max disk used by spill segments; the oldest segment is dropped beyond it"
+    )
+    MEMORY_SPILL_SEGMENT_SIZE_MB: int = Field(default=64, description="Size at which a new spill segment is started")
+    MEMORY_STORAGE_SHARDS: int = Field(
+        default=16,
+        description="Number of independently locked memory store shards; size and object limits are split evenly across them"
+    )
+
+    # Admission control / load shedding
+    ADMISSION_MAX_PENDING_IMAGES: int = Field(
+        default=500,
+        description="Maximum admitted but unfinished images before analysis requests get 429"
+    )
+    ADMISSION_MAX_PENDING_SECONDS: float = Field(
+        default=900.0,
+        description="Maximum estimated backlog of compute seconds before analysis requests get 429"
+    )
+    ADMISSION_MAX_MEMORY_FRACTION: float = Field(
+        default=0.9,
+        description="Memory store (or spill tier, when enabled) occupancy fraction above which uploads get 503"
+    )
+    ADMISSION_DEFAULT_IMAGE_SECONDS: float = Field(
+        default=5.0,
+        description="Initial per-image compute estimate until real timings are observed"
+    )
+
+    # Watch-folder ingestion for camera rigs
+    WATCH_FOLDERS: List[WatchFolderConfig] = Field(
+        default_factory=list,
+        description="Directories whose new images are analyzed automatically, as a JSON list of watch folder objects"
+    )
+    WATCH_SETTLE_SECONDS: float = Field(
+        default=2.0,
+        description="A file must be unchanged this long before it is taken, unless the rig is seen closing it"
+    )
+    WATCH_BATCH_WINDOW_SECONDS: float = Field(
+        default=10.0,
+        description="New images are collected this long after the first one before they are submitted as a batch"
+    )
+    WATCH_BATCH_MAX_IMAGES: int = Field(default=50, description="A batch is submitted early once it has this many images")
+    WATCH_POLL_INTERVAL_SECONDS: float = Field(
+        default=1.0,
+        description="Rescan interval when inotify is unavailable, and while files are settling"
+    )
+    WATCH_FORCE_POLLING: bool = Field(
+        default=False,
+        description="Poll instead of using inotify, e.g. for network shares that do not deliver events"
     )
 
     # Celery / async processing backends (optional for local dev)
@@ -8,12 +8,22 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
+import asyncio
 from pathlib import Path
 import logging
 
 from app.api.v1.router import api_router
+from app.api.v1.endpoints.analysis import stop_active_batches
 from app.core.config import settings
 from app.core.logger import setup_logging
+from app.services.analysis_executor import analysis_executor, ingest_executor
+from app.services.admission import admission_controller
+from app.services.storage import store
+from app.services.result_cache import result_cache
+from app.services.result_db import result_db
+from app.services.batch_lifecycle import batch_lifecycle
+from app.services.watch_folder import watch_folder_service
+from app.services.resumable_upload import resumable_uploads
 
 # Setup logging
 setup_logging()
@@ -36,9 +46,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by browser clients resuming an upload
+    expose_headers=["Location", "Upload-Offset", "Upload-Length", "Tus-Resumable"],
 )
 
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+class EventStreamAwareGZipMiddleware(GZipMiddleware):
+    """GZip that passes server-sent event streams through uncompressed.
+
+    Compressing text/event-stream buffers events inside the gzip stream and
+    defeats the push channel, so requests accepting it bypass compression.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            accept = dict(scope.get("headers") or []).get(b"accept", b"")
+            if b"text/event-stream" in accept:
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(EventStreamAwareGZipMiddleware, minimum_size=1000)
 
 # Create necessary directories
 uploads_dir = Path("uploads")
@@ -53,6 +80,27 @@ app.mount("/results", StaticFiles(directory="results"), name="results")
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def start_background_services():
+    """Start the memory store expiry reaper, the batch lifecycle sweeper and the watch folders"""
+    store.start_reaper()
+    loop = asyncio.get_running_loop()
+    batch_lifecycle.start_sweeper(settings.BATCH_SWEEP_INTERVAL_SECONDS, loop)
+    watch_folder_service.start(loop)
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop running batches, the worker pools and background services"""
+    # No new watch-folder batches; unsubmitted files stay in place for the next start
+    watch_folder_service.stop()
+    # Batches save their final status on the way out, so stop them before the database closes
+    await stop_active_batches()
+    analysis_executor.shutdown()
+    ingest_executor.shutdown()
+    store.stop_reaper()
+    batch_lifecycle.stop_sweeper()
+    result_db.close()
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -69,6 +117,14 @@ async def health_check():
         "status": "healthy",
         "api_version": settings.VERSION,
         "model_loaded": True,  # We'll update this based on actual model status
+        "analysis_workers": analysis_executor.stats(),
+        "ingest_workers": ingest_executor.stats(),
+        "watch_folders": watch_folder_service.stats(),
+        "resumable_uploads": resumable_uploads.stats(),
+        "admission": admission_controller.stats(),
+        "memory_store": store.stats(),
+        "result_cache": result_cache.stats(),
+        "batch_lifecycle": batch_lifecycle.stats(),
     }
 
 if __name__ == "__main__":
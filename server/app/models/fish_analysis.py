@@ -12,6 +12,7 @@ class AnalysisStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class Point2D(BaseModel):
     """2D point coordinates"""
@@ -78,7 +79,7 @@ class LateralLineAnalysis(BaseModel):
 
 class CalibrationInfo(BaseModel):
     """Grid calibration information"""
-    pixels_per_inch: float = Field(..., gt=0)
+    pixels_per_inch: float = Field(..., ge=0)  # 0 when calibration failed
     grid_square_size_inches: float = Field(..., gt=0)
     detected_squares: int = Field(..., ge=0)
     calibration_quality: str = Field(default="good")  # good, fair, poor
@@ -94,6 +95,10 @@ class ProcessingMetadata(BaseModel):
     model_version: str
     api_version: str
     processed_at: datetime = Field(default_factory=datetime.utcnow)
+    # Pixel quantities refer to the analyzed image; for a normalized working
+    # copy, divide by source_scale to get original-image pixels
+    source_scale: float = Field(default=1.0, gt=0)
+    source_dimensions: Optional[ImageDimensions] = None
 
 class FishAnalysisResult(BaseModel):
     """Complete fish analysis result"""
@@ -137,7 +142,8 @@ class FishAnalysisResult(BaseModel):
 
 class BatchAnalysisRequest(BaseModel):
     """Batch analysis request"""
-    images: List[str] = Field(..., min_length=1, max_length=100)
+    # Omit to analyze every image uploaded under batch_id
+    images: Optional[List[str]] = Field(default=None, min_length=1, max_length=100)
     grid_square_size_inches: float = Field(default=1.0, gt=0)
     include_visualizations: bool = Field(default=True)
     batch_id: Optional[str] = None  # Optional batch_id from upload
@@ -0,0 +1,148 @@
+"""
+Admission control for analysis and upload requests.
+
+Work is accepted only while the node can finish it in bounded time: the number
+of admitted-but-unfinished images, the estimated compute seconds they represent
+and the in-memory store occupancy are checked before a request enqueues
+anything. Overloaded requests are rejected with 429 (analysis backlog) or 503
+(memory store full) and a Retry-After hint instead of degrading every request.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.analysis_executor import analysis_executor
+from app.services.storage import store
+
+logger = logging.getLogger(__name__)
+
+
+def _overloaded(status_code: int, detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionController:
+    """Tracks admitted analysis work and sheds load past configured limits."""
+
+    _EWMA_ALPHA = 0.2
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending_images = 0
+        self._avg_image_seconds = settings.ADMISSION_DEFAULT_IMAGE_SECONDS
+        self._rejected = 0
+        self._pending_bytes: List[Callable[[], int]] = []
+
+    def _backlog_seconds(self, pending_images: int) -> float:
+        return pending_images * self._avg_image_seconds / analysis_executor.max_workers
+
+    def admit_analysis(self, n_images: int, max_wait_seconds: Optional[float] = None) -> None:
+        """
+        Reserve capacity for n_images analyses or reject the request.
+
+        An idle node always admits, so a single batch larger than the limits
+        still runs. Callers must release() every reserved image.
+
+        Args:
+            n_images: Number of images the request will analyze
+            max_wait_seconds: Tighter backlog bound for latency-sensitive callers
+
+        Raises:
+            HTTPException: 429 with Retry-After when the backlog is too deep
+        """
+        limit = settings.ADMISSION_MAX_PENDING_SECONDS
+        if max_wait_seconds is not None:
+            limit = min(limit, max_wait_seconds)
+        with self._lock:
+            if self._pending_images > 0:
+                backlog = self._backlog_seconds(self._pending_images + n_images)
+                if self._pending_images + n_images > settings.ADMISSION_MAX_PENDING_IMAGES:
+                    self._rejected += 1
+                    raise _overloaded(
+                        429,
+                        f"Analysis queue is full ({self._pending_images} images pending)",
+                        self._backlog_seconds(self._pending_images + n_images - settings.ADMISSION_MAX_PENDING_IMAGES),
+                    )
+                if backlog > limit:
+                    self._rejected += 1
+                    raise _overloaded(
+                        429,
+                        f"Analysis backlog too long (~{backlog:.0f}s of pending work)",
+                        backlog - limit,
+                    )
+            self._pending_images += n_images
+
+    def register_pending_bytes(self, source: Callable[[], int]) -> None:
+        """
+        Count bytes held outside the store but bound for it against its ceiling.
+
+        Args:
+            source: Returns the bytes currently held, e.g. by unfinished
+                resumable uploads
+        """
+        with self._lock:
+            self._pending_bytes.append(source)
+
+    def admit_upload(self, incoming_bytes: int = 0) -> None:
+        """
+        Reject uploads while the store is near its ceiling or the analysis
+        queue is already full.
+
+        Args:
+            incoming_bytes: Size of the upload, when known up front
+
+        Raises:
+            HTTPException: 503 when the blob store is full, 429 when the
+                analysis queue is full
+        """
+        with self._lock:
+            sources = list(self._pending_bytes)
+        pending = incoming_bytes + sum(source() for source in sources)
+        full = store.near_capacity(settings.ADMISSION_MAX_MEMORY_FRACTION, pending)
+        with self._lock:
+            backlog = self._backlog_seconds(self._pending_images)
+            if full:
+                self._rejected += 1
+                # Stored images are released as queued analyses finish
+                raise _overloaded(503, "Image store is full, retry later", min(max(backlog, 5), 60))
+            if self._pending_images >= settings.ADMISSION_MAX_PENDING_IMAGES:
+                self._rejected += 1
+                raise _overloaded(
+                    429,
+                    f"Analysis queue is full ({self._pending_images} images pending)",
+                    backlog - settings.ADMISSION_MAX_PENDING_SECONDS,
+                )
+
+    def release(self, n_images: int = 1) -> None:
+        with self._lock:
+            self._pending_images = max(0, self._pending_images - n_images)
+
+    def observe(self, processing_seconds: float) -> None:
+        """Feed a completed analysis duration into the per-image estimate."""
+        if processing_seconds <= 0:
+            return
+        with self._lock:
+            self._avg_image_seconds += self._EWMA_ALPHA * (processing_seconds - self._avg_image_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending_images": self._pending_images,
+                "estimated_backlog_seconds": round(self._backlog_seconds(self._pending_images), 1),
+                "average_image_seconds": round(self._avg_image_seconds, 2),
+                "rejected_requests": self._rejected,
+            }
+
+
+admission_controller = AdmissionController()
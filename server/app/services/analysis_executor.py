@@ -0,0 +1,105 @@
+"""
+Shared worker pools for CPU-bound image work.
+
+Single-image requests and batch jobs both submit work to analysis_executor, so
+inference never runs on the event loop thread and the number of concurrent
+analyses on a node is bounded by CONCURRENCY_LIMIT regardless of where the
+work came from. Validating, hashing and storing incoming images runs on the
+separate ingest_executor, so bulk uploads neither wait behind inference nor
+hold up the analyses they feed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AnalysisExecutor:
+    """Bounded thread pool with queue accounting for analysis work."""
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "analysis") -> None:
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=thread_name_prefix
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    async def run(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        timeout: Optional[float] = None,
+        cancel_event: Optional[threading.Event] = None,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Run fn(*args, **kwargs) on a worker thread and await its result.
+
+        Args:
+            fn: Synchronous callable to execute
+            timeout: Seconds to wait, including time spent queued
+            cancel_event: Passed on to fn, and set when the caller gives up
+                (timeout or task cancellation) so cooperative work stops at
+                its next checkpoint
+
+        Raises:
+            asyncio.TimeoutError: If timeout elapses before fn completes
+        """
+        if cancel_event is not None:
+            kwargs["cancel_event"] = cancel_event
+        with self._lock:
+            self._queued += 1
+
+        def _invoke() -> T:
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        future: Future = self._executor.submit(_invoke)
+        future.add_done_callback(self._on_done)
+        try:
+            if timeout is not None and timeout > 0:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            return await asyncio.wrap_future(future)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if cancel_event is not None:
+                cancel_event.set()
+            raise
+
+    def _on_done(self, future: Future) -> None:
+        # A future cancelled while still queued never reaches _invoke
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+analysis_executor = AnalysisExecutor(settings.CONCURRENCY_LIMIT)
+ingest_executor = AnalysisExecutor(settings.INGEST_WORKERS, thread_name_prefix="ingest")
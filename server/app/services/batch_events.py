@@ -0,0 +1,78 @@
+"""
+Push channel for batch progress.
+
+Batch workers publish progress deltas and per-image result summaries here;
+streaming endpoints subscribe per batch and forward events to clients as they
+happen, replacing status/progress polling.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Event emitted after a batch reaches a terminal status; subscribers stop there
+END_EVENT = "end"
+
+
+class BatchEventBroker:
+    """Fans out batch events to per-subscriber asyncio queues."""
+
+    def __init__(self, queue_size: int = 256) -> None:
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Tuple[asyncio.Queue, asyncio.AbstractEventLoop]]] = {}
+
+    def subscribe(self, batch_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        with self._lock:
+            self._subscribers.setdefault(batch_id, set()).add((queue, asyncio.get_running_loop()))
+        return queue
+
+    def unsubscribe(self, batch_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(batch_id)
+            if not subscribers:
+                return
+            for item in [s for s in subscribers if s[0] is queue]:
+                subscribers.discard(item)
+            if not subscribers:
+                del self._subscribers[batch_id]
+
+    def publish(self, batch_id: str, event: str, data: Dict[str, Any]) -> None:
+        """Deliver an event to every subscriber of batch_id; safe from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(batch_id, ()))
+        if not subscribers:
+            return
+        try:
+            current: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for queue, loop in subscribers:
+            if loop is current:
+                self._offer(queue, (event, data))
+            else:
+                loop.call_soon_threadsafe(self._offer, queue, (event, data))
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, item: Tuple[str, Dict[str, Any]]) -> None:
+        # A slow consumer loses its oldest events rather than stalling workers;
+        # progress events carry absolute counters so the next one resyncs it
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(item)
+
+    def subscriber_count(self, batch_id: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(batch_id, ()))
+
+
+batch_events = BatchEventBroker()
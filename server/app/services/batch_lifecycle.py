@@ -0,0 +1,165 @@
+"""
+Lifecycle policy for finished batches.
+
+A periodic sweep keeps long-running processes flat over a season:
+
+* finished batches nobody has looked at for BATCH_MEMORY_IDLE_SECONDS are
+  dropped from the in-process status registry (they reload from the result
+  database on the next request);
+* batches finished more than BATCH_ARCHIVE_AFTER_HOURS ago are compacted into
+  gzip archives and rehydrated lazily when read again;
+* batches older than BATCH_RETENTION_DAYS are deleted outright (0 keeps them);
+* records of normalized working copies (see image_normalize) are dropped once
+  the copies have expired from the blob store.
+
+The registries evictors drop batches from belong to the event loop, so the
+sweeper thread schedules them on it and waits for their count; database work
+stays on the thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.result_db import ResultDatabase, result_db
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLifecycle:
+    """Evicts, archives and expires finished batches on a background thread."""
+
+    def __init__(
+        self,
+        db: ResultDatabase,
+        memory_idle_seconds: float,
+        archive_after_seconds: float,
+        retention_seconds: float
+    ) -> None:
+        self._db = db
+        self.memory_idle_seconds = memory_idle_seconds
+        self.archive_after_seconds = archive_after_seconds
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._evictors: List[Callable[[float], int]] = []
+        self._sweeper: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sweeper_stop = threading.Event()
+        self._totals = {"evicted": 0, "archived_results": 0, "expired_batches": 0, "sweeps": 0}
+
+    def register_evictor(self, evictor: Callable[[float], int]) -> None:
+        """
+        Add an in-memory registry to the sweep.
+
+        Args:
+            evictor: Called with the idle threshold in seconds; drops finished
+                batches idle for longer and returns how many it dropped
+        """
+        with self._lock:
+            self._evictors.append(evictor)
+
+    def sweep(self) -> Dict[str, int]:
+        """Run one eviction, archival and retention pass."""
+        with self._lock:
+            evictors = list(self._evictors)
+        evicted = sum(self._run_evictor(evictor) for evictor in evictors)
+        
+        now = time.time()
+        expired = 0
+        if self.retention_seconds > 0:
+            for batch_id in self._db.expired_batches(now - self.retention_seconds):
+                self._db.delete_batch(batch_id)
+                expired += 1
+        archived = 0
+        if self.archive_after_seconds > 0:
+            for batch_id in self._db.archive_candidates(now - self.archive_after_seconds):
+                archived += self._db.archive_batch(batch_id)
+        # A working copy expires from the store MEMORY_TTL_SECONDS after its last ingest
+        self._db.forget_normalizations(now - settings.MEMORY_TTL_SECONDS)
+        if archived or expired:
+            self._db.reclaim_space()
+        
+        with self._lock:
+            self._totals["evicted"] += evicted
+            self._totals["archived_results"] += archived
+            self._totals["expired_batches"] += expired
+            self._totals["sweeps"] += 1
+        if evicted or archived or expired:
+            logger.info(f"Batch sweep: {evicted} evicted from memory, {archived} results archived, {expired} batches expired")
+        return {"evicted": evicted, "archived_results": archived, "expired_batches": expired}
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                **self._totals,
+                "memory_idle_seconds": self.memory_idle_seconds,
+                "archive_after_seconds": self.archive_after_seconds,
+                "retention_seconds": self.retention_seconds,
+            }
+
+    def start_sweeper(self, interval_seconds: float, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Start a daemon thread that runs sweep() periodically.
+
+        Args:
+            interval_seconds: Time between sweeps
+            loop: Event loop the evictors run on; without one they run on the
+                sweeper thread
+        """
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._loop = loop
+            self._sweeper_stop.clear()
+            self._sweeper = threading.Thread(
+                target=self._sweeper_loop, args=(interval_seconds,),
+                name="batch-lifecycle-sweeper", daemon=True
+            )
+            self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        self._sweeper_stop.set()
+
+    def _run_evictor(self, evictor: Callable[[float], int]) -> int:
+        loop = self._loop
+        if loop is None or threading.current_thread() is not self._sweeper:
+            return evictor(self.memory_idle_seconds)
+        done: "concurrent.futures.Future[int]" = concurrent.futures.Future()
+
+        def run() -> None:
+            try:
+                done.set_result(evictor(self.memory_idle_seconds))
+            except Exception as e:
+                done.set_exception(e)
+
+        try:
+            loop.call_soon_threadsafe(run)
+        except RuntimeError:
+            # The loop has closed; nothing is left to evict
+            return 0
+        try:
+            return done.result(timeout=30)
+        except concurrent.futures.TimeoutError:
+            logger.warning("Event loop did not run the batch evictor within 30s")
+            return 0
+
+    def _sweeper_loop(self, interval_seconds: float) -> None:
+        while not self._sweeper_stop.wait(interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:  # pragma: no cover - keep the sweeper alive
+                logger.error(f"Batch lifecycle sweep failed: {str(e)}")
+
+
+batch_lifecycle = BatchLifecycle(
+    result_db,
+    memory_idle_seconds=settings.BATCH_MEMORY_IDLE_SECONDS,
+    archive_after_seconds=settings.BATCH_ARCHIVE_AFTER_HOURS * 3600,
+    retention_seconds=settings.BATCH_RETENTION_DAYS * 86400,
+)
@@ -0,0 +1,307 @@
+"""
+Content-addressed, deduplicating facade over the blob store backend.
+
+put_content() hashes each blob with BLAKE2b and stores the bytes once under
+cas://{digest[:2]}/{digest}; the caller's key (mem://{batch_id}/{file},
+memvis://{analysis_id}/{viz}.jpg) becomes a small reference record pointing at
+it. Re-uploads and retries of the same photo therefore share one copy, sent
+to the backend once, and the digest doubles as the identity used by the
+analysis result cache.
+
+get(), exists() and pins resolve references transparently; every other store
+operation is passed straight to the backend.
+
+Blobs are reference counted: delete(), delete_prefix() and delete_namespace()
+drop the references they remove, and a blob whose last reference goes is
+deleted with it, so cancelled batches and rejected uploads free their memory
+at once. References that simply expire are forgotten in TTL order and leave
+their blob to its own (equal or later) expiry. Counts only cover references
+made by this process, so on backends shared with other processes
+(`shared = True`: S3, shm) blobs are left to expiry and eviction as before.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from app.services.spill_store import namespace_of
+
+REF_CONTENT_TYPE = "application/x-octapulse-cas-ref"
+
+
+def content_hasher() -> "hashlib.blake2b":
+    """Incremental hasher producing content_digest() values."""
+    return hashlib.blake2b(digest_size=32)
+
+
+def content_digest(data: Union[bytes, memoryview]) -> str:
+    hasher = content_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """content_digest() of a file, read in chunks."""
+    hasher = content_hasher()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def make_cas_key(digest: str) -> str:
+    return f"cas://{digest[:2]}/{digest}"
+
+
+class ContentAddressedStore:
+    """Deduplicates blobs by content and resolves reference keys on read."""
+
+    def __init__(self, backend: Any) -> None:
+        self._backend = backend
+        self._lock = threading.Lock()
+        # key -> blob keys pinned through it, so unpin() still finds the blob
+        # after the reference itself was deleted
+        self._pinned_blobs: Dict[str, List[str]] = {}
+        self._counts_refs = not getattr(backend, "shared", False)
+        # Reference key -> (digest, expires_at), roughly in expiry order
+        self._refs: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._ref_counts: Dict[str, int] = {}
+        # scheme://namespace -> reference keys in it
+        self._ref_namespaces: Dict[str, Set[str]] = {}
+        self._content_puts = 0
+        self._dedup_hits = 0
+        self._dedup_bytes = 0
+        self._blobs_freed = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._backend, name)
+
+    @property
+    def backend(self) -> Any:
+        return self._backend
+
+    def put_content(
+        self,
+        key: str,
+        data: Union[bytes, memoryview],
+        content_type: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        digest: Optional[str] = None
+    ) -> str:
+        """
+        Store data once by content and point key at it.
+
+        Args:
+            key: Reference key the caller will use
+            data: Blob content
+            digest: Precomputed content_digest(data), if the caller has it
+
+        Returns:
+            Hex BLAKE2b digest of data
+        """
+        digest = digest or content_digest(data)
+        blob_key = make_cas_key(digest)
+        # Counted before the blob is written, so deleting its last other
+        # reference meanwhile cannot free it
+        self._add_ref(key, digest, ttl_seconds)
+        try:
+            # A duplicate is only touched, which restarts its TTL (and LRU
+            # position) so it outlives the new reference without being
+            # uploaded again
+            duplicate = self._backend.touch(blob_key, content_type=content_type, ttl_seconds=ttl_seconds)
+            if not duplicate:
+                self._backend.put(blob_key, data, content_type=content_type, ttl_seconds=ttl_seconds)
+            self._backend.put(key, digest.encode("ascii"), content_type=REF_CONTENT_TYPE, ttl_seconds=ttl_seconds)
+        except BaseException:
+            self._drop_refs([key])
+            raise
+        with self._lock:
+            self._content_puts += 1
+            if duplicate:
+                self._dedup_hits += 1
+                self._dedup_bytes += len(data)
+        return digest
+
+    def link(self, key: str, digest: str, ttl_seconds: Optional[int] = None) -> bool:
+        """Point key at an already stored blob; False if that blob is gone."""
+        self._add_ref(key, digest, ttl_seconds)
+        try:
+            if not self._backend.exists(make_cas_key(digest)):
+                self._drop_refs([key])
+                return False
+            self._backend.put(key, digest.encode("ascii"), content_type=REF_CONTENT_TYPE, ttl_seconds=ttl_seconds)
+        except BaseException:
+            self._drop_refs([key])
+            raise
+        return True
+
+    def digest_of(self, key: str) -> Optional[str]:
+        """Content digest behind key, or None if key is missing or not a reference."""
+        blob = self._backend.get(key)
+        if blob is None or blob[1] != REF_CONTENT_TYPE:
+            return None
+        return bytes(blob[0]).decode("ascii")
+
+    def get(self, key: str) -> Optional[Tuple[Union[bytes, memoryview], Optional[str]]]:
+        blob = self._backend.get(key)
+        if blob is not None and blob[1] == REF_CONTENT_TYPE:
+            return self._backend.get(make_cas_key(bytes(blob[0]).decode("ascii")))
+        return blob
+
+    def delete(self, key: str) -> None:
+        """Delete key, and the blob behind it if this was its last reference."""
+        self._backend.delete(key)
+        self._drop_refs([key])
+
+    def delete_prefix(self, prefix: str) -> int:
+        removed = self._backend.delete_prefix(prefix)
+        with self._lock:
+            namespace = namespace_of(prefix)
+            candidates = self._ref_namespaces.get(namespace, ()) if namespace is not None else self._refs.keys()
+            keys = [k for k in candidates if k.startswith(prefix)]
+        self._drop_refs(keys)
+        return removed
+
+    def delete_namespace(self, namespace: str) -> int:
+        removed = self._backend.delete_namespace(namespace)
+        with self._lock:
+            keys = list(self._ref_namespaces.get(namespace, ()))
+        self._drop_refs(keys)
+        return removed
+
+    def exists(self, key: str) -> bool:
+        blob_key = self._blob_key(key)
+        return blob_key is not None and self._backend.exists(blob_key)
+
+    def pin(self, key: str) -> None:
+        """Pin key and, for a reference, the shared blob behind it."""
+        self._backend.pin(key)
+        blob_key = self._blob_key(key)
+        if blob_key is not None and blob_key != key:
+            self._backend.pin(blob_key)
+            with self._lock:
+                self._pinned_blobs.setdefault(key, []).append(blob_key)
+
+    def unpin(self, key: str) -> None:
+        self._backend.unpin(key)
+        with self._lock:
+            blob_keys = self._pinned_blobs.get(key)
+            blob_key = blob_keys.pop() if blob_keys else None
+            if blob_keys is not None and not blob_keys:
+                del self._pinned_blobs[key]
+        if blob_key is not None:
+            self._backend.unpin(blob_key)
+
+    @contextmanager
+    def pinned(self, keys: Iterable[str]) -> Iterator[None]:
+        keys = list(keys)
+        for key in keys:
+            self.pin(key)
+        try:
+            yield
+        finally:
+            for key in keys:
+                self.unpin(key)
+
+    def pin_namespace(self, namespace: str) -> List[str]:
+        keys = self._backend.pin_namespace(namespace)
+        for key in keys:
+            blob_key = self._blob_key(key)
+            if blob_key is not None and blob_key != key:
+                self._backend.pin(blob_key)
+                with self._lock:
+                    self._pinned_blobs.setdefault(key, []).append(blob_key)
+        return keys
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._backend.stats())
+        with self._lock:
+            stats["dedup"] = {
+                "content_puts": self._content_puts,
+                "duplicates": self._dedup_hits,
+                "duplicate_bytes": self._dedup_bytes,
+                "references": len(self._refs),
+                "blobs": len(self._ref_counts),
+                "blobs_freed": self._blobs_freed,
+            }
+        return stats
+
+    def _add_ref(self, key: str, digest: str, ttl_seconds: Optional[int]) -> None:
+        if not self._counts_refs:
+            return
+        expires_at = time.time() + ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        with self._lock:
+            orphans = self._forget_refs([key])
+            self._refs[key] = (digest, expires_at)
+            self._ref_counts[digest] = self._ref_counts.get(digest, 0) + 1
+            namespace = namespace_of(key)
+            if namespace is not None:
+                self._ref_namespaces.setdefault(namespace, set()).add(key)
+            self._forget_expired()
+        # key was repointed away from its old blob
+        self._free(orphans)
+
+    def _drop_refs(self, keys: List[str]) -> None:
+        if not keys or not self._counts_refs:
+            return
+        with self._lock:
+            orphans = self._forget_refs(keys)
+        self._free(orphans)
+
+    def _free(self, digests: List[str]) -> None:
+        if not digests:
+            return
+        # Under the lock so a reference added meanwhile either keeps the blob
+        # or is counted before its put_content() writes the blob again
+        with self._lock:
+            for digest in digests:
+                if digest not in self._ref_counts:
+                    self._backend.delete(make_cas_key(digest))
+                    self._blobs_freed += 1
+
+    def _forget_refs(self, keys: Iterable[str]) -> List[str]:
+        """Forget references under self._lock; returns digests left without any."""
+        orphans = []
+        for key in keys:
+            ref = self._refs.pop(key, None)
+            if ref is None:
+                continue
+            digest = ref[0]
+            count = self._ref_counts[digest] - 1
+            if count > 0:
+                self._ref_counts[digest] = count
+            else:
+                del self._ref_counts[digest]
+                orphans.append(digest)
+            namespace = namespace_of(key)
+            if namespace is not None:
+                refs = self._ref_namespaces.get(namespace)
+                if refs is not None:
+                    refs.discard(key)
+                    if not refs:
+                        del self._ref_namespaces[namespace]
+        return orphans
+
+    def _forget_expired(self) -> None:
+        """Forget expired references at the head of self._refs; their blobs expire on their own."""
+        now = time.time()
+        expired = []
+        for key, (_digest, expires_at) in self._refs.items():
+            if expires_at is None or expires_at >= now or len(expired) >= 64:
+                break
+            expired.append(key)
+        self._forget_refs(expired)
+
+    def _blob_key(self, key: str) -> Optional[str]:
+        """The key holding key's bytes: its blob for a reference, itself otherwise."""
+        blob = self._backend.get(key)
+        if blob is None:
+            return None
+        if blob[1] == REF_CONTENT_TYPE:
+            return make_cas_key(bytes(blob[0]).decode("ascii"))
+        return key
@@ -15,6 +15,8 @@ from sklearn.cluster import KMeans
 import math
 from typing import Dict, List, Tuple, Optional
 import logging
+import threading
+from dataclasses import dataclass
 from datetime import datetime
 
 from app.core.config import settings
@@ -23,22 +25,70 @@ from app.models.fish_analysis import (
     ColorAnalysis, LateralLineAnalysis, CalibrationInfo, ImageDimensions,
     ProcessingMetadata, AnalysisStatus
 )
-from app.services.in_memory_storage import store, make_mem_vis_key
+from app.services.in_memory_storage import make_mem_vis_key
+from app.services.content_store import content_digest, file_digest
+from app.services.result_cache import result_cache, make_result_cache_key
+from app.services.storage import store
+from app.services.analysis_executor import analysis_executor
+from app.services.image_decode import DecodedImage
+from app.services.image_normalize import read_normalization
+from app.utils.image_probe import ImageProbe, ImageProbeError, probe_image, probe_image_file
 import io
 
 logger = logging.getLogger(__name__)
 
+class AnalysisCancelledError(Exception):
+    """Raised at a stage boundary when the owning job has been cancelled"""
+
+def _raise_if_cancelled(cancel_event: Optional[threading.Event], stage: str) -> None:
+    """Abort processing between stages once cancellation has been requested"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise AnalysisCancelledError(f"Analysis cancelled before {stage}")
+
+@dataclass
+class PrefetchedImage:
+    """An image loaded, hashed and decoded ahead of its analysis by prefetch_image"""
+    data: bytes
+    digest: str
+    probe: ImageProbe
+    decoded: DecodedImage
+
+class _PerThread:
+    """Descriptor storing an attribute per worker thread.
+
+    The service is a process-wide singleton whose calibration state is set
+    while analyzing one image; analyses run concurrently on the executor, so
+    each thread keeps its own copy.
+    """
+
+    def __init__(self, default):
+        self.default = default
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj._thread_state, self.name, self.default)
+
+    def __set__(self, obj, value):
+        setattr(obj._thread_state, self.name, value)
+
 class EnhancedFishMeasurementService:
     """Professional fish measurement service for FastAPI integration"""
     
+    grid_square_size = _PerThread(settings.GRID_SQUARE_SIZE_INCHES)
+    pixels_per_inch = _PerThread(None)
+    grid_squares = _PerThread(())
+    apriltag_detected = _PerThread(False)
+    pixels_per_mm = _PerThread(None)
+    
     def __init__(self):
         """Initialize the enhanced fish measurement service"""
         self.model = None
-        self.grid_square_size = settings.GRID_SQUARE_SIZE_INCHES
-        self.pixels_per_inch = None
-        self.grid_squares = []
-        self.apriltag_detected = False
-        self.pixels_per_mm = None
+        self.model_fingerprint = ""
+        self._thread_state = threading.local()
         
         # Class names from training
         self.class_names = {
@@ -78,14 +128,23 @@ class EnhancedFishMeasurementService:
                 raise FileNotFoundError(f"Model file not found: {settings.MODEL_PATH}")
             
             self.model = YOLO(settings.MODEL_PATH)
+            # Cached results are only reused with the exact same weights
+            self.model_fingerprint = file_digest(settings.MODEL_PATH)
             logger.info(f"Model loaded successfully from {settings.MODEL_PATH}")
             
         except Exception as e:
             logger.error(f"Failed to load model: {str(e)}")
             raise Exception(f"Failed to load model: {str(e)}")
     
-    def detect_single_grid_square(self, image: np.ndarray) -> Optional[Tuple[float, List]]:
-        """Detect grid squares for calibration"""
+    def detect_single_grid_square(self, image: np.ndarray, scale: float = 1.0) -> Optional[Tuple[float, List]]:
+        """
+        Detect grid squares for calibration
+        
+        Args:
+            image: Image to calibrate
+            scale: Pixels of image per original pixel, for working copies
+                normalized at upload; size thresholds shrink with it
+        """
         logger.info("Detecting grid squares for calibration...")
         
         # Convert to different color spaces
@@ -113,7 +172,7 @@ class EnhancedFishMeasurementService:
         best_method = None
         
         for method_name, enhanced in enhanced_images:
-            squares = self._find_grid_squares_in_image(enhanced)
+            squares = self._find_grid_squares_in_image(enhanced, scale)
             if len(squares) > len(best_squares):
                 best_squares = squares
                 best_method = method_name
@@ -139,7 +198,23 @@ class EnhancedFishMeasurementService:
         self.grid_squares = best_squares
         return pixels_per_inch, best_squares
 
-    def detect_apriltag_scale(self, image: np.ndarray) -> Optional[float]:
+    def detect_apriltag_scale(
+        self,
+        image: np.ndarray,
+        search: Optional[Tuple[np.ndarray, float]] = None
+    ) -> Optional[float]:
+        """
+        Pixels per millimeter from the AprilTag in the image
+        
+        Args:
+            image: Full-resolution image
+            search: Reduced variant of image and its scale factor to image. The
+                tag is looked for there first and its corners refined on the
+                full image; the full image is only searched if that fails.
+            
+        Returns:
+            Pixels per millimeter, or None if no tag was found
+        """
         try:
             aruco = cv2.aruco if hasattr(cv2, 'aruco') else None
             if aruco is None:
@@ -155,10 +230,16 @@ class EnhancedFishMeasurementService:
             dictionary = aruco.getPredefinedDictionary(dict_id)
             parameters = aruco.DetectorParameters()
             detector = aruco.ArucoDetector(dictionary, parameters)
-            corners, ids, _ = detector.detectMarkers(image)
-            if ids is None or len(corners) == 0:
-                return None
-            c = corners[0].reshape(-1, 2)
+            c = None
+            if search is not None and search[1] > 1:
+                corners, ids, _ = detector.detectMarkers(search[0])
+                if ids is not None and len(corners) > 0:
+                    c = self._refine_corners(image, corners[0].reshape(-1, 2) * search[1], search[1])
+            if c is None:
+                corners, ids, _ = detector.detectMarkers(image)
+                if ids is None or len(corners) == 0:
+                    return None
+                c = corners[0].reshape(-1, 2)
             side_lengths = [
                 float(np.linalg.norm(c[0] - c[1])),
                 float(np.linalg.norm(c[1] - c[2])),
@@ -172,17 +253,32 @@ class EnhancedFishMeasurementService:
             logger.debug(f"AprilTag detection skipped: {e}")
             return None
     
-    def _find_grid_squares_in_image(self, enhanced_image: np.ndarray) -> List[Tuple[int, int, int, int]]:
-        """Find grid squares using contour detection"""
+    def _refine_corners(self, image: np.ndarray, corners: np.ndarray, scale: float) -> np.ndarray:
+        """Sub-pixel positions on image of corners found on a variant reduced by scale"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        window = int(math.ceil(scale)) + 2
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+        refined = cv2.cornerSubPix(
+            gray, corners.astype(np.float32).reshape(-1, 1, 2), (window, window), (-1, -1), criteria
+        )
+        return refined.reshape(-1, 2)
+    
+    def _find_grid_squares_in_image(
+        self, enhanced_image: np.ndarray, scale: float = 1.0
+    ) -> List[Tuple[int, int, int, int]]:
+        """Find grid squares using contour detection; pixel thresholds are for originals and scaled by scale"""
         squares = []
         blurred = cv2.GaussianBlur(enhanced_image, (3, 3), 0)
         threshold_values = [50, 70, 90, 110, 130]
+        min_size = 20 * scale
+        tolerance = 10 * scale
+        kernel_size = max(1, round(2 * scale))
         
         for thresh_val in threshold_values:
             _, binary = cv2.threshold(blurred, thresh_val, 255, cv2.THRESH_BINARY)
             
             # Morphological operations
-            kernel = np.ones((2,2), np.uint8)
+            kernel = np.ones((kernel_size, kernel_size), np.uint8)
             binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
             binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
             
@@ -195,7 +291,6 @@ class EnhancedFishMeasurementService:
                 if len(approx) >= 4:
                     x, y, w, h = cv2.boundingRect(contour)
                     
-                    min_size = 20
                     max_size = min(enhanced_image.shape) // 3
                     aspect_ratio = w / h if h > 0 else 0
                     
@@ -205,8 +300,8 @@ class EnhancedFishMeasurementService:
                         
                         # Check for duplicates
                         is_duplicate = any(
-                            abs(x - ex) < 10 and abs(y - ey) < 10 and
-                            abs(w - ew) < 10 and abs(h - eh) < 10
+                            abs(x - ex) < tolerance and abs(y - ey) < tolerance and
+                            abs(w - ew) < tolerance and abs(h - eh) < tolerance
                             for ex, ey, ew, eh in squares
                         )
                         
@@ -215,11 +310,21 @@ class EnhancedFishMeasurementService:
         
         return squares
     
-    def run_segmentation(self, image: np.ndarray) -> Dict:
-        """Run segmentation on the image"""
+    def run_segmentation(self, image: np.ndarray, output_size: Optional[Tuple[int, int]] = None) -> Dict:
+        """
+        Run segmentation on the image
+        
+        Args:
+            image: Model input, possibly a reduced variant of the analyzed image
+            output_size: (width, height) of the analyzed image that masks and
+                boxes are returned in; defaults to the size of image
+        """
         if not self.model:
             raise Exception("Model not loaded")
         
+        output_width, output_height = output_size or (image.shape[1], image.shape[0])
+        box_scale = np.array([output_width / image.shape[1], output_height / image.shape[0]] * 2)
+        
         results = self.model.predict(image, conf=0.25, verbose=False)
         segmentation_data = {}
         
@@ -239,13 +344,13 @@ class EnhancedFishMeasurementService:
                         segmentation_data[class_name] = []
                     
                     # Resize mask to image size
-                    mask_resized = cv2.resize(mask, (image.shape[1], image.shape[0]))
+                    mask_resized = cv2.resize(mask, (output_width, output_height))
                     mask_binary = (mask_resized > 0.5).astype(np.uint8)
                     
                     segmentation_data[class_name].append({
                         'mask': mask_binary,
                         'confidence': float(conf),
-                        'bbox': box
+                        'bbox': box * box_scale
                     })
         
         return segmentation_data
@@ -433,70 +538,118 @@ class EnhancedFishMeasurementService:
             return None
     
     async def process_image(
+        self,
+        image_path: str,
+        grid_square_size: float = 1.0,
+        include_visualizations: bool = True,
+        include_color_analysis: bool = True,
+        include_lateral_line_analysis: bool = True,
+        cancel_event: Optional[threading.Event] = None
+    ) -> FishAnalysisResult:
+        """Run analyze_image on the shared analysis executor"""
+        return await analysis_executor.run(
+            self.analyze_image,
+            image_path,
+            grid_square_size=grid_square_size,
+            include_visualizations=include_visualizations,
+            include_color_analysis=include_color_analysis,
+            include_lateral_line_analysis=include_lateral_line_analysis,
+            cancel_event=cancel_event
+        )
+    
+    def analyze_image(
         self, 
         image_path: str, 
         grid_square_size: float = 1.0,
         include_visualizations: bool = True,
         include_color_analysis: bool = True,
-        include_lateral_line_analysis: bool = True
+        include_lateral_line_analysis: bool = True,
+        cancel_event: Optional[threading.Event] = None,
+        prefetched: Optional[PrefetchedImage] = None
     ) -> FishAnalysisResult:
         """
         Process a single image for fish measurements
         
+        CPU-bound and synchronous; call it from a worker thread (see
+        process_image) rather than from the event loop.
+        
         Args:
             image_path: Path to the image file
             grid_square_size: Size of grid squares in inches
             include_visualizations: Generate visualization images
             include_color_analysis: Include color analysis
             include_lateral_line_analysis: Include lateral line analysis
+            cancel_event: Optional event checked between processing stages
+            prefetched: image_path as already loaded and decoded by prefetch_image
             
         Returns:
             Complete fish analysis result
+            
+        Raises:
+            AnalysisCancelledError: If cancel_event is set before a stage starts
         """
         analysis_id = str(uuid.uuid4())
         start_time = datetime.utcnow()
         processing_start = datetime.now()
+        data = None
         
         try:
+            _raise_if_cancelled(cancel_event, "image load")
             logger.info(f"Processing image: {image_path}")
             
-            # Load image from disk or memory store
-            image: np.ndarray
-            if image_path.startswith('mem://'):
-                blob = store.get(image_path)
-                if blob is None:
-                    raise ValueError(f"In-memory image not found: {image_path}")
-                data, _content_type = blob
-                image_array = np.frombuffer(data, dtype=np.uint8)
-                image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-                if image is None:
-                    raise ValueError(f"Could not decode in-memory image: {image_path}")
+            if prefetched is not None:
+                data, digest = prefetched.data, prefetched.digest
             else:
-                # Validate image file exists
-                image_file = Path(image_path)
-                if not image_file.exists():
-                    raise ValueError(f"Image file does not exist: {image_path}")
-                # Load and validate image
-                image = cv2.imread(image_path)
-                if image is None:
-                    raise ValueError(f"Could not load image (corrupted or invalid format): {image_path}")
-            
-            # Validate image dimensions
-            if image.shape[0] <= 0 or image.shape[1] <= 0:
-                raise ValueError(f"Invalid image dimensions: {image.shape[1]}x{image.shape[0]}")
-            
-            # Validate minimum image size
-            if image.shape[0] < 100 or image.shape[1] < 100:
-                raise ValueError(f"Image too small for analysis: {image.shape[1]}x{image.shape[0]} (minimum 100x100)")
+                # Uploads carry their content digest; anything else is hashed here
+                digest = store.digest_of(image_path) if image_path.startswith('mem://') else None
+                if digest is None:
+                    data = self._load_image_bytes(image_path)
+                    digest = content_digest(data)
+            
+            cache_key = make_result_cache_key(
+                digest, self.model_fingerprint, grid_square_size, include_visualizations,
+                include_color_analysis, include_lateral_line_analysis
+            )
+            cached = self._from_result_cache(cache_key, analysis_id, image_path, start_time, processing_start)
+            if cached is not None:
+                logger.info(f"Analysis served from result cache for {image_path}")
+                return cached
+            
+            if data is None:
+                data = self._load_image_bytes(image_path)
+            
+            # Validate format and dimensions from the header before decoding
+            try:
+                probe = prefetched.probe if prefetched is not None else probe_image(data)
+            except ImageProbeError as e:
+                raise ValueError(f"Could not load image (corrupted or invalid format): {image_path}: {str(e)}")
+            probe.check_limits(settings.MIN_IMAGE_DIMENSION, settings.MAX_IMAGE_PIXELS)
+            # Set for working copies normalized at upload; calibration and
+            # measurements share its pixels, so inches need no correction,
+            # but grid detection scales its pixel thresholds by it
+            normalization = read_normalization(probe, digest)
+            
+            # Decoded variants live for this analysis only. Calibration and
+            # measurements need the full image anyway, so it is decoded once
+            # and the coarse variants are downscaled from it
+            decoded = prefetched.decoded if prefetched is not None else DecodedImage(data, probe)
+            try:
+                image = decoded.full()
+                apriltag_search = decoded.for_long_side(settings.APRILTAG_SEARCH_LONG_SIDE)
+            except ValueError:
+                raise ValueError(f"Could not load image (corrupted or invalid format): {image_path}")
             
             logger.info(f"Successfully loaded image: {image.shape[1]}x{image.shape[0]} pixels")
             
             self.grid_square_size = grid_square_size
 
+            _raise_if_cancelled(cancel_event, "calibration")
+
             # AprilTag preferred calibration
             self.apriltag_detected = False
             self.pixels_per_mm = None
-            ppm = self.detect_apriltag_scale(image)
+            self.grid_squares = []
+            ppm = self.detect_apriltag_scale(image, search=apriltag_search)
             grid_squares = []
             if ppm and ppm > 0:
                 self.pixels_per_mm = ppm
@@ -504,17 +657,26 @@ class EnhancedFishMeasurementService:
                 self.pixels_per_inch = ppm * 25.4
             else:
                 # Fallback: grid calibration
-                calibration_result = self.detect_single_grid_square(image)
+                calibration_result = self.detect_single_grid_square(
+                    image, normalization.scale if normalization else 1.0
+                )
                 if not calibration_result:
                     raise ValueError("Calibration failed - no AprilTag or grid detected")
                 self.pixels_per_inch, grid_squares = calibration_result
             
             # Run segmentation
-            segmentation_data = self.run_segmentation(image)
+            _raise_if_cancelled(cancel_event, "segmentation")
+            # The model letterboxes its input, so it gets a reduced variant;
+            # detections come back in full-resolution coordinates
+            segmentation_input, _ = decoded.for_long_side(settings.SEGMENTATION_INPUT_LONG_SIDE)
+            segmentation_data = self.run_segmentation(
+                segmentation_input, output_size=(image.shape[1], image.shape[0])
+            )
             if not segmentation_data:
                 raise ValueError("No fish parts detected in image")
             
             # Calculate measurements
+            _raise_if_cancelled(cancel_event, "measurements")
             measurements = self.calculate_measurements(segmentation_data)
             
             # Prepare detection summary
@@ -576,34 +738,39 @@ class EnhancedFishMeasurementService:
                     processing_time_seconds=processing_time,
                     model_version="model",
                     api_version=settings.VERSION,
-                    processed_at=start_time
+                    processed_at=start_time,
+                    source_scale=normalization.scale if normalization else 1.0,
+                    source_dimensions=ImageDimensions(
+                        width=normalization.source_width,
+                        height=normalization.source_height
+                    ) if normalization else None
                 )
             )
             
             # Generate visualizations if requested
             if include_visualizations:
-                vis_paths = await self._generate_visualizations(
+                _raise_if_cancelled(cancel_event, "visualizations")
+                vis_paths = self._generate_visualizations(
                     image, segmentation_data, measurements, analysis_id
                 )
                 result.visualization_paths = vis_paths
             
+            vis_digests = {name: store.digest_of(key) for name, key in result.visualization_paths.items()}
+            if all(vis_digests.values()):
+                result_cache.put(cache_key, result.model_copy(deep=True), vis_digests)
+            
             logger.info(f"Analysis completed for {image_path} in {processing_time:.2f}s")
             return result
             
+        except AnalysisCancelledError:
+            logger.info(f"Processing cancelled for {image_path}")
+            raise
         except Exception as e:
             logger.error(f"Error processing image {image_path}: {str(e)}")
             processing_time = (datetime.now() - processing_start).total_seconds()
             
-            # Try to get image dimensions even if processing failed
-            image_width, image_height = 1, 1  # Valid minimal dimensions to pass validation
-            try:
-                if Path(image_path).exists():
-                    temp_image = cv2.imread(image_path)
-                    if temp_image is not None and temp_image.shape[0] > 0 and temp_image.shape[1] > 0:
-                        image_height, image_width = temp_image.shape[:2]
-            except Exception:
-                # If we can't get dimensions, use minimal valid values
-                pass
+            # Report image dimensions even if processing failed
+            image_width, image_height = self._probe_dimensions(image_path, data)
             
             return FishAnalysisResult(
                 analysis_id=analysis_id,
@@ -628,7 +795,103 @@ class EnhancedFishMeasurementService:
                 error_message=str(e)
             )
     
-    async def _generate_visualizations(
+    def prefetch_image(self, image_path: str) -> PrefetchedImage:
+        """
+        Load, hash and decode an image ahead of its analysis
+        
+        Meant to run on another worker thread while earlier images are in
+        inference. The variants analyze_image uses are decoded here and
+        cached on the result, so its analysis starts at calibration.
+        
+        Raises:
+            ValueError: If the image is missing, invalid or cannot be decoded;
+                analyze_image reports the same failure when run without it
+        """
+        data = self._load_image_bytes(image_path)
+        probe = probe_image(data)
+        probe.check_limits(settings.MIN_IMAGE_DIMENSION, settings.MAX_IMAGE_PIXELS)
+        decoded = DecodedImage(data, probe)
+        decoded.full()
+        decoded.for_long_side(settings.APRILTAG_SEARCH_LONG_SIDE)
+        decoded.for_long_side(settings.SEGMENTATION_INPUT_LONG_SIDE)
+        digest = store.digest_of(image_path) if image_path.startswith('mem://') else None
+        return PrefetchedImage(data=data, digest=digest or content_digest(data), probe=probe, decoded=decoded)
+    
+    def _probe_dimensions(self, image_path: str, data: Optional[bytes]) -> Tuple[int, int]:
+        """
+        Oriented (width, height) read from the image header, without decoding
+        
+        Returns:
+            Dimensions, or (1, 1) if the header is unreadable, which still
+            passes ImageDimensions validation
+        """
+        try:
+            if data is not None:
+                probe = probe_image(data, complete=False)
+            elif image_path.startswith('mem://'):
+                blob = store.get(image_path)
+                if blob is None:
+                    return 1, 1
+                probe = probe_image(blob[0], complete=False)
+            else:
+                probe = probe_image_file(image_path)
+            return probe.oriented_size
+        except (ImageProbeError, OSError):
+            return 1, 1
+    
+    def _load_image_bytes(self, image_path: str) -> bytes:
+        """Encoded image bytes from the memory store or disk"""
+        if image_path.startswith('mem://'):
+            blob = store.get(image_path)
+            if blob is None:
+                raise ValueError(f"In-memory image not found: {image_path}")
+            return bytes(blob[0])
+        
+        image_file = Path(image_path)
+        if not image_file.exists():
+            raise ValueError(f"Image file does not exist: {image_path}")
+        return image_file.read_bytes()
+    
+    def _from_result_cache(
+        self,
+        cache_key: tuple,
+        analysis_id: str,
+        image_path: str,
+        start_time: datetime,
+        processing_start: datetime
+    ) -> Optional[FishAnalysisResult]:
+        """
+        Re-issue a cached analysis of the same image under a new analysis_id
+        
+        Visualizations are linked to the new id without copying their bytes.
+        Returns None on a miss, or if a cached visualization has since
+        expired from the store.
+        """
+        entry = result_cache.get(cache_key)
+        if entry is None:
+            return None
+        cached, vis_digests = entry
+        
+        vis_paths: Dict[str, str] = {}
+        for name, digest in vis_digests.items():
+            key = make_mem_vis_key(analysis_id, name)
+            if not store.link(key, digest, ttl_seconds=settings.MEMORY_TTL_SECONDS):
+                result_cache.discard(cache_key)
+                return None
+            vis_paths[name] = key
+        
+        metadata = cached.processing_metadata.model_copy(update={
+            "processing_time_seconds": (datetime.now() - processing_start).total_seconds(),
+            "processed_at": start_time
+        })
+        return cached.model_copy(deep=True, update={
+            "analysis_id": analysis_id,
+            "image_path": image_path,
+            "visualization_paths": vis_paths,
+            "processing_metadata": metadata
+        })
+    
+    def _generate_visualizations(
         self, 
         image: np.ndarray, 
         segmentation_data: Dict, 
@@ -643,7 +906,7 @@ class EnhancedFishMeasurementService:
             ok1, buf1 = cv2.imencode('.jpg', detailed_vis, [int(cv2.IMWRITE_JPEG_QUALITY), 90])
             if ok1:
                 key1 = make_mem_vis_key(analysis_id, 'detailed')
-                store.put(key1, buf1.tobytes(), content_type='image/jpeg', ttl_seconds=settings.MEMORY_TTL_SECONDS)
+                store.put_content(key1, buf1.tobytes(), content_type='image/jpeg', ttl_seconds=settings.MEMORY_TTL_SECONDS)
                 vis_paths['detailed'] = key1
             
             # Create measurements-only visualization
@@ -651,7 +914,7 @@ class EnhancedFishMeasurementService:
             ok2, buf2 = cv2.imencode('.jpg', clean_vis, [int(cv2.IMWRITE_JPEG_QUALITY), 90])
             if ok2:
                 key2 = make_mem_vis_key(analysis_id, 'measurements')
-                store.put(key2, buf2.tobytes(), content_type='image/jpeg', ttl_seconds=settings.MEMORY_TTL_SECONDS)
+                store.put_content(key2, buf2.tobytes(), content_type='image/jpeg', ttl_seconds=settings.MEMORY_TTL_SECONDS)
                 vis_paths['measurements'] = key2
             
             return vis_paths
@@ -0,0 +1,124 @@
+"""
+Per-analysis image decoding with reduced-resolution variants.
+
+Not every stage of an analysis needs every pixel: the model letterboxes its
+input to a fixed size and coarse searches only need enough detail to find
+their target. DecodedImage holds the encoded bytes of one image and hands
+out decoded variants at 1/1, 1/2, 1/4 or 1/8 scale, each decoded at most once
+for the lifetime of the analysis. JPEGs are decoded straight to the reduced
+size with IMREAD_REDUCED_COLOR_*, which scales in the DCT domain and skips
+most of the work of a full decode; other formats, or a JPEG whose full
+resolution is already decoded, are downscaled from the full image. A caller
+that needs the full image as well should decode it first, so the image is
+decoded once and each variant costs only a resize.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from app.utils.image_probe import ImageProbe, probe_image
+
+REDUCTION_FACTORS = (1, 2, 4, 8)
+
+_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class DecodedImage:
+    """Lazily decoded variants of one encoded image, cached by reduction factor."""
+
+    def __init__(self, data: Union[bytes, memoryview], probe: Optional[ImageProbe] = None) -> None:
+        """
+        Args:
+            data: Encoded image
+            probe: Header probe of data, if the caller already has it
+
+        Raises:
+            ImageProbeError: If data is not a supported image
+        """
+        self._data = data
+        self.probe = probe or probe_image(data)
+        self._variants: Dict[int, np.ndarray] = {}
+        self.decodes = 0
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height) of the full-resolution image as decoded"""
+        return self.probe.oriented_size
+
+    def full(self) -> np.ndarray:
+        """
+        The full-resolution image
+
+        Raises:
+            ValueError: If the image cannot be decoded
+        """
+        return self.reduced(1)
+
+    def reduced(self, factor: int) -> np.ndarray:
+        """
+        The image downscaled by factor (1, 2, 4 or 8)
+
+        Raises:
+            ValueError: If the image cannot be decoded
+        """
+        if factor not in REDUCTION_FACTORS:
+            raise ValueError(f"Unsupported reduction factor: {factor}")
+        image = self._variants.get(factor)
+        if image is not None:
+            return image
+
+        full = self._variants.get(1)
+        if factor == 1 or (full is None and self.probe.format != "jpeg"):
+            full = full if full is not None else self._decode(cv2.IMREAD_COLOR)
+            self._variants[1] = full
+        if factor == 1:
+            return full
+        if full is not None:
+            height, width = full.shape[:2]
+            image = cv2.resize(
+                full,
+                (-(-width // factor), -(-height // factor)),
+                interpolation=cv2.INTER_AREA
+            )
+        else:
+            image = self._decode(_REDUCED_FLAGS[factor])
+        self._variants[factor] = image
+        return image
+
+    def for_long_side(self, min_long_side: int) -> Tuple[np.ndarray, float]:
+        """
+        The smallest variant whose long side is still at least min_long_side
+
+        Args:
+            min_long_side: Required long side in pixels; 0 or less selects the full image
+
+        Returns:
+            (image, scale), where scale maps variant pixel coordinates to full-resolution ones
+        """
+        factor = 1
+        if min_long_side > 0:
+            long_side = max(self.size)
+            for candidate in REDUCTION_FACTORS:
+                if long_side / candidate >= min_long_side:
+                    factor = candidate
+        image = self.reduced(factor)
+        return image, self.size[0] / image.shape[1]
+
+    def release(self) -> None:
+        """Drop all decoded variants"""
+        self._variants.clear()
+
+    def _decode(self, flags: int) -> np.ndarray:
+        image = cv2.imdecode(np.frombuffer(self._data, dtype=np.uint8), flags)
+        if image is None or image.size == 0:
+            raise ValueError("Could not decode image (corrupted or invalid format)")
+        self.decodes += 1
+        return image
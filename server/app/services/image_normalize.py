@@ -0,0 +1,130 @@
+"""
+Normalized-resolution working copies of uploaded images.
+
+Camera originals carry far more pixels than segmentation or the
+visualizations use. With UPLOAD_NORMALIZE_LONG_SIDE set, uploads larger than
+that are downscaled once at ingest (aspect ratio preserved, orientation
+applied) and stored as a JPEG working copy, which every later stage decodes
+instead of the original.
+
+The copy notes its scale factor and source size in a JPEG comment for anyone
+reading the file, but a comment is something any client can write, so the
+factor is only trusted for copies recorded by content digest at ingest
+(record_normalization). Measurements stay correct in physical units without
+using that factor: calibration runs on the same pixels as the measurements.
+The factor is reported so pixel quantities can be mapped back to the
+original.
+"""
+
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass
+from typing import Optional, Tuple, Union
+
+import cv2
+
+from app.services.image_decode import DecodedImage
+from app.services.result_db import result_db
+from app.utils.image_probe import ImageProbe, probe_image
+
+_COMMENT_PREFIX = "octapulse-normalized:"
+
+
+@dataclass(frozen=True)
+class Normalization:
+    """How a working copy was derived from its original"""
+    # Working-copy pixels per original pixel
+    scale: float
+    source_width: int
+    source_height: int
+
+
+@dataclass(frozen=True)
+class NormalizedImage:
+    data: bytes
+    probe: ImageProbe
+    normalization: Normalization
+
+
+def record_normalization(digest: str, normalization: Normalization) -> None:
+    """Record the working copy with content digest as written by this server"""
+    result_db.record_normalization(
+        digest, normalization.scale, normalization.source_width, normalization.source_height
+    )
+
+
+def read_normalization(probe: ImageProbe, digest: str) -> Optional[Normalization]:
+    """
+    How a probed image was normalized, or None for originals
+
+    Only copies recorded by record_normalization count; a client upload
+    carrying the same comment is treated as an original.
+
+    Args:
+        probe: Header probe of the image
+        digest: content_digest() of the image
+    """
+    if not probe.comment or not probe.comment.startswith(_COMMENT_PREFIX):
+        return None
+    recorded = result_db.normalization_of(digest)
+    if recorded is None:
+        return None
+    scale, source_width, source_height = recorded
+    return Normalization(scale=scale, source_width=source_width, source_height=source_height)
+
+
+def normalize_image(
+    data: Union[bytes, memoryview],
+    probe: ImageProbe,
+    long_side: int,
+    quality: int = 92
+) -> Optional[NormalizedImage]:
+    """
+    Downscale an image so its long side is long_side pixels
+
+    Args:
+        data: Encoded original
+        probe: Header probe of data
+        long_side: Target long side; 0 or less disables normalization
+        quality: JPEG quality of the working copy
+
+    Returns:
+        The working copy, or None if the image is already small enough
+
+    Raises:
+        ValueError: If the image cannot be decoded or encoded
+    """
+    source_width, source_height = probe.oriented_size
+    if long_side <= 0 or max(source_width, source_height) <= long_side:
+        return None
+
+    # Start from the smallest reduced decode that still covers the target
+    decoded = DecodedImage(data, probe)
+    image, _ = decoded.for_long_side(long_side)
+    ratio = long_side / max(source_width, source_height)
+    size = (max(1, round(source_width * ratio)), max(1, round(source_height * ratio)))
+    image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    decoded.release()
+
+    ok, encoded = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    if not ok:
+        raise ValueError("Could not encode normalized image")
+    normalization = Normalization(
+        scale=size[0] / source_width,
+        source_width=source_width,
+        source_height=source_height,
+    )
+    comment = f"{_COMMENT_PREFIX}scale={normalization.scale:.8f};source={source_width}x{source_height}"
+    out = _insert_jpeg_comment(encoded.tobytes(), comment)
+    return NormalizedImage(data=out, probe=probe_image(out), normalization=normalization)
+
+
+def _insert_jpeg_comment(jpeg: bytes, comment: str) -> bytes:
+    """Add a COM segment after SOI, and after the JFIF APP0 segment if there is one"""
+    pos = 2
+    if jpeg[2:4] == b"\xff\xe0":
+        (length,) = struct.unpack_from(">H", jpeg, 4)
+        pos = 4 + length
+    payload = comment.encode("latin-1")
+    return jpeg[:pos] + b"\xff\xfe" + struct.pack(">H", len(payload) + 2) + payload + jpeg[pos:]
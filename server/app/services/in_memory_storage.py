@@ -3,14 +3,60 @@ Simple in-memory storage for transient binary blobs (images, visualizations).
 
 This module provides a process-local, thread-safe store with optional TTL-based
 expiry. It is intended for development/local use and not for production.
+
+Keys are spread over MEMORY_STORAGE_SHARDS shards by hash, each with its own
+lock, LRU order, pins and expiry heap, so upload handlers, analysis workers and
+visualization reads only contend when they touch the same shard.
+
+Keys of the form scheme://namespace/name (mem://{batch_id}/..., memvis://{analysis_id}/...)
+are also indexed by their scheme://namespace part, so batch- or
+analysis-scoped listing, pinning and deletion cost O(k) in the keys involved
+instead of scanning the whole store.
+
+Expiry is tracked in a min-heap of deadlines, so put/get stay O(log n) however
+large the store grows: a few expired entries are reaped on each put and an
+optional background reaper thread drains the rest.
+
+The store is bounded by MEMORY_STORAGE_MAX_SIZE_MB and
+MEMORY_STORAGE_MAX_OBJECTS for all shards together. When a put would exceed
+them, the least recently used unpinned entries of the whole store are
+evicted, taking one shard lock at a time, so a shard full of pinned images
+borrows room from the rest instead of failing. Entries pinned
+by running analyses are never evicted or expired. The reference records
+content_store writes next to each blob count against the byte limit only, so
+MEMORY_STORAGE_MAX_OBJECTS bounds the images actually held.
+
+With MEMORY_SPILL_ENABLED, evicted entries, objects larger than the store and
+puts that only pinned data blocks go to the disk spill tier (see
+spill_store) instead of being dropped or rejected; get() then returns a
+memoryview over the mapped segment rather than bytes. Evicted entries are
+detached under the shard lock and written to disk after it is released;
+until then reads are served from the detached entry, and writes, deletes and
+namespace listings of those keys wait for the write. Without it, a put that
+only pinned data blocks is rejected with StorageFullError.
 """
 
 from __future__ import annotations
 
+import heapq
+import itertools
+import logging
 import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from app.core.config import settings
+from app.services.content_store import REF_CONTENT_TYPE
+from app.services.spill_store import SpillStore, namespace_of
+
+logger = logging.getLogger(__name__)
+
+
+class StorageFullError(Exception):
+    """Raised when a put cannot fit without evicting pinned entries."""
 
 
 @dataclass
@@ -18,80 +64,560 @@ class _Entry:
     data: bytes
     content_type: Optional[str]
     expires_at: Optional[float]  # epoch seconds
+    seq: int = 0  # identifies the heap item that tracks this entry's deadline
+    used: int = 0  # store-wide tick of the last put or get, for LRU across shards
+    objects: int = 1  # 0 for reference records, which only count their bytes
+
+
+class _Budget:
+    """Byte and object limits shared by every shard of a store."""
+
+    def __init__(self, max_bytes: int, max_objects: int) -> None:
+        # Taken only inside a shard lock, never the other way round
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.max_objects = max_objects
+        self.bytes = 0
+        self.objects = 0
+        self._ticks = itertools.count(1)
+
+    def tick(self) -> int:
+        return next(self._ticks)
+
+    def has_room(self, size: int, objects: int = 1) -> bool:
+        with self.lock:
+            return self.bytes + size <= self.max_bytes and self.objects + objects <= self.max_objects
+
+    def reserve(self, size: int, objects: int = 1) -> bool:
+        with self.lock:
+            if self.bytes + size > self.max_bytes or self.objects + objects > self.max_objects:
+                return False
+            self.bytes += size
+            self.objects += objects
+            return True
+
+    def release(self, size: int, objects: int = 1) -> None:
+        with self.lock:
+            self.bytes -= size
+            self.objects -= objects
+
+
+def _objects_of(content_type: Optional[str]) -> int:
+    return 0 if content_type == REF_CONTENT_TYPE else 1
+
+
+class _Shard:
+    """One lock-protected partition of the store with its own LRU order."""
+
+    # Expired entries reaped inline by each put
+    _REAP_BATCH = 16
+
+    def __init__(self, budget: _Budget, spill: Optional[SpillStore] = None) -> None:
+        self.lock = threading.Lock()
+        self.budget = budget
+        self.spill = spill
+        # Ordered from least to most recently used
+        self.data: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.pins: Dict[str, int] = {}
+        # scheme://namespace -> keys of this shard in that namespace
+        self.namespaces: Dict[str, Set[str]] = {}
+        self.evictions: int = 0
+        self.evicted_bytes: int = 0
+        self.expirations: int = 0
+        # (expires_at, seq, key); items whose seq no longer matches the live
+        # entry are stale and skipped when popped
+        self.expiry_heap: List[Tuple[float, int, str]] = []
+        # Evicted entries still being written to the spill tier, outside the lock
+        self.spilling: Dict[str, _Entry] = {}
+        self.spilled = threading.Condition(self.lock)
+        self._seq = itertools.count(1)
+
+    def put(self, key: str, data: bytes, content_type: Optional[str], expires_at: Optional[float]) -> bool:
+        """Store data; False (with any older value of key removed) if the store has no room for it."""
+        size = len(data)
+        objects = _objects_of(content_type)
+        with self.lock:
+            self._remove(key)
+            self._reap(time.time(), self._REAP_BATCH)
+            if not self.budget.reserve(size, objects):
+                return False
+            entry = _Entry(
+                data=data, content_type=content_type, expires_at=expires_at,
+                seq=next(self._seq), used=self.budget.tick(), objects=objects
+            )
+            self.data[key] = entry
+            namespace = namespace_of(key)
+            if namespace is not None:
+                self.namespaces.setdefault(namespace, set()).add(key)
+            if expires_at is not None:
+                heapq.heappush(self.expiry_heap, (expires_at, entry.seq, key))
+            return True
+
+    def oldest(self) -> Optional[int]:
+        """Last-use tick of this shard's least recently used unpinned entry"""
+        with self.lock:
+            for key, entry in self.data.items():
+                if key not in self.pins:
+                    return entry.used
+            return None
+
+    def evict(self, size: int, objects: int = 1, older_than: Optional[int] = None) -> int:
+        """
+        Evict unpinned entries, least recently used first, until size bytes
+        and objects fit the store or the next entry was used at or after
+        older_than; returns how many were evicted.
+
+        With a spill tier the victims are detached under the lock and
+        written to disk after releasing it.
+        """
+        with self.lock:
+            with self.budget.lock:
+                excess_bytes = self.budget.bytes + size - self.budget.max_bytes
+                excess_objects = self.budget.objects + objects - self.budget.max_objects
+            victims = []
+            for key, entry in self.data.items():
+                if excess_bytes <= 0 and excess_objects <= 0:
+                    break
+                if older_than is not None and entry.used >= older_than:
+                    break
+                if key in self.pins:
+                    continue
+                victims.append(key)
+                excess_bytes -= len(entry.data)
+                excess_objects -= entry.objects
+            detached = []
+            for key in victims:
+                entry = self.data[key]
+                self.evicted_bytes += len(entry.data)
+                self.evictions += 1
+                self._remove(key)
+                if self.spill is not None:
+                    self.spilling[key] = entry
+                    detached.append((key, entry))
+        try:
+            for key, entry in detached:
+                try:
+                    self.spill.put(key, entry.data, entry.content_type, entry.expires_at)
+                except OSError as e:
+                    logger.error(f"Failed to spill {key}, dropping it: {str(e)}")
+                with self.lock:
+                    del self.spilling[key]
+                    self.spilled.notify_all()
+        finally:
+            with self.lock:
+                # Release the rest if a write failed unexpectedly
+                for key, entry in detached:
+                    if self.spilling.get(key) is entry:
+                        del self.spilling[key]
+                self.spilled.notify_all()
+        return len(victims)
+
+    def settle(self, key: str) -> None:
+        """Wait until key is no longer being written to the spill tier."""
+        with self.lock:
+            self._settle(lambda k: k == key)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        with self.lock:
+            entry = self._live(key)
+            if entry is None:
+                entry = self.spilling.get(key)
+                return (entry.data, entry.content_type) if entry is not None else None
+            self.data.move_to_end(key)
+            entry.used = self.budget.tick()
+            return entry.data, entry.content_type
+
+    def exists(self, key: str) -> bool:
+        with self.lock:
+            return self._live(key) is not None or key in self.spilling
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self._settle(lambda k: k == key)
+            self._remove(key)
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self.lock:
+            self._settle(lambda k: k.startswith(prefix))
+            namespace = namespace_of(prefix)
+            if namespace is not None:
+                candidates = self.namespaces.get(namespace, ())
+            else:
+                candidates = self.data.keys()
+            keys = [k for k in candidates if k.startswith(prefix)]
+            for k in keys:
+                self._remove(k)
+            return len(keys)
+
+    def list_namespace(self, namespace: str) -> List[str]:
+        with self.lock:
+            self._settle(lambda k: namespace_of(k) == namespace)
+            return [k for k in list(self.namespaces.get(namespace, ())) if self._live(k) is not None]
+
+    def pin_namespace(self, namespace: str) -> List[str]:
+        with self.lock:
+            self._settle(lambda k: namespace_of(k) == namespace)
+            keys = [k for k in list(self.namespaces.get(namespace, ())) if self._live(k) is not None]
+            for k in keys:
+                self.pins[k] = self.pins.get(k, 0) + 1
+            return keys
+
+    def delete_namespace(self, namespace: str) -> int:
+        with self.lock:
+            self._settle(lambda k: namespace_of(k) == namespace)
+            keys = list(self.namespaces.get(namespace, ()))
+            for k in keys:
+                self._remove(k)
+            return len(keys)
+
+    def pin(self, key: str) -> None:
+        with self.lock:
+            self.pins[key] = self.pins.get(key, 0) + 1
+
+    def unpin(self, key: str) -> None:
+        with self.lock:
+            count = self.pins.get(key, 0) - 1
+            if count > 0:
+                self.pins[key] = count
+                return
+            self.pins.pop(key, None)
+            entry = self.data.get(key)
+            if entry is not None and entry.expires_at is not None:
+                # Its deadline may have been skipped while pinned; track it again
+                heapq.heappush(self.expiry_heap, (entry.expires_at, entry.seq, key))
+
+    def touch(self, key: str, expires_at: Optional[float]) -> bool:
+        with self.lock:
+            entry = self._live(key)
+            if entry is None:
+                return False
+            self.data.move_to_end(key)
+            entry.used = self.budget.tick()
+            entry.expires_at = expires_at
+            entry.seq = next(self._seq)
+            if expires_at is not None:
+                heapq.heappush(self.expiry_heap, (expires_at, entry.seq, key))
+            return True
+
+    def reap_expired(self, batch_size: int) -> int:
+        """Drain expired entries in small locked batches; returns entries removed."""
+        removed_before = self.expirations
+        while True:
+            with self.lock:
+                if self._reap(time.time(), batch_size) < batch_size:
+                    # Drop stale heap items once they dominate the heap
+                    if len(self.expiry_heap) > 2 * len(self.data) + 1024:
+                        self.expiry_heap = [
+                            (e.expires_at, e.seq, k) for k, e in self.data.items()
+                            if e.expires_at is not None
+                        ]
+                        heapq.heapify(self.expiry_heap)
+                    return self.expirations - removed_before
+
+    def _settle(self, match: Callable[[str], bool]) -> None:
+        """With the lock held, wait until no key matching match is being spilled."""
+        while any(match(k) for k in self.spilling):
+            self.spilled.wait()
+
+    def _live(self, key: str) -> Optional[_Entry]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at < time.time() and key not in self.pins:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _remove(self, key: str) -> None:
+        entry = self.data.pop(key, None)
+        if entry is None:
+            return
+        self.budget.release(len(entry.data), entry.objects)
+        namespace = namespace_of(key)
+        if namespace is not None:
+            keys = self.namespaces.get(namespace)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.namespaces[namespace]
+
+    def _reap(self, now: float, limit: int) -> int:
+        """Remove up to limit expired entries; returns how many heap items were consumed."""
+        heap = self.expiry_heap
+        consumed = 0
+        while heap and consumed < limit and heap[0][0] < now:
+            _expires_at, seq, key = heapq.heappop(heap)
+            consumed += 1
+            entry = self.data.get(key)
+            if entry is None or entry.seq != seq or key in self.pins:
+                # Overwritten, deleted or pinned; unpin() re-arms pinned deadlines
+                continue
+            self._remove(key)
+            self.expirations += 1
+        return consumed
 
 
 class InMemoryStorage:
     """A singleton in-memory key-value store for binary data with TTL support."""
 
+    shared = False
     _instance: "InMemoryStorage" | None = None
-    _lock = threading.RLock()
+    _lock = threading.Lock()
 
-    def __init__(self) -> None:
-        self._data: Dict[str, _Entry] = {}
-        self._gc_interval_seconds: int = 60
-        self._last_gc: float = 0.0
+    def __init__(
+        self,
+        max_bytes: int,
+        max_objects: int,
+        shards: int = 1,
+        spill: Optional[SpillStore] = None
+    ) -> None:
+        shards = max(1, shards)
+        self._max_bytes = max_bytes
+        self._max_objects = max_objects
+        self._spill = spill
+        self._budget = _Budget(max_bytes, max_objects)
+        self._shards = [_Shard(self._budget, spill) for _ in range(max(1, shards))]
+        self._rejected_puts = 0
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
 
     @classmethod
     def instance(cls) -> "InMemoryStorage":
         with cls._lock:
             if cls._instance is None:
-                cls._instance = InMemoryStorage()
+                spill = None
+                if settings.MEMORY_SPILL_ENABLED:
+                    spill = SpillStore(
+                        settings.MEMORY_SPILL_DIR,
+                        max_bytes=settings.MEMORY_SPILL_MAX_SIZE_MB * 1024 * 1024,
+                        segment_bytes=settings.MEMORY_SPILL_SEGMENT_SIZE_MB * 1024 * 1024,
+                    )
+                cls._instance = InMemoryStorage(
+                    max_bytes=settings.MEMORY_STORAGE_MAX_SIZE_MB * 1024 * 1024,
+                    max_objects=settings.MEMORY_STORAGE_MAX_OBJECTS,
+                    shards=settings.MEMORY_STORAGE_SHARDS,
+                    spill=spill,
+                )
             return cls._instance
 
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
     def put(self, key: str, data: bytes, content_type: Optional[str] = None, ttl_seconds: Optional[int] = None) -> None:
+        """
+        Store data under key, evicting (or spilling) least recently used entries if needed.
+
+        Raises:
+            StorageFullError: If the entry cannot fit without evicting pinned
+                data and no spill tier is configured
+            OSError: If the entry had to be spilled and the write failed
+        """
         expires_at = time.time() + ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
-        with self._lock:
-            self._data[key] = _Entry(data=data, content_type=content_type, expires_at=expires_at)
-            self._maybe_gc()
+        shard = self._shard(key)
+        if self._spill is not None:
+            # Drop any older spilled copy so reads see this value
+            shard.settle(key)
+            self._spill.delete(key)
+        if len(data) <= self._max_bytes:
+            while True:
+                if shard.put(key, data, content_type, expires_at):
+                    return
+                if not self._make_room(len(data), _objects_of(content_type)):
+                    break
+        else:
+            shard.delete(key)
+        if self._spill is not None:
+            self._spill.put(key, data, content_type, expires_at)
+            return
+        with self._budget.lock:
+            self._rejected_puts += 1
+        if len(data) > self._max_bytes:
+            raise StorageFullError(f"Object of {len(data)} bytes exceeds the store limit of {self._max_bytes} bytes")
+        raise StorageFullError("Memory store is full of pinned objects")
 
-    def get(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
-        with self._lock:
-            entry = self._data.get(key)
-            if entry is None:
-                return None
-            if entry.expires_at is not None and entry.expires_at < time.time():
-                # expired
-                del self._data[key]
-                return None
-            return entry.data, entry.content_type
+    def _make_room(self, size: int, objects: int) -> bool:
+        """
+        Evict the least recently used unpinned entries of the whole store until size and objects fit
+
+        Each round evicts from the shard holding the oldest entry, down to the
+        next shard's oldest, so only one shard lock is held at a time.
+
+        Returns:
+            False if only pinned entries are left
+        """
+        while not self._budget.has_room(size, objects):
+            heads = sorted(
+                (used, index) for index, used in
+                ((index, shard.oldest()) for index, shard in enumerate(self._shards))
+                if used is not None
+            )
+            if not heads:
+                return False
+            older_than = heads[1][0] + 1 if len(heads) > 1 else None
+            self._shards[heads[0][1]].evict(size, objects, older_than)
+        return True
+
+    def get(self, key: str) -> Optional[Tuple[Union[bytes, memoryview], Optional[str]]]:
+        """Return (data, content_type); data is a memoryview when served from the spill tier."""
+        blob = self._shard(key).get(key)
+        if blob is None and self._spill is not None:
+            return self._spill.get(key)
+        return blob
+
+    def touch(self, key: str, content_type: Optional[str] = None, ttl_seconds: Optional[int] = None) -> bool:
+        """
+        Restart key's TTL and mark it recently used without rewriting it.
+
+        Returns:
+            False if key is not held in memory (spilled entries cannot be
+            touched in place; put them again)
+        """
+        expires_at = time.time() + ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        return self._shard(key).touch(key, expires_at)
 
     def delete(self, key: str) -> None:
-        with self._lock:
-            if key in self._data:
-                del self._data[key]
+        self._shard(key).delete(key)
+        if self._spill is not None:
+            self._spill.delete(key)
 
     def delete_prefix(self, prefix: str) -> int:
-        with self._lock:
-            keys = [k for k in self._data.keys() if k.startswith(prefix)]
-            for k in keys:
-                del self._data[k]
-            return len(keys)
+        """Delete keys starting with prefix; uses the namespace index when prefix names one."""
+        removed = sum(shard.delete_prefix(prefix) for shard in self._shards)
+        if self._spill is not None:
+            removed += self._spill.delete_prefix(prefix)
+        return removed
+
+    def list_namespace(self, namespace: str) -> List[str]:
+        """Live keys under scheme://namespace (e.g. mem://{batch_id}), sorted."""
+        keys: Set[str] = set()
+        for shard in self._shards:
+            keys.update(shard.list_namespace(namespace))
+        if self._spill is not None:
+            keys.update(self._spill.list_namespace(namespace))
+        return sorted(keys)
+
+    def pin_namespace(self, namespace: str) -> List[str]:
+        """
+        Pin every live key under namespace and return them, sorted.
+
+        Listing and pinning happen under each shard's lock, so none of the
+        returned keys can expire or be evicted before the matching unpin().
+        """
+        keys: List[str] = []
+        for shard in self._shards:
+            keys.extend(shard.pin_namespace(namespace))
+        if self._spill is not None:
+            # Pins are mirrored in both tiers so a key stays protected as it moves
+            in_memory = set(keys)
+            for key in keys:
+                self._spill.pin(key)
+            for key in self._spill.list_namespace(namespace):
+                if key not in in_memory:
+                    self.pin(key)
+                    keys.append(key)
+        return sorted(keys)
+
+    def delete_namespace(self, namespace: str) -> int:
+        """Delete every key under namespace; returns the number removed."""
+        removed = sum(shard.delete_namespace(namespace) for shard in self._shards)
+        if self._spill is not None:
+            removed += self._spill.delete_namespace(namespace)
+        return removed
 
     def exists(self, key: str) -> bool:
-        with self._lock:
-            entry = self._data.get(key)
-            if entry is None:
-                return False
-            if entry.expires_at is not None and entry.expires_at < time.time():
-                del self._data[key]
-                return False
+        if self._shard(key).exists(key):
             return True
+        return self._spill is not None and self._spill.exists(key)
 
-    def _maybe_gc(self) -> None:
-        now = time.time()
-        if now - self._last_gc < self._gc_interval_seconds:
-            return
-        expired = []
-        for key, entry in list(self._data.items()):
-            if entry.expires_at is not None and entry.expires_at < now:
-                expired.append(key)
-        for key in expired:
-            del self._data[key]
-        self._last_gc = now
+    def pin(self, key: str) -> None:
+        """Protect key from eviction and expiry until a matching unpin()."""
+        self._shard(key).pin(key)
+        if self._spill is not None:
+            self._spill.pin(key)
+
+    def unpin(self, key: str) -> None:
+        self._shard(key).unpin(key)
+        if self._spill is not None:
+            self._spill.unpin(key)
+
+    @contextmanager
+    def pinned(self, keys: Iterable[str]) -> Iterator[None]:
+        keys = list(keys)
+        for key in keys:
+            self.pin(key)
+        try:
+            yield
+        finally:
+            for key in keys:
+                self.unpin(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy against the configured limits plus eviction counters."""
+        totals = {"pinned": 0, "evictions": 0, "evicted_bytes": 0, "expirations": 0}
+        for shard in self._shards:
+            with shard.lock:
+                totals["pinned"] += len(shard.pins)
+                totals["evictions"] += shard.evictions
+                totals["evicted_bytes"] += shard.evicted_bytes
+                totals["expirations"] += shard.expirations
+        with self._budget.lock:
+            totals.update(objects=self._budget.objects, bytes=self._budget.bytes, rejected_puts=self._rejected_puts)
+        totals.update(
+            max_objects=self._max_objects,
+            max_bytes=self._max_bytes,
+            shards=len(self._shards),
+        )
+        if self._spill is not None:
+            totals["spill"] = self._spill.stats()
+        return totals
+
+    def prefetch(self, keys: Iterable[str]) -> None:
+        """Nothing to warm: every key is already local."""
+
+    def near_capacity(self, fraction: float, pending_bytes: int = 0) -> bool:
+        """
+        Whether occupancy is at or above fraction of the hard limits.
+
+        With a spill tier, memory overflows to disk, so only the spill
+        budget counts. pending_bytes, bound for the store but not in it
+        yet, count as stored.
+        """
+        stats = self.stats()
+        spill = stats.get("spill")
+        if spill is not None:
+            return spill["bytes"] + pending_bytes >= spill["max_bytes"] * fraction
+        return (stats["bytes"] + pending_bytes >= self._max_bytes * fraction
+                or stats["objects"] >= self._max_objects * fraction)
+
+    def reap_expired(self, batch_size: int = 256) -> int:
+        """Remove every expired entry, one shard at a time; returns entries removed."""
+        return sum(shard.reap_expired(batch_size) for shard in self._shards)
+
+    def start_reaper(self, interval_seconds: float = 5.0) -> None:
+        """Start a daemon thread that periodically removes expired entries."""
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper_stop.clear()
+            self._reaper = threading.Thread(
+                target=self._reaper_loop, args=(interval_seconds,),
+                name="memory-store-reaper", daemon=True
+            )
+            self._reaper.start()
+
+    def stop_reaper(self) -> None:
+        self._reaper_stop.set()
+
+    def _reaper_loop(self, interval_seconds: float) -> None:
+        while not self._reaper_stop.wait(interval_seconds):
+            try:
+                self.reap_expired()
+            except Exception as e:  # pragma: no cover - keep the reaper alive
+                logger.error(f"Memory store reaper failed: {str(e)}")
 
 
 # Convenience functions
-store = InMemoryStorage.instance()
 
 def make_mem_image_key(batch_id: str, filename: str) -> str:
     return f"mem://{batch_id}/{filename}"
@@ -99,4 +625,10 @@ def make_mem_image_key(batch_id: str, filename: str) -> str:
 def make_mem_vis_key(analysis_id: str, viz_type: str) -> str:
     return f"memvis://{analysis_id}/{viz_type}.jpg"
 
+def mem_image_namespace(batch_id: str) -> str:
+    return f"mem://{batch_id}"
+
+def mem_vis_namespace(analysis_id: str) -> str:
+    return f"memvis://{analysis_id}"
+
 
@@ -0,0 +1,97 @@
+"""
+Analysis result cache keyed by image content.
+
+A finished analysis is remembered under (image digest, grid size, analysis
+options, calibration settings, model fingerprint), together with the content
+digests of its visualizations. Re-analysing the same photo with the same
+options and model then returns a copy of the stored result without decoding
+the image or running the model.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.models.fish_analysis import FishAnalysisResult
+
+CacheKey = Tuple[Any, ...]
+
+
+def make_result_cache_key(
+    digest: str,
+    model_fingerprint: str,
+    grid_square_size: float,
+    include_visualizations: bool,
+    include_color_analysis: bool,
+    include_lateral_line_analysis: bool
+) -> CacheKey:
+    """Everything that can change an analysis result for a given image."""
+    return (
+        digest,
+        model_fingerprint,
+        float(grid_square_size),
+        include_visualizations,
+        include_color_analysis,
+        include_lateral_line_analysis,
+        settings.APRILTAG_SIZE_MM,
+        settings.APRILTAG_FAMILY,
+    )
+
+
+class ResultCache:
+    """Bounded LRU of completed analysis results."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, Tuple[FishAnalysisResult, Dict[str, str]]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: CacheKey) -> Optional[Tuple[FishAnalysisResult, Dict[str, str]]]:
+        """
+        Look up a cached result.
+
+        Returns:
+            (result, visualization digests by name), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key: CacheKey, result: FishAnalysisResult, vis_digests: Dict[str, str]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (result, dict(vis_digests))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: CacheKey) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+result_cache = ResultCache(settings.RESULT_CACHE_MAX_ENTRIES)
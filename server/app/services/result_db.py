@@ -0,0 +1,719 @@
+"""
+Persistent, indexed store for analysis results and batch status.
+
+Every published FishAnalysisResult is written to SQLite (WAL mode, so other
+worker processes can read while one writes) as a JSON document next to
+indexed columns for batch, status, processing time and each measurement.
+Results can then be looked up by analysis_id, batch, status, time range or
+measurement value without keeping finished batches in memory, and they
+survive restarts.
+
+Old finished batches are compacted by moving their JSON documents into a
+gzip-compressed NDJSON archive file and blanking the payload column; the
+indexed columns stay, so queries still see the rows. Reading an archived
+result of one batch transparently rehydrates that batch from the archive;
+queries across batches read the archived documents they need straight from
+the archive files and leave the batches archived.
+
+Saved batch status records the process that wrote it (see process_owner), so
+a reader in another worker can tell a batch that is still running elsewhere
+from one whose process died before finishing it.
+
+Resumable upload sessions are kept here too, so any worker can continue an
+upload another one started, including after a restart.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.models.fish_analysis import AnalysisStatus, FishAnalysisResult
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    analysis_id TEXT PRIMARY KEY,
+    batch_id TEXT,
+    status TEXT NOT NULL,
+    image_path TEXT NOT NULL,
+    processed_at REAL NOT NULL,
+    processing_time REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_batch ON results (batch_id, processed_at);
+CREATE INDEX IF NOT EXISTS idx_results_status ON results (status, processed_at);
+CREATE INDEX IF NOT EXISTS idx_results_processed ON results (processed_at);
+
+CREATE TABLE IF NOT EXISTS measurements (
+    analysis_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    distance_inches REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_measurements_analysis ON measurements (analysis_id);
+CREATE INDEX IF NOT EXISTS idx_measurements_value ON measurements (name, distance_inches);
+
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    info TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_batches_status ON batches (status, updated_at);
+
+CREATE TABLE IF NOT EXISTS normalized_images (
+    digest TEXT PRIMARY KEY,
+    scale REAL NOT NULL,
+    source_width INTEGER NOT NULL,
+    source_height INTEGER NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_normalized_recorded ON normalized_images (recorded_at);
+
+CREATE TABLE IF NOT EXISTS resumable_uploads (
+    upload_id TEXT PRIMARY KEY,
+    batch_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    key TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    header_checked INTEGER NOT NULL DEFAULT 0,
+    writer TEXT,
+    touched_at REAL NOT NULL,
+    digest TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_resumable_touched ON resumable_uploads (touched_at);
+"""
+
+# Batch status fields stored as datetimes / enums in batch_analysis_status
+_BATCH_DATETIME_FIELDS = ("started_at", "completed_at")
+
+_FINISHED = (AnalysisStatus.COMPLETED.value, AnalysisStatus.FAILED.value, AnalysisStatus.CANCELLED.value)
+
+# Payload of a result whose JSON document lives in its batch's archive file
+_ARCHIVED = ""
+
+
+def _read_boot_id() -> str:
+    try:
+        return Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+    except OSError:
+        return ""
+
+
+_BOOT_ID = _read_boot_id()
+_owner: Tuple[int, str] = (0, "")
+
+
+def _start_time(pid: int) -> Optional[str]:
+    """Start time of process pid in clock ticks since boot, or None if it is not running (or not Linux)."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # Fields after the parenthesized command name, which may contain spaces, start at field 3
+    return stat.rsplit(")", 1)[1].split()[19]
+
+
+def process_owner() -> str:
+    """This process as boot_id:pid:start_time, which stays unique across restarts and reused pids."""
+    global _owner
+    pid = os.getpid()
+    if _owner[0] != pid:
+        _owner = (pid, f"{_BOOT_ID}:{pid}:{_start_time(pid) or ''}")
+    return _owner[1]
+
+
+def owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process identified by a process_owner() value is still running."""
+    try:
+        boot_id, pid_text, started = (owner or "").split(":")
+        pid = int(pid_text)
+    except ValueError:
+        # Saved before owners were recorded
+        return False
+    if boot_id != _BOOT_ID:
+        return False
+    if started:
+        return _start_time(pid) == started
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def epoch(value: datetime) -> float:
+    """Seconds since the epoch; naive datetimes are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class ResultDatabase:
+    """SQLite-backed result and batch records shared by all workers."""
+
+    def __init__(self, path: str, archive_dir: str) -> None:
+        self.path = path
+        self.archive_dir = Path(archive_dir)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        # Lets compaction hand freed pages back to the filesystem (new files only)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL only syncs at checkpoints; a crash loses at most the
+        # last few results, never corrupts the file
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def insert_result(self, batch_id: Optional[str], result: FishAnalysisResult) -> None:
+        """Insert or replace one result and its measurement rows."""
+        row = (
+            result.analysis_id,
+            batch_id,
+            result.status.value,
+            result.image_path,
+            epoch(result.processing_metadata.processed_at),
+            result.processing_metadata.processing_time_seconds,
+            result.model_dump_json(),
+        )
+        measurements = [(result.analysis_id, m.name, m.distance_inches) for m in result.measurements]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+                self._conn.execute("DELETE FROM measurements WHERE analysis_id = ?", (result.analysis_id,))
+                self._conn.executemany("INSERT INTO measurements VALUES (?, ?, ?)", measurements)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_result(self, analysis_id: str) -> Optional[FishAnalysisResult]:
+        results = self._fetch(
+            "SELECT batch_id, analysis_id, payload FROM results WHERE analysis_id = ?", (analysis_id,)
+        )
+        return results[0] if results else None
+
+    def batch_of(self, analysis_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT batch_id FROM results WHERE analysis_id = ?", (analysis_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def query_results(
+        self,
+        batch_id: Optional[str] = None,
+        status: Optional[AnalysisStatus] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        measurement: Optional[str] = None,
+        min_inches: Optional[float] = None,
+        max_inches: Optional[float] = None,
+        offset: int = 0,
+        limit: int = 100,
+        newest_first: bool = True
+    ) -> Tuple[List[FishAnalysisResult], int]:
+        """
+        Filter results through the indexes.
+
+        Args:
+            batch_id: Only results of this batch
+            status: Only results with this status
+            since: Processed at or after this time
+            until: Processed before this time
+            measurement: Only results having this measurement, optionally
+                bounded by min_inches / max_inches
+            offset: Rows to skip
+            limit: Maximum rows to return
+            newest_first: Order by processing start time descending
+
+        Returns:
+            (page of results, total matching count)
+        """
+        where, params = self._filters(batch_id, status, since, until, measurement, min_inches, max_inches)
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM results r{where}", params).fetchone()[0]
+        # A page across batches may touch many archived batches; only a
+        # single batch's reads are worth rehydrating it for
+        results = self._fetch(
+            f"SELECT r.batch_id, r.analysis_id, r.payload FROM results r{where} "
+            f"ORDER BY r.processed_at {order}, r.rowid {order} LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+            rehydrate=batch_id is not None,
+        )
+        return results, total
+
+    def count(self, batch_id: Optional[str] = None, status: Optional[AnalysisStatus] = None) -> int:
+        where, params = self._filters(batch_id, status)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM results r{where}", params).fetchone()[0]
+
+    def batch_stats(self, batch_id: str) -> Dict[str, Any]:
+        with self._lock:
+            count, total_time, completed, failed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(processing_time), 0), "
+                "SUM(status = ?), SUM(status = ?) FROM results WHERE batch_id = ?",
+                (AnalysisStatus.COMPLETED.value, AnalysisStatus.FAILED.value, batch_id),
+            ).fetchone()
+        return {
+            "published": count,
+            "completed": completed or 0,
+            "failed": failed or 0,
+            "processing_time_total": total_time,
+            "average_processing_time": total_time / count if count else None,
+        }
+
+    def save_batch(self, batch_id: str, info: Dict[str, Any]) -> None:
+        """Persist a batch_analysis_status entry, owned by this process."""
+        encoded = {
+            key: value.value if isinstance(value, AnalysisStatus)
+            else value.isoformat() if isinstance(value, datetime)
+            else value
+            for key, value in info.items()
+        }
+        encoded["owner"] = process_owner()
+        started_at = info.get("started_at")
+        row = (
+            batch_id,
+            encoded["status"],
+            epoch(started_at) if isinstance(started_at, datetime) else None,
+            epoch(datetime.utcnow()),
+            json.dumps(encoded, default=str),
+        )
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO batches VALUES (?, ?, ?, ?, ?)", row)
+
+    def load_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        A saved batch_analysis_status entry, or None if the batch is unknown.
+
+        The entry's "owner" is the process_owner() of the process that saved it.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT info FROM batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        if row is None:
+            return None
+        info = json.loads(row[0])
+        info["status"] = AnalysisStatus(info["status"])
+        for key in _BATCH_DATETIME_FIELDS:
+            if info.get(key):
+                info[key] = datetime.fromisoformat(info[key])
+        return info
+
+    def archive_candidates(self, finished_before: float) -> List[str]:
+        """Finished batches last updated before the given epoch that still hold payloads."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT b.batch_id FROM batches b WHERE b.status IN (?, ?, ?) AND b.updated_at < ? "
+                "AND EXISTS (SELECT 1 FROM results r WHERE r.batch_id = b.batch_id AND r.payload != ?)",
+                (*_FINISHED, finished_before, _ARCHIVED),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def archive_batch(self, batch_id: str) -> int:
+        """
+        Move a batch's result documents into its compressed archive file.
+
+        The file is compressed without holding the database lock, so result
+        writes and reads carry on meanwhile; only the documents written to it
+        are blanked afterwards.
+
+        Returns:
+            Number of results archived
+        """
+        select = "SELECT analysis_id, payload FROM results WHERE batch_id = ? ORDER BY rowid"
+        with self._lock:
+            rows = self._conn.execute(select, (batch_id,)).fetchall()
+        if any(payload == _ARCHIVED for _, payload in rows):
+            # Partly archived (interrupted earlier); start from the full set
+            self._rehydrate(batch_id)
+            with self._lock:
+                rows = self._conn.execute(select, (batch_id,)).fetchall()
+        rows = [row for row in rows if row[1] != _ARCHIVED]
+        if not rows:
+            return 0
+        path = self._archive_path(batch_id)
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for _, payload in rows:
+                f.write(payload)
+                f.write("\n")
+        with self._lock:
+            # The file is complete before any payload is blanked
+            os.replace(tmp_path, path)
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE results SET payload = ? WHERE analysis_id = ?",
+                    [(_ARCHIVED, analysis_id) for analysis_id, _ in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def rehydrate_batch(self, batch_id: str) -> int:
+        """
+        Restore a batch's result documents from its archive file.
+
+        Returns:
+            Number of results restored
+        """
+        return self._rehydrate(batch_id)
+
+    def expired_batches(self, started_before: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT batch_id FROM batches WHERE status IN (?, ?, ?) AND started_at < ?",
+                (*_FINISHED, started_before),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete_batch(self, batch_id: str) -> None:
+        """Remove a batch, its results, measurements and archive file."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "DELETE FROM measurements WHERE analysis_id IN "
+                    "(SELECT analysis_id FROM results WHERE batch_id = ?)",
+                    (batch_id,),
+                )
+                self._conn.execute("DELETE FROM results WHERE batch_id = ?", (batch_id,))
+                self._conn.execute("DELETE FROM batches WHERE batch_id = ?", (batch_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._archive_path(batch_id).unlink(missing_ok=True)
+
+    def record_normalization(self, digest: str, scale: float, source_width: int, source_height: int) -> None:
+        """Record a working copy written at ingest, by its content digest."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO normalized_images "
+                "(digest, scale, source_width, source_height, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                (digest, scale, source_width, source_height, epoch(datetime.utcnow())),
+            )
+
+    def normalization_of(self, digest: str) -> Optional[Tuple[float, int, int]]:
+        """(scale, source_width, source_height) recorded for digest, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT scale, source_width, source_height FROM normalized_images WHERE digest = ?", (digest,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def forget_normalizations(self, recorded_before: float) -> int:
+        """Drop working-copy records older than recorded_before; returns how many."""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM normalized_images WHERE recorded_at < ?", (recorded_before,)
+            ).rowcount
+
+    def create_upload(self, upload: Dict[str, Any], max_reserved: int) -> bool:
+        """
+        Record a new resumable upload unless it would take the declared length
+        of unfinished uploads past max_reserved.
+
+        Returns:
+            False if the upload was refused
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                reserved = self._conn.execute(
+                    "SELECT COALESCE(SUM(length), 0) FROM resumable_uploads WHERE result IS NULL"
+                ).fetchone()[0]
+                if reserved + upload["length"] > max_reserved:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "INSERT INTO resumable_uploads (upload_id, batch_id, filename, key, length, touched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (upload["upload_id"], upload["batch_id"], upload["filename"], upload["key"],
+                     upload["length"], epoch(datetime.utcnow())),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def load_upload(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """A resumable upload's record, with its finalize result decoded, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT upload_id, batch_id, filename, key, length, header_checked, writer, digest, result "
+                "FROM resumable_uploads WHERE upload_id = ?",
+                (upload_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        upload = dict(zip(
+            ("upload_id", "batch_id", "filename", "key", "length", "header_checked", "writer", "digest", "result"), row
+        ))
+        upload["header_checked"] = bool(upload["header_checked"])
+        upload["result"] = json.loads(upload["result"]) if upload["result"] else None
+        return upload
+
+    def claim_upload(self, upload_id: str, writer: str) -> Optional[bool]:
+        """
+        Make writer the only request writing an upload.
+
+        A claim left by a process that exited is taken over. Writers are
+        process_owner() values with a per-request suffix after "/".
+
+        Returns:
+            None if the upload is unknown, False if a live writer holds it
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT writer FROM resumable_uploads WHERE upload_id = ?", (upload_id,)
+                ).fetchone()
+                if row is None or (row[0] and owner_alive(row[0].split("/", 1)[0])):
+                    self._conn.execute("ROLLBACK")
+                    return None if row is None else False
+                self._conn.execute("UPDATE resumable_uploads SET writer = ? WHERE upload_id = ?", (writer, upload_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def release_upload(self, upload_id: str, writer: str) -> None:
+        """Drop writer's claim on an upload and count it as activity."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE resumable_uploads SET writer = NULL, touched_at = ? WHERE upload_id = ? AND writer = ?",
+                (epoch(datetime.utcnow()), upload_id, writer),
+            )
+
+    def check_upload_header(self, upload_id: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE resumable_uploads SET header_checked = 1 WHERE upload_id = ?", (upload_id,))
+
+    def finish_upload(self, upload_id: str, digest: str, result: Dict[str, Any]) -> None:
+        """Record a finalized upload's digest of the received bytes and its finalize result."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE resumable_uploads SET digest = ?, result = ? WHERE upload_id = ?",
+                (digest, json.dumps(result, default=str), upload_id),
+            )
+
+    def delete_upload(self, upload_id: str) -> Optional[bool]:
+        """
+        Forget a resumable upload.
+
+        Returns:
+            None if it was unknown, else whether it was still unfinished
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT result IS NULL FROM resumable_uploads WHERE upload_id = ?", (upload_id,)
+                ).fetchone()
+                self._conn.execute("DELETE FROM resumable_uploads WHERE upload_id = ?", (upload_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return None if row is None else bool(row[0])
+
+    def idle_uploads(self, touched_before: float) -> List[str]:
+        """Uploads untouched since touched_before that no live request is writing."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT upload_id, writer FROM resumable_uploads WHERE touched_at < ?", (touched_before,)
+            ).fetchall()
+        return [
+            upload_id for upload_id, writer in rows
+            if not (writer and owner_alive(writer.split("/", 1)[0]))
+        ]
+
+    def upload_totals(self) -> Tuple[int, int]:
+        """(count, total declared length) of unfinished resumable uploads."""
+        with self._lock:
+            return tuple(self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM resumable_uploads WHERE result IS NULL"
+            ).fetchone())
+
+    def reclaim_space(self) -> None:
+        """Return pages freed by compaction and deletion to the filesystem."""
+        with self._lock:
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _fetch(self, sql: str, params: Tuple[Any, ...], rehydrate: bool = True) -> List[FishAnalysisResult]:
+        """
+        Run a (batch_id, analysis_id, payload) query
+
+        Archived batches it touches are rehydrated, or with rehydrate=False
+        the archived documents are read from their archive files.
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        archived = {batch_id for batch_id, _, payload in rows if payload == _ARCHIVED}
+        if archived and rehydrate:
+            for batch_id in archived:
+                self._rehydrate(batch_id)
+            with self._lock:
+                rows = self._conn.execute(sql, params).fetchall()
+            # Anything archived again meanwhile is read from its file below
+            archived = {batch_id for batch_id, _, payload in rows if payload == _ARCHIVED}
+        if archived:
+            wanted = {analysis_id for _, analysis_id, payload in rows if payload == _ARCHIVED}
+            documents: Dict[str, str] = {}
+            for batch_id in archived:
+                documents.update(self._read_archived(batch_id, wanted))
+            rows = [
+                (batch_id, analysis_id, documents.get(analysis_id, _ARCHIVED) if payload == _ARCHIVED else payload)
+                for batch_id, analysis_id, payload in rows
+            ]
+        return [FishAnalysisResult.model_validate_json(payload) for _, _, payload in rows if payload != _ARCHIVED]
+
+    def _read_archived(self, batch_id: Optional[str], analysis_ids: Set[str]) -> Dict[str, str]:
+        """Documents of the given results from a batch's archive file, without rehydrating it."""
+        documents = {}
+        try:
+            with gzip.open(self._archive_path(batch_id), "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    analysis_id = json.loads(line)["analysis_id"]
+                    if analysis_id in analysis_ids:
+                        documents[analysis_id] = line.rstrip("\n")
+        except FileNotFoundError:
+            # Rehydrated meanwhile; the documents are back in the table
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT analysis_id, payload FROM results WHERE batch_id = ? "
+                    f"AND analysis_id IN ({', '.join('?' * len(analysis_ids))})",
+                    (batch_id, *analysis_ids),
+                ).fetchall()
+            documents = {analysis_id: payload for analysis_id, payload in rows if payload != _ARCHIVED}
+        return documents
+
+    def _rehydrate(self, batch_id: Optional[str]) -> int:
+        """
+        Restore a batch's archived documents into the table
+
+        The archive file is decompressed and parsed without the database
+        lock; only the update holds it. Documents go back only into rows
+        that are still archived, so a result written meanwhile is kept.
+        """
+        path = self._archive_path(batch_id)
+        while True:
+            try:
+                with open(path, "rb") as raw:
+                    read_stat = os.fstat(raw.fileno())
+                    with gzip.open(raw, "rt", encoding="utf-8") as f:
+                        rows = [
+                            (line.rstrip("\n"), json.loads(line)["analysis_id"], _ARCHIVED)
+                            for line in f if line.strip()
+                        ]
+            except FileNotFoundError:
+                if self._has_archived(batch_id):
+                    logger.error(f"Archive missing for batch {batch_id}: {path}")
+                # Otherwise another reader rehydrated it first
+                return 0
+            with self._lock:
+                try:
+                    current_stat = os.stat(path)
+                except FileNotFoundError:
+                    # Another reader rehydrated it first
+                    return 0
+                if (current_stat.st_ino, current_stat.st_mtime_ns) == (read_stat.st_ino, read_stat.st_mtime_ns):
+                    self._conn.execute("BEGIN")
+                    try:
+                        self._conn.executemany(
+                            "UPDATE results SET payload = ? WHERE analysis_id = ? AND payload = ?", rows
+                        )
+                        # Counts as fresh activity so the batch is not re-archived right away
+                        self._conn.execute(
+                            "UPDATE batches SET updated_at = ? WHERE batch_id = ?",
+                            (epoch(datetime.utcnow()), batch_id),
+                        )
+                        self._conn.execute("COMMIT")
+                    except Exception:
+                        self._conn.execute("ROLLBACK")
+                        raise
+                    path.unlink(missing_ok=True)
+                    break
+            # Rehydrated and archived again while we read; read the new file
+        logger.info(f"Rehydrated {len(rows)} archived results of batch {batch_id}")
+        return len(rows)
+
+    def _has_archived(self, batch_id: Optional[str]) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM results WHERE batch_id = ? AND payload = ? LIMIT 1", (batch_id, _ARCHIVED)
+            ).fetchone() is not None
+
+    def _archive_path(self, batch_id: Optional[str]) -> Path:
+        return self.archive_dir / f"{batch_id}.ndjson.gz"
+
+    @staticmethod
+    def _filters(
+        batch_id: Optional[str] = None,
+        status: Optional[AnalysisStatus] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        measurement: Optional[str] = None,
+        min_inches: Optional[float] = None,
+        max_inches: Optional[float] = None
+    ) -> Tuple[str, Tuple[Any, ...]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if batch_id is not None:
+            clauses.append("r.batch_id = ?")
+            params.append(batch_id)
+        if status is not None:
+            clauses.append("r.status = ?")
+            params.append(status.value)
+        if since is not None:
+            clauses.append("r.processed_at >= ?")
+            params.append(epoch(since))
+        if until is not None:
+            clauses.append("r.processed_at < ?")
+            params.append(epoch(until))
+        if measurement is not None:
+            sub = "SELECT analysis_id FROM measurements WHERE name = ?"
+            params.append(measurement)
+            if min_inches is not None:
+                sub += " AND distance_inches >= ?"
+                params.append(min_inches)
+            if max_inches is not None:
+                sub += " AND distance_inches <= ?"
+                params.append(max_inches)
+            clauses.append(f"r.analysis_id IN ({sub})")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, tuple(params)
+
+
+result_db = ResultDatabase(settings.RESULT_DB_PATH, settings.BATCH_ARCHIVE_DIR)
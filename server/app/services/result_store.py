@@ -0,0 +1,208 @@
+"""
+Per-batch result store for fish analysis results.
+
+Batch workers publish each FishAnalysisResult here as soon as it finishes, so
+status, progress and paginated endpoints can serve finished fish while the
+rest of the batch is still running. Results are kept ordered by processing
+start time (overall and per status) and indexed by analysis_id, so page and
+stats reads do not rescan or re-sort the whole batch.
+
+Every result is also written through to the persistent result database.
+Once a batch finishes its in-memory set is released and the batch is served
+from the database instead, so memory does not grow with the number of
+batches and finished batches remain readable after a restart.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from app.models.fish_analysis import AnalysisStatus, FishAnalysisResult
+from app.services.result_db import ResultDatabase, result_db
+
+
+class _OrderedResults:
+    """Results kept sorted by processed_at; ties keep publication order."""
+
+    def __init__(self) -> None:
+        self._keys: List[float] = []
+        self._items: List[FishAnalysisResult] = []
+
+    def insert(self, result: FishAnalysisResult) -> None:
+        key = result.processing_metadata.processed_at.timestamp()
+        pos = bisect_right(self._keys, key)
+        self._keys.insert(pos, key)
+        self._items.insert(pos, result)
+
+    def slice(self, offset: int, limit: int, newest_first: bool) -> List[FishAnalysisResult]:
+        if newest_first:
+            end = len(self._items) - offset
+            start = max(0, end - limit)
+            return list(reversed(self._items[start:max(0, end)]))
+        return self._items[offset:offset + limit]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class BatchResultSet:
+    """Results of one batch, readable while the batch is still running."""
+
+    def __init__(self, batch_id: str) -> None:
+        self.batch_id = batch_id
+        self._lock = threading.Lock()
+        self._all = _OrderedResults()
+        self._by_status: Dict[AnalysisStatus, _OrderedResults] = {}
+        self._by_id: Dict[str, FishAnalysisResult] = {}
+        self._processing_time_total = 0.0
+
+    def add(self, result: FishAnalysisResult) -> None:
+        with self._lock:
+            self._all.insert(result)
+            self._by_status.setdefault(result.status, _OrderedResults()).insert(result)
+            self._by_id[result.analysis_id] = result
+            self._processing_time_total += result.processing_metadata.processing_time_seconds
+
+    def get(self, analysis_id: str) -> Optional[FishAnalysisResult]:
+        with self._lock:
+            return self._by_id.get(analysis_id)
+
+    def analysis_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._by_id)
+
+    def all(self) -> List[FishAnalysisResult]:
+        """Snapshot of every published result, oldest first."""
+        with self._lock:
+            return self._all.slice(0, len(self._all), newest_first=False)
+
+    def page(
+        self,
+        offset: int,
+        limit: int,
+        status: Optional[AnalysisStatus] = None,
+        newest_first: bool = True
+    ) -> Tuple[List[FishAnalysisResult], int]:
+        """Return one page ordered by processing start time and the total item count."""
+        with self._lock:
+            ordered = self._all if status is None else self._by_status.get(status, _OrderedResults())
+            return ordered.slice(offset, limit, newest_first), len(ordered)
+
+    def count(self, status: Optional[AnalysisStatus] = None) -> int:
+        with self._lock:
+            if status is None:
+                return len(self._all)
+            return len(self._by_status.get(status, ()))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            count = len(self._all)
+            return {
+                "published": count,
+                "completed": len(self._by_status.get(AnalysisStatus.COMPLETED, ())),
+                "failed": len(self._by_status.get(AnalysisStatus.FAILED, ())),
+                "processing_time_total": self._processing_time_total,
+                "average_processing_time": self._processing_time_total / count if count else None,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._all)
+
+
+class PersistedResultSet:
+    """Read-only view of a finished batch served from the result database."""
+
+    def __init__(self, db: ResultDatabase, batch_id: str) -> None:
+        self.batch_id = batch_id
+        self._db = db
+
+    def get(self, analysis_id: str) -> Optional[FishAnalysisResult]:
+        if self._db.batch_of(analysis_id) != self.batch_id:
+            return None
+        return self._db.get_result(analysis_id)
+
+    def analysis_ids(self) -> List[str]:
+        return [r.analysis_id for r in self.all()]
+
+    def all(self) -> List[FishAnalysisResult]:
+        results, _ = self._db.query_results(batch_id=self.batch_id, limit=-1, newest_first=False)
+        return results
+
+    def page(
+        self,
+        offset: int,
+        limit: int,
+        status: Optional[AnalysisStatus] = None,
+        newest_first: bool = True
+    ) -> Tuple[List[FishAnalysisResult], int]:
+        return self._db.query_results(
+            batch_id=self.batch_id, status=status, offset=offset, limit=limit, newest_first=newest_first
+        )
+
+    def count(self, status: Optional[AnalysisStatus] = None) -> int:
+        return self._db.count(batch_id=self.batch_id, status=status)
+
+    def stats(self) -> Dict[str, float]:
+        return self._db.batch_stats(self.batch_id)
+
+    def __len__(self) -> int:
+        return self.count()
+
+
+class ResultStore:
+    """Registry of live batch result sets backed by the persistent result database."""
+
+    def __init__(self, db: ResultDatabase) -> None:
+        self._lock = threading.Lock()
+        self._db = db
+        self._batches: Dict[str, BatchResultSet] = {}
+        self._analysis_batch: Dict[str, str] = {}
+
+    def create(self, batch_id: str) -> BatchResultSet:
+        with self._lock:
+            result_set = self._batches.get(batch_id)
+            if result_set is None:
+                result_set = self._batches[batch_id] = BatchResultSet(batch_id)
+            return result_set
+
+    def get(self, batch_id: str) -> BatchResultSet | PersistedResultSet:
+        """The live result set of a running batch, else its persisted view."""
+        with self._lock:
+            result_set = self._batches.get(batch_id)
+        return result_set if result_set is not None else PersistedResultSet(self._db, batch_id)
+
+    def publish(self, batch_id: str, result: FishAnalysisResult) -> None:
+        self._db.insert_result(batch_id, result)
+        result_set = self.create(batch_id)
+        result_set.add(result)
+        with self._lock:
+            self._analysis_batch[result.analysis_id] = batch_id
+
+    def save(self, result: FishAnalysisResult) -> None:
+        """Persist a result that does not belong to a batch."""
+        self._db.insert_result(None, result)
+
+    def results(self, batch_id: str) -> List[FishAnalysisResult]:
+        return self.get(batch_id).all()
+
+    def find(self, analysis_id: str) -> Optional[FishAnalysisResult]:
+        with self._lock:
+            batch_id = self._analysis_batch.get(analysis_id)
+            result_set = self._batches.get(batch_id) if batch_id else None
+        if result_set is not None:
+            return result_set.get(analysis_id)
+        return self._db.get_result(analysis_id)
+
+    def drop(self, batch_id: str) -> None:
+        """Release a batch's in-memory results; reads fall through to the database."""
+        with self._lock:
+            result_set = self._batches.pop(batch_id, None)
+            if result_set is not None:
+                for analysis_id in result_set.analysis_ids():
+                    self._analysis_batch.pop(analysis_id, None)
+
+
+result_store = ResultStore(result_db)
@@ -0,0 +1,316 @@
+"""
+Resumable image uploads.
+
+Clients on unreliable links send an image in pieces, tus-style: they create an
+upload with its total length, PATCH chunks at the current offset (asking for
+the offset with HEAD after a dropped connection) and finalize it once every
+byte has arrived.
+
+Upload state is shared by all worker processes and survives restarts, so any
+worker can answer HEAD, PATCH and finalize for any upload. The session record
+(declared length, target key, writer claim and finalize result) is a row in
+the result database. Received bytes are stored in the blob store as parts
+keyed by their offset, and an upload's offset is the contiguous run of parts
+the store holds. If parts are lost (an evicted or restarted memory store),
+HEAD reports the smaller offset and the client resends from there.
+
+The image type and header are checked as soon as they have arrived, so a file
+that is not a supported image is refused on the PATCH that shows it.
+Finalizing reads the parts back through an ImageIngest, which validates,
+hashes and stores the assembled image, and then deletes the parts. A BLAKE2b
+state cannot be carried between requests, so the content hash is computed
+there rather than per chunk.
+
+The declared lengths of unfinished uploads are capped by
+RESUMABLE_UPLOAD_MAX_BYTES across all workers and count against the blob
+store's ceiling in upload admission, since that is where they end up.
+Sessions are swept lazily: unfinished uploads idle for
+RESUMABLE_UPLOAD_TTL_SECONDS are dropped, and finalized ones are remembered
+for as long so a client that lost the finalize response can repeat it.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.result_db import ResultDatabase, process_owner, result_db
+from app.services.storage import store
+from app.utils.file_utils import ImageIngest, IngestedImage
+
+logger = logging.getLogger(__name__)
+
+_PART_KEY = re.compile(r"/(\d+)-(\d+)$")
+
+
+class UploadBusyError(Exception):
+    """Another request is still writing the upload."""
+
+
+def upload_parts_namespace(upload_id: str) -> str:
+    return f"resumable://{upload_id}"
+
+
+@dataclass
+class UploadSession:
+    """One resumable upload, open or finalized, as recorded in the result database."""
+    upload_id: str
+    batch_id: str
+    filename: str
+    key: str
+    length: int
+    header_checked: bool = False
+    # Bytes received so far; the length once finalized
+    offset: int = 0
+    # content_digest() of the received bytes, once finalized
+    digest: Optional[str] = None
+    # Finalize response file info, once finalized
+    result: Optional[Dict[str, Any]] = None
+    # Claim of the request writing this upload, if this session made one
+    writer: Optional[str] = None
+
+
+class ResumableUploadService:
+    """Resumable uploads kept in the result database and the blob store."""
+
+    def __init__(self, db: ResultDatabase, ttl_seconds: float, max_bytes: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._db = db
+        self._lock = threading.Lock()
+        # Open uploads and their declared bytes across all workers, as of
+        # this process' last upload operation; read by upload admission
+        self._open = 0
+        self._reserved = 0
+        self._totals = {"created": 0, "finalized": 0, "expired": 0, "aborted": 0}
+
+    def create(self, filename: Optional[str], key: str, length: int, batch_id: str) -> UploadSession:
+        """
+        Open an upload of length bytes to be stored under key
+
+        Raises:
+            HTTPException: 400 if the filename or length is invalid, 503 if
+                unfinished uploads already reserve RESUMABLE_UPLOAD_MAX_BYTES
+        """
+        if length <= 0:
+            raise HTTPException(status_code=400, detail="Upload-Length must be positive")
+        # Checks the filename and size
+        ImageIngest(filename, key, expected_size=length)
+        self.sweep()
+        session = UploadSession(str(uuid.uuid4()), batch_id, filename or "", key, length)
+        created = self._db.create_upload(
+            {"upload_id": session.upload_id, "batch_id": batch_id, "filename": session.filename,
+             "key": key, "length": length},
+            self.max_bytes,
+        )
+        self._refresh()
+        if not created:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many unfinished resumable uploads, retry later",
+                headers={"Retry-After": "30"}
+            )
+        self._count("created")
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        self.sweep()
+        upload = self._db.load_upload(upload_id)
+        if upload is None:
+            return None
+        upload.pop("writer")
+        session = UploadSession(**upload)
+        session.offset = session.length if session.result is not None else self._received(session)[0]
+        return session
+
+    def claim(self, upload_id: str) -> Optional[UploadSession]:
+        """
+        The upload, claimed for writing by the caller until release(); None if unknown
+
+        Raises:
+            UploadBusyError: If another request is still writing it
+        """
+        writer = f"{process_owner()}/{uuid.uuid4()}"
+        claimed = self._db.claim_upload(upload_id, writer)
+        if claimed is None:
+            return None
+        if not claimed:
+            raise UploadBusyError(upload_id)
+        session = self.get(upload_id)
+        if session is not None:
+            session.writer = writer
+        else:
+            self._db.release_upload(upload_id, writer)
+        return session
+
+    def release(self, session: UploadSession) -> None:
+        if session.writer is not None:
+            self._db.release_upload(session.upload_id, session.writer)
+            session.writer = None
+
+    def append(self, session: UploadSession, chunk: bytes) -> None:
+        """
+        Store the next chunk at the session's offset
+
+        Blocking; meant to run on the ingest pool. An upload that turns out
+        not to be a supported image is discarded; a chunk running past the
+        declared length is refused and leaves the upload as it was.
+
+        Raises:
+            HTTPException: If the chunk runs past the declared length or the
+                upload is not a supported image
+        """
+        if session.offset + len(chunk) > session.length:
+            raise HTTPException(status_code=400, detail=f"Upload exceeds its Upload-Length of {session.length} bytes")
+        if not session.header_checked:
+            self._check_header(session, chunk)
+        store.put(f"{upload_parts_namespace(session.upload_id)}/{session.offset}-{len(chunk)}", chunk)
+        session.offset += len(chunk)
+
+    def finish(self, session: UploadSession, checksum: Optional[str] = None) -> IngestedImage:
+        """
+        Assemble the received parts, then validate and store the image
+
+        Blocking (it may normalize the image); meant to run on the ingest
+        pool. An invalid image or a checksum mismatch discards the upload;
+        storage errors leave it open so finalizing can be retried. Record the
+        result with complete().
+
+        Args:
+            session: Claimed upload whose bytes have all been received
+            checksum: Expected content_digest() of the received bytes
+
+        Raises:
+            HTTPException: 409 if parts are missing, 400 if the image is
+                invalid or the checksum does not match
+        """
+        offset, parts = self._received(session)
+        if offset < session.length:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete: {offset} of {session.length} bytes received"
+            )
+        ingest = ImageIngest(session.filename, session.key, expected_size=session.length)
+        for _, _, part_key in parts:
+            blob = store.get(part_key)
+            if blob is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Upload incomplete: received bytes were evicted, resume from the offset HEAD reports"
+                )
+            ingest.feed(blob[0])
+        session.digest = ingest.digest
+        if checksum is not None and checksum.strip().lower() != session.digest:
+            self.discard(session.upload_id)
+            raise HTTPException(status_code=400, detail="Checksum mismatch")
+        try:
+            return ingest.finish()
+        except HTTPException:
+            self.discard(session.upload_id)
+            raise
+
+    def complete(self, session: UploadSession, result: Dict[str, Any]) -> None:
+        """Record a finished upload's finalize result and drop its parts."""
+        self._db.finish_upload(session.upload_id, session.digest, result)
+        session.result = result
+        store.delete_namespace(upload_parts_namespace(session.upload_id))
+        self._refresh()
+        self._count("finalized")
+
+    def discard(self, upload_id: str) -> bool:
+        """Forget an upload, dropping any bytes received; False if it is unknown"""
+        unfinished = self._db.delete_upload(upload_id)
+        store.delete_namespace(upload_parts_namespace(upload_id))
+        if unfinished is None:
+            return False
+        self._refresh()
+        if unfinished:
+            self._count("aborted")
+        return True
+
+    def sweep(self) -> int:
+        """Drop uploads idle for longer than ttl_seconds and return how many"""
+        expired = 0
+        for upload_id in self._db.idle_uploads(time.time() - self.ttl_seconds):
+            unfinished = self._db.delete_upload(upload_id)
+            store.delete_namespace(upload_parts_namespace(upload_id))
+            if unfinished:
+                expired += 1
+        if expired:
+            self._refresh()
+            self._count("expired", expired)
+            logger.info(f"Expired {expired} idle resumable uploads")
+        return expired
+
+    def reserved_bytes(self) -> int:
+        """Declared length of every unfinished upload, as last seen by this process"""
+        with self._lock:
+            return self._reserved
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open": self._open,
+                "reserved_bytes": self._reserved,
+                **self._totals,
+            }
+
+    def _received(self, session: UploadSession) -> Tuple[int, List[Tuple[int, int, str]]]:
+        """The offset up to which parts are stored without a gap, and those parts in order"""
+        parts = []
+        for key in store.list_namespace(upload_parts_namespace(session.upload_id)):
+            match = _PART_KEY.search(key)
+            if match:
+                parts.append((int(match.group(1)), int(match.group(2)), key))
+        offset = 0
+        contiguous = []
+        for start, size, key in sorted(parts):
+            if start != offset:
+                break
+            contiguous.append((start, size, key))
+            offset += size
+        return offset, contiguous
+
+    def _check_header(self, session: UploadSession, chunk: bytes) -> None:
+        # The header is within the first few hundred KB, so only those parts are reread
+        ingest = ImageIngest(session.filename, session.key, expected_size=session.length)
+        try:
+            for _, _, part_key in self._received(session)[1]:
+                blob = store.get(part_key)
+                if blob is None:
+                    return
+                ingest.feed(blob[0])
+                if ingest.header_checked:
+                    break
+            if not ingest.header_checked:
+                ingest.feed(chunk)
+        except HTTPException:
+            self.discard(session.upload_id)
+            raise
+        if ingest.header_checked:
+            self._db.check_upload_header(session.upload_id)
+            session.header_checked = True
+
+    def _refresh(self) -> None:
+        open_uploads, reserved = self._db.upload_totals()
+        with self._lock:
+            self._open, self._reserved = open_uploads, reserved
+
+    def _count(self, total: str, n: int = 1) -> None:
+        with self._lock:
+            self._totals[total] += n
+
+
+resumable_uploads = ResumableUploadService(
+    result_db,
+    ttl_seconds=settings.RESUMABLE_UPLOAD_TTL_SECONDS,
+    max_bytes=settings.RESUMABLE_UPLOAD_MAX_BYTES,
+)
@@ -0,0 +1,297 @@
+"""
+S3-compatible blob storage backend.
+
+Implements the same interface as InMemoryStorage on top of an S3 bucket so
+several API/worker nodes can share uploads and visualizations. Store keys keep
+their URI form (mem://{batch_id}/{file}) and map to object keys
+{S3_KEY_PREFIX}{scheme}/{rest}, so namespace operations become prefix listings.
+
+Requests go through one boto3 client with a sized connection pool; large
+objects are sent with multipart uploads. Reads go through a local in-memory
+read-through cache, and prefetch() warms it concurrently for a batch's inputs.
+Keys are generated uniquely and never rewritten in place, so cached copies do
+not need cross-node invalidation.
+
+S3 has no per-object TTL: the expiry is stored as object metadata and checked
+on read, and a bucket lifecycle rule should delete expired objects for real.
+
+boto3 is only imported when this backend is selected (STORAGE_TYPE=s3).
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.services.in_memory_storage import InMemoryStorage
+
+logger = logging.getLogger(__name__)
+
+_EXPIRES_META = "expires-at"
+# delete_objects accepts at most this many keys per request
+_DELETE_BATCH = 1000
+
+
+class S3Storage:
+    """Store interface over an S3 bucket with a local read-through cache."""
+
+    # Other nodes hold references to the same blobs
+    shared = True
+
+    def __init__(
+        self,
+        bucket: str,
+        cache: InMemoryStorage,
+        region: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        use_ssl: bool = True,
+        key_prefix: str = "",
+        max_pool_connections: int = 32,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunksize: int = 8 * 1024 * 1024,
+        transfer_concurrency: int = 4,
+        prefetch_workers: int = 8,
+        client: Any = None,
+    ) -> None:
+        """
+        Args:
+            bucket: Existing bucket to store objects in
+            cache: Local store used as the read-through cache
+            endpoint_url: Custom endpoint (MinIO, moto server, ...)
+            key_prefix: Prefix prepended to every object key
+            max_pool_connections: Size of the shared HTTP connection pool
+            multipart_threshold: Objects at least this large use multipart upload
+            client: Preconfigured S3 client, mainly for tests against a stand-in
+        """
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        self._bucket = bucket
+        self._cache = cache
+        self._prefix = key_prefix
+        if client is None:
+            client = boto3.session.Session().client(
+                "s3",
+                region_name=region,
+                endpoint_url=endpoint_url or None,
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+                use_ssl=use_ssl,
+                config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={"max_attempts": 5, "mode": "adaptive"},
+                    # MinIO and most stand-ins do not resolve virtual-host buckets
+                    s3={"addressing_style": "path" if endpoint_url else "auto"},
+                ),
+            )
+        self._client = client
+        self._transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=transfer_concurrency,
+        )
+        self._missing_errors = (client.exceptions.NoSuchKey,)
+        self._prefetcher = ThreadPoolExecutor(max_workers=max(1, prefetch_workers), thread_name_prefix="s3-prefetch")
+        self._lock = threading.Lock()
+        self._gets = 0
+        self._cache_hits = 0
+        self._puts = 0
+        self._put_bytes = 0
+
+    def _object_key(self, key: str) -> str:
+        scheme, sep, rest = key.partition("://")
+        return f"{self._prefix}{scheme}/{rest}" if sep else f"{self._prefix}{key}"
+
+    def _store_key(self, object_key: str) -> str:
+        scheme, _sep, rest = object_key[len(self._prefix):].partition("/")
+        return f"{scheme}://{rest}"
+
+    def put(self, key: str, data: Union[bytes, memoryview], content_type: Optional[str] = None, ttl_seconds: Optional[int] = None) -> None:
+        """
+        Upload data under key and keep a copy in the local cache.
+
+        Raises:
+            botocore.exceptions.ClientError: If the upload fails
+        """
+        extra: Dict[str, Any] = {}
+        if content_type:
+            extra["ContentType"] = content_type
+        if ttl_seconds and ttl_seconds > 0:
+            extra["Metadata"] = {_EXPIRES_META: str(time.time() + ttl_seconds)}
+        # upload_fileobj switches to multipart above the configured threshold
+        self._client.upload_fileobj(
+            io.BytesIO(data), self._bucket, self._object_key(key),
+            ExtraArgs=extra, Config=self._transfer_config
+        )
+        with self._lock:
+            self._puts += 1
+            self._put_bytes += len(data)
+        self._cache_put(key, data, content_type, ttl_seconds)
+
+    def get(self, key: str) -> Optional[Tuple[Union[bytes, memoryview], Optional[str]]]:
+        with self._lock:
+            self._gets += 1
+        blob = self._cache.get(key)
+        if blob is not None:
+            with self._lock:
+                self._cache_hits += 1
+            return blob
+        try:
+            response = self._client.get_object(Bucket=self._bucket, Key=self._object_key(key))
+        except self._missing_errors:
+            return None
+        ttl = self._remaining_ttl(response.get("Metadata", {}))
+        if ttl is not None and ttl <= 0:
+            return None
+        data = response["Body"].read()
+        content_type = response.get("ContentType")
+        self._cache_put(key, data, content_type, ttl)
+        return data, content_type
+
+    def exists(self, key: str) -> bool:
+        if self._cache.exists(key):
+            return True
+        try:
+            response = self._client.head_object(Bucket=self._bucket, Key=self._object_key(key))
+        except self._client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        ttl = self._remaining_ttl(response.get("Metadata", {}))
+        return ttl is None or ttl > 0
+
+    def touch(self, key: str, content_type: Optional[str] = None, ttl_seconds: Optional[int] = None) -> bool:
+        """
+        Restart key's TTL without uploading it again: the expiry metadata is
+        replaced by a server-side copy of the object onto itself.
+
+        Returns:
+            False if the object does not exist
+        """
+        if not (ttl_seconds and ttl_seconds > 0):
+            return self.exists(key)
+        extra: Dict[str, Any] = {"Metadata": {_EXPIRES_META: str(time.time() + ttl_seconds)}}
+        if content_type:
+            extra["ContentType"] = content_type
+        object_key = self._object_key(key)
+        try:
+            self._client.copy_object(
+                Bucket=self._bucket, Key=object_key, CopySource={"Bucket": self._bucket, "Key": object_key},
+                MetadataDirective="REPLACE", **extra
+            )
+        except self._client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        self._cache.touch(key, content_type, ttl_seconds)
+        return True
+
+    def delete(self, key: str) -> None:
+        self._cache.delete(key)
+        self._client.delete_object(Bucket=self._bucket, Key=self._object_key(key))
+
+    def delete_prefix(self, prefix: str) -> int:
+        self._cache.delete_prefix(prefix)
+        return self._delete_keys(self._list(prefix))
+
+    def list_namespace(self, namespace: str) -> List[str]:
+        """Keys under scheme://namespace, sorted."""
+        return sorted(self._list(f"{namespace}/"))
+
+    def pin_namespace(self, namespace: str) -> List[str]:
+        """List namespace keys and pin them in the local cache (objects in S3 are never evicted)."""
+        keys = self.list_namespace(namespace)
+        for key in keys:
+            self._cache.pin(key)
+        return keys
+
+    def delete_namespace(self, namespace: str) -> int:
+        return self.delete_prefix(f"{namespace}/")
+
+    def prefetch(self, keys: Iterable[str]) -> None:
+        """Start fetching keys into the local cache concurrently; returns immediately."""
+        for key in keys:
+            if not self._cache.exists(key):
+                self._prefetcher.submit(self._prefetch_one, key)
+
+    def _prefetch_one(self, key: str) -> None:
+        try:
+            self.get(key)
+        except Exception as e:
+            logger.warning(f"Prefetch of {key} failed: {str(e)}")
+
+    def pin(self, key: str) -> None:
+        """Keep key's cached copy from being evicted until a matching unpin()."""
+        self._cache.pin(key)
+
+    def unpin(self, key: str) -> None:
+        self._cache.unpin(key)
+
+    @contextmanager
+    def pinned(self, keys: Iterable[str]) -> Iterator[None]:
+        with self._cache.pinned(keys):
+            yield
+
+    def near_capacity(self, fraction: float, pending_bytes: int = 0) -> bool:
+        # The bucket is the ceiling; the cache evicts freely
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "s3",
+                "bucket": self._bucket,
+                "gets": self._gets,
+                "cache_hits": self._cache_hits,
+                "puts": self._puts,
+                "put_bytes": self._put_bytes,
+                "cache": self._cache.stats(),
+            }
+
+    def reap_expired(self, batch_size: int = 256) -> int:
+        return self._cache.reap_expired(batch_size)
+
+    def start_reaper(self, interval_seconds: float = 5.0) -> None:
+        self._cache.start_reaper(interval_seconds)
+
+    def stop_reaper(self) -> None:
+        self._cache.stop_reaper()
+        self._prefetcher.shutdown(wait=False, cancel_futures=True)
+
+    def _cache_put(self, key: str, data, content_type: Optional[str], ttl_seconds: Optional[float]) -> None:
+        try:
+            self._cache.put(key, data, content_type=content_type, ttl_seconds=ttl_seconds)
+        except Exception as e:
+            # The object is safely in S3; a full cache only costs a later fetch
+            logger.debug(f"Not caching {key}: {str(e)}")
+
+    @staticmethod
+    def _remaining_ttl(metadata: Dict[str, str]) -> Optional[float]:
+        expires_at = metadata.get(_EXPIRES_META)
+        if not expires_at:
+            return None
+        return float(expires_at) - time.time()
+
+    def _list(self, prefix: str) -> List[str]:
+        paginator = self._client.get_paginator("list_objects_v2")
+        keys: List[str] = []
+        for page in paginator.paginate(Bucket=self._bucket, Prefix=self._object_key(prefix)):
+            keys.extend(self._store_key(obj["Key"]) for obj in page.get("Contents", ()))
+        return keys
+
+    def _delete_keys(self, keys: List[str]) -> int:
+        for start in range(0, len(keys), _DELETE_BATCH):
+            chunk = keys[start:start + _DELETE_BATCH]
+            self._client.delete_objects(
+                Bucket=self._bucket,
+                Delete={"Objects": [{"Key": self._object_key(k)} for k in chunk], "Quiet": True},
+            )
+        return len(keys)
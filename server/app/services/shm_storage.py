@@ -0,0 +1,614 @@
+"""
+Cross-process shared-memory blob arena.
+
+With STORAGE_TYPE=shm every uvicorn worker process on a node attaches to one
+multiprocessing.shared_memory segment, so an image uploaded through one worker
+can be analyzed by another and visualizations can be served by any of them.
+
+The segment holds a header, a table of attached processes, an open-addressing
+slot table (the shared index, probed by a process-independent CRC of the key)
+and a data area tiled with records, each either free or holding one entry.
+Deleting or expiring an entry frees its record at once. Writers take the first
+free run at or after an allocation cursor that sweeps the data area. When
+there is none, they evict the oldest unpinned records from the cursor on,
+stepping over pinned ones, and raise StorageFullError only when no run between
+pinned records is large enough. Index and data updates happen under an fcntl
+lock on SHM_LOCK_PATH, plus a thread lock because flock does not exclude
+threads of one process.
+
+get() returns a memoryview straight into the segment while the entry is pinned
+(the pin keeps its record from being reused) and a copy otherwise. Pins are
+counted per attached process, so a worker attaching after another one died
+releases the dead worker's pins.
+
+Only blobs are shared. Batch status, results and admission counters remain
+per process.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.services.in_memory_storage import StorageFullError
+from app.services.result_db import owner_alive, process_owner
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"OPSHMA01"
+_VERSION = 2
+
+# magic, version, slot count, data size, allocation cursor, used, live bytes,
+# next seq, live slots, deleted slots, evictions, evicted bytes, expirations,
+# rejected puts
+_HEADER = struct.Struct("<8sIIQQQQQIIQQQQ")
+_HEADER_SIZE = 128
+(_H_MAGIC, _H_VERSION, _H_NSLOTS, _H_DATA_SIZE, _H_CURSOR, _H_USED, _H_LIVE_BYTES,
+ _H_NEXT_SEQ, _H_LIVE, _H_DELETED, _H_EVICTIONS, _H_EVICTED_BYTES, _H_EXPIRATIONS,
+ _H_REJECTED) = range(14)
+
+# Attached processes, as process_owner() strings (empty = free entry)
+_PIN_OWNERS = 32
+_OWNER_SIZE = 64
+_TABLE_START = _HEADER_SIZE + _PIN_OWNERS * _OWNER_SIZE
+
+# state, pins, seq, data offset, length, expires_at (0 = never), key length, content type length
+_SLOT = struct.Struct("<BxxxIQQQdHH")
+_KEY_MAX = 256
+_CT_MAX = 64
+_KEY_OFFSET = _SLOT.size
+_CT_OFFSET = _KEY_OFFSET + _KEY_MAX
+# Pins held by each attached process; the state field's pins is their total
+_OWNER_PINS = struct.Struct(f"<{_PIN_OWNERS}I")
+_PINS_OFFSET = (_CT_OFFSET + _CT_MAX + 7) & ~7
+_SLOT_SIZE = _PINS_OFFSET + _OWNER_PINS.size
+
+_EMPTY, _LIVE, _DELETED = 0, 1, 2
+
+# Data record header: seq (0 = free), total record size, key length
+_RECORD = struct.Struct("<QQH")
+_MIN_RECORD = (_RECORD.size + 7) & ~7
+
+# Keep enough empty slots that probe chains stay short
+_MAX_LIVE_FRACTION = 0.7
+_REHASH_FRACTION = 0.8
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _attach_segment(name: str, size: int) -> shared_memory.SharedMemory:
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        shm = shared_memory.SharedMemory(name=name)
+    # Each process' resource tracker would unlink the segment when that
+    # process exits, pulling it out from under the other workers
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def reset_arena(name: str) -> None:
+    """Unlink a segment left over from a previous server run, if any."""
+    try:
+        shm = _attach_segment(name, 1)
+    except Exception:
+        return
+    shm.close()
+    # unlink() unregisters from the tracker; balance the unregister above
+    resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+class SharedMemoryStorage:
+    """Store interface over a shared-memory arena shared by local worker processes."""
+
+    # Other worker processes hold references to the same blobs
+    shared = True
+
+    def __init__(self, name: str, size_bytes: int, slots: int, lock_path: str) -> None:
+        table_bytes = slots * _SLOT_SIZE
+        self._data_start = _align(_TABLE_START + table_bytes)
+        if size_bytes < self._data_start + _MIN_RECORD:
+            raise ValueError("Shared memory arena is too small for its slot table")
+        self._shm = _attach_segment(name, size_bytes)
+        self._buf = self._shm.buf
+        self._thread_lock = threading.Lock()
+        self._lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._h: List[Any] = []
+        self._owner_index = -1
+        self._owner_pid = 0
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
+        with self._locked():
+            if self._h[_H_MAGIC] != _MAGIC or self._h[_H_VERSION] != _VERSION:
+                self._initialize(slots, (self._shm.size - self._data_start) & ~7)
+            elif self._h[_H_NSLOTS] != slots:
+                raise ValueError(
+                    f"Shared memory arena {name} has {self._h[_H_NSLOTS]} slots, expected {slots}"
+                )
+            self._attach_owner()
+
+    def _initialize(self, slots: int, data_size: int) -> None:
+        self._buf[:self._data_start] = bytes(self._data_start)
+        self._h = [_MAGIC, _VERSION, slots, data_size, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0]
+        self._free_record(0, data_size)
+        logger.info(f"Initialized shared memory arena: {slots} slots, {data_size} data bytes")
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                self._h = list(_HEADER.unpack_from(self._buf, 0))
+                try:
+                    yield
+                finally:
+                    _HEADER.pack_into(self._buf, 0, *self._h)
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    # Attached processes
+
+    def _owner(self, owner_index: int) -> str:
+        base = _HEADER_SIZE + owner_index * _OWNER_SIZE
+        return bytes(self._buf[base:base + _OWNER_SIZE]).rstrip(b"\0").decode("utf-8")
+
+    def _set_owner(self, owner_index: int, owner: str) -> None:
+        base = _HEADER_SIZE + owner_index * _OWNER_SIZE
+        self._buf[base:base + _OWNER_SIZE] = owner.encode("utf-8")[:_OWNER_SIZE].ljust(_OWNER_SIZE, b"\0")
+
+    def _attach_owner(self) -> None:
+        """Claim this process' pin counts, first releasing those of processes that exited."""
+        me = process_owner()
+        self._owner_pid = os.getpid()
+        self._owner_index = -1
+        free = []
+        for owner_index in range(_PIN_OWNERS):
+            owner = self._owner(owner_index)
+            if owner == me:
+                self._owner_index = owner_index
+            elif not owner or not owner_alive(owner):
+                if owner:
+                    released = self._release_owner_pins(owner_index)
+                    logger.info(f"Released {released} pins of exited process {owner}")
+                    self._set_owner(owner_index, "")
+                free.append(owner_index)
+        if self._owner_index < 0:
+            if not free:
+                logger.warning(
+                    f"More than {_PIN_OWNERS} processes attached to the shared memory arena; "
+                    "pins of this one cannot be released if it dies"
+                )
+                return
+            self._owner_index = free[0]
+            self._set_owner(self._owner_index, me)
+
+    def _release_owner_pins(self, owner_index: int) -> int:
+        released = 0
+        at = _PINS_OFFSET + owner_index * 4
+        for index in range(self._h[_H_NSLOTS]):
+            base = self._slot_offset(index)
+            held = struct.unpack_from("<I", self._buf, base + at)[0]
+            if held:
+                struct.pack_into("<I", self._buf, base + at, 0)
+                if self._buf[base] == _LIVE:
+                    self._set_pins(index, max(0, self._slot(index)[1] - held))
+                    released += held
+        return released
+
+    # Slot table
+
+    def _slot_offset(self, index: int) -> int:
+        return _TABLE_START + index * _SLOT_SIZE
+
+    def _slot(self, index: int) -> Tuple:
+        return _SLOT.unpack_from(self._buf, self._slot_offset(index))
+
+    def _slot_key(self, index: int) -> bytes:
+        offset = self._slot_offset(index)
+        key_len = _SLOT.unpack_from(self._buf, offset)[6]
+        return bytes(self._buf[offset + _KEY_OFFSET:offset + _KEY_OFFSET + key_len])
+
+    def _find(self, key: bytes) -> Tuple[int, int]:
+        """Return (index of key or -1, first reusable index for inserting it)."""
+        slots = self._h[_H_NSLOTS]
+        index = zlib.crc32(key) % slots
+        reusable = -1
+        for _ in range(slots):
+            state = self._buf[self._slot_offset(index)]
+            if state == _EMPTY:
+                return -1, reusable if reusable >= 0 else index
+            if state == _DELETED:
+                if reusable < 0:
+                    reusable = index
+            elif self._slot_key(index) == key:
+                return index, -1
+            index = (index + 1) % slots
+        return -1, reusable
+
+    def _write_slot(self, index: int, pins: int, owner_pins: bytes, seq: int, offset: int, length: int,
+                    expires_at: Optional[float], key: bytes, content_type: bytes) -> None:
+        base = self._slot_offset(index)
+        _SLOT.pack_into(self._buf, base, _LIVE, pins, seq, offset, length, expires_at or 0.0,
+                        len(key), len(content_type))
+        self._buf[base + _KEY_OFFSET:base + _KEY_OFFSET + len(key)] = key
+        self._buf[base + _CT_OFFSET:base + _CT_OFFSET + len(content_type)] = content_type
+        self._buf[base + _PINS_OFFSET:base + _SLOT_SIZE] = owner_pins
+
+    def _owner_pins(self, index: int) -> bytes:
+        base = self._slot_offset(index)
+        return bytes(self._buf[base + _PINS_OFFSET:base + _SLOT_SIZE])
+
+    def _clear_slot(self, index: int) -> None:
+        """Remove an entry and free its data record."""
+        base = self._slot_offset(index)
+        _state, _pins, _seq, data_offset, length, _exp, key_len, _cl = _SLOT.unpack_from(self._buf, base)
+        record = data_offset - _RECORD.size - key_len
+        record_size = self._record(record)[1]
+        self._free_record(record, record_size)
+        self._buf[base] = _DELETED
+        self._h[_H_LIVE] -= 1
+        self._h[_H_DELETED] += 1
+        self._h[_H_LIVE_BYTES] -= length
+        self._h[_H_USED] -= record_size
+
+    def _set_pins(self, index: int, pins: int) -> None:
+        struct.pack_into("<I", self._buf, self._slot_offset(index) + 4, pins)
+
+    def _add_pins(self, index: int, delta: int) -> None:
+        """Change this process' pins on a slot, and the slot's total, by delta."""
+        if self._owner_pid != os.getpid():
+            # Forked after attaching; pins belong to this process, not the parent
+            self._attach_owner()
+        if self._owner_index >= 0:
+            at = self._slot_offset(index) + _PINS_OFFSET + self._owner_index * 4
+            held = struct.unpack_from("<I", self._buf, at)[0]
+            struct.pack_into("<I", self._buf, at, max(0, held + delta))
+        self._set_pins(index, max(0, self._slot(index)[1] + delta))
+
+    def _rehash(self) -> None:
+        """Rebuild the slot table without tombstones."""
+        slots = self._h[_H_NSLOTS]
+        live = []
+        for index in range(slots):
+            if self._buf[self._slot_offset(index)] == _LIVE:
+                offset = self._slot_offset(index)
+                live.append((self._slot_key(index), bytes(self._buf[offset:offset + _SLOT_SIZE])))
+        self._buf[_HEADER_SIZE:_HEADER_SIZE + slots * _SLOT_SIZE] = bytes(slots * _SLOT_SIZE)
+        for key, raw in live:
+            _, index = self._find(key)
+            offset = self._slot_offset(index)
+            self._buf[offset:offset + _SLOT_SIZE] = raw
+        self._h[_H_DELETED] = 0
+
+    def _live_slots(self) -> Iterator[Tuple[int, str]]:
+        for index in range(self._h[_H_NSLOTS]):
+            if self._buf[self._slot_offset(index)] == _LIVE:
+                yield index, self._slot_key(index).decode("utf-8")
+
+    def _expired(self, slot: Tuple) -> bool:
+        _state, pins, _seq, _offset, _length, expires_at, _kl, _cl = slot
+        return pins == 0 and expires_at and expires_at < time.time()
+
+    # Data records
+
+    def _record(self, offset: int) -> Tuple[int, int, int]:
+        return _RECORD.unpack_from(self._buf, self._data_start + offset)
+
+    def _free_record(self, offset: int, size: int) -> None:
+        _RECORD.pack_into(self._buf, self._data_start + offset, 0, size, 0)
+
+    def _record_slot(self, offset: int, seq: int, key_len: int) -> int:
+        """Slot index of the entry stored in a record, or -1."""
+        key_start = self._data_start + offset + _RECORD.size
+        index, _ = self._find(bytes(self._buf[key_start:key_start + key_len]))
+        if index >= 0 and self._slot(index)[2] == seq:
+            return index
+        return -1
+
+    def _evict(self, index: int) -> None:
+        slot = self._slot(index)
+        if self._expired(slot):
+            self._h[_H_EXPIRATIONS] += 1
+        else:
+            self._h[_H_EVICTIONS] += 1
+            self._h[_H_EVICTED_BYTES] += slot[4]
+        self._clear_slot(index)
+
+    def _find_run(self, need: int, evict: bool) -> Optional[Tuple[int, int, List[int]]]:
+        """
+        First run of at least need contiguous bytes, sweeping from the cursor.
+
+        Free records always belong to a run; with evict, so do records of
+        unpinned entries. Runs do not wrap around the end of the data area.
+
+        Returns:
+            (offset, size, slot indexes to evict), or None if there is no run
+        """
+        size = self._h[_H_DATA_SIZE]
+        cursor = self._h[_H_CURSOR]
+        offset = start = cursor
+        run = 0
+        victims: List[int] = []
+        wrapped = False
+        while not (wrapped and start >= cursor):
+            seq, record_size, key_len = self._record(offset)
+            usable = seq == 0
+            if seq and evict:
+                index = self._record_slot(offset, seq, key_len)
+                if index >= 0 and not self._slot(index)[1]:
+                    victims.append(index)
+                    usable = True
+            if usable:
+                run += record_size
+                if run >= need:
+                    return start, run, victims
+            else:
+                start, run, victims = offset + record_size, 0, []
+            offset += record_size
+            if offset >= size:
+                if wrapped:
+                    break
+                offset = start = run = 0
+                victims = []
+                wrapped = True
+        return None
+
+    def _allocate(self, need: int) -> Tuple[int, int]:
+        """Reserve a record of at least need bytes; returns (offset, record size)."""
+        size = self._h[_H_DATA_SIZE]
+        if need > size:
+            self._h[_H_REJECTED] += 1
+            raise StorageFullError(f"Object of {need} bytes exceeds the arena size of {size} bytes")
+        found = None
+        if size - self._h[_H_USED] >= need:
+            found = self._find_run(need, evict=False)
+        if found is None:
+            found = self._find_run(need, evict=True)
+        if found is None:
+            self._h[_H_REJECTED] += 1
+            raise StorageFullError("Shared memory arena is full of pinned objects")
+        offset, run, victims = found
+        for index in victims:
+            self._evict(index)
+        if run - need >= _MIN_RECORD:
+            self._free_record(offset + need, run - need)
+            run = need
+        self._h[_H_USED] += run
+        self._h[_H_CURSOR] = (offset + run) % size
+        return offset, run
+
+    def _evict_oldest(self) -> None:
+        """Evict the first unpinned entry from the cursor on, to free a slot."""
+        size = self._h[_H_DATA_SIZE]
+        cursor = offset = self._h[_H_CURSOR]
+        while True:
+            seq, record_size, key_len = self._record(offset)
+            if seq:
+                index = self._record_slot(offset, seq, key_len)
+                if index >= 0 and not self._slot(index)[1]:
+                    self._evict(index)
+                    return
+            offset = (offset + record_size) % size
+            if offset == cursor:
+                self._h[_H_REJECTED] += 1
+                raise StorageFullError("Shared memory arena slot table is full of pinned objects")
+
+    # Store interface
+
+    def put(self, key: str, data: Union[bytes, memoryview], content_type: Optional[str] = None, ttl_seconds: Optional[int] = None) -> None:
+        """
+        Copy data into the arena under key, evicting the oldest unpinned entries if needed.
+
+        Raises:
+            StorageFullError: If pinned entries leave no room or data exceeds the arena
+        """
+        key_bytes = key.encode("utf-8")
+        if len(key_bytes) > _KEY_MAX:
+            raise ValueError(f"Key longer than {_KEY_MAX} bytes: {key}")
+        ct_bytes = (content_type or "").encode("utf-8")[:_CT_MAX]
+        expires_at = time.time() + ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        length = len(data)
+        need = _align(_RECORD.size + len(key_bytes) + length)
+        with self._locked():
+            pins, owner_pins = 0, bytes(_OWNER_PINS.size)
+            index, _ = self._find(key_bytes)
+            if index >= 0:
+                pins, owner_pins = self._slot(index)[1], self._owner_pins(index)
+                self._clear_slot(index)
+            while self._h[_H_LIVE] >= self._h[_H_NSLOTS] * _MAX_LIVE_FRACTION:
+                self._evict_oldest()
+            offset, record_size = self._allocate(need)
+            seq = self._h[_H_NEXT_SEQ]
+            self._h[_H_NEXT_SEQ] += 1
+            record = self._data_start + offset
+            _RECORD.pack_into(self._buf, record, seq, record_size, len(key_bytes))
+            self._buf[record + _RECORD.size:record + _RECORD.size + len(key_bytes)] = key_bytes
+            data_offset = offset + _RECORD.size + len(key_bytes)
+            self._buf[self._data_start + data_offset:self._data_start + data_offset + length] = data
+            if self._h[_H_LIVE] + self._h[_H_DELETED] >= self._h[_H_NSLOTS] * _REHASH_FRACTION:
+                self._rehash()
+            _, index = self._find(key_bytes)
+            if self._buf[self._slot_offset(index)] == _DELETED:
+                self._h[_H_DELETED] -= 1
+            self._write_slot(index, pins, owner_pins, seq, data_offset, length, expires_at, key_bytes, ct_bytes)
+            self._h[_H_LIVE] += 1
+            self._h[_H_LIVE_BYTES] += length
+
+    def get(self, key: str) -> Optional[Tuple[Union[bytes, memoryview], Optional[str]]]:
+        """Return (data, content_type); data is a zero-copy view while the key is pinned."""
+        key_bytes = key.encode("utf-8")
+        with self._locked():
+            index, _ = self._find(key_bytes)
+            if index < 0:
+                return None
+            slot = self._slot(index)
+            if self._expired(slot):
+                self._clear_slot(index)
+                self._h[_H_EXPIRATIONS] += 1
+                return None
+            _state, pins, _seq, offset, length, _exp, _kl, ct_len = slot
+            base = self._slot_offset(index) + _CT_OFFSET
+            content_type = bytes(self._buf[base:base + ct_len]).decode("utf-8") or None
+            view = self._buf[self._data_start + offset:self._data_start + offset + length]
+            return (view if pins else bytes(view)), content_type
+
+    def exists(self, key: str) -> bool:
+        key_bytes = key.encode("utf-8")
+        with self._locked():
+            index, _ = self._find(key_bytes)
+            if index < 0:
+                return False
+            if self._expired(self._slot(index)):
+                self._clear_slot(index)
+                self._h[_H_EXPIRATIONS] += 1
+                return False
+            return True
+
+    def touch(self, key: str, content_type: Optional[str] = None, ttl_seconds: Optional[int] = None) -> bool:
+        """Restart key's TTL in place; False if it is missing or expired."""
+        expires_at = time.time() + ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        with self._locked():
+            index, _ = self._find(key.encode("utf-8"))
+            if index < 0:
+                return False
+            slot = self._slot(index)
+            if self._expired(slot):
+                self._clear_slot(index)
+                self._h[_H_EXPIRATIONS] += 1
+                return False
+            state, pins, seq, offset, length, _exp, key_len, ct_len = slot
+            _SLOT.pack_into(
+                self._buf, self._slot_offset(index), state, pins, seq, offset, length, expires_at or 0.0, key_len, ct_len
+            )
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._locked():
+            index, _ = self._find(key.encode("utf-8"))
+            if index >= 0:
+                self._clear_slot(index)
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._locked():
+            indexes = [index for index, key in self._live_slots() if key.startswith(prefix)]
+            for index in indexes:
+                self._clear_slot(index)
+            return len(indexes)
+
+    def list_namespace(self, namespace: str) -> List[str]:
+        prefix = f"{namespace}/"
+        with self._locked():
+            return sorted(
+                key for index, key in self._live_slots()
+                if key.startswith(prefix) and not self._expired(self._slot(index))
+            )
+
+    def pin_namespace(self, namespace: str) -> List[str]:
+        """Pin every live key under namespace and return them, sorted."""
+        prefix = f"{namespace}/"
+        keys = []
+        with self._locked():
+            for index, key in self._live_slots():
+                slot = self._slot(index)
+                if key.startswith(prefix) and not self._expired(slot):
+                    self._add_pins(index, 1)
+                    keys.append(key)
+        return sorted(keys)
+
+    def delete_namespace(self, namespace: str) -> int:
+        return self.delete_prefix(f"{namespace}/")
+
+    def pin(self, key: str) -> None:
+        """Protect key from eviction and expiry until a matching unpin()."""
+        with self._locked():
+            index, _ = self._find(key.encode("utf-8"))
+            if index >= 0:
+                self._add_pins(index, 1)
+
+    def unpin(self, key: str) -> None:
+        with self._locked():
+            index, _ = self._find(key.encode("utf-8"))
+            if index >= 0:
+                self._add_pins(index, -1)
+
+    @contextmanager
+    def pinned(self, keys: Iterable[str]) -> Iterator[None]:
+        keys = list(keys)
+        for key in keys:
+            self.pin(key)
+        try:
+            yield
+        finally:
+            for key in keys:
+                self.unpin(key)
+
+    def prefetch(self, keys: Iterable[str]) -> None:
+        """Nothing to warm: every key is already in local shared memory."""
+
+    def near_capacity(self, fraction: float, pending_bytes: int = 0) -> bool:
+        with self._locked():
+            # Record headers and alignment take space too, so count used record bytes
+            return (self._h[_H_USED] + pending_bytes >= self._h[_H_DATA_SIZE] * fraction
+                    or self._h[_H_LIVE] >= self._h[_H_NSLOTS] * _MAX_LIVE_FRACTION * fraction)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._locked():
+            pinned = sum(1 for index, _key in self._live_slots() if self._slot(index)[1])
+            return {
+                "backend": "shm",
+                "objects": self._h[_H_LIVE],
+                "bytes": self._h[_H_LIVE_BYTES],
+                "used_bytes": self._h[_H_USED],
+                "max_objects": int(self._h[_H_NSLOTS] * _MAX_LIVE_FRACTION),
+                "max_bytes": self._h[_H_DATA_SIZE],
+                "pinned": pinned,
+                "evictions": self._h[_H_EVICTIONS],
+                "evicted_bytes": self._h[_H_EVICTED_BYTES],
+                "expirations": self._h[_H_EXPIRATIONS],
+                "rejected_puts": self._h[_H_REJECTED],
+            }
+
+    def reap_expired(self, batch_size: int = 256) -> int:
+        """Remove expired unpinned entries and free their records."""
+        with self._locked():
+            expired = [index for index, _key in self._live_slots() if self._expired(self._slot(index))]
+            for index in expired:
+                self._clear_slot(index)
+            self._h[_H_EXPIRATIONS] += len(expired)
+            return len(expired)
+
+    def start_reaper(self, interval_seconds: float = 5.0) -> None:
+        """Start a daemon thread that periodically removes expired entries."""
+        with self._thread_lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper_stop.clear()
+            self._reaper = threading.Thread(
+                target=self._reaper_loop, args=(interval_seconds,),
+                name="shm-store-reaper", daemon=True
+            )
+            self._reaper.start()
+
+    def stop_reaper(self) -> None:
+        self._reaper_stop.set()
+
+    def _reaper_loop(self, interval_seconds: float) -> None:
+        while not self._reaper_stop.wait(interval_seconds):
+            try:
+                self.reap_expired()
+            except Exception as e:  # pragma: no cover - keep the reaper alive
+                logger.error(f"Shared memory reaper failed: {str(e)}")
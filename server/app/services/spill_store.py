@@ -0,0 +1,327 @@
+"""
+Disk spill tier for the in-memory blob store.
+
+Entries evicted from memory, and objects that do not fit a memory shard, are
+appended to segment files under MEMORY_SPILL_DIR and read back through
+read-only mmaps: get() returns a memoryview over the mapped region, so spilled
+images are decoded and visualizations streamed without copying into Python
+bytes. Every record carries its key, content type and expiry, so the index is
+rebuilt from the segments at startup and spilled uploads survive a restart.
+
+Segments are append-only and deletes write a small tombstone record, so the
+tier tracks live bytes (records still in the index) apart from the bytes on
+disk. Segments are retired oldest first: one with no live records is simply
+unlinked; while live bytes exceed MEMORY_SPILL_MAX_SIZE_MB its unpinned
+entries are dropped and pinned ones copied forward into the active segment;
+and while the files exceed the budget, a segment that is mostly dead records
+is compacted by copying its live entries forward. Only the oldest segment is
+ever retired, so a tombstone never outlives the record it shadows.
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# magic, flags, key length, content type length, data length, expires_at (0 = never)
+_HEADER = struct.Struct("<4sBHHQd")
+_MAGIC = b"FSB1"
+_FLAG_TOMBSTONE = 1
+
+
+def namespace_of(key: str) -> Optional[str]:
+    """Return the scheme://namespace part of key, or None if it has none."""
+    scheme_end = key.find("://")
+    if scheme_end < 0:
+        return None
+    slash = key.find("/", scheme_end + 3)
+    return key[:slash] if slash >= 0 else None
+
+
+@dataclass
+class _Location:
+    segment: int
+    offset: int  # of the data, past the record header
+    length: int
+    content_type: Optional[str]
+    expires_at: Optional[float]
+    record: int  # header, key, content type and data
+
+
+@dataclass
+class _Segment:
+    id: int
+    path: Path
+    size: int = 0
+    live: int = 0  # bytes of records still in the index
+    keys: Set[str] = field(default_factory=set)
+    _map: Optional[mmap.mmap] = None
+
+    def view(self, offset: int, length: int) -> memoryview:
+        if length == 0:
+            return memoryview(b"")
+        if self._map is None or offset + length > len(self._map):
+            # Remap to cover newly appended records; views handed out from the
+            # previous map keep it alive until they are released
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._map)[offset:offset + length]
+
+
+class SpillStore:
+    """Append-only, mmap-backed blob tier with a rebuildable in-memory index."""
+
+    def __init__(self, directory: str, max_bytes: int, segment_bytes: int) -> None:
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._segment_bytes = max(1, segment_bytes)
+        self._lock = threading.Lock()
+        # Oldest segment first
+        self._segments: "OrderedDict[int, _Segment]" = OrderedDict()
+        self._index: Dict[str, _Location] = {}
+        self._namespaces: Dict[str, Set[str]] = {}
+        self._pins: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._live_bytes = 0
+        self._writer = None
+        self._spilled = 0
+        self._spilled_bytes = 0
+        self._dropped = 0
+        self._load()
+
+    def put(self, key: str, data, content_type: Optional[str] = None, expires_at: Optional[float] = None) -> None:
+        """
+        Append data under key, replacing any previous spilled value.
+
+        Raises:
+            OSError: If the segment file cannot be written
+        """
+        with self._lock:
+            self._forget(key)
+            self._write(key, data, content_type, expires_at)
+            self._spilled += 1
+            self._spilled_bytes += len(data)
+            self._reclaim()
+
+    def get(self, key: str) -> Optional[Tuple[memoryview, Optional[str]]]:
+        with self._lock:
+            location = self._live(key)
+            if location is None:
+                return None
+            segment = self._segments[location.segment]
+            return segment.view(location.offset, location.length), location.content_type
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            return self._live(key) is not None
+
+    def delete(self, key: str) -> bool:
+        # Unlocked membership test keeps the common miss off the tier lock
+        if key not in self._index:
+            return False
+        with self._lock:
+            deleted = self._delete(key)
+            self._reclaim()
+            return deleted
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            namespace = namespace_of(prefix)
+            candidates = self._namespaces.get(namespace, ()) if namespace is not None else self._index.keys()
+            keys = [k for k in candidates if k.startswith(prefix)]
+            for k in keys:
+                self._delete(k)
+            self._reclaim()
+            return len(keys)
+
+    def list_namespace(self, namespace: str) -> List[str]:
+        with self._lock:
+            return [k for k in list(self._namespaces.get(namespace, ())) if self._live(k) is not None]
+
+    def delete_namespace(self, namespace: str) -> int:
+        with self._lock:
+            keys = list(self._namespaces.get(namespace, ()))
+            for k in keys:
+                self._delete(k)
+            self._reclaim()
+            return len(keys)
+
+    def pin(self, key: str) -> None:
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: str) -> None:
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "objects": len(self._index),
+                "bytes": self._live_bytes,
+                "disk_bytes": self._total_bytes,
+                "max_bytes": self._max_bytes,
+                "segments": len(self._segments),
+                "spilled": self._spilled,
+                "spilled_bytes": self._spilled_bytes,
+                "dropped": self._dropped,
+            }
+
+    def _live(self, key: str) -> Optional[_Location]:
+        location = self._index.get(key)
+        if location is None:
+            return None
+        if location.expires_at is not None and location.expires_at < time.time() and key not in self._pins:
+            # The record's own expiry keeps it dead across restarts
+            self._forget(key)
+            return None
+        return location
+
+    def _forget(self, key: str) -> Optional[_Location]:
+        location = self._index.pop(key, None)
+        if location is None:
+            return None
+        segment = self._segments.get(location.segment)
+        if segment is not None:
+            segment.keys.discard(key)
+            segment.live -= location.record
+        self._live_bytes -= location.record
+        namespace = namespace_of(key)
+        if namespace is not None:
+            keys = self._namespaces.get(namespace)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._namespaces[namespace]
+        return location
+
+    def _delete(self, key: str) -> bool:
+        if self._forget(key) is None:
+            return False
+        key_bytes = key.encode("utf-8")
+        self._append(_HEADER.pack(_MAGIC, _FLAG_TOMBSTONE, len(key_bytes), 0, 0, 0.0) + key_bytes, b"")
+        return True
+
+    def _write(self, key: str, data, content_type: Optional[str], expires_at: Optional[float]) -> None:
+        key_bytes = key.encode("utf-8")
+        ct_bytes = (content_type or "").encode("utf-8")
+        header = _HEADER.pack(_MAGIC, 0, len(key_bytes), len(ct_bytes), len(data), expires_at or 0.0)
+        segment = self._append(header + key_bytes + ct_bytes, data)
+        self._index_record(
+            key, segment, segment.size - len(data), len(data), content_type, expires_at,
+            _HEADER.size + len(key_bytes) + len(ct_bytes) + len(data)
+        )
+
+    def _index_record(
+        self, key: str, segment: _Segment, offset: int, length: int,
+        content_type: Optional[str], expires_at: Optional[float], record: int
+    ) -> None:
+        self._index[key] = _Location(segment.id, offset, length, content_type, expires_at, record)
+        segment.keys.add(key)
+        segment.live += record
+        self._live_bytes += record
+        namespace = namespace_of(key)
+        if namespace is not None:
+            self._namespaces.setdefault(namespace, set()).add(key)
+
+    def _append(self, record: bytes, data) -> _Segment:
+        segment = next(reversed(self._segments.values()), None)
+        size = len(record) + len(data)
+        if segment is None or self._writer is None or (segment.size and segment.size + size > self._segment_bytes):
+            segment = self._open_segment((segment.id + 1) if segment is not None else 1)
+        self._writer.write(record)
+        self._writer.write(data)
+        # Make the record visible to mmap readers immediately
+        self._writer.flush()
+        segment.size += size
+        self._total_bytes += size
+        return segment
+
+    def _open_segment(self, segment_id: int) -> _Segment:
+        if self._writer is not None:
+            self._writer.close()
+        segment = _Segment(segment_id, self._dir / f"segment-{segment_id:08d}.seg")
+        self._writer = open(segment.path, "ab")
+        self._segments[segment_id] = segment
+        return segment
+
+    def _reclaim(self) -> None:
+        """Retire the oldest segments that are dead, over the live budget or worth compacting."""
+        # Bounded so pinned entries copied forward are not chased round the segments
+        for _ in range(len(self._segments) - (self._writer is not None)):
+            segment_id, segment = next(iter(self._segments.items()))
+            if self._writer is not None and segment_id == next(reversed(self._segments)):
+                return
+            over_live = self._live_bytes > self._max_bytes
+            mostly_dead = self._total_bytes > self._max_bytes and segment.live * 2 <= segment.size
+            if segment.keys and not over_live and not mostly_dead:
+                return
+            for key in list(segment.keys):
+                location = self._index[key]
+                if over_live and key not in self._pins:
+                    self._forget(key)
+                    self._dropped += 1
+                    continue
+                view = segment.view(location.offset, location.length)
+                self._forget(key)
+                self._write(key, view, location.content_type, location.expires_at)
+            del self._segments[segment_id]
+            self._total_bytes -= segment.size
+            # Readers still holding views keep the unlinked mapping valid
+            segment.path.unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        """Rebuild the index from existing segments, truncating torn tails."""
+        now = time.time()
+        for path in sorted(self._dir.glob("segment-*.seg")):
+            try:
+                segment_id = int(path.stem.split("-", 1)[1])
+            except ValueError:
+                continue
+            segment = _Segment(segment_id, path)
+            self._segments[segment_id] = segment
+            file_size = path.stat().st_size
+            with open(path, "rb") as f:
+                offset = 0
+                while offset < file_size:
+                    header = f.read(_HEADER.size)
+                    if len(header) < _HEADER.size:
+                        break
+                    magic, flags, key_len, ct_len, data_len, expires_at = _HEADER.unpack(header)
+                    end = offset + _HEADER.size + key_len + ct_len + data_len
+                    if magic != _MAGIC or end > file_size:
+                        break
+                    key = f.read(key_len).decode("utf-8")
+                    content_type = f.read(ct_len).decode("utf-8") or None
+                    f.seek(data_len, 1)
+                    self._forget(key)
+                    if not flags & _FLAG_TOMBSTONE and not (expires_at and expires_at < now):
+                        self._index_record(
+                            key, segment, end - data_len, data_len, content_type, expires_at or None, end - offset
+                        )
+                    offset = end
+            if offset < file_size:
+                logger.warning(f"Truncating damaged spill segment {path.name} at byte {offset}")
+                with open(path, "r+b") as f:
+                    f.truncate(offset)
+            segment.size = offset
+            self._total_bytes += offset
+        if self._index:
+            logger.info(f"Recovered {len(self._index)} spilled objects from {self._dir}")
+        # No writer is open yet, so the first put starts a fresh segment after
+        # any recovered (possibly torn) tail, and dead segments go now
+        self._reclaim()
@@ -0,0 +1,66 @@
+"""
+Blob store selection.
+
+The rest of the app imports `store` from here and only relies on the shared
+store interface (put/get/exists/touch/delete, namespace operations, pins, prefetch,
+stats), so the backend is chosen purely by STORAGE_TYPE. Whatever the backend,
+it is wrapped in a ContentAddressedStore so identical blobs are kept once.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from app.core.config import settings
+from app.services.content_store import ContentAddressedStore
+from app.services.in_memory_storage import InMemoryStorage
+
+logger = logging.getLogger(__name__)
+
+
+def create_store():
+    """Build the configured backend: "memory" (default), "s3" or "shm"."""
+    storage_type = settings.STORAGE_TYPE.lower()
+    if storage_type == "memory":
+        return InMemoryStorage.instance()
+    if storage_type == "s3":
+        from app.services.s3_storage import S3Storage
+
+        if not settings.S3_BUCKET_NAME:
+            raise ValueError("STORAGE_TYPE=s3 requires S3_BUCKET_NAME")
+        # A small local tier fronts the bucket as read-through cache
+        cache = InMemoryStorage(
+            max_bytes=settings.S3_CACHE_MAX_SIZE_MB * 1024 * 1024,
+            max_objects=settings.MEMORY_STORAGE_MAX_OBJECTS,
+            shards=settings.MEMORY_STORAGE_SHARDS,
+        )
+        logger.info(f"Using S3 storage backend: bucket={settings.S3_BUCKET_NAME}")
+        return S3Storage(
+            bucket=settings.S3_BUCKET_NAME,
+            cache=cache,
+            region=settings.S3_REGION,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            access_key_id=settings.AWS_ACCESS_KEY_ID,
+            secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            use_ssl=settings.S3_USE_SSL,
+            key_prefix=settings.S3_KEY_PREFIX,
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNK_SIZE_MB * 1024 * 1024,
+            transfer_concurrency=settings.S3_TRANSFER_CONCURRENCY,
+            prefetch_workers=settings.S3_PREFETCH_WORKERS,
+        )
+    if storage_type == "shm":
+        from app.services.shm_storage import SharedMemoryStorage
+
+        logger.info(f"Using shared memory storage backend: {settings.SHM_ARENA_NAME}")
+        return SharedMemoryStorage(
+            name=settings.SHM_ARENA_NAME,
+            size_bytes=settings.SHM_ARENA_SIZE_MB * 1024 * 1024,
+            slots=settings.SHM_ARENA_SLOTS,
+            lock_path=settings.SHM_LOCK_PATH,
+        )
+    raise ValueError(f"Unsupported STORAGE_TYPE: {settings.STORAGE_TYPE}")
+
+
+store = ContentAddressedStore(create_store())
@@ -0,0 +1,425 @@
+"""
+Watch-folder ingestion for camera rigs.
+
+Grading stations write JPEGs into a local directory. Each directory listed in
+WATCH_FOLDERS gets a daemon thread that notices new images, waits until they
+are completely written, collects them into batches and submits each batch for
+analysis with the rig's calibration profile, without any HTTP round trip.
+
+* New files are noticed through inotify where the kernel provides it, and by
+  rescanning every WATCH_POLL_INTERVAL_SECONDS otherwise (or with
+  WATCH_FORCE_POLLING, for network shares that deliver no events).
+* A file is taken once the rig has closed it or moved it into place, or once
+  its size and modification time have been unchanged for WATCH_SETTLE_SECONDS.
+  Files inotify saw being created wait for their close, so a rig that
+  pauses mid-write is not cut short.
+* Taken files are collected for WATCH_BATCH_WINDOW_SECONDS after the first
+  one, or until WATCH_BATCH_MAX_IMAGES are waiting, and submitted as one batch.
+* Queued files stay in place until their result is published and are then
+  moved into the folder's processed subdirectory; invalid images are moved
+  into rejected straight away. A file whose result was never published (the
+  process stopped, or the batch was cancelled) is still in the folder and is
+  submitted again, after a restart by the first scan. Files a batch could
+  not take (for example during shutdown, or while the image store is full)
+  stay where they are and are picked up again as well.
+* With several worker processes, only the one holding the folder's lock file
+  watches it; the others stand by and take over if that process exits.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import ctypes.util
+import fcntl
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.config import WatchFolderConfig, settings
+from app.utils.file_utils import is_image_filename
+
+logger = logging.getLogger(__name__)
+
+# Called with a queued file once the batch is done with it, and whether its
+# result was published
+Settled = Callable[[str, bool], None]
+# Submits image files as one batch; returns the batch id and, for each file
+# the batch took, None if it was queued or why it was rejected as invalid
+Submitter = Callable[
+    [List[str], WatchFolderConfig, Settled],
+    Awaitable[Tuple[str, Dict[str, Optional[str]]]]
+]
+
+# Rescan interval of an idle folder whose events come from inotify, as a
+# safety net for missed events
+_IDLE_RESCAN_SECONDS = 60.0
+# A file seen being created is normally taken when it is closed; if that
+# event is lost it is taken after WATCH_SETTLE_SECONDS times this factor
+_OPEN_FILE_SETTLE_FACTOR = 10
+# Held by the one process watching a folder; hidden, so never taken as an image
+_LOCK_NAME = ".octapulse-watch.lock"
+# How often a standby process tries to take over a folder
+_STANDBY_RETRY_SECONDS = 5.0
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_IGNORED = 0x00008000
+_IN_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal inotify binding for a single directory."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Raises:
+            OSError: If inotify is unavailable or the directory cannot be watched
+        """
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_CREATE | _IN_CLOSE_WRITE | _IN_MOVED_TO
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+        self.alive = True
+
+    def wait(self, timeout: float) -> Tuple[Set[str], Set[str]]:
+        """
+        Block until something changes in the directory or timeout elapses
+
+        Returns:
+            (names of files created, names of files closed after writing or
+            moved into the directory)
+        """
+        created: Set[str] = set()
+        complete: Set[str] = set()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return created, complete
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return created, complete
+        pos = 0
+        while pos + _IN_EVENT.size <= len(data):
+            _, mask, _, length = _IN_EVENT.unpack_from(data, pos)
+            name = data[pos + _IN_EVENT.size:pos + _IN_EVENT.size + length].rstrip(b"\x00")
+            pos += _IN_EVENT.size + length
+            if mask & _IN_IGNORED:
+                # The directory itself went away
+                self.alive = False
+            elif mask & _IN_CREATE and name:
+                created.add(os.fsdecode(name))
+            elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO) and name:
+                complete.add(os.fsdecode(name))
+        return created, complete
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _FolderWatcher:
+    """Collects and submits the new images of one watch folder."""
+
+    def __init__(self, service: WatchFolderService, folder: WatchFolderConfig) -> None:
+        self.service = service
+        self.folder = folder
+        self.rig_id = folder.rig_id or os.path.basename(os.path.normpath(folder.path))
+        self.mode = "stopped"
+        # name -> (size, mtime_ns, unchanged since)
+        self._seen: Dict[str, Tuple[int, int, float]] = {}
+        # Files seen being created and not closed yet
+        self._writing: Set[str] = set()
+        # Versions already submitted whose files could not be moved away
+        self._submitted: Set[Tuple[str, int, int]] = set()
+        # Queued files awaiting their result -> the (size, mtime_ns) queued
+        self._queued: Dict[str, Tuple[int, int]] = {}
+        # (path, published) of queued files the batch is done with, appended
+        # on the event loop and handled on the watcher thread
+        self._settled: "deque[Tuple[str, bool]]" = deque()
+        self._pending: List[str] = []
+        self._pending_since = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._lock_fd: Optional[int] = None
+        self.totals = {"batches": 0, "images": 0, "rejected": 0}
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"watch-folder-{self.rig_id}", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.folder.path,
+            "rig_id": self.rig_id,
+            "mode": self.mode,
+            "pending": len(self._pending),
+            "queued": len(self._queued),
+            **self.totals,
+        }
+
+    def _run(self) -> None:
+        stop = self.service._stop
+        inotify = None
+        while not stop.is_set():
+            try:
+                if not os.path.isdir(self.folder.path):
+                    self.mode = "missing"
+                    self._release()
+                    stop.wait(_IDLE_RESCAN_SECONDS)
+                    continue
+                if not self._claim():
+                    self.mode = "standby"
+                    stop.wait(_STANDBY_RETRY_SECONDS)
+                    continue
+                if inotify is None and not self.service.force_polling:
+                    try:
+                        inotify = _Inotify(self.folder.path)
+                    except OSError as e:
+                        logger.warning(f"Watch folder {self.folder.path}: inotify unavailable ({str(e)}), polling instead")
+                self.mode = "inotify" if inotify is not None else "polling"
+
+                busy = bool(self._seen or self._pending)
+                if inotify is not None:
+                    created, complete = inotify.wait(self.service.poll_interval if busy else _IDLE_RESCAN_SECONDS)
+                    self._writing = (self._writing | created) - complete
+                    if not inotify.alive:
+                        inotify.close()
+                        inotify = None
+                        self._writing.clear()
+                else:
+                    stop.wait(self.service.poll_interval)
+                    complete = set()
+                if stop.is_set():
+                    break
+                self._move_settled()
+                self._scan(complete)
+                self._flush_due()
+            except Exception as e:  # pragma: no cover - keep the watcher alive
+                logger.error(f"Watch folder {self.folder.path} failed: {str(e)}")
+                stop.wait(self.service.poll_interval)
+        if inotify is not None:
+            inotify.close()
+        self._release()
+        self.mode = "stopped"
+
+    def _claim(self) -> bool:
+        """Whether this process watches the folder, taking its lock if nobody holds it"""
+        if self._lock_fd is not None:
+            return True
+        path = os.path.join(self.folder.path, _LOCK_NAME)
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        except OSError as e:
+            if self.mode != "standby":
+                logger.error(f"Watch folder {self.folder.path}: cannot open lock file ({str(e)}), not watching")
+            return False
+        try:
+            # Released by the kernel when the process exits, however it exits
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        logger.info(f"Watch folder {self.folder.path}: watching from process {os.getpid()}")
+        return True
+
+    def _release(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _scan(self, complete: Set[str]) -> None:
+        """Track the images in the folder and queue the ones that are completely written"""
+        now = time.monotonic()
+        present = set()
+        with os.scandir(self.folder.path) as entries:
+            for entry in entries:
+                if not is_image_filename(entry.name) or not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                present.add(entry.name)
+                version = (stat.st_size, stat.st_mtime_ns)
+                previous = self._seen.get(entry.name)
+                if previous is None or previous[:2] != version:
+                    self._seen[entry.name] = (*version, now)
+                    previous = self._seen[entry.name]
+                if (entry.name in self._pending or (entry.name, *version) in self._submitted
+                        or self._queued.get(entry.name) == version):
+                    continue
+                settle_seconds = self.service.settle_seconds
+                if entry.name in self._writing:
+                    settle_seconds *= _OPEN_FILE_SETTLE_FACTOR
+                settled = entry.name in complete or now - previous[2] >= settle_seconds
+                if settled and stat.st_size > 0:
+                    if not self._pending:
+                        self._pending_since = now
+                    self._pending.append(entry.name)
+        for name in set(self._seen) - present:
+            del self._seen[name]
+        self._writing &= present
+        self._submitted = {version for version in self._submitted if version[0] in present}
+        self._queued = {name: version for name, version in self._queued.items() if name in present}
+        self._pending = [name for name in self._pending if name in present]
+
+    def _flush_due(self) -> None:
+        if not self._pending:
+            return
+        full = len(self._pending) >= self.service.max_batch_images
+        if full or time.monotonic() - self._pending_since >= self.service.window_seconds:
+            names = self._pending[:self.service.max_batch_images]
+            self._pending = self._pending[len(names):]
+            self._pending_since = time.monotonic()
+            self._submit(names)
+
+    def _submit(self, names: List[str]) -> None:
+        paths = [os.path.join(self.folder.path, name) for name in names]
+        try:
+            batch_id, outcomes = self.service._submit(paths, self.folder, self._settle)
+        except Exception as e:
+            # Left in place, so they are submitted again after the next window
+            logger.error(f"Watch folder {self.folder.path}: could not submit {len(paths)} images: {str(e)}")
+            return
+
+        accepted = rejected = 0
+        for path, error in outcomes.items():
+            if error is None:
+                # Moved once its result is published
+                accepted += 1
+                seen = self._seen.get(os.path.basename(path))
+                if seen is not None:
+                    self._queued[os.path.basename(path)] = seen[:2]
+            else:
+                # Only invalid images get an error; files that hit a
+                # transient failure are missing from outcomes and stay put
+                rejected += 1
+                logger.warning(f"Watch folder {self.folder.path}: rejected {os.path.basename(path)}: {error}")
+                self._move(path, self.folder.rejected_dir)
+        self.totals["batches"] += 1
+        self.totals["images"] += accepted
+        self.totals["rejected"] += rejected
+        logger.info(f"Watch folder {self.folder.path}: batch {batch_id} with {accepted} images, {rejected} rejected")
+
+    def _settle(self, path: str, published: bool) -> None:
+        """Note that the batch is done with a queued file; called on the event loop"""
+        self._settled.append((path, published))
+
+    def _move_settled(self) -> None:
+        """Move queued files whose results are published; the others are submitted again"""
+        while self._settled:
+            path, published = self._settled.popleft()
+            name = os.path.basename(path)
+            version = self._queued.pop(name, None)
+            if not published or version is None:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if (stat.st_size, stat.st_mtime_ns) == version:
+                self._move(path, self.folder.processed_dir)
+
+    def _move(self, path: str, subdir: str) -> None:
+        target_dir = os.path.join(self.folder.path, subdir)
+        name = os.path.basename(path)
+        stem, ext = os.path.splitext(name)
+        try:
+            os.makedirs(target_dir, exist_ok=True)
+            target = os.path.join(target_dir, name)
+            counter = 1
+            while os.path.exists(target):
+                target = os.path.join(target_dir, f"{stem}_{counter}{ext}")
+                counter += 1
+            os.replace(path, target)
+        except OSError as e:
+            logger.error(f"Watch folder {self.folder.path}: could not move {name}: {str(e)}")
+            stat = self._seen.get(name)
+            if stat is not None:
+                self._submitted.add((name, stat[0], stat[1]))
+
+
+class WatchFolderService:
+    """Runs a watcher thread per configured watch folder, in every worker process."""
+
+    def __init__(
+        self,
+        folders: List[WatchFolderConfig],
+        settle_seconds: float,
+        window_seconds: float,
+        max_batch_images: int,
+        poll_interval: float,
+        force_polling: bool
+    ) -> None:
+        self.settle_seconds = settle_seconds
+        self.window_seconds = window_seconds
+        self.max_batch_images = max(1, max_batch_images)
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+        self._watchers = [_FolderWatcher(self, folder) for folder in folders]
+        self._submitter: Optional[Submitter] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+
+    def register_submitter(self, submitter: Submitter) -> None:
+        """
+        Set the coroutine that turns collected images into an analysis batch.
+
+        Args:
+            submitter: Called on the event loop with the image paths, the
+                folder's profile and a callback; returns the batch id and the
+                outcome of each file the batch took. Files it leaves out stay
+                in the folder. It calls the callback with each queued file
+                once its result is published, or once the batch ends without
+                publishing one.
+        """
+        self._submitter = submitter
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start watching; batches are submitted on loop."""
+        if not self._watchers or self._submitter is None:
+            return
+        self._loop = loop
+        self._stop.clear()
+        for watcher in self._watchers:
+            logger.info(f"Watching {watcher.folder.path} for rig {watcher.rig_id}")
+            watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [watcher.stats() for watcher in self._watchers]
+
+    def _submit(
+        self,
+        paths: List[str],
+        folder: WatchFolderConfig,
+        settled: Settled
+    ) -> Tuple[str, Dict[str, Optional[str]]]:
+        """Run the submitter on the event loop and wait for it from a watcher thread"""
+        future = asyncio.run_coroutine_threadsafe(self._submitter(paths, folder, settled), self._loop)
+        return future.result()
+
+
+watch_folder_service = WatchFolderService(
+    settings.WATCH_FOLDERS,
+    settle_seconds=settings.WATCH_SETTLE_SECONDS,
+    window_seconds=settings.WATCH_BATCH_WINDOW_SECONDS,
+    max_batch_images=settings.WATCH_BATCH_MAX_IMAGES,
+    poll_interval=settings.WATCH_POLL_INTERVAL_SECONDS,
+    force_polling=settings.WATCH_FORCE_POLLING,
+)
@@ -0,0 +1,391 @@
+"""
+Incremental zip and tar extraction
+
+ArchiveStream is fed an archive chunk by chunk as it arrives and returns each
+member as soon as its last byte is in, so an upload of thousands of images
+never has to be buffered whole. Only the member being read is held in memory.
+
+Zip archives are read through their local file headers, without the central
+directory at the end of the file. Deflated entries whose sizes are deferred
+to a data descriptor (as written by streaming zip tools) are supported.
+Tar archives may be uncompressed or gzip, bzip2 or xz compressed, and may use
+GNU or pax long names.
+"""
+
+import bz2
+import lzma
+import posixpath
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Generator, List, Optional, Tuple
+
+# Parser requests: ("read", n) wants exactly n bytes, ("skip", n) discards n
+# bytes, ("some", 0) wants whatever is buffered, ("unread", data) hands back
+# bytes it did not use
+_Request = Tuple[str, object]
+
+_ZIP_LOCAL = b"PK\x03\x04"
+_ZIP_CENTRAL = b"PK\x01\x02"
+_ZIP_END = b"PK\x05\x06"
+_ZIP64_END = b"PK\x06\x06"
+_ZIP_DESCRIPTOR = b"PK\x07\x08"
+_ZIP_STORED = 0
+_ZIP_DEFLATED = 8
+
+# Upper bound on bytes inflated per step, so a small compressed chunk cannot
+# expand into an arbitrarily large buffer
+_INFLATE_STEP = 1024 * 1024
+
+_TAR_BLOCK = 512
+_TAR_FILE_TYPES = (b"0", b"\x00", b"7")
+
+class ArchiveFormatError(ValueError):
+    """The archive is malformed or uses a feature that cannot be streamed"""
+
+@dataclass
+class ArchiveMember:
+    """A file read from an archive, or the reason it could not be read"""
+    name: str
+    data: Optional[bytes] = None
+    error: Optional[str] = None
+
+def _default_accept(name: str) -> bool:
+    return True
+
+class ArchiveStream:
+    """Push-based reader for zip and tar archives"""
+
+    def __init__(self, max_member_size: int, accept: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            max_member_size: Members larger than this are reported with an error instead of being read
+            accept: Filter on member paths; rejected members are skipped unread
+        """
+        self.max_member_size = max_member_size
+        self.format: Optional[str] = None
+        self.members = 0
+        self.skipped = 0
+        self._accept = accept or _default_accept
+        self._decompressor = None
+        self._buffer = bytearray()
+        self._parser: Optional[Generator[_Request, Optional[bytes], None]] = None
+        self._request: Optional[_Request] = None
+        self._done: List[ArchiveMember] = []
+        self._finished = False
+
+    def feed(self, chunk: bytes) -> List[ArchiveMember]:
+        """
+        Parse the next chunk of the archive
+
+        Returns:
+            Members completed by this chunk, in archive order
+
+        Raises:
+            ArchiveFormatError: If the archive is malformed or unsupported
+        """
+        if self._parser is None:
+            self._buffer += chunk
+            if not self._detect(final=False):
+                return []
+            chunk, self._buffer = bytes(self._buffer), bytearray()
+        self._push(chunk)
+        return self._take()
+
+    def finish(self) -> List[ArchiveMember]:
+        """
+        Flush at end of input
+
+        Raises:
+            ArchiveFormatError: If the archive ends early
+        """
+        if self._parser is None:
+            if not self._buffer:
+                raise ArchiveFormatError("Archive is empty")
+            self._detect(final=True)
+            chunk, self._buffer = bytes(self._buffer), bytearray()
+            self._push(chunk)
+        if not self._finished and self._decompressor is not None and not self._decompressor.eof:
+            raise ArchiveFormatError("Compressed archive ends early")
+        if not self._finished and self._request == ("read", _TAR_BLOCK) and not self._buffer:
+            # Some tar writers omit the two empty blocks that end the archive
+            self._finished = True
+        if not self._finished:
+            raise ArchiveFormatError("Archive ends inside a member")
+        return self._take()
+
+    def _detect(self, final: bool) -> bool:
+        head = bytes(self._buffer[:262])
+        if head[:4] in (_ZIP_LOCAL, _ZIP_END):
+            self.format, self._parser = "zip", self._read_zip()
+        elif head[:2] == b"\x1f\x8b":
+            self.format, self._decompressor = "tar.gz", zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif head[:3] == b"BZh":
+            self.format, self._decompressor = "tar.bz2", bz2.BZ2Decompressor()
+        elif head[:6] == b"\xfd7zXZ\x00":
+            self.format, self._decompressor = "tar.xz", lzma.LZMADecompressor()
+        elif len(head) >= 262 and head[257:262] == b"ustar":
+            self.format = "tar"
+        elif len(head) < 262 and not final:
+            return False
+        else:
+            raise ArchiveFormatError("Unsupported archive format; expected zip or tar")
+        if self._parser is None:
+            self._parser = self._read_tar()
+        self._request = next(self._parser)
+        return True
+
+    def _push(self, chunk: bytes) -> None:
+        if self._decompressor is None:
+            if not self._finished:
+                self._buffer += chunk
+                self._pump()
+            return
+        while not self._finished and not self._decompressor.eof:
+            try:
+                out = self._decompress(chunk)
+            except (zlib.error, OSError, EOFError, lzma.LZMAError) as e:
+                raise ArchiveFormatError(f"Corrupt compressed archive: {str(e)}")
+            chunk = b""
+            if not out:
+                return
+            self._buffer += out
+            self._pump()
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        decompressor = self._decompressor
+        if isinstance(decompressor, type(zlib.decompressobj())):
+            return decompressor.decompress(decompressor.unconsumed_tail + chunk, _INFLATE_STEP)
+        return decompressor.decompress(chunk, _INFLATE_STEP)
+
+    def _pump(self) -> None:
+        """Serve parser requests from the buffer until it needs more input"""
+        while not self._finished:
+            kind, arg = self._request
+            if kind == "read":
+                if len(self._buffer) < arg:
+                    return
+                data = bytes(self._buffer[:arg])
+                del self._buffer[:arg]
+            elif kind == "skip":
+                taken = min(arg, len(self._buffer))
+                del self._buffer[:taken]
+                if taken < arg:
+                    self._request = ("skip", arg - taken)
+                    return
+                data = None
+            elif kind == "some":
+                if not self._buffer:
+                    return
+                data = bytes(self._buffer)
+                self._buffer.clear()
+            else:
+                self._buffer[:0] = arg
+                data = None
+            try:
+                self._request = self._parser.send(data)
+            except StopIteration:
+                self._finished = True
+                self._buffer.clear()
+
+    def _take(self) -> List[ArchiveMember]:
+        done, self._done = self._done, []
+        return done
+
+    def _member(self, name: str, size: int) -> Optional[ArchiveMember]:
+        """The member to read into, or None to skip it unread"""
+        self.members += 1
+        if not self._accept(name):
+            self.skipped += 1
+            return None
+        if size > self.max_member_size:
+            self._done.append(ArchiveMember(name=name, error=self._too_large()))
+            return None
+        return ArchiveMember(name=name)
+
+    def _too_large(self) -> str:
+        return f"File too large. Maximum size: {self.max_member_size / (1024*1024):.1f}MB"
+
+    def _read_tar(self) -> Generator[_Request, Optional[bytes], None]:
+        long_name: Optional[str] = None
+        empty_blocks = 0
+        while True:
+            header = yield ("read", _TAR_BLOCK)
+            if header == b"\x00" * _TAR_BLOCK:
+                empty_blocks += 1
+                if empty_blocks == 2:
+                    return
+                continue
+            empty_blocks = 0
+            if _tar_checksum(header) != _tar_number(header[148:156]):
+                raise ArchiveFormatError("Corrupt tar archive: header checksum mismatch")
+            size = _tar_number(header[124:136])
+            padding = -size % _TAR_BLOCK
+            kind = header[156:157]
+
+            if kind in (b"L", b"x"):
+                data = yield ("read", size)
+                yield ("skip", padding)
+                if kind == b"L":
+                    long_name = data.rstrip(b"\x00").decode("utf-8", "replace")
+                else:
+                    long_name = _pax_path(data) or long_name
+                continue
+
+            name = long_name or _tar_name(header)
+            long_name = None
+            member = self._member(name, size) if kind in _TAR_FILE_TYPES and not name.endswith("/") else None
+            if member is None or member.error is not None:
+                yield ("skip", size + padding)
+                continue
+            member.data = yield ("read", size)
+            yield ("skip", padding)
+            self._done.append(member)
+
+    def _read_zip(self) -> Generator[_Request, Optional[bytes], None]:
+        while True:
+            signature = yield ("read", 4)
+            if signature in (_ZIP_CENTRAL, _ZIP_END, _ZIP64_END):
+                # Local entries are over; the central directory adds nothing we need
+                return
+            if signature != _ZIP_LOCAL:
+                raise ArchiveFormatError("Corrupt zip archive: expected a local file header")
+            header = yield ("read", 26)
+            (_, flags, method, _, _, crc, compressed_size, size,
+             name_length, extra_length) = struct.unpack("<HHHHHIIIHH", header)
+            raw_name = yield ("read", name_length)
+            extra = yield ("read", extra_length)
+            name = raw_name.decode("utf-8" if flags & 0x800 else "cp437", "replace")
+            zip64 = _zip64_sizes(extra, size, compressed_size)
+            if zip64 is not None:
+                size, compressed_size = zip64
+            deferred = bool(flags & 0x08)
+
+            if flags & 0x01:
+                if deferred:
+                    raise ArchiveFormatError(f"Encrypted zip entry {name} cannot be streamed")
+                self._done.append(ArchiveMember(name=name, error="Encrypted zip entries are not supported"))
+                yield ("skip", compressed_size)
+                continue
+            if deferred and method != _ZIP_DEFLATED:
+                raise ArchiveFormatError(f"Zip entry {name} has no size and is not deflated; it cannot be streamed")
+
+            is_file = not name.endswith("/")
+            member = self._member(name, 0 if deferred else size) if is_file else None
+            if member is not None and method not in (_ZIP_STORED, _ZIP_DEFLATED):
+                member.error = f"Unsupported zip compression method {method}"
+
+            if not deferred:
+                keep = member is not None and member.error is None
+                if not keep:
+                    yield ("skip", compressed_size)
+                    if member is not None:
+                        self._done.append(member)
+                    continue
+                data = yield ("read", compressed_size)
+                if method == _ZIP_DEFLATED:
+                    try:
+                        data = zlib.decompressobj(-zlib.MAX_WBITS).decompress(data, self.max_member_size + 1)
+                    except zlib.error as e:
+                        member.error = f"Corrupt zip entry: {str(e)}"
+                    else:
+                        if len(data) > self.max_member_size:
+                            member.error = self._too_large()
+            else:
+                # Inflate until the deflate stream ends; that is where the entry ends
+                inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+                parts: List[bytes] = []
+                inflated = 0
+                while not inflater.eof:
+                    pending = yield ("some", 0)
+                    while pending and not inflater.eof:
+                        try:
+                            out = inflater.decompress(pending, _INFLATE_STEP)
+                        except zlib.error as e:
+                            raise ArchiveFormatError(f"Corrupt zip entry {name}: {str(e)}")
+                        pending = inflater.unconsumed_tail
+                        inflated += len(out)
+                        if member is not None and member.error is None:
+                            if inflated > self.max_member_size:
+                                member.error = self._too_large()
+                                parts = []
+                            else:
+                                parts.append(out)
+                if inflater.unused_data:
+                    yield ("unread", inflater.unused_data)
+                data = b"".join(parts)
+                descriptor = yield ("read", 4)
+                if descriptor == _ZIP_DESCRIPTOR:
+                    descriptor = yield ("read", 4)
+                (crc,) = struct.unpack("<I", descriptor)
+                yield ("skip", 8 if zip64 is None else 16)
+
+            if member is None:
+                continue
+            if member.error is None and zlib.crc32(data) != crc:
+                member.error = "Corrupt zip entry: checksum mismatch"
+            if member.error is None:
+                member.data = data
+            self._done.append(member)
+
+def _tar_number(field: bytes) -> int:
+    if field[:1] and field[0] & 0x80:
+        # GNU base-256 encoding for large values
+        return int.from_bytes(field[1:], "big")
+    digits = field.rstrip(b"\x00 ").strip()
+    try:
+        return int(digits, 8) if digits else 0
+    except ValueError:
+        raise ArchiveFormatError("Corrupt tar archive: invalid number field")
+
+def _tar_checksum(header: bytes) -> int:
+    return sum(header[:148]) + 8 * 0x20 + sum(header[156:])
+
+def _tar_name(header: bytes) -> str:
+    name = header[:100].split(b"\x00", 1)[0].decode("utf-8", "replace")
+    if header[257:262] == b"ustar":
+        prefix = header[345:500].split(b"\x00", 1)[0].decode("utf-8", "replace")
+        if prefix:
+            name = posixpath.join(prefix, name)
+    return name
+
+def _pax_path(data: bytes) -> Optional[str]:
+    """The path record of a pax extended header"""
+    pos = 0
+    while pos < len(data):
+        space = data.find(b" ", pos)
+        if space < 0:
+            break
+        try:
+            length = int(data[pos:space])
+        except ValueError:
+            break
+        if length <= 0:
+            break
+        key, _, value = data[space + 1:pos + length - 1].partition(b"=")
+        if key == b"path":
+            return value.decode("utf-8", "replace")
+        pos += length
+    return None
+
+def _zip64_sizes(extra: bytes, size: int, compressed_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Sizes from the zip64 extended information field of a local header
+
+    Returns:
+        (size, compressed_size), or None if the entry has no zip64 field
+    """
+    pos = 0
+    while pos + 4 <= len(extra):
+        field_id, length = struct.unpack_from("<HH", extra, pos)
+        if field_id == 0x0001:
+            values = extra[pos + 4:pos + 4 + length]
+            offset = 0
+            if size == 0xFFFFFFFF and offset + 8 <= len(values):
+                (size,) = struct.unpack_from("<Q", values, offset)
+                offset += 8
+            if compressed_size == 0xFFFFFFFF and offset + 8 <= len(values):
+                (compressed_size,) = struct.unpack_from("<Q", values, offset)
+            return size, compressed_size
+        pos += 4 + length
+    return None
@@ -2,71 +2,554 @@
 File utilities for upload handling
 """
 
+import asyncio
+import os
 import uuid
+from dataclasses import dataclass
 from pathlib import Path
 from fastapi import HTTPException, UploadFile
 import magic
-from typing import List
+from typing import Callable, Dict, List, Optional
 import logging
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
 
 from app.core.config import settings
+from app.services.content_store import content_digest, content_hasher
+from app.services.image_decode import DecodedImage
+from app.services.image_normalize import Normalization, normalize_image, record_normalization
+from app.services.storage import store
+from app.utils.image_probe import ImageProbe, ImageProbeError, IncompleteHeaderError, probe_image
 
 logger = logging.getLogger(__name__)
 
-async def validate_image_file(file: UploadFile) -> None:
+VALID_MIME_TYPES = [
+    'image/jpeg', 'image/png', 'image/bmp',
+    'image/tiff', 'image/x-ms-bmp'
+]
+
+# Leading bytes handed to libmagic
+_SNIFF_BYTES = 2048
+# Camera JPEGs carry tens of KB of EXIF (thumbnails included) ahead of the
+# frame header, so an early header probe that runs out of data is retried
+# with twice as many bytes, up to this much
+_EARLY_PROBE_MAX_BYTES = 256 * 1024
+
+@dataclass
+class IngestedImage:
+    """An upload stored in the blob store by ImageIngest"""
+    key: str
+    size: int
+    content_hash: str
+    content_type: Optional[str]
+    probe: ImageProbe
+    # Set when a normalized working copy was stored instead of the upload
+    normalization: Optional[Normalization] = None
+
+def validate_image_filename(filename: Optional[str]) -> None:
     """
-    Validate uploaded image file
+    Validate the filename and extension of an upload
     
-    Args:
-        file: Uploaded file to validate
-        
     Raises:
-        HTTPException: If file is invalid
+        HTTPException: If the filename is missing or has an unsupported extension
     """
-    # Check file size
-    content = await file.read()
-    file_size = len(content)
-    
-    # Reset file position for later reading
-    await file.seek(0)
-    
-    if file_size == 0:
-        raise HTTPException(status_code=400, detail="Empty file uploaded")
+    if not filename:
+        raise HTTPException(status_code=400, detail="Filename is required")
     
-    if file_size > settings.MAX_UPLOAD_SIZE:
+    file_extension = Path(filename).suffix.lower()
+    if file_extension not in settings.ALLOWED_IMAGE_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE / (1024*1024):.1f}MB"
+            detail=f"Invalid file type. Allowed types: {', '.join(settings.ALLOWED_IMAGE_EXTENSIONS)}"
         )
+
+def sniff_image_mime(head: bytes) -> Optional[str]:
+    """
+    Check the leading bytes of an upload with python-magic
     
-    # Check file extension
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Filename is required")
+    Args:
+        head: First chunk of the file
+        
+    Returns:
+        Detected MIME type, or None if detection is unavailable
+        
+    Raises:
+        HTTPException: If the detected type is not a supported image format
+    """
+    try:
+        mime_type = magic.from_buffer(head[:_SNIFF_BYTES], mime=True)
+    except Exception as e:
+        logger.warning(f"MIME type detection failed: {str(e)}")
+        # Continue without MIME validation if magic fails
+        return None
     
-    file_extension = Path(file.filename).suffix.lower()
-    if file_extension not in settings.ALLOWED_IMAGE_EXTENSIONS:
+    if mime_type not in VALID_MIME_TYPES:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file type. Allowed types: {', '.join(settings.ALLOWED_IMAGE_EXTENSIONS)}"
+            detail=f"Invalid file format. Detected: {mime_type}"
         )
+    return mime_type
+
+def probe_upload(data: bytes, complete: bool = True) -> ImageProbe:
+    """
+    Read an upload's geometry from its header and check it against the image limits
     
-    # Check MIME type using python-magic
+    Raises:
+        HTTPException: If the header is corrupt or the resolution is out of range
+        IncompleteHeaderError: If complete is False and data stops inside the header
+    """
     try:
-        mime_type = magic.from_buffer(content[:2048], mime=True)
-        valid_mime_types = [
-            'image/jpeg', 'image/png', 'image/bmp', 
-            'image/tiff', 'image/x-ms-bmp'
-        ]
-        
-        if mime_type not in valid_mime_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file format. Detected: {mime_type}"
+        probe = probe_image(data, complete=complete)
+        probe.check_limits(settings.MIN_IMAGE_DIMENSION, settings.MAX_IMAGE_PIXELS)
+    except IncompleteHeaderError:
+        raise
+    except ImageProbeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+    return probe
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"File too large. Maximum size: {max_size / (1024*1024):.1f}MB"
+    )
+
+class ImageIngest:
+    """
+    Incremental validation, hashing and assembly of one image upload
+    
+    Chunks are fed as they arrive: the size limit is enforced as soon as it
+    is exceeded, the MIME type is sniffed once enough leading bytes are in,
+    the header is probed once all of it has arrived, and the content hash
+    is updated chunk by chunk. Chunks are assembled in a single buffer that
+    becomes the stored blob, so no second copy is made.
+    """
+    
+    def __init__(
+        self,
+        filename: Optional[str],
+        key: str,
+        max_size: Optional[int] = None,
+        expected_size: Optional[int] = None,
+        content_type: Optional[str] = None
+    ):
+        """
+        Args:
+            filename: Client filename, checked for a supported extension
+            key: Blob store key to store the image under
+            max_size: Size limit in bytes (defaults to MAX_UPLOAD_SIZE)
+            expected_size: Size announced by the client, if known
+            content_type: Client content type, used if sniffing is unavailable
+            
+        Raises:
+            HTTPException: If the filename or announced size is invalid
+        """
+        self.key = key
+        self.max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+        self.size = 0
+        self._content_type = content_type
+        validate_image_filename(filename)
+        if expected_size is not None and expected_size > self.max_size:
+            raise _too_large(self.max_size)
+        # Grown chunk by chunk, so memory is only committed for bytes received
+        self._buffer = bytearray()
+        self._hasher = content_hasher()
+        self._sniffed = False
+        # Upload size at which the header is probed next, None once resolved
+        self._probe_at: Optional[int] = _SNIFF_BYTES
+    
+    @property
+    def digest(self) -> str:
+        """content_digest() of the bytes fed so far"""
+        return self._hasher.hexdigest()
+    
+    @property
+    def header_checked(self) -> bool:
+        """Whether the type and header checks made before the whole file arrives are done"""
+        return self._sniffed and self._probe_at is None
+    
+    def feed(self, chunk: bytes) -> None:
+        """
+        Append the next chunk of the upload
+        
+        Raises:
+            HTTPException: If the upload exceeds the size limit or is not a supported image
+        """
+        if self.size + len(chunk) > self.max_size:
+            raise _too_large(self.max_size)
+        self._buffer += chunk
+        self.size += len(chunk)
+        self._hasher.update(chunk)
+        if not self._sniffed and self.size >= _SNIFF_BYTES:
+            self._sniff()
+        if self._probe_at is not None and self.size >= self._probe_at:
+            self._probe_head()
+    
+    def finish(self) -> IngestedImage:
+        """
+        Store the assembled image in the blob store
+        
+        Images larger than UPLOAD_NORMALIZE_LONG_SIDE are replaced by a
+        normalized working copy, and with UPLOAD_VERIFY_DECODE the image data
+        is decoded to reject corrupt files. Both decode the image, so call
+        this off the event loop when either is enabled.
+        
+        Raises:
+            HTTPException: If the upload is empty or not a supported image
+        """
+        if self.size == 0:
+            raise HTTPException(status_code=400, detail="Empty file uploaded")
+        if not self._sniffed:
+            self._sniff()
+        # Header checks were done early; the whole file is needed for truncation checks
+        probe = probe_upload(self._buffer)
+        original = memoryview(self._buffer).toreadonly()
+        
+        try:
+            normalized = normalize_image(
+                original, probe, settings.UPLOAD_NORMALIZE_LONG_SIDE, settings.UPLOAD_NORMALIZE_JPEG_QUALITY
             )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+        if normalized is None and settings.UPLOAD_VERIFY_DECODE:
+            # A 1/8 decode still reads every JPEG scan, at a fraction of the cost
+            try:
+                DecodedImage(original, probe).reduced(8)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+        if normalized is None:
+            content_hash = store.put_content(
+                self.key,
+                original,
+                content_type=self._content_type,
+                ttl_seconds=settings.MEMORY_TTL_SECONDS,
+                digest=self._hasher.hexdigest()
+            )
+            return IngestedImage(
+                key=self.key,
+                size=self.size,
+                content_hash=content_hash,
+                content_type=self._content_type,
+                probe=probe
+            )
+        
+        # Recorded before the copy is stored, so analysis never sees it unrecorded
+        digest = content_digest(normalized.data)
+        record_normalization(digest, normalized.normalization)
+        content_hash = store.put_content(
+            self.key,
+            normalized.data,
+            content_type="image/jpeg",
+            ttl_seconds=settings.MEMORY_TTL_SECONDS,
+            digest=digest
+        )
+        return IngestedImage(
+            key=self.key,
+            size=self.size,
+            content_hash=content_hash,
+            content_type="image/jpeg",
+            probe=normalized.probe,
+            normalization=normalized.normalization
+        )
+    
+    def _sniff(self) -> None:
+        self._sniffed = True
+        head = bytes(self._buffer[:min(self.size, _SNIFF_BYTES)])
+        mime_type = sniff_image_mime(head)
+        if mime_type:
+            self._content_type = mime_type
+    
+    def _probe_head(self) -> None:
+        # Reject bad headers and resolutions before the rest is received
+        try:
+            probe_upload(bytes(self._buffer), complete=False)
+        except IncompleteHeaderError:
+            self._probe_at = self.size * 2 if self.size < _EARLY_PROBE_MAX_BYTES else None
+            return
+        self._probe_at = None
+
+async def ingest_image_upload(
+    file: UploadFile,
+    key: str,
+    max_size: Optional[int] = None
+) -> IngestedImage:
+    """
+    Validate an uploaded image and write it to the blob store in one pass
+    
+    The upload is read once in UPLOAD_CHUNK_SIZE chunks through ImageIngest.
+    
+    Args:
+        file: Uploaded file
+        key: Blob store key to store the image under
+        max_size: Size limit in bytes (defaults to MAX_UPLOAD_SIZE)
+        
+    Returns:
+        Stored image info
+        
+    Raises:
+        HTTPException: If the file is invalid
+    """
+    ingest = ImageIngest(file.filename, key, max_size=max_size, expected_size=file.size, content_type=file.content_type)
+    while True:
+        chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        ingest.feed(chunk)
+    return await asyncio.to_thread(ingest.finish)
+
+def ingest_upload_file(
+    file: UploadFile,
+    key: str,
+    max_size: Optional[int] = None
+) -> IngestedImage:
+    """
+    Validate a received multipart upload and write it to the blob store
+    
+    Reads the upload's spooled file directly, once, in UPLOAD_CHUNK_SIZE
+    chunks through ImageIngest. Blocking; meant to run on a worker thread,
+    so the files of one request can be ingested in parallel.
+    
+    Args:
+        file: Uploaded file, already received
+        key: Blob store key to store the image under
+        max_size: Size limit in bytes (defaults to MAX_UPLOAD_SIZE)
+        
+    Returns:
+        Stored image info
+        
+    Raises:
+        HTTPException: If the file is invalid
+    """
+    ingest = ImageIngest(file.filename, key, max_size=max_size, expected_size=file.size, content_type=file.content_type)
+    file.file.seek(0)
+    while True:
+        chunk = file.file.read(settings.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        ingest.feed(chunk)
+    return ingest.finish()
+
+def ingest_image_bytes(
+    filename: str,
+    key: str,
+    data: bytes,
+    max_size: Optional[int] = None
+) -> IngestedImage:
+    """
+    Validate an image already held in memory and write it to the blob store
+
+    Blocking; meant to run on a worker thread.
+
+    Args:
+        filename: Original filename, checked for a supported extension
+        key: Blob store key to store the image under
+        data: Encoded image
+        max_size: Size limit in bytes (defaults to MAX_UPLOAD_SIZE)
+
+    Returns:
+        Stored image info
+
+    Raises:
+        HTTPException: If the image is invalid
+    """
+    ingest = ImageIngest(filename, key, max_size=max_size, expected_size=len(data))
+    ingest.feed(data)
+    return ingest.finish()
+
+def ingest_image_file(
+    path: str,
+    key: str,
+    max_size: Optional[int] = None
+) -> IngestedImage:
+    """
+    Validate an image file on local disk and write it to the blob store
+
+    The file is read once in UPLOAD_CHUNK_SIZE chunks through ImageIngest.
+    Blocking; meant to run on a worker thread.
+
+    Args:
+        path: Image file
+        key: Blob store key to store the image under
+        max_size: Size limit in bytes (defaults to MAX_UPLOAD_SIZE)
+
+    Returns:
+        Stored image info
+
+    Raises:
+        HTTPException: If the image is invalid
+        OSError: If the file cannot be read
+    """
+    with open(path, "rb") as f:
+        ingest = ImageIngest(Path(path).name, key, max_size=max_size, expected_size=os.fstat(f.fileno()).st_size)
+        while True:
+            chunk = f.read(settings.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            ingest.feed(chunk)
+    return ingest.finish()
+
+def is_image_filename(name: str) -> bool:
+    """Whether a file or archive member name looks like an image rather than metadata, OS clutter or a hidden temporary file"""
+    path = Path(name)
+    if path.name.startswith(".") or "__MACOSX" in path.parts:
+        return False
+    return path.suffix.lower() in settings.ALLOWED_IMAGE_EXTENSIONS
+
+@dataclass
+class StreamedPart:
+    """A file part of a streamed multipart body, stored or rejected"""
+    filename: str
+    image: Optional[IngestedImage] = None
+    error: Optional[str] = None
+
+class ImagePartStream:
+    """
+    Incremental multipart/form-data reader for image uploads
+    
+    Request body chunks are fed as they arrive. Each file part streams
+    through its own ImageIngest and is returned by feed() as soon as its
+    closing boundary has been parsed, so callers can act on every image
+    without waiting for the rest of the body. Plain form fields are
+    skipped: analysis starts before they would arrive, so batch options
+    belong in the query string.
+    """
+    
+    def __init__(
+        self,
+        content_type: str,
+        make_key: Callable[[str], str],
+        max_files: int,
+        max_total_size: int
+    ):
+        """
+        Args:
+            content_type: Request Content-Type header carrying the boundary
+            make_key: Maps a client filename to the blob store key for it
+            max_files: File parts beyond this count are rejected
+            max_total_size: Total stored bytes beyond which parts are rejected
             
-    except Exception as e:
-        logger.warning(f"MIME type detection failed: {str(e)}")
-        # Continue without MIME validation if magic fails
+        Raises:
+            HTTPException: If the body is not multipart/form-data with a boundary
+        """
+        media_type, params = parse_options_header(content_type)
+        if media_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise HTTPException(status_code=415, detail="Expected a multipart/form-data body")
+        self.files = 0
+        self.total_bytes = 0
+        self._make_key = make_key
+        self._max_files = max_files
+        self._max_total_size = max_total_size
+        self._done: List[StreamedPart] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._part: Optional[StreamedPart] = None
+        self._ingest: Optional[ImageIngest] = None
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+    
+    def feed(self, chunk: bytes) -> List[StreamedPart]:
+        """
+        Parse the next body chunk
+        
+        Completing a part stores it, and with upload normalization enabled
+        also decodes it, so callers on the event loop should run this in a
+        worker thread.
+        
+        Returns:
+            File parts completed by this chunk, in body order
+            
+        Raises:
+            HTTPException: If the body is not valid multipart data
+        """
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise HTTPException(status_code=400, detail=f"Malformed multipart body: {str(e)}")
+        done, self._done = self._done, []
+        return done
+    
+    def finish(self) -> List[StreamedPart]:
+        """Flush the parser at end of body and return any remaining parts"""
+        try:
+            self._parser.finalize()
+        except MultipartParseError as e:
+            raise HTTPException(status_code=400, detail=f"Malformed multipart body: {str(e)}")
+        done, self._done = self._done, []
+        return done
+    
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._part = None
+        self._ingest = None
+    
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+    
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+    
+    def _on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+    
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"filename" not in options:
+            return
+        
+        filename = options[b"filename"].decode("utf-8", "replace")
+        self._part = StreamedPart(filename=filename)
+        self.files += 1
+        try:
+            if self.files > self._max_files:
+                raise HTTPException(status_code=400, detail=f"Batch size exceeds maximum of {self._max_files} images")
+            remaining = self._max_total_size - self.total_bytes
+            if remaining <= 0:
+                raise HTTPException(status_code=413, detail="Batch exceeds maximum total size")
+            content_type = self._headers.get(b"content-type")
+            self._ingest = ImageIngest(
+                filename,
+                self._make_key(filename),
+                max_size=min(settings.MAX_UPLOAD_SIZE, remaining),
+                content_type=content_type.decode("latin-1") if content_type else None
+            )
+        except HTTPException as e:
+            self._part.error = e.detail
+    
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._ingest is None:
+            return
+        try:
+            self._ingest.feed(data[start:end])
+        except HTTPException as e:
+            # Drop what was buffered and skip the rest of this part
+            self._part.error = e.detail
+            self._ingest = None
+    
+    def _on_part_end(self) -> None:
+        if self._part is None:
+            return
+        if self._ingest is not None:
+            try:
+                self._part.image = self._ingest.finish()
+                self.total_bytes += self._part.image.size
+            except HTTPException as e:
+                self._part.error = e.detail
+            except Exception as e:
+                logger.error(f"Error storing streamed upload {self._part.filename}: {str(e)}")
+                self._part.error = str(e)
+        self._done.append(self._part)
+        self._part = None
+        self._ingest = None
 
 def generate_unique_filename(original_filename: str) -> str:
     """
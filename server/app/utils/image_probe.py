@@ -0,0 +1,282 @@
+"""
+Header-only image probing
+
+Reads the dimensions of JPEG, PNG, TIFF and BMP images from their headers
+without decoding pixel data, and catches the common kinds of corruption
+(bad signatures, malformed segment chains, header CRC mismatches, files cut
+off before their end marker). Used wherever the app only needs to know
+whether an image is usable and how large it is.
+"""
+
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Bytes read per step by probe_image_file
+_FILE_PROBE_BYTES = 64 * 1024
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Start-of-frame markers; C4 (DHT), C8 (JPG) and CC (DAC) share the range
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Bytes at the end of a JPEG searched first for its end-of-image marker
+_JPEG_TAIL_BYTES = 4096
+# Markers that carry no length field
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+_TIFF_TAG_WIDTH = 256
+_TIFF_TAG_HEIGHT = 257
+_TIFF_TAG_ORIENTATION = 274
+
+class ImageProbeError(ValueError):
+    """The data is not a supported image or its header is corrupt"""
+
+class IncompleteHeaderError(ImageProbeError):
+    """The header extends past the bytes probed so far"""
+
+@dataclass(frozen=True)
+class ImageProbe:
+    """Format and geometry of an image read from its header"""
+    format: str
+    width: int
+    height: int
+    # EXIF orientation (1-8) of JPEGs; OpenCV applies it when decoding
+    orientation: int = 1
+    # Text of the first JPEG comment segment ahead of the frame header
+    comment: Optional[str] = None
+
+    @property
+    def oriented_size(self) -> Tuple[int, int]:
+        """(width, height) of the image once its orientation is applied"""
+        if self.orientation in (5, 6, 7, 8):
+            return self.height, self.width
+        return self.width, self.height
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    def check_limits(self, min_side: int, max_pixels: int) -> None:
+        """
+        Raises:
+            ImageProbeError: If the image is too small to analyze or too large to decode
+        """
+        width, height = self.oriented_size
+        if width < min_side or height < min_side:
+            raise ImageProbeError(
+                f"Image too small for analysis: {width}x{height} (minimum {min_side}x{min_side})"
+            )
+        if self.pixels > max_pixels:
+            raise ImageProbeError(
+                f"Image resolution too large: {width}x{height} "
+                f"({self.pixels / 1e6:.1f} megapixels, maximum {max_pixels / 1e6:.1f})"
+            )
+
+def probe_image(data: Buffer, complete: bool = True) -> ImageProbe:
+    """
+    Read format and dimensions from the start of an encoded image
+
+    Args:
+        data: Encoded image, or its leading bytes
+        complete: Whether data is the whole file. Enables the checks for
+            images cut short; when False, running out of data raises
+            IncompleteHeaderError so the caller can retry with more bytes.
+
+    Returns:
+        Probed image geometry
+
+    Raises:
+        ImageProbeError: If the format is unsupported or the header is corrupt
+    """
+    data = memoryview(data).cast("B")
+    head = bytes(data[:8])
+    if head.startswith(b"\xff\xd8"):
+        return _probe_jpeg(data, complete)
+    if head.startswith(_PNG_SIGNATURE):
+        return _probe_png(data, complete)
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return _probe_tiff(data, complete)
+    if head.startswith(b"BM"):
+        return _probe_bmp(data, complete)
+    if len(data) < 8 and not complete:
+        raise IncompleteHeaderError("Not enough data to identify the image format")
+    raise ImageProbeError("Unsupported or unrecognized image format")
+
+def probe_image_file(path: str) -> ImageProbe:
+    """
+    probe_image() for a file on disk, reading only as much as the header needs
+
+    Raises:
+        ImageProbeError: If the format is unsupported or the header is corrupt
+        OSError: If the file cannot be read
+    """
+    with open(path, "rb") as f:
+        data = b""
+        while True:
+            chunk = f.read(max(len(data), _FILE_PROBE_BYTES))
+            if not chunk:
+                return probe_image(data, complete=True)
+            data += chunk
+            try:
+                return probe_image(data, complete=False)
+            except IncompleteHeaderError:
+                continue
+
+def _require(data: memoryview, end: int, complete: bool, what: str) -> None:
+    if end <= len(data):
+        return
+    if complete:
+        raise ImageProbeError(f"Image is truncated inside its {what}")
+    raise IncompleteHeaderError(f"Need more data to read the {what}")
+
+def _probe_jpeg(data: memoryview, complete: bool) -> ImageProbe:
+    pos = 2
+    size: Optional[Tuple[int, int]] = None
+    orientation = 1
+    comment: Optional[str] = None
+    while True:
+        _require(data, pos + 2, complete, "JPEG segment chain")
+        if data[pos] != 0xFF:
+            raise ImageProbeError(f"Corrupt JPEG: expected a marker at byte {pos}")
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            pos += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            pos += 2
+            continue
+        if marker == 0xD9:
+            raise ImageProbeError("Corrupt JPEG: image ends before any scan data")
+
+        _require(data, pos + 4, complete, "JPEG segment chain")
+        (length,) = struct.unpack_from(">H", data, pos + 2)
+        if length < 2:
+            raise ImageProbeError(f"Corrupt JPEG: invalid segment length at byte {pos}")
+        segment = pos + 4
+        end = pos + 2 + length
+
+        if marker == 0xE1 and size is None:
+            _require(data, end, complete, "JPEG EXIF segment")
+            if bytes(data[segment:segment + 6]) == b"Exif\x00\x00":
+                try:
+                    tags = _tiff_tags(data[segment + 6:end], (_TIFF_TAG_ORIENTATION,))
+                except ImageProbeError:
+                    # A damaged EXIF block does not make the image unusable
+                    tags = None
+                if tags and 1 <= tags.get(_TIFF_TAG_ORIENTATION, 1) <= 8:
+                    orientation = tags.get(_TIFF_TAG_ORIENTATION, 1)
+        elif marker == 0xFE and size is None and comment is None:
+            _require(data, end, complete, "JPEG comment segment")
+            comment = bytes(data[segment:end]).decode("latin-1")
+        elif marker in _JPEG_SOF_MARKERS:
+            _require(data, segment + 5, complete, "JPEG frame header")
+            height, width = struct.unpack_from(">HH", data, segment + 1)
+            if width == 0 or height == 0:
+                raise ImageProbeError(f"Corrupt JPEG: invalid frame size {width}x{height}")
+            size = (width, height)
+            if not complete:
+                break
+        elif marker == 0xDA:
+            if size is None:
+                raise ImageProbeError("Corrupt JPEG: scan data before the frame header")
+            # Entropy-coded data escapes 0xFF bytes, so an end marker after
+            # the scan header can only be the real one. The tail is searched
+            # first; files with more trailing data than that (appended
+            # previews, vendor trailers) fall back to a scan from the SOS
+            if (
+                bytes(data[max(end, len(data) - _JPEG_TAIL_BYTES):]).rfind(b"\xff\xd9") < 0
+                and bytes(data[end:]).find(b"\xff\xd9") < 0
+            ):
+                raise ImageProbeError("Corrupt JPEG: image data is truncated")
+            break
+        pos = end
+    return ImageProbe(format="jpeg", width=size[0], height=size[1], orientation=orientation, comment=comment)
+
+def _probe_png(data: memoryview, complete: bool) -> ImageProbe:
+    _require(data, 33, complete, "PNG header")
+    length, chunk_type = struct.unpack_from(">I4s", data, 8)
+    if chunk_type != b"IHDR" or length != 13:
+        raise ImageProbeError("Corrupt PNG: missing image header")
+    width, height = struct.unpack_from(">II", data, 16)
+    (crc,) = struct.unpack_from(">I", data, 29)
+    if zlib.crc32(data[12:29]) != crc:
+        raise ImageProbeError("Corrupt PNG: image header checksum mismatch")
+    if width == 0 or height == 0:
+        raise ImageProbeError(f"Corrupt PNG: invalid image size {width}x{height}")
+    if complete and bytes(data[-1024:]).rfind(b"IEND") < 0:
+        raise ImageProbeError("Corrupt PNG: image data is truncated")
+    return ImageProbe(format="png", width=width, height=height)
+
+def _probe_tiff(data: memoryview, complete: bool) -> ImageProbe:
+    tags = _tiff_tags(data, (_TIFF_TAG_WIDTH, _TIFF_TAG_HEIGHT), complete=complete)
+    if tags is None:
+        raise ImageProbeError("Corrupt TIFF: unreadable image directory")
+    width = tags.get(_TIFF_TAG_WIDTH, 0)
+    height = tags.get(_TIFF_TAG_HEIGHT, 0)
+    if width == 0 or height == 0:
+        raise ImageProbeError(f"Corrupt TIFF: invalid image size {width}x{height}")
+    return ImageProbe(format="tiff", width=width, height=height)
+
+def _probe_bmp(data: memoryview, complete: bool) -> ImageProbe:
+    _require(data, 26, complete, "BMP header")
+    (pixel_offset, header_size) = struct.unpack_from("<II", data, 10)
+    if header_size == 12:
+        width, height, _, bits = struct.unpack_from("<HHHH", data, 18)
+        compression = 0
+    elif header_size >= 40:
+        _require(data, 34, complete, "BMP header")
+        width, height, _, bits, compression = struct.unpack_from("<iiHHI", data, 18)
+    else:
+        raise ImageProbeError(f"Corrupt BMP: unknown header size {header_size}")
+    # Negative heights mark top-down bitmaps
+    height = abs(height)
+    if width <= 0 or height == 0:
+        raise ImageProbeError(f"Corrupt BMP: invalid image size {width}x{height}")
+    if complete:
+        if pixel_offset >= len(data):
+            raise ImageProbeError("Corrupt BMP: pixel data offset is past the end of the file")
+        stride = (width * bits + 31) // 32 * 4
+        if compression == 0 and pixel_offset + stride * height > len(data):
+            raise ImageProbeError("Corrupt BMP: image data is truncated")
+    return ImageProbe(format="bmp", width=width, height=height)
+
+def _tiff_tags(
+    data: memoryview,
+    wanted: Tuple[int, ...],
+    complete: bool = True
+) -> Optional[Dict[int, int]]:
+    """
+    Integer values of the wanted tags in the first IFD of a TIFF structure
+
+    Returns:
+        Found tags, or None if data does not hold a readable TIFF header
+    """
+    _require(data, 8, complete, "TIFF header")
+    order = bytes(data[:2])
+    if order == b"II":
+        endian = "<"
+    elif order == b"MM":
+        endian = ">"
+    else:
+        return None
+    magic, ifd = struct.unpack_from(endian + "HI", data, 2)
+    if magic != 42 or ifd < 8:
+        return None
+    _require(data, ifd + 2, complete, "TIFF image directory")
+    (entries,) = struct.unpack_from(endian + "H", data, ifd)
+    _require(data, ifd + 2 + entries * 12, complete, "TIFF image directory")
+
+    tags: Dict[int, int] = {}
+    for i in range(entries):
+        tag, value_type, count = struct.unpack_from(endian + "HHI", data, ifd + 2 + i * 12)
+        if tag not in wanted or count != 1:
+            continue
+        if value_type == 3:  # SHORT
+            (tags[tag],) = struct.unpack_from(endian + "H", data, ifd + 10 + i * 12)
+        elif value_type == 4:  # LONG
+            (tags[tag],) = struct.unpack_from(endian + "I", data, ifd + 10 + i * 12)
+    return tags
@@ -0,0 +1,146 @@
+"""
+Batch manifests
+
+A manifest lists server-side image files for one batch, either as CSV (a
+column named path, image_path, image, file or filename, or else the first
+column) or as NDJSON (one object with one of those keys per line, or a bare
+JSON string). A directory glob can stand in for a manifest.
+
+Manifests name files on the server, so every path, base directory and glob
+is confined to a root directory (MANIFEST_ROOT): relative paths resolve
+against it, '..' is refused, and anything that lands outside it, symlinks
+included, is an error.
+"""
+
+import csv
+import glob
+import io
+import json
+import os
+from typing import List, Optional
+
+from app.utils.file_utils import is_image_filename
+
+_PATH_COLUMNS = ("path", "image_path", "image", "file", "filename")
+
+class ManifestError(ValueError):
+    """The manifest is malformed, empty or too long"""
+
+def parse_manifest(
+    data: bytes,
+    max_entries: int,
+    root: str,
+    base_dir: Optional[str] = None,
+    content_type: Optional[str] = None
+) -> List[str]:
+    """
+    Image paths listed in a CSV or NDJSON manifest, in manifest order
+
+    Args:
+        data: Manifest contents
+        max_entries: Maximum number of images
+        root: Directory every listed path must be inside
+        base_dir: Directory relative paths are resolved against, itself
+            relative to root (defaults to root)
+        content_type: Request content type; the format is sniffed when it
+            is neither CSV nor NDJSON
+
+    Raises:
+        ManifestError: If the manifest is malformed, lists no images, lists
+            more than max_entries or names a path outside root
+    """
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ManifestError("Manifest is not UTF-8 text")
+
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"):
+        is_ndjson = True
+    elif media_type == "text/csv":
+        is_ndjson = False
+    else:
+        first = text.lstrip()[:1]
+        is_ndjson = first in ("{", '"')
+
+    paths = _ndjson_paths(text) if is_ndjson else _csv_paths(text)
+    if not paths:
+        raise ManifestError("Manifest lists no images")
+    if len(paths) > max_entries:
+        raise ManifestError(f"Manifest lists {len(paths)} images; maximum is {max_entries}")
+    root = os.path.realpath(root)
+    base = _confine(base_dir, root) if base_dir else root
+    return [path if path.startswith("mem://") else _confine(os.path.join(base, path), root) for path in paths]
+
+def glob_manifest(pattern: str, max_entries: int, root: str) -> List[str]:
+    """
+    Image files matching a server-side glob pattern (** recurses), sorted
+
+    Args:
+        pattern: Glob pattern, relative to root or absolute inside it
+        max_entries: Maximum number of images
+        root: Directory matches must be inside; matches that are symlinks
+            leading out of it are skipped
+
+    Raises:
+        ManifestError: If the pattern leaves root, nothing matches or more
+            than max_entries images match
+    """
+    root = os.path.realpath(root)
+    paths = []
+    for path in glob.iglob(_confine(pattern, root), recursive=True):
+        if not is_image_filename(path) or not os.path.isfile(path) or not _within(os.path.realpath(path), root):
+            continue
+        paths.append(path)
+        if len(paths) > max_entries:
+            raise ManifestError(f"Glob matches more than {max_entries} images")
+    if not paths:
+        raise ManifestError(f"No images match {pattern}")
+    return sorted(paths)
+
+def _csv_paths(text: str) -> List[str]:
+    rows = [row for row in csv.reader(io.StringIO(text)) if row and any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    column = next((header.index(name) for name in _PATH_COLUMNS if name in header), None)
+    first_line = 1
+    if column is not None:
+        rows = rows[1:]
+        first_line = 2
+    else:
+        column = 0
+    paths = []
+    for line, row in enumerate(rows, start=first_line):
+        if column >= len(row) or not row[column].strip():
+            raise ManifestError(f"Manifest entry {line} has no image path")
+        paths.append(row[column].strip())
+    return paths
+
+def _ndjson_paths(text: str) -> List[str]:
+    paths = []
+    for line, raw in enumerate(text.splitlines(), start=1):
+        if not raw.strip():
+            continue
+        try:
+            entry = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise ManifestError(f"Manifest line {line} is not valid JSON: {str(e)}")
+        if isinstance(entry, dict):
+            entry = next((entry[name] for name in _PATH_COLUMNS if name in entry), None)
+        if not isinstance(entry, str) or not entry.strip():
+            raise ManifestError(f"Manifest line {line} has no image path")
+        paths.append(entry.strip())
+    return paths
+
+def _confine(path: str, root: str) -> str:
+    """path resolved against the resolved root; raises ManifestError if it leaves root"""
+    if ".." in path.replace("\\", "/").split("/"):
+        raise ManifestError(f"Path {path} must not contain '..'")
+    resolved = os.path.normpath(os.path.join(root, path))
+    if not _within(os.path.realpath(resolved), root):
+        raise ManifestError(f"Path {path} is outside the manifest root")
+    return resolved
+
+def _within(path: str, root: str) -> bool:
+    return os.path.commonpath([path, root]) == root
@@ -41,17 +41,26 @@ def main():
     logger.info(f"🤖 Model: {settings.MODEL_PATH}")
     logger.info(f"📐 Grid Size: {settings.GRID_SQUARE_SIZE_INCHES} inches")
     logger.info(f"🌐 CORS Origins: {settings.ALLOWED_HOSTS}")
+    logger.info(f"👷 Workers: {settings.SERVER_WORKERS} (storage: {settings.STORAGE_TYPE})")
     logger.info("="*70)
     
+    if settings.SERVER_WORKERS > 1 and settings.STORAGE_TYPE == "memory":
+        logger.warning("Each worker keeps its own in-memory store; use STORAGE_TYPE=shm or s3 to share uploads")
+    
+    if settings.STORAGE_TYPE == "shm":
+        # Workers attach to the arena on import; start from an empty one
+        from app.services.shm_storage import reset_arena
+        reset_arena(settings.SHM_ARENA_NAME)
+    
     # Start the server
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=settings.SERVER_WORKERS == 1,  # Reload only works with a single worker
         log_level="info",
         access_log=True,
-        workers=1  # Single worker for development
+        workers=settings.SERVER_WORKERS
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+"""
+Shared fixtures for the API tests
+
+The app is configured through environment variables before it is imported:
+the result database, batch archives and model path live in a temporary
+directory, and the detection model is replaced by a stand-in so no weights
+are needed. The vision pipeline itself is replaced by a fake analyze_image
+that only reads the image header.
+"""
+
+import os
+import tempfile
+import uuid
+from datetime import datetime
+
+import cv2
+import numpy as np
+import pytest
+
+_TMP_DIR = tempfile.mkdtemp(prefix="octapulse-tests-")
+_MODEL_PATH = os.path.join(_TMP_DIR, "model.pt")
+open(_MODEL_PATH, "wb").close()
+os.environ["MODEL_PATH"] = _MODEL_PATH
+os.environ["RESULT_DB_PATH"] = os.path.join(_TMP_DIR, "results.db")
+os.environ["BATCH_ARCHIVE_DIR"] = os.path.join(_TMP_DIR, "archive")
+os.environ["WATCH_FOLDERS"] = "[]"
+
+import ultralytics  # noqa: E402
+
+
+class _StandInModel:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def predict(self, *args, **kwargs):
+        return []
+
+
+ultralytics.YOLO = _StandInModel
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.fish_analysis import (  # noqa: E402
+    AnalysisStatus, CalibrationInfo, FishAnalysisResult, ImageDimensions, ProcessingMetadata
+)
+from app.services.fish_measurement import fish_measurement_service  # noqa: E402
+from app.services.storage import store  # noqa: E402
+from app.utils.image_probe import probe_image  # noqa: E402
+
+
+def make_jpeg(width: int = 320, height: int = 240, seed: int = 0) -> bytes:
+    """A random JPEG of the given size"""
+    rng = np.random.default_rng(seed)
+    ok, encoded = cv2.imencode(".jpg", rng.integers(0, 255, (height, width, 3), dtype=np.uint8))
+    assert ok
+    return encoded.tobytes()
+
+
+def read_image_bytes(image_path: str) -> bytes:
+    """The stored bytes of a mem:// key or disk path"""
+    if image_path.startswith("mem://"):
+        return bytes(store.get(image_path)[0])
+    with open(image_path, "rb") as f:
+        return f.read()
+
+
+def _fake_analyze_image(image_path: str, grid_square_size: float = 1.0, *args, **kwargs) -> FishAnalysisResult:
+    width, height = probe_image(read_image_bytes(image_path)).oriented_size
+    return make_result(image_path, width, height, grid_square_size)
+
+
+def make_result(image_path: str, width: int = 320, height: int = 240, grid_square_size: float = 1.0) -> FishAnalysisResult:
+    """A completed result for image_path"""
+    return FishAnalysisResult(
+        analysis_id=str(uuid.uuid4()),
+        image_path=image_path,
+        status=AnalysisStatus.COMPLETED,
+        image_dimensions=ImageDimensions(width=width, height=height),
+        calibration=CalibrationInfo(pixels_per_inch=100.0, grid_square_size_inches=grid_square_size, detected_squares=1),
+        detections={"trout": 1},
+        detailed_detections=[],
+        measurements=[],
+        processing_metadata=ProcessingMetadata(
+            processing_time_seconds=0.0,
+            model_version="test",
+            api_version=settings.VERSION,
+            processed_at=datetime.utcnow()
+        )
+    )
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    One app instance for the whole session, since shutdown stops the worker
+    pool and closes the result database for good
+    """
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(fish_measurement_service, "analyze_image", _fake_analyze_image)
+        with TestClient(app) as test_client:
+            yield test_client
@@ -0,0 +1,74 @@
+"""
+Admission control: 429/503 with Retry-After
+"""
+
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services import admission as admission_module
+from app.services.admission import AdmissionController, admission_controller
+from app.services.storage import store
+from conftest import make_jpeg
+
+API = "/api/v1"
+
+
+def test_idle_node_admits_an_oversized_batch(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_PENDING_IMAGES", 2)
+    controller = AdmissionController()
+
+    controller.admit_analysis(10)
+
+    assert controller.stats()["pending_images"] == 10
+    with pytest.raises(HTTPException) as excinfo:
+        controller.admit_analysis(1)
+    assert excinfo.value.status_code == 429
+    assert int(excinfo.value.headers["Retry-After"]) >= 1
+
+    controller.release(10)
+    controller.admit_analysis(1)
+
+
+def test_backlog_estimate_bounds_latency_sensitive_requests(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_DEFAULT_IMAGE_SECONDS", 10.0)
+    controller = AdmissionController()
+    controller.admit_analysis(1)
+
+    with pytest.raises(HTTPException) as excinfo:
+        controller.admit_analysis(1, max_wait_seconds=1.0)
+
+    assert excinfo.value.status_code == 429
+    assert controller.stats()["rejected_requests"] == 1
+    controller.admit_analysis(1)
+    controller.observe(2.0)
+    assert controller.stats()["average_image_seconds"] == 8.4
+
+
+def test_full_analysis_queue_rejects_batches_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_PENDING_IMAGES", 1)
+    key = f"mem://{uuid.uuid4()}/fish.jpg"
+    store.put(key, make_jpeg(), content_type="image/jpeg")
+    admission_controller.admit_analysis(1)
+    try:
+        response = client.post(f"{API}/analysis/batch", json={"images": [key]})
+    finally:
+        admission_controller.release(1)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert store.exists(key)
+
+
+def test_full_store_rejects_uploads_with_503(client, monkeypatch):
+    monkeypatch.setattr(admission_module.store, "near_capacity", lambda fraction, pending_bytes=0: True)
+
+    response = client.post(
+        f"{API}/upload/single",
+        files={"file": ("fish.jpg", make_jpeg(), "image/jpeg")}
+    )
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 5
@@ -0,0 +1,70 @@
+"""
+Single-image analysis on the shared worker executor
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.services.analysis_executor import AnalysisExecutor
+from app.services.fish_measurement import fish_measurement_service
+from app.services.storage import store
+from conftest import make_jpeg
+
+API = "/api/v1/analysis"
+
+
+def test_single_analysis_runs_off_the_event_loop(client):
+    key = f"mem://{uuid.uuid4()}/fish.jpg"
+    store.put(key, make_jpeg(640, 480), content_type="image/jpeg")
+
+    response = client.post(f"{API}/single", json={"image_path": key})
+
+    assert response.status_code == 200
+    assert response.json()["image_dimensions"] == {"width": 640, "height": 480}
+
+
+def test_single_analysis_timeout_cancels_the_worker(client, monkeypatch):
+    seen = {}
+
+    def slow_analyze_image(image_path, *args, cancel_event=None, **kwargs):
+        seen["event"] = cancel_event
+        cancel_event.wait(10)
+
+    monkeypatch.setattr(fish_measurement_service, "analyze_image", slow_analyze_image)
+    monkeypatch.setattr(settings, "ANALYSIS_TIMEOUT_SECONDS", 0.1)
+    key = f"mem://{uuid.uuid4()}/fish.jpg"
+    store.put(key, make_jpeg(), content_type="image/jpeg")
+
+    response = client.post(f"{API}/single", json={"image_path": key})
+
+    assert response.status_code == 504
+    assert seen["event"].is_set()
+
+
+def test_executor_counts_queued_and_running_work():
+    executor = AnalysisExecutor(1)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(executor.run(release.wait, 10))
+        second = asyncio.ensure_future(executor.run(lambda: "done"))
+        while executor.stats()["running"] == 0:
+            await asyncio.sleep(0.01)
+        busy = executor.stats()
+        release.set()
+        return busy, await first, await second
+
+    try:
+        busy, first, second = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert busy == {"workers": 1, "queued": 1, "running": 1}
+    assert (first, second) == (True, "done")
+    deadline = time.monotonic() + 5
+    while executor.stats()["running"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert executor.stats() == {"workers": 1, "queued": 0, "running": 0}
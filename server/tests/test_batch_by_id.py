@@ -0,0 +1,51 @@
+"""
+Starting a batch from its batch_id alone
+"""
+
+import time
+import uuid
+
+from app.core.config import settings
+from app.services.in_memory_storage import make_mem_image_key
+from app.services.storage import store
+from conftest import make_jpeg
+
+API = "/api/v1/analysis"
+
+
+def test_batch_id_resolves_its_uploads(client):
+    batch_id = str(uuid.uuid4())
+    keys = [make_mem_image_key(batch_id, f"fish_{i}.jpg") for i in range(3)]
+    for i, key in enumerate(keys):
+        store.put(key, make_jpeg(seed=i), content_type="image/jpeg")
+    store.put(make_mem_image_key(str(uuid.uuid4()), "other.jpg"), make_jpeg(), content_type="image/jpeg")
+
+    response = client.post(f"{API}/batch", json={"batch_id": batch_id})
+
+    assert response.status_code == 200
+    assert response.json()["total_images"] == 3
+    deadline = time.monotonic() + 10
+    while client.get(f"{API}/batch/{batch_id}/status").json()["status"] != "completed":
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    results = client.get(f"{API}/batch/{batch_id}/results/paginated", params={"per_page": 10}).json()["items"]
+    assert sorted(r["image_path"] for r in results) == sorted(keys)
+
+
+def test_batch_id_over_the_size_limit_is_rejected_and_unpinned(client, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_BATCH_SIZE", 2)
+    batch_id = str(uuid.uuid4())
+    keys = [make_mem_image_key(batch_id, f"fish_{i}.jpg") for i in range(3)]
+    for key in keys:
+        store.put(key, make_jpeg(), content_type="image/jpeg")
+    pinned_before = store.stats()["pinned"]
+
+    response = client.post(f"{API}/batch", json={"batch_id": batch_id})
+
+    assert response.status_code == 400
+    assert store.stats()["pinned"] == pinned_before
+
+
+def test_batch_needs_images_or_a_batch_id(client):
+    assert client.post(f"{API}/batch", json={}).status_code == 400
+    assert client.post(f"{API}/batch", json={"batch_id": str(uuid.uuid4())}).status_code == 400
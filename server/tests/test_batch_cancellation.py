@@ -0,0 +1,99 @@
+"""
+Cancelling a running batch
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.services.fish_measurement import AnalysisCancelledError, fish_measurement_service
+from app.services.storage import store
+from conftest import make_jpeg
+
+API = "/api/v1/analysis"
+
+
+def put_images(count: int) -> list:
+    batch_id = str(uuid.uuid4())
+    keys = []
+    for i in range(count):
+        key = f"mem://{batch_id}/fish_{i}.jpg"
+        store.put(key, make_jpeg(seed=i), content_type="image/jpeg")
+        keys.append(key)
+    return keys
+
+
+def wait_for_status(client, batch_id: str, statuses: tuple, timeout: float = 10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f"{API}/batch/{batch_id}/status").json()
+        if status["status"] in statuses or time.monotonic() > deadline:
+            return status
+        time.sleep(0.02)
+
+
+def test_cancel_stops_in_flight_images_and_releases_queued_uploads(client, monkeypatch):
+    started = threading.Semaphore(0)
+
+    def blocking_analyze_image(image_path, *args, cancel_event=None, **kwargs):
+        started.release()
+        while not cancel_event.is_set():
+            time.sleep(0.01)
+        raise AnalysisCancelledError("Analysis cancelled before segmentation")
+
+    monkeypatch.setattr(fish_measurement_service, "analyze_image", blocking_analyze_image)
+    images = put_images(settings.CONCURRENCY_LIMIT + 2)
+    batch_id = str(uuid.uuid4())
+
+    # The background task runs inside the POST, so it is issued from another thread
+    poster = threading.Thread(target=client.post, args=(f"{API}/batch",), kwargs={
+        "json": {"images": images, "batch_id": batch_id}
+    })
+    poster.start()
+    for _ in range(settings.CONCURRENCY_LIMIT):
+        assert started.acquire(timeout=10)
+
+    response = client.delete(f"{API}/batch/{batch_id}")
+    poster.join(timeout=10)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    # Queued tasks may release their own upload before the endpoint gets to it
+    assert response.json()["released_images"] <= len(images)
+    status = wait_for_status(client, batch_id, ("cancelled",))
+    assert status["status"] == "cancelled"
+    assert status["completed_images"] == 0
+    assert status["failed_images"] == 0
+    assert not any(store.exists(key) for key in images)
+
+
+def test_finished_batch_cannot_be_cancelled(client):
+    batch_id = str(uuid.uuid4())
+    client.post(f"{API}/batch", json={"images": put_images(1), "batch_id": batch_id})
+
+    assert wait_for_status(client, batch_id, ("completed",))["status"] == "completed"
+    assert client.delete(f"{API}/batch/{batch_id}").status_code == 400
+    assert client.delete(f"{API}/batch/{uuid.uuid4()}").status_code == 404
+
+
+def test_batch_unpins_images_off_the_event_loop(client, monkeypatch):
+    unpin = store.unpin
+    on_loop = []
+
+    def recording_unpin(key):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        unpin(key)
+
+    monkeypatch.setattr(store, "unpin", recording_unpin)
+    images = put_images(2)
+    batch_id = str(uuid.uuid4())
+    client.post(f"{API}/batch", json={"images": images + ["mem://missing/fish.jpg"], "batch_id": batch_id})
+
+    assert wait_for_status(client, batch_id, ("completed",))["status"] == "completed"
+    assert on_loop and not any(on_loop)
@@ -0,0 +1,96 @@
+"""
+Server-sent batch progress events
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+
+from app.services.batch_events import BatchEventBroker, batch_events
+from app.services.fish_measurement import fish_measurement_service
+from app.services.storage import store
+from conftest import make_jpeg, make_result
+
+API = "/api/v1/analysis"
+
+
+def parse_events(body: str) -> list:
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_slow_subscriber_drops_its_oldest_events():
+    broker = BatchEventBroker(queue_size=2)
+
+    async def scenario():
+        queue = broker.subscribe("batch")
+        for i in range(3):
+            broker.publish("batch", "progress", {"completed_images": i})
+        # Publishing from a worker thread is handed to the subscriber's loop
+        await asyncio.to_thread(broker.publish, "batch", "end", {"status": "completed"})
+        await asyncio.sleep(0)
+        received = [queue.get_nowait() for _ in range(queue.qsize())]
+        broker.unsubscribe("batch", queue)
+        return received
+
+    received = asyncio.run(scenario())
+
+    assert received == [("progress", {"completed_images": 2}), ("end", {"status": "completed"})]
+    assert broker.subscriber_count("batch") == 0
+
+
+def test_stream_reports_results_then_ends(client, monkeypatch):
+    release = threading.Event()
+
+    def analyze_image(image_path, *args, **kwargs):
+        release.wait(10)
+        return make_result(image_path)
+
+    monkeypatch.setattr(fish_measurement_service, "analyze_image", analyze_image)
+    batch_id = str(uuid.uuid4())
+    images = [f"mem://{batch_id}/fish_{i}.jpg" for i in range(2)]
+    for key in images:
+        store.put(key, make_jpeg(), content_type="image/jpeg")
+    poster = threading.Thread(target=client.post, args=(f"{API}/batch",), kwargs={
+        "json": {"images": images, "batch_id": batch_id}
+    })
+    poster.start()
+    while client.get(f"{API}/batch/{batch_id}/status").status_code == 404:
+        time.sleep(0.01)
+
+    stream = {}
+    reader = threading.Thread(target=lambda: stream.update(response=client.get(f"{API}/batch/{batch_id}/events")))
+    reader.start()
+    deadline = time.monotonic() + 10
+    while batch_events.subscriber_count(batch_id) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    poster.join(timeout=10)
+    reader.join(timeout=10)
+
+    response = stream["response"]
+    events = parse_events(response.text)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    assert events[0][0] == "progress"
+    assert sorted(data["image_path"] for event, data in events if event == "result") == images
+    assert events[-1] == ("end", {"status": "completed"})
+    assert events[-2][0] == "progress" and events[-2][1]["completed_images"] == 2
+
+
+def test_stream_of_a_finished_batch_ends_immediately(client):
+    batch_id = str(uuid.uuid4())
+    key = f"mem://{batch_id}/fish.jpg"
+    store.put(key, make_jpeg(), content_type="image/jpeg")
+    client.post(f"{API}/batch", json={"images": [key], "batch_id": batch_id})
+
+    events = parse_events(client.get(f"{API}/batch/{batch_id}/events").text)
+
+    assert [event for event, _ in events] == ["progress", "end"]
+    assert client.get(f"{API}/batch/{uuid.uuid4()}/events").status_code == 404
@@ -0,0 +1,92 @@
+"""
+Batch archival and the lifecycle sweeper
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+
+from app.models.fish_analysis import AnalysisStatus
+from app.services.batch_lifecycle import BatchLifecycle
+from app.services import result_db
+from app.services.result_db import ResultDatabase
+
+from conftest import make_result
+
+
+def make_db(tmp_path, batches=2, per_batch=3):
+    db = ResultDatabase(str(tmp_path / "results.db"), str(tmp_path / "archive"))
+    for b in range(batches):
+        batch_id = f"batch-{b}"
+        db.save_batch(batch_id, {"batch_id": batch_id, "status": AnalysisStatus.COMPLETED, "started_at": datetime.utcnow()})
+        for i in range(per_batch):
+            db.insert_result(batch_id, make_result(f"/data/{batch_id}/{i}.jpg"))
+    return db
+
+
+def test_cross_batch_query_reads_archives_without_rehydrating(tmp_path):
+    db = make_db(tmp_path)
+    assert db.archive_batch("batch-0") == 3
+    assert db.archive_batch("batch-1") == 3
+
+    results, total = db.query_results(limit=10)
+
+    assert total == 6
+    assert sorted(r.image_path for r in results) == sorted(
+        f"/data/batch-{b}/{i}.jpg" for b in range(2) for i in range(3)
+    )
+    assert sorted(p.name for p in (tmp_path / "archive").iterdir()) == ["batch-0.ndjson.gz", "batch-1.ndjson.gz"]
+
+    # Reading one batch brings it back
+    results, total = db.query_results(batch_id="batch-0")
+    assert total == 3 and len(results) == 3
+    assert [p.name for p in (tmp_path / "archive").iterdir()] == ["batch-1.ndjson.gz"]
+    db.close()
+
+
+def test_archives_are_read_and_parsed_outside_the_database_lock(tmp_path, monkeypatch):
+    db = make_db(tmp_path, batches=1)
+    db.archive_batch("batch-0")
+    # A result replaced while the batch was archived keeps its new document
+    replacement = make_result("/data/batch-0/replaced.jpg")
+    archived_id = db.query_results(limit=1)[0][0].analysis_id
+    replacement.analysis_id = archived_id
+    db.insert_result("batch-0", replacement)
+    lock_held = []
+    open_archive = result_db.gzip.open
+
+    def _open(*args, **kwargs):
+        lock_held.append(db._lock.locked())
+        return open_archive(*args, **kwargs)
+
+    monkeypatch.setattr(result_db.gzip, "open", _open)
+
+    results, total = db.query_results(batch_id="batch-0")
+
+    assert lock_held == [False]
+    assert total == 3
+    assert db.get_result(archived_id).image_path == "/data/batch-0/replaced.jpg"
+    assert not (tmp_path / "archive" / "batch-0.ndjson.gz").exists()
+    db.close()
+
+
+def test_sweeper_runs_evictors_on_the_event_loop(tmp_path):
+    db = make_db(tmp_path, batches=0)
+    lifecycle = BatchLifecycle(db, memory_idle_seconds=60, archive_after_seconds=0, retention_seconds=0)
+    threads = []
+
+    def evictor(max_idle_seconds):
+        threads.append(threading.current_thread())
+        return 1
+
+    lifecycle.register_evictor(evictor)
+
+    async def run():
+        lifecycle.start_sweeper(0.01, asyncio.get_running_loop())
+        while not threads:
+            await asyncio.sleep(0.01)
+        lifecycle.stop_sweeper()
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+    assert threads[0] is threading.main_thread()
+    db.close()
@@ -0,0 +1,82 @@
+"""
+Batch status saved by other worker processes
+"""
+
+import asyncio
+import uuid
+from datetime import datetime
+
+from app.api.v1.endpoints.analysis import batch_analysis_status
+from app.models.fish_analysis import AnalysisStatus
+from app.services import result_db as result_db_module
+from app.services.result_db import owner_alive, process_owner, result_db
+from app.services.result_store import PersistedResultSet
+
+API = "/api/v1/analysis"
+
+
+def save_running_batch():
+    batch_id = str(uuid.uuid4())
+    result_db.save_batch(batch_id, {
+        "batch_id": batch_id,
+        "status": AnalysisStatus.PROCESSING,
+        "total_images": 4,
+        "completed_images": 1,
+        "failed_images": 0,
+        "invalid_images": [],
+        "started_at": datetime.utcnow(),
+    })
+    return batch_id
+
+
+def test_owner_alive():
+    assert owner_alive(process_owner())
+    boot_id, pid, started = process_owner().split(":")
+    assert not owner_alive(f"{boot_id}:{pid}:{started}0")
+    assert not owner_alive(f"another-boot:{pid}:{started}")
+    assert not owner_alive(None)
+
+
+def test_batch_running_in_another_process_is_not_cached(client):
+    batch_id = save_running_batch()
+
+    status = client.get(f"{API}/batch/{batch_id}/status").json()
+
+    assert status["status"] == "processing"
+    # Results are served by the results endpoints, not with every status poll
+    assert "results" not in status
+    assert batch_id not in batch_analysis_status
+    assert client.delete(f"{API}/batch/{batch_id}").status_code == 409
+
+
+def test_batch_of_an_exited_process_is_marked_interrupted(client, monkeypatch):
+    monkeypatch.setattr(result_db_module, "_owner", (result_db_module.os.getpid(), "old-boot:1:1"))
+    batch_id = save_running_batch()
+    monkeypatch.undo()
+
+    status = client.get(f"{API}/batch/{batch_id}/status").json()
+
+    assert status["status"] == "failed"
+    assert "interrupted" in status["error_message"]
+    assert result_db.load_batch(batch_id)["status"] == AnalysisStatus.FAILED
+
+
+def test_progress_reads_result_stats_off_the_event_loop(client, monkeypatch):
+    batch_id = save_running_batch()
+    stats = PersistedResultSet.stats
+    on_loop = []
+
+    def _stats(self):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return stats(self)
+
+    monkeypatch.setattr(PersistedResultSet, "stats", _stats)
+    progress = client.get(f"{API}/batch/{batch_id}/progress")
+
+    assert progress.status_code == 200
+    assert progress.json()["completed_images"] == 1
+    assert on_loop == [False]
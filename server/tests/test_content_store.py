@@ -0,0 +1,45 @@
+from app.services.content_store import ContentAddressedStore, make_cas_key
+from app.services.in_memory_storage import InMemoryStorage
+
+
+def make_store(**limits):
+    return ContentAddressedStore(InMemoryStorage(
+        max_bytes=limits.get("max_bytes", 1024 * 1024), max_objects=limits.get("max_objects", 100), shards=4
+    ))
+
+
+def test_last_reference_frees_the_blob():
+    store = make_store()
+    digest = store.put_content("mem://a/1.jpg", b"photo", "image/jpeg")
+    store.put_content("mem://b/1.jpg", b"photo", "image/jpeg")
+
+    store.delete("mem://a/1.jpg")
+    assert store.backend.exists(make_cas_key(digest))
+    assert store.get("mem://b/1.jpg")[0] == b"photo"
+
+    store.delete("mem://b/1.jpg")
+    assert not store.backend.exists(make_cas_key(digest))
+    assert store.stats()["dedup"]["blobs_freed"] == 1
+
+
+def test_deleting_a_namespace_frees_its_blobs():
+    store = make_store()
+    digests = [store.put_content(f"mem://batch/{i}.jpg", bytes([i]) * 100) for i in range(5)]
+    store.link("mem://other/0.jpg", digests[0])
+
+    store.delete_namespace("mem://batch")
+
+    assert store.backend.exists(make_cas_key(digests[0]))
+    assert not any(store.backend.exists(make_cas_key(d)) for d in digests[1:])
+    assert store.stats()["objects"] == 1
+
+
+def test_references_do_not_count_against_the_object_limit():
+    store = make_store(max_objects=4)
+    for i in range(4):
+        store.put_content(f"mem://batch/{i}.jpg", bytes([i]) * 100)
+
+    stats = store.stats()
+    assert stats["objects"] == 4
+    assert stats["evictions"] == 0
+    assert all(store.exists(f"mem://batch/{i}.jpg") for i in range(4))
@@ -0,0 +1,144 @@
+"""
+Reduced-resolution decode variants
+"""
+
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.fish_measurement import fish_measurement_service
+from app.services.image_decode import DecodedImage
+from app.services.storage import store
+from conftest import make_jpeg
+
+# BGR colour of each drawn part, keyed by the model class it stands for
+PART_COLORS = {0: (40, 120, 40), 2: (200, 60, 60), 5: (60, 60, 200)}
+
+
+class _Tensor:
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class _ColorSegmenter:
+    """Stands in for the model: segments each part by its colour at the input's resolution"""
+
+    def predict(self, image, **kwargs):
+        masks, classes, boxes = [], [], []
+        for cls, color in PART_COLORS.items():
+            mask = cv2.inRange(image, np.clip(np.array(color) - 40, 0, 255), np.clip(np.array(color) + 40, 0, 255))
+            x, y, w, h = cv2.boundingRect(mask)
+            masks.append((mask > 0).astype(np.float32))
+            classes.append(cls)
+            boxes.append([x, y, x + w, y + h])
+        return [SimpleNamespace(
+            masks=SimpleNamespace(data=_Tensor(np.array(masks))),
+            boxes=SimpleNamespace(
+                cls=_Tensor(np.array(classes, dtype=np.float32)),
+                xyxy=_Tensor(np.array(boxes, dtype=np.float32)),
+                conf=_Tensor(np.full(len(classes), 0.9, dtype=np.float32)),
+            ),
+        )]
+
+
+def make_fish_jpeg(width: int, height: int) -> bytes:
+    """A light JPEG with a body, dorsal fin and pectoral fin drawn in PART_COLORS"""
+    image = np.full((height, width, 3), 235, dtype=np.uint8)
+    cx, cy = width // 2, height // 2
+    cv2.ellipse(image, (cx, cy), (width * 3 // 8, height // 8), 0, 0, 360, PART_COLORS[0], -1)
+    cv2.ellipse(image, (cx - width // 20, cy - height // 7), (width // 12, height // 30), 0, 0, 360, PART_COLORS[2], -1)
+    cv2.ellipse(image, (cx - width // 5, cy + height // 20), (width // 30, height // 40), 0, 0, 360, PART_COLORS[5], -1)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    assert ok
+    return encoded.tobytes()
+
+
+def make_png(width: int, height: int) -> bytes:
+    ok, encoded = cv2.imencode(".png", np.full((height, width, 3), 128, dtype=np.uint8))
+    assert ok
+    return encoded.tobytes()
+
+
+def test_jpeg_variants_are_decoded_reduced_once_each():
+    image = DecodedImage(make_jpeg(1600, 1200))
+
+    quarter = image.reduced(4)
+
+    assert quarter.shape[:2] == (300, 400)
+    assert image.reduced(4) is quarter
+    assert image.decodes == 1
+    assert image.full().shape[:2] == (1200, 1600)
+    assert image.decodes == 2
+
+
+def test_variants_after_the_full_decode_are_downscaled_from_it():
+    image = DecodedImage(make_jpeg(1000, 600))
+    image.full()
+
+    half = image.reduced(2)
+
+    assert half.shape[:2] == (300, 500)
+    assert image.decodes == 1
+
+
+def test_non_jpeg_variants_come_from_one_full_decode():
+    image = DecodedImage(make_png(801, 401))
+
+    assert image.reduced(8).shape[:2] == (51, 101)
+    assert image.reduced(2).shape[:2] == (201, 401)
+    assert image.decodes == 1
+
+
+def test_for_long_side_picks_the_smallest_sufficient_variant():
+    image = DecodedImage(make_jpeg(1600, 1200))
+
+    variant, scale = image.for_long_side(640)
+    full, full_scale = image.for_long_side(0)
+
+    assert variant.shape[1] == 800
+    assert scale == 2.0
+    assert full.shape[1] == 1600 and full_scale == 1.0
+    with pytest.raises(ValueError):
+        image.reduced(3)
+
+
+def test_prefetch_decodes_the_image_once():
+    key = "mem://decode-once/fish.jpg"
+    store.put(key, make_jpeg(4000, 3000), content_type="image/jpeg")
+
+    decoded = fish_measurement_service.prefetch_image(key).decoded
+
+    # The coarse variants are downscaled from the full decode
+    assert decoded.for_long_side(settings.SEGMENTATION_INPUT_LONG_SIDE)[0].shape[1] < 4000
+    assert decoded.decodes == 1
+    store.delete(key)
+
+
+def test_segmentation_on_the_reduced_variant_matches_full_resolution(monkeypatch):
+    service = fish_measurement_service
+    monkeypatch.setattr(service, "model", _ColorSegmenter())
+    monkeypatch.setattr(service, "pixels_per_inch", 100.0)
+    decoded = DecodedImage(make_fish_jpeg(4000, 3000))
+    full = decoded.full()
+    variant, scale = decoded.for_long_side(settings.SEGMENTATION_INPUT_LONG_SIDE)
+    assert scale > 1
+
+    reference = service.calculate_measurements(service.run_segmentation(full))
+    reduced = service.calculate_measurements(
+        service.run_segmentation(variant, output_size=(full.shape[1], full.shape[0]))
+    )
+
+    assert [m.name for m in reduced] == [m.name for m in reference]
+    assert {m.name for m in reference} >= {"total_length", "head_to_dorsal", "head_to_pectoral"}
+    for ours, theirs in zip(reduced, reference):
+        # Within a few full-resolution pixels of the full-resolution measurement
+        assert abs(ours.distance_inches - theirs.distance_inches) <= 2 * scale / 100.0
@@ -0,0 +1,63 @@
+"""
+Tests for normalized working copies and the trust in their markers
+"""
+
+import cv2
+import numpy as np
+
+from app.services.content_store import content_digest
+from app.services.fish_measurement import fish_measurement_service
+from app.services.image_decode import DecodedImage
+from app.services.image_normalize import normalize_image, read_normalization, record_normalization
+from app.utils.image_probe import probe_image
+from conftest import make_jpeg
+
+
+def make_grid_jpeg(width: int, height: int, cell: int, line: int) -> bytes:
+    """White cells of cell pixels separated by dark lines of line pixels"""
+    image = np.full((height, width, 3), 245, dtype=np.uint8)
+    for offset in range(0, max(width, height), cell + line):
+        image[:, offset:offset + line] = 30
+        image[offset:offset + line, :] = 30
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    assert ok
+    return encoded.tobytes()
+
+
+def test_only_recorded_working_copies_are_trusted():
+    original = make_jpeg(width=640, height=480)
+    copy = normalize_image(original, probe_image(original), long_side=320)
+    assert copy is not None
+    probe = copy.probe
+    assert read_normalization(probe, content_digest(copy.data)) is None
+
+    record_normalization(content_digest(copy.data), copy.normalization)
+    assert read_normalization(probe, content_digest(copy.data)) == copy.normalization
+
+
+def test_client_supplied_marker_does_not_skip_normalization():
+    original = make_jpeg(width=640, height=480, seed=1)
+    forged = original[:2] + b"\xff\xfe\x00\x3a" + b"octapulse-normalized:scale=1.0;source=640x480".ljust(56) + original[2:]
+    probe = probe_image(forged)
+    assert probe.comment.startswith("octapulse-normalized:")
+    assert read_normalization(probe, content_digest(forged)) is None
+    copy = normalize_image(forged, probe, long_side=320)
+    assert copy is not None
+    assert copy.probe.oriented_size == (320, 240)
+
+
+def test_grid_calibration_agrees_before_and_after_normalization():
+    original = make_grid_jpeg(2400, 1800, cell=48, line=8)
+    copy = normalize_image(original, probe_image(original), long_side=600)
+    assert copy is not None and copy.normalization.scale == 0.25
+
+    before = fish_measurement_service.detect_single_grid_square(DecodedImage(original).full())
+    # Cells of the copy are 12 pixels, below the thresholds meant for originals
+    after = fish_measurement_service.detect_single_grid_square(
+        DecodedImage(copy.data).full(), copy.normalization.scale
+    )
+
+    assert before is not None and after is not None
+    # The same grid square measures the same on both, to within one pixel of the copy
+    square_size = fish_measurement_service.grid_square_size
+    assert abs(after[0] - before[0] * copy.normalization.scale) * square_size <= 1
@@ -0,0 +1,59 @@
+"""
+Tests for JPEG header probing and early rejection during ingest
+"""
+
+import struct
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.storage import store
+from app.utils.file_utils import ImageIngest
+from app.utils.image_probe import ImageProbeError, probe_image
+from conftest import make_jpeg
+
+
+def _with_exif(jpeg: bytes, size: int) -> bytes:
+    """jpeg with an EXIF APP1 segment of about size bytes after its SOI"""
+    tiff = b"II*\x00" + struct.pack("<IHI", 8, 0, 0)
+    payload = b"Exif\x00\x00" + tiff + bytes(size - len(tiff) - 8)
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload + jpeg[2:]
+
+
+def test_trailing_data_after_end_of_image_is_accepted():
+    data = make_jpeg() + bytes(64 * 1024)
+    probe = probe_image(data)
+    assert (probe.width, probe.height) == (320, 240)
+
+
+def test_truncated_scan_data_is_rejected():
+    data = make_jpeg()
+    with pytest.raises(ImageProbeError, match="truncated"):
+        probe_image(data[:len(data) // 2])
+
+
+def test_header_behind_large_exif_is_probed_before_upload_completes():
+    # Too small to analyze, with its frame header 20KB in and trailing data to keep the upload going
+    data = _with_exif(make_jpeg(width=16, height=16), 20 * 1024) + bytes(64 * 1024)
+    ingest = ImageIngest("small.jpg", "mem://probe/small.jpg")
+    fed = 0
+    with pytest.raises(HTTPException) as excinfo:
+        while fed < len(data):
+            ingest.feed(data[fed:fed + 4096])
+            fed += 4096
+    assert "Invalid image" in excinfo.value.detail
+    assert fed < len(data)
+
+
+def test_batch_start_moves_unreadable_images_to_invalid(client):
+    batch_id = str(uuid.uuid4())
+    good, cut = f"mem://{batch_id}/good.jpg", f"mem://{batch_id}/cut.jpg"
+    store.put(good, make_jpeg(), content_type="image/jpeg")
+    store.put(cut, make_jpeg()[:200], content_type="image/jpeg")
+
+    response = client.post("/api/v1/analysis/batch", json={"images": [good, cut], "batch_id": batch_id})
+
+    assert response.status_code == 200
+    assert response.json()["total_images"] == 1
+    assert response.json()["invalid_images"] == [cut]
@@ -0,0 +1,163 @@
+"""
+Capacity limits and expiry of the sharded in-memory store
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import in_memory_storage
+from app.services.in_memory_storage import InMemoryStorage, StorageFullError, _Shard
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable stand-in for the store's wall clock"""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(in_memory_storage, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_full_store_evicts_least_recently_used():
+    store = InMemoryStorage(max_bytes=4 * 1024, max_objects=100)
+    for i in range(4):
+        store.put(f"mem://old/{i}", b"x" * 1024)
+    # Reading an entry makes it the most recently used
+    store.get("mem://old/0")
+
+    store.put("mem://new/0", b"y" * 1024)
+
+    assert store.exists("mem://old/0")
+    assert not store.exists("mem://old/1")
+    stats = store.stats()
+    assert stats["bytes"] == 4 * 1024
+    assert stats["evictions"] == 1
+    assert stats["evicted_bytes"] == 1024
+
+
+def test_object_limit_evicts_past_pinned_entries():
+    store = InMemoryStorage(max_bytes=1024 * 1024, max_objects=2)
+    store.put("mem://b/0", b"x")
+    store.put("mem://b/1", b"x")
+    store.pin("mem://b/0")
+
+    store.put("mem://b/2", b"x")
+
+    assert store.exists("mem://b/0")
+    assert not store.exists("mem://b/1")
+
+
+def test_limits_are_shared_by_all_shards():
+    store = InMemoryStorage(max_bytes=64 * 1024, max_objects=64, shards=16)
+
+    # Far more than a 1/16 share, all pinned, all landing wherever they hash
+    for i in range(48):
+        store.put(f"mem://batch/{i}.jpg", b"x" * 1024)
+        store.pin(f"mem://batch/{i}.jpg")
+
+    stats = store.stats()
+    assert stats["objects"] == 48
+    assert stats["evictions"] == 0
+
+
+def test_full_store_evicts_least_recently_used_across_shards():
+    store = InMemoryStorage(max_bytes=10 * 1024, max_objects=1000, shards=4)
+    for i in range(10):
+        store.put(f"mem://old/{i}", b"x" * 1024)
+    store.pin("mem://old/0")
+
+    for i in range(5):
+        store.put(f"mem://new/{i}", b"y" * 1024)
+
+    stats = store.stats()
+    assert stats["bytes"] <= 10 * 1024
+    assert stats["evictions"] == 5
+    assert store.exists("mem://old/0")
+    assert all(store.exists(f"mem://new/{i}") for i in range(5))
+
+
+def test_put_fails_only_when_everything_is_pinned():
+    store = InMemoryStorage(max_bytes=4 * 1024, max_objects=100, shards=8)
+    for i in range(4):
+        store.put(f"mem://b/{i}", b"x" * 1024)
+        store.pin(f"mem://b/{i}")
+
+    with pytest.raises(StorageFullError):
+        store.put("mem://b/extra", b"x" * 1024)
+    with pytest.raises(StorageFullError):
+        store.put("mem://b/huge", b"x" * 8 * 1024)
+
+    store.unpin("mem://b/2")
+    store.put("mem://b/extra", b"x" * 1024)
+    assert not store.exists("mem://b/2")
+    assert store.stats()["rejected_puts"] == 2
+
+
+def test_pinned_entries_do_not_expire(clock):
+    store = InMemoryStorage(max_bytes=1024, max_objects=10)
+    store.put("mem://b/pinned", b"x", ttl_seconds=1)
+    store.put("mem://b/loose", b"x", ttl_seconds=1)
+    store.pin("mem://b/pinned")
+    clock.value += 2
+
+    assert store.exists("mem://b/pinned")
+    assert not store.exists("mem://b/loose")
+
+
+def test_reaper_removes_only_live_expired_entries(clock):
+    store = InMemoryStorage(max_bytes=1024 * 1024, max_objects=1000)
+    for i in range(300):
+        store.put(f"mem://b/{i}", b"x", ttl_seconds=10)
+    # Overwriting leaves a stale heap item behind the new deadline
+    store.put("mem://b/0", b"x", ttl_seconds=100)
+    store.put("mem://b/1", b"x")
+    store.pin("mem://b/2")
+
+    clock.value += 20
+    removed = store.reap_expired(batch_size=64)
+
+    assert removed == 297
+    assert store.stats()["expirations"] == 297
+    assert store.exists("mem://b/0") and store.exists("mem://b/1") and store.exists("mem://b/2")
+
+
+def test_unpin_rearms_a_skipped_deadline(clock):
+    store = InMemoryStorage(max_bytes=1024, max_objects=10)
+    store.put("mem://b/pinned", b"x", ttl_seconds=10)
+    store.pin("mem://b/pinned")
+    clock.value += 20
+    assert store.reap_expired() == 0
+
+    store.unpin("mem://b/pinned")
+
+    assert store.reap_expired() == 1
+    assert store.stats()["objects"] == 0
+
+
+def test_put_reaps_a_bounded_number_of_expired_entries(clock):
+    store = InMemoryStorage(max_bytes=1024 * 1024, max_objects=1000)
+    for i in range(40):
+        store.put(f"mem://b/{i}", b"x", ttl_seconds=10)
+    clock.value += 20
+
+    store.put("mem://b/new", b"x")
+
+    assert store.stats()["expirations"] == _Shard._REAP_BATCH
+
+
+def test_namespace_index_lists_pins_and_deletes_only_its_keys():
+    store = InMemoryStorage(max_bytes=1024 * 1024, max_objects=1000, shards=4)
+    for i in range(6):
+        store.put(f"mem://batch-a/{i}.jpg", b"x")
+    store.put("mem://batch-ab/0.jpg", b"x")
+    store.put("memvis://batch-a/overlay", b"x")
+
+    pinned = store.pin_namespace("mem://batch-a")
+
+    assert sorted(pinned) == sorted(f"mem://batch-a/{i}.jpg" for i in range(6))
+    assert store.stats()["pinned"] == 6
+    assert store.delete_prefix("mem://batch-a/1") == 1
+    assert len(store.list_namespace("mem://batch-a")) == 5
+    assert store.delete_namespace("mem://batch-a") == 5
+    assert store.list_namespace("mem://batch-a") == []
+    assert store.exists("mem://batch-ab/0.jpg") and store.exists("memvis://batch-a/overlay")
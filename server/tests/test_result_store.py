@@ -0,0 +1,94 @@
+"""
+Incrementally published batch results
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.models.fish_analysis import AnalysisStatus
+from app.services.fish_measurement import fish_measurement_service
+from app.services.storage import store
+from app.services.result_db import ResultDatabase
+from app.services.result_store import ResultStore
+from conftest import make_jpeg, make_result
+
+API = "/api/v1/analysis"
+
+
+def result_at(seconds: int, status: AnalysisStatus = AnalysisStatus.COMPLETED, processing_time: float = 1.0):
+    result = make_result(f"fish_{seconds}.jpg")
+    result.status = status
+    result.processing_metadata.processed_at = datetime(2026, 1, 1) + timedelta(seconds=seconds)
+    result.processing_metadata.processing_time_seconds = processing_time
+    return result
+
+
+def test_results_are_ordered_by_processing_start_per_status(tmp_path):
+    results = ResultStore(ResultDatabase(str(tmp_path / "results.db"), str(tmp_path / "archive")))
+    for seconds, status in ((3, AnalysisStatus.COMPLETED), (1, AnalysisStatus.FAILED), (2, AnalysisStatus.COMPLETED)):
+        results.publish("batch", result_at(seconds, status, processing_time=seconds))
+    result_set = results.get("batch")
+
+    newest, total = result_set.page(0, 2, newest_first=True)
+    completed, completed_total = result_set.page(0, 10, AnalysisStatus.COMPLETED, newest_first=False)
+
+    assert [r.image_path for r in newest] == ["fish_3.jpg", "fish_2.jpg"]
+    assert total == 3
+    assert [r.image_path for r in completed] == ["fish_2.jpg", "fish_3.jpg"]
+    assert completed_total == 2
+    assert result_set.stats()["failed"] == 1
+    assert result_set.stats()["average_processing_time"] == 2.0
+
+
+def test_dropped_batches_are_read_from_the_database(tmp_path):
+    results = ResultStore(ResultDatabase(str(tmp_path / "results.db"), str(tmp_path / "archive")))
+    for seconds, status in ((1, AnalysisStatus.COMPLETED), (2, AnalysisStatus.FAILED), (3, AnalysisStatus.COMPLETED)):
+        results.publish("batch", result_at(seconds, status))
+    result = results.results("batch")[0]
+
+    results.drop("batch")
+
+    assert results.find(result.analysis_id).image_path == result.image_path
+    completed, total = results.get("batch").page(0, 10, AnalysisStatus.COMPLETED, newest_first=True)
+    assert [r.image_path for r in completed] == ["fish_3.jpg", "fish_1.jpg"]
+    assert total == 2
+    assert results.get("batch").get(result.analysis_id).analysis_id == result.analysis_id
+    assert results.get("other").get(result.analysis_id) is None
+
+
+def test_finished_images_are_served_mid_batch(client, monkeypatch):
+    release = threading.Event()
+
+    def analyze_image(image_path, *args, **kwargs):
+        if image_path.endswith("slow.jpg"):
+            release.wait(10)
+        return make_result(image_path)
+
+    monkeypatch.setattr(fish_measurement_service, "analyze_image", analyze_image)
+    batch_id = str(uuid.uuid4())
+    images = [f"mem://{batch_id}/fast.jpg", f"mem://{batch_id}/slow.jpg"]
+    for key in images:
+        store.put(key, make_jpeg(), content_type="image/jpeg")
+
+    poster = threading.Thread(target=client.post, args=(f"{API}/batch",), kwargs={
+        "json": {"images": images, "batch_id": batch_id}
+    })
+    poster.start()
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            response = client.get(f"{API}/batch/{batch_id}/results/paginated")
+            if response.status_code == 200 and response.json()["pagination"]["total_items"]:
+                break
+            time.sleep(0.02)
+        page = response.json()
+        status = client.get(f"{API}/batch/{batch_id}/status").json()
+    finally:
+        release.set()
+        poster.join(timeout=10)
+
+    assert [r["image_path"] for r in page["items"]] == [images[0]]
+    assert status["status"] == "processing"
+    assert client.get(f"{API}/batch/{batch_id}/status").json()["status"] == "completed"
@@ -0,0 +1,103 @@
+"""
+Request-level tests for resumable uploads
+"""
+
+from app.api.v1.endpoints import upload
+from app.core.config import settings
+from app.services.result_db import result_db
+from app.services.resumable_upload import ResumableUploadService, resumable_uploads, upload_parts_namespace
+from app.services.storage import store
+from conftest import make_jpeg
+
+API = "/api/v1/upload/resumable"
+
+
+def create_upload(client, length, filename="fish.jpg"):
+    response = client.post(f"{API}?filename={filename}", headers={"Upload-Length": str(length)})
+    assert response.status_code == 201
+    return response.json()["upload_url"]
+
+
+def patch(client, upload_url, offset, chunk):
+    return client.patch(
+        upload_url,
+        content=chunk,
+        headers={"Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream"}
+    )
+
+
+def test_received_bytes_are_stored_as_parts_until_finalized(client, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 4096)
+    data = make_jpeg(seed=50)
+    upload_url = create_upload(client, len(data))
+    parts = upload_parts_namespace(upload_url.rsplit("/", 1)[-1])
+    assert store.list_namespace(parts) == []
+
+    half = len(data) // 2
+    assert patch(client, upload_url, 0, data[:half]).status_code == 204
+    assert sum(len(store.get(key)[0]) for key in store.list_namespace(parts)) == half
+    assert patch(client, upload_url, half, data[half:]).status_code == 204
+
+    response = client.post(f"{upload_url}/finalize")
+    assert response.status_code == 200
+    assert response.json()["file_info"]["image_dimensions"] == {"width": 320, "height": 240}
+    assert store.list_namespace(parts) == []
+    assert bytes(store.get(response.json()["file_info"]["file_path"])[0]) == data
+
+
+def test_upload_continues_in_another_worker(client, monkeypatch):
+    data = make_jpeg(seed=51)
+    upload_url = create_upload(client, len(data))
+    half = len(data) // 2
+    assert patch(client, upload_url, 0, data[:half]).status_code == 204
+
+    # A fresh service holds nothing in process memory, like another worker or a restart
+    monkeypatch.setattr(upload, "resumable_uploads", ResumableUploadService(result_db, 3600, 2**31))
+    head = client.head(upload_url)
+    assert head.headers["Upload-Offset"] == str(half)
+    assert patch(client, upload_url, half, data[half:]).status_code == 204
+    first = client.post(f"{upload_url}/finalize")
+    monkeypatch.undo()
+    repeated = client.post(f"{upload_url}/finalize")
+
+    assert first.status_code == 200
+    assert repeated.json()["file_info"] == first.json()["file_info"]
+
+
+def test_claimed_upload_refuses_other_writers(client):
+    data = make_jpeg(seed=52)
+    upload_url = create_upload(client, len(data))
+    session = resumable_uploads.claim(upload_url.rsplit("/", 1)[-1])
+
+    busy = patch(client, upload_url, 0, data)
+    resumable_uploads.release(session)
+
+    assert busy.status_code == 409
+    assert patch(client, upload_url, 0, data).status_code == 204
+
+
+def test_non_image_is_refused_at_the_first_chunk(client):
+    upload_url = create_upload(client, 10_000)
+
+    response = patch(client, upload_url, 0, b"plain text " * 300)
+
+    assert response.status_code == 400
+    assert client.head(upload_url).status_code == 404
+
+
+def test_unfinished_uploads_count_against_store_admission(client, monkeypatch):
+    pending = []
+
+    def near_capacity(fraction, pending_bytes=0):
+        pending.append(pending_bytes)
+        return False
+
+    monkeypatch.setattr(store, "near_capacity", near_capacity)
+    reserved = resumable_uploads.reserved_bytes()
+    first = create_upload(client, 2_000_000)
+    second = create_upload(client, 1_000_000)
+
+    assert pending == [reserved + 2_000_000, reserved + 3_000_000]
+    for upload_url in (first, second):
+        assert client.delete(upload_url).status_code == 204
+    assert resumable_uploads.reserved_bytes() == reserved
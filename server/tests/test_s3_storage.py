@@ -0,0 +1,85 @@
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.services.content_store import ContentAddressedStore, make_cas_key
+from app.services.in_memory_storage import InMemoryStorage
+from app.services.s3_storage import S3Storage
+
+BUCKET = "octapulse-test"
+
+
+@pytest.fixture
+def s3_store():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        backend = S3Storage(
+            bucket=BUCKET,
+            cache=InMemoryStorage(max_bytes=1024 * 1024, max_objects=100, shards=2),
+            key_prefix="test/",
+            client=client,
+        )
+        yield backend, client
+
+
+def test_round_trip_through_the_bucket(s3_store):
+    store, client = s3_store
+    store.put("mem://batch/a.jpg", b"photo", "image/jpeg", ttl_seconds=60)
+    store.put("mem://batch/b.jpg", b"photo", "image/jpeg")
+
+    store._cache.delete_namespace("mem://batch")
+    assert store.get("mem://batch/a.jpg") == (b"photo", "image/jpeg")
+    assert sorted(store.list_namespace("mem://batch")) == ["mem://batch/a.jpg", "mem://batch/b.jpg"]
+    assert client.head_object(Bucket=BUCKET, Key="test/mem/batch/a.jpg")["ContentType"] == "image/jpeg"
+
+    assert store.delete_namespace("mem://batch") == 2
+    assert not store.exists("mem://batch/a.jpg")
+    assert store.list_namespace("mem://batch") == []
+
+
+def test_expired_objects_are_not_served(s3_store):
+    store, client = s3_store
+    store.put("mem://batch/a.jpg", b"photo", "image/jpeg", ttl_seconds=1)
+    store._cache.delete("mem://batch/a.jpg")
+    time.sleep(1.1)
+
+    assert store.get("mem://batch/a.jpg") is None
+    assert not store.exists("mem://batch/a.jpg")
+
+
+def test_touch_restarts_the_ttl_without_uploading(s3_store):
+    store, client = s3_store
+    store.put("mem://a/1.jpg", b"x" * 10_000, "image/jpeg", ttl_seconds=60)
+    expires = client.head_object(Bucket=BUCKET, Key="test/mem/a/1.jpg")["Metadata"]
+    time.sleep(0.01)
+
+    assert store.touch("mem://a/1.jpg", "image/jpeg", ttl_seconds=60)
+    assert not store.touch("mem://a/missing.jpg", "image/jpeg", ttl_seconds=60)
+
+    head = client.head_object(Bucket=BUCKET, Key="test/mem/a/1.jpg")
+    assert head["Metadata"] != expires
+    assert head["ContentType"] == "image/jpeg"
+    assert store.stats()["puts"] == 1
+
+
+def test_duplicate_content_is_not_uploaded_again(s3_store):
+    backend, client = s3_store
+    store = ContentAddressedStore(backend)
+    data = b"x" * 10_000
+    digest = store.put_content("mem://a/1.jpg", data, "image/jpeg", ttl_seconds=60)
+    expires = client.head_object(Bucket=BUCKET, Key=f"test/cas/{digest[:2]}/{digest}")["Metadata"]
+    time.sleep(0.01)
+
+    store.put_content("mem://b/1.jpg", data, "image/jpeg", ttl_seconds=60)
+
+    stats = store.stats()
+    assert stats["put_bytes"] == len(data) + 2 * len(digest)
+    assert stats["dedup"]["duplicates"] == 1
+    head = client.head_object(Bucket=BUCKET, Key=f"test/cas/{digest[:2]}/{digest}")
+    # Touched in place: a later expiry and the content type kept
+    assert head["Metadata"] != expires
+    assert head["ContentType"] == "image/jpeg"
+    assert store.backend.exists(make_cas_key(digest))
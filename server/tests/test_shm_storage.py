@@ -0,0 +1,99 @@
+"""
+Shared-memory blob arena
+"""
+
+import uuid
+
+import pytest
+
+from app.services import shm_storage
+from app.services.shm_storage import SharedMemoryStorage, reset_arena
+
+DATA_BYTES = 4104
+
+
+@pytest.fixture
+def arena(tmp_path):
+    """Factory attaching to one fresh segment with DATA_BYTES of record space"""
+    name = f"test-arena-{uuid.uuid4().hex[:12]}"
+
+    def attach(slots=16):
+        table_end = shm_storage._align(shm_storage._TABLE_START + slots * shm_storage._SLOT_SIZE)
+        return SharedMemoryStorage(name, table_end + DATA_BYTES, slots, str(tmp_path / "arena.lock"))
+
+    yield attach
+    reset_arena(name)
+
+
+def test_pinned_oldest_entry_does_not_block_puts(arena):
+    store = arena()
+    store.put("a", b"a" * 1000)
+    store.pin("a")
+    store.put("b", b"b" * 1000)
+    store.put("c", b"c" * 1000)
+
+    # Only about 1000 live bytes are pinned; the put evicts around them
+    store.put("d", b"d" * 2000)
+
+    data, _ = store.get("a")
+    assert bytes(data) == b"a" * 1000
+    assert bytes(store.get("d")[0]) == b"d" * 2000
+    assert not store.exists("b") and not store.exists("c")
+    assert store.stats()["evictions"] == 2
+
+
+def test_deleted_records_are_reused_before_evicting(arena):
+    store = arena()
+    for key in "abcd":
+        store.put(key, key.encode() * 1000)
+    store.delete("b")
+
+    store.put("e", b"e" * 1000)
+
+    assert all(store.exists(key) for key in "acde")
+    assert store.stats()["evictions"] == 0
+
+
+def test_put_fails_only_when_pinned_entries_leave_no_room(arena):
+    store = arena()
+    for key in "abcd":
+        store.put(key, key.encode() * 1000)
+        store.pin(key)
+    store.unpin("b")
+
+    with pytest.raises(shm_storage.StorageFullError):
+        store.put("e", b"e" * 2000)
+    # Nothing was evicted for the failed put
+    assert store.exists("b")
+
+    store.put("e", b"e" * 1000)
+    assert not store.exists("b")
+
+
+def test_near_capacity_counts_record_overhead(arena):
+    store = arena(slots=32)
+    for i in range(10):
+        store.put(f"k{i}", b"x")
+
+    stats = store.stats()
+    assert stats["bytes"] == 10
+    assert stats["used_bytes"] >= 10 * 24
+    assert store.near_capacity(0.05)
+
+
+def test_pins_of_an_exited_process_are_released_on_attach(arena, monkeypatch):
+    monkeypatch.setattr(shm_storage, "process_owner", lambda: "old-boot:1:1")
+    crashed = arena()
+    crashed.put("a", b"a" * 100)
+    crashed.pin("a")
+    monkeypatch.undo()
+    worker = arena()
+    worker.put("b", b"b" * 100)
+    worker.pin("b")
+
+    restarted = arena()
+
+    assert restarted.stats()["pinned"] == 1
+    # The live process' pin still protects its view from being reused
+    assert isinstance(restarted.get("b")[0], memoryview)
+    assert isinstance(restarted.get("a")[0], bytes)
@@ -0,0 +1,107 @@
+import threading
+
+from app.services.in_memory_storage import InMemoryStorage
+from app.services.spill_store import SpillStore
+
+
+def segment_files(directory):
+    return sorted(path.name for path in directory.glob("segment-*.seg"))
+
+
+def test_budget_counts_live_records_only(tmp_path):
+    spill = SpillStore(str(tmp_path), max_bytes=64 * 1024, segment_bytes=16 * 1024)
+    for round_ in range(20):
+        for i in range(4):
+            spill.put(f"mem://batch/{i}", bytes([round_]) * 4096)
+
+    stats = spill.stats()
+    assert stats["dropped"] == 0
+    assert stats["objects"] == 4
+    assert 4 * 4096 < stats["bytes"] < 5 * 4096
+    # Overwritten records are compacted away instead of growing the files
+    assert stats["disk_bytes"] <= 64 * 1024 + 16 * 1024
+    assert all(bytes(spill.get(f"mem://batch/{i}")[0]) == bytes([19]) * 4096 for i in range(4))
+
+
+def test_dead_segments_are_dropped(tmp_path):
+    spill = SpillStore(str(tmp_path), max_bytes=1024 * 1024, segment_bytes=8 * 1024)
+    for i in range(8):
+        spill.put(f"mem://batch/{i}", b"x" * 4096)
+    spill.put("mem://keep/0", b"k" * 100)
+    spill.delete_namespace("mem://batch")
+
+    assert spill.stats()["objects"] == 1
+    assert len(segment_files(tmp_path)) == 1
+    assert bytes(spill.get("mem://keep/0")[0]) == b"k" * 100
+
+
+def test_restart_recovers_without_new_segments(tmp_path):
+    spill = SpillStore(str(tmp_path), max_bytes=1024 * 1024, segment_bytes=8 * 1024)
+    spill.put("mem://batch/a", b"a" * 100, "image/jpeg")
+    spill.put("mem://batch/b", b"b" * 100)
+    spill.delete("mem://batch/b")
+    files = segment_files(tmp_path)
+
+    for _ in range(3):
+        spill = SpillStore(str(tmp_path), max_bytes=1024 * 1024, segment_bytes=8 * 1024)
+    assert segment_files(tmp_path) == files
+    assert spill.get("mem://batch/a")[1] == "image/jpeg"
+    assert not spill.exists("mem://batch/b")
+    # The deleted record and its tombstone are on disk but not live
+    assert spill.stats()["bytes"] < spill.stats()["disk_bytes"]
+
+
+def test_memory_store_spills_evicted_and_oversized_entries(tmp_path):
+    spill = SpillStore(str(tmp_path), max_bytes=1024 * 1024, segment_bytes=64 * 1024)
+    store = InMemoryStorage(max_bytes=4 * 1024, max_objects=100, shards=2, spill=spill)
+    for i in range(6):
+        store.put(f"mem://batch/{i}", bytes([i]) * 1024, content_type="image/jpeg")
+    store.put("mem://batch/huge", b"h" * 8 * 1024)
+
+    data, content_type = store.get("mem://batch/0")
+    assert isinstance(data, memoryview)
+    assert bytes(data) == bytes([0]) * 1024 and content_type == "image/jpeg"
+    assert bytes(store.get("mem://batch/huge")[0]) == b"h" * 8 * 1024
+    assert sorted(store.list_namespace("mem://batch")) == sorted([f"mem://batch/{i}" for i in range(6)] + ["mem://batch/huge"])
+    assert store.stats()["rejected_puts"] == 0
+
+    # Spilled entries are found again after a restart
+    reopened = SpillStore(str(tmp_path), max_bytes=1024 * 1024, segment_bytes=64 * 1024)
+    assert bytes(reopened.get("mem://batch/1")[0]) == bytes([1]) * 1024
+
+
+def test_evicted_entries_are_spilled_outside_the_shard_lock(tmp_path):
+    spill = SpillStore(str(tmp_path), max_bytes=1024 * 1024, segment_bytes=64 * 1024)
+    store = InMemoryStorage(max_bytes=2 * 1024, max_objects=100, shards=1, spill=spill)
+    shard = store._shards[0]
+    store.put("mem://batch/old", b"o" * 1024)
+    store.put("mem://batch/keep", b"k" * 1024)
+    writing, release = threading.Event(), threading.Event()
+    spill_put = spill.put
+
+    def slow_put(key, *args):
+        writing.set()
+        assert release.wait(5)
+        spill_put(key, *args)
+
+    spill.put = slow_put
+    evicting = threading.Thread(target=store.put, args=("mem://batch/new", b"n" * 1024))
+    evicting.start()
+    assert writing.wait(5)
+
+    # The shard stays usable while the victim is written, and the victim readable
+    assert shard.lock.acquire(timeout=1)
+    shard.lock.release()
+    assert bytes(store.get("mem://batch/keep")[0]) == b"k" * 1024
+    assert bytes(store.get("mem://batch/old")[0]) == b"o" * 1024
+    # Deleting the victim waits for its write instead of racing it
+    deleting = threading.Thread(target=store.delete, args=("mem://batch/old",))
+    deleting.start()
+    deleting.join(0.2)
+    assert deleting.is_alive()
+
+    release.set()
+    evicting.join(5)
+    deleting.join(5)
+    assert not store.exists("mem://batch/old")
+    assert bytes(store.get("mem://batch/new")[0]) == b"n" * 1024
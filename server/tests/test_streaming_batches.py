@@ -0,0 +1,268 @@
+"""
+Request-level tests for the streaming batch endpoints and watch folders
+"""
+
+import asyncio
+import io
+import os
+import threading
+import time
+import zipfile
+
+from fastapi import HTTPException
+
+from app.api.v1.endpoints import analysis
+from app.api.v1.endpoints.analysis import ADMISSION_TIMED_OUT, _admit_streamed_image, _analyze_watched_files
+from app.core.config import WatchFolderConfig, settings
+from app.services.admission import admission_controller
+from app.services.in_memory_storage import StorageFullError
+from app.services.result_store import result_store
+from app.services.watch_folder import WatchFolderService, _FolderWatcher
+
+from conftest import make_jpeg
+
+API = "/api/v1/analysis"
+FINISHED = ("completed", "failed", "cancelled")
+
+
+def wait_for_batch(client, batch_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f"{API}/batch/{batch_id}/status").json()
+        if status["status"] in FINISHED or time.monotonic() > deadline:
+            return status
+        time.sleep(0.05)
+
+
+def test_stream_batch_queues_each_part(client):
+    files = [("files", (f"fish{i}.jpg", make_jpeg(seed=i), "image/jpeg")) for i in range(3)]
+    files.append(("files", ("notes.jpg", b"not an image" * 100, "image/jpeg")))
+
+    # Plain form fields are skipped, not taken as options or files
+    response = client.post(
+        f"{API}/batch/stream?include_visualizations=false", files=files, data={"grid_square_size_inches": "2"}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_images"] == 3
+    assert [f["original_filename"] for f in body["uploaded_files"]] == ["fish0.jpg", "fish1.jpg", "fish2.jpg"]
+    assert all(f["file_path"].startswith(f"mem://{body['batch_id']}/") for f in body["uploaded_files"])
+    assert [f["filename"] for f in body["failed_files"]] == ["notes.jpg"]
+    status = wait_for_batch(client, body["batch_id"])
+    assert status["status"] == "completed"
+    assert status["completed_images"] == 3
+
+
+def test_archive_batch_analyzes_zip_members(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for i in range(3):
+            zf.writestr(f"rig/fish{i}.jpg", make_jpeg(seed=10 + i))
+        zf.writestr("rig/README.txt", "calibration notes")
+        zf.writestr("__MACOSX/rig/._fish0.jpg", b"\0" * 64)
+
+    response = client.post(
+        f"{API}/batch/archive?include_visualizations=false",
+        content=archive.getvalue(),
+        headers={"content-type": "application/zip"}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_images"] == 3
+    assert body["upload_error"] is None
+    status = wait_for_batch(client, body["batch_id"])
+    assert status["status"] == "completed"
+    assert status["completed_images"] == 3
+
+
+def test_manifest_batch_analyzes_listed_files(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MANIFEST_ROOT", str(tmp_path))
+    for i in range(3):
+        (tmp_path / f"fish{i}.jpg").write_bytes(make_jpeg(seed=20 + i))
+    manifest = "path,weight_g\n" + "".join(f"fish{i}.jpg,{100 + i}\n" for i in range(3)) + "missing.jpg,1\n"
+
+    response = client.post(
+        f"{API}/batch/manifest?include_visualizations=false&base_dir={tmp_path}",
+        content=manifest,
+        headers={"content-type": "text/csv"}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["manifest_images"] == 4
+    status = wait_for_batch(client, body["batch_id"])
+    assert status["status"] == "completed"
+    assert status["completed_images"] == 3
+    assert status["failed_images"] == 1
+
+
+def test_manifest_paths_stay_inside_the_manifest_root(client, tmp_path, monkeypatch):
+    root = tmp_path / "images"
+    root.mkdir()
+    (tmp_path / "secret.jpg").write_bytes(make_jpeg(seed=25))
+    (root / "link.jpg").symlink_to(tmp_path / "secret.jpg")
+    monkeypatch.setattr(settings, "MANIFEST_ROOT", str(root))
+
+    for query, manifest in (
+        ("", "path\n../secret.jpg\n"),
+        ("", f"path\n{tmp_path / 'secret.jpg'}\n"),
+        ("", "path\nlink.jpg\n"),
+        (f"&base_dir={tmp_path}", "path\nsecret.jpg\n"),
+        ("&directory_glob=../*.jpg", ""),
+    ):
+        response = client.post(
+            f"{API}/batch/manifest?include_visualizations=false{query}",
+            content=manifest,
+            headers={"content-type": "text/csv"}
+        )
+        assert response.status_code == 400, (query, manifest)
+
+    # A glob under the root skips the symlink that leads out of it
+    response = client.post(f"{API}/batch/manifest?include_visualizations=false&directory_glob=*.jpg")
+    assert response.status_code == 400
+    assert "No images match" in response.json()["detail"]
+
+
+def test_watch_folder_submits_and_settles_files(client, tmp_path):
+    folder = WatchFolderConfig(path=str(tmp_path), rig_id="rig-1", include_visualizations=False)
+    service = WatchFolderService(
+        [folder], settle_seconds=0.2, window_seconds=0.2, max_batch_images=10, poll_interval=0.1, force_polling=True
+    )
+    service.register_submitter(_analyze_watched_files)
+    service.start(client.portal.call(asyncio.get_running_loop))
+    try:
+        for i in range(2):
+            (tmp_path / f"fish{i}.jpg").write_bytes(make_jpeg(seed=30 + i))
+        (tmp_path / "broken.jpg").write_bytes(b"not an image" * 100)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline and any(name.endswith(".jpg") for name in os.listdir(tmp_path)):
+            time.sleep(0.1)
+    finally:
+        service.stop()
+
+    assert sorted(os.listdir(tmp_path / "processed")) == ["fish0.jpg", "fish1.jpg"]
+    assert os.listdir(tmp_path / "rejected") == ["broken.jpg"]
+    stats = service.stats()[0]
+    assert stats["pending"] == 0
+
+
+def test_watched_files_that_fail_transiently_stay_in_the_folder(client, tmp_path, monkeypatch):
+    good, broken, unlucky = (str(tmp_path / name) for name in ("fish.jpg", "broken.jpg", "unlucky.jpg"))
+    for path, data in ((good, make_jpeg(seed=40)), (broken, b"not an image" * 100), (unlucky, make_jpeg(seed=41))):
+        with open(path, "wb") as f:
+            f.write(data)
+    ingest_image_file = analysis.ingest_image_file
+
+    def store_full_for_unlucky(path, key):
+        if path == unlucky:
+            raise StorageFullError("Memory store is full of pinned objects")
+        return ingest_image_file(path, key)
+
+    monkeypatch.setattr(analysis, "ingest_image_file", store_full_for_unlucky)
+    folder = WatchFolderConfig(path=str(tmp_path), include_visualizations=False)
+    batch_id, outcomes = client.portal.call(
+        _analyze_watched_files, [good, broken, unlucky], folder, lambda path, published: None
+    )
+
+    assert outcomes[good] is None
+    assert "Invalid" in outcomes[broken]
+    assert unlucky not in outcomes
+    assert wait_for_batch(client, batch_id)["completed_images"] == 1
+
+
+def test_queued_files_stay_until_their_result_is_published(tmp_path):
+    service = WatchFolderService([], settle_seconds=0, window_seconds=0, max_batch_images=10,
+                                 poll_interval=0.1, force_polling=True)
+    submitted = []
+
+    def submit(paths, folder, settled):
+        submitted.append((paths, settled))
+        return "batch", {path: None for path in paths}
+
+    service._submit = submit
+    watcher = _FolderWatcher(service, WatchFolderConfig(path=str(tmp_path)))
+    for i in range(2):
+        (tmp_path / f"fish{i}.jpg").write_bytes(make_jpeg(seed=60 + i))
+    watcher._scan(set())
+    watcher._flush_due()
+    paths, settled = submitted[0]
+
+    # Queued files are neither moved nor submitted again until the batch is done with them
+    watcher._scan(set())
+    watcher._flush_due()
+    assert len(submitted) == 1
+    assert sorted(os.listdir(tmp_path)) == ["fish0.jpg", "fish1.jpg"]
+
+    settled(paths[0], True)
+    settled(paths[1], False)
+    watcher._move_settled()
+    assert os.listdir(tmp_path / "processed") == [os.path.basename(paths[0])]
+    # The file whose result was never published is submitted again
+    watcher._scan(set())
+    watcher._flush_due()
+    assert submitted[1][0] == [paths[1]]
+
+
+def test_watched_files_settle_once_their_results_are_stored(client, tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"fish{i}.jpg"))
+        (tmp_path / f"fish{i}.jpg").write_bytes(make_jpeg(seed=70 + i))
+    paths.append(str(tmp_path / "notes.jpg"))
+    (tmp_path / "notes.jpg").write_bytes(b"not an image" * 100)
+    settled = []
+    done = threading.Event()
+
+    def on_settled(path, published):
+        # May run before the submitter has returned the batch id
+        batch_id, = (batch_id for batch_id, info in analysis.batch_analysis_status.items()
+                     if info.get("source") == f"watch:{tmp_path.name}")
+        settled.append((path, published, len(result_store.results(batch_id))))
+        if len(settled) == 3:
+            done.set()
+
+    _, outcomes = client.portal.call(
+        _analyze_watched_files, paths, WatchFolderConfig(path=str(tmp_path)), on_settled
+    )
+
+    assert done.wait(10)
+    assert outcomes[paths[3]] is not None
+    assert sorted(path for path, _, _ in settled) == paths[:3]
+    assert all(published and stored >= i + 1 for i, (_, published, stored) in enumerate(settled))
+
+
+def test_one_process_watches_each_folder(tmp_path):
+    folder = WatchFolderConfig(path=str(tmp_path), rig_id="rig-2")
+    first, second = (
+        WatchFolderService([folder], 0.2, 0.2, 10, 0.1, True)._watchers[0] for _ in range(2)
+    )
+
+    assert first._claim()
+    assert not second._claim()
+    first._release()
+    assert second._claim()
+    second._release()
+
+
+def test_waiting_admission_gives_up_on_timeout_and_disconnect(monkeypatch):
+    def at_capacity(*args, **kwargs):
+        raise HTTPException(status_code=429, detail="Analysis queue is full")
+
+    async def admit(**kwargs):
+        active = {"cancel_event": asyncio.Event(), "runner": asyncio.get_running_loop().create_future()}
+        return await _admit_streamed_image(active, wait=True, **kwargs)
+
+    async def gone():
+        return True
+
+    monkeypatch.setattr(admission_controller, "admit_upload", at_capacity)
+    monkeypatch.setattr(analysis, "ADMISSION_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "ANALYSIS_TIMEOUT_SECONDS", 0.05)
+    assert asyncio.run(admit()) == ADMISSION_TIMED_OUT
+
+    monkeypatch.setattr(settings, "ANALYSIS_TIMEOUT_SECONDS", 60.0)
+    started = time.monotonic()
+    assert "disconnected" in asyncio.run(admit(disconnected=gone))
+    assert time.monotonic() - started < 5
@@ -0,0 +1,84 @@
+"""
+Streaming validation and storage of uploads
+"""
+
+import threading
+
+from app.core.config import settings
+from app.services.content_store import content_digest
+from app.services.storage import store
+from conftest import make_jpeg
+
+API = "/api/v1/upload"
+
+
+def test_upload_is_stored_and_hashed_chunk_by_chunk(client, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 1024)
+    image = make_jpeg(640, 480)
+
+    response = client.post(f"{API}/single", files={"file": ("fish.jpg", image, "application/octet-stream")})
+
+    assert response.status_code == 200
+    info = response.json()["file_info"]
+    assert info["file_size"] == len(image)
+    assert info["content_hash"] == content_digest(image)
+    data, content_type = store.get(info["file_path"])
+    assert bytes(data) == image
+    # The sniffed type wins over the one the client sent
+    assert content_type == "image/jpeg"
+
+
+def test_oversized_and_non_image_uploads_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 1024)
+    image = make_jpeg(640, 480)
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", len(image) - 1)
+
+    too_large = client.post(f"{API}/single", files={"file": ("fish.jpg", image, "image/jpeg")})
+    not_an_image = client.post(f"{API}/single", files={"file": ("fish.jpg", b"plain text " * 100, "image/jpeg")})
+
+    assert too_large.status_code == 400
+    assert "too large" in too_large.json()["detail"]
+    assert not_an_image.status_code == 400
+    assert "Invalid file format" in not_an_image.json()["detail"]
+
+
+def test_batch_upload_enforces_the_total_size(client, monkeypatch):
+    first, second = make_jpeg(seed=1), make_jpeg(seed=2)
+    monkeypatch.setattr(settings, "MAX_TOTAL_BATCH_SIZE", len(first) + len(second) // 2)
+
+    response = client.post(f"{API}/batch", files=[
+        ("files", ("a.jpg", first, "image/jpeg")),
+        ("files", ("b.jpg", second, "image/jpeg")),
+    ])
+
+    summary = response.json()["summary"]
+    assert response.status_code == 200
+    assert (summary["successful_uploads"], summary["failed_uploads"]) == (1, 1)
+
+
+def test_batch_files_are_ingested_in_parallel_in_upload_order(client, monkeypatch):
+    from app.api.v1.endpoints import upload
+
+    ingest_upload_file = upload.ingest_upload_file
+    # Each ingest waits for the other, so a serial pass would time out
+    both_started = threading.Barrier(2, timeout=5)
+    threads = []
+
+    def _ingest(file, key, max_size=None):
+        threads.append(threading.current_thread().name)
+        if file.filename != "bad.jpg":
+            both_started.wait()
+        return ingest_upload_file(file, key, max_size=max_size)
+
+    monkeypatch.setattr(upload, "ingest_upload_file", _ingest)
+    response = client.post(f"{API}/batch", files=[
+        ("files", ("b.jpg", make_jpeg(seed=2), "image/jpeg")),
+        ("files", ("bad.jpg", b"plain text " * 100, "image/jpeg")),
+        ("files", ("a.jpg", make_jpeg(seed=1), "image/jpeg")),
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [info["original_filename"] for info in body["uploaded_files"]] == ["b.jpg", "a.jpg"]
+    assert [failed["filename"] for failed in body["failed_files"]] == ["bad.jpg"]
+    assert all(name.startswith("ingest") for name in threads)